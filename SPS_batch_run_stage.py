@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+
+"""
+SPS Batch Run Stage
+
+Runs one SPS pipeline stage (e.g. first FA analysis or ESP smear file
+generation) over many project folders and writes one consolidated status
+report.
+
+Every project is run in its own Python process with the project folder as
+working directory, exactly as if the stage script had been started there by
+hand.  Up to --workers projects run at the same time.  The parameters the
+stage would otherwise ask for interactively (min_failed_libs,
+dilution_factor, ...) are taken from a JSON config file and handed to the
+stage through the sps_parameters environment (SPS_<NAME>), with prompts
+disabled:
+
+    {
+        "defaults": {"min_failed_libs": 20, "dilution_factor": 5},
+        "projects": {
+            "/data/projects/BP9735": {},
+            "BP9736": {"min_failed_libs": 10}
+        }
+    }
+
+Relative project paths are resolved against the config file's folder.
+Project folders given on the command line are run with the defaults.
+
+A project counts as successful only if the stage wrote a new
+.workflow_status/<script>.success marker, because the stage scripts stop on
+errors without a failing exit code.  The output of every run is kept in
+.workflow_status/<script>.batch.log inside the project folder.
+
+For stages that write BarTender label files (initiate, library_creation,
+rework), --label-batch FILE combines the label files of all successful
+projects into one file, so the labels of the whole batch print as one job.
+
+USAGE: python SPS_batch_run_stage.py <stage> [project_dir ...] [--config FILE]
+                                     [--workers N] [--report FILE]
+                                     [--label-batch FILE]
+
+Stages: initiate, process_wga, library_creation, first_fa, rework,
+        second_fa, decision, conclude
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from sps_bartender import write_print_batch
+from sps_instrumentation import instrument_stage, profile_step
+from sps_parameters import ENV_PREFIX, NON_INTERACTIVE_ENV
+
+# ---------------------------------------------------------------------------
+# Module-level constants
+# ---------------------------------------------------------------------------
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# stage name -> stage script
+STAGES = {
+    'initiate': 'SPS_initiate_project_folder_and_make_sort_plate_labels.py',
+    'process_wga': 'SPS_process_WGA_results.py',
+    'library_creation': 'SPS_make_illumina_index_and_FA_files_NEW.py',
+    'first_fa': 'SPS_first_FA_output_analysis_NEW.py',
+    'rework': 'SPS_rework_first_attempt_NEW.py',
+    'second_fa': 'SPS_second_FA_output_analysis_NEW.py',
+    'decision': 'decision_second_attempt.py',
+    'conclude': 'SPS_conclude_FA_analysis_generate_ESP_smear_file.py',
+}
+
+# stage name -> BarTender label file the stage writes (glob, relative to the project folder)
+STAGE_LABEL_FILES = {
+    'initiate': '1_make_barcode_labels/bartender_barcode_labels/BARTENDER_sort_plate_labels_*.txt',
+    'library_creation': '1_make_library_analyze_fa/A_first_attempt_make_lib/'
+                        'BARTENDER_Library_IlluminaIndex_FA_plate_labels.txt',
+    'rework': '1_make_library_analyze_fa/C_second_attempt_make_lib/BARTENDER_Redo_Library_FA_plates.txt',
+}
+
+STATUS_DIR_NAME = '.workflow_status'
+
+REPORT_COLUMNS = [
+    'project',
+    'stage',
+    'status',
+    'return_code',
+    'duration_s',
+    'message',
+    'log_file',
+]
+
+# output lines that explain why a stage stopped
+ERROR_MARKERS = ('FATAL ERROR', 'ERROR', 'Error', 'Aborting', 'Problem')
+
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+def read_batch_config(config_path):
+    """
+    Read the batch config file.
+
+    Args:
+        config_path (Path): JSON file with optional "defaults" and "projects".
+
+    Returns:
+        tuple: (defaults dict, {project Path: parameter dict})
+
+    Raises:
+        ValueError: If the file is not valid JSON or has the wrong structure.
+    """
+    config_path = Path(config_path)
+
+    try:
+        with open(config_path) as fh:
+            config = json.load(fh)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Config file {config_path} is not valid JSON: {e}")
+
+    if not isinstance(config, dict):
+        raise ValueError(f"Config file {config_path} must contain a JSON object")
+
+    defaults = config.get('defaults', {})
+    projects = config.get('projects', {})
+
+    if not isinstance(defaults, dict) or not isinstance(projects, dict):
+        raise ValueError(f"'defaults' and 'projects' in {config_path} must be JSON objects")
+
+    project_params = {}
+    for project, params in projects.items():
+        if not isinstance(params, dict):
+            raise ValueError(f"Parameters for project {project} in {config_path} must be a JSON object")
+        project_dir = Path(project).expanduser()
+        if not project_dir.is_absolute():
+            project_dir = config_path.parent / project_dir
+        project_params[project_dir.resolve()] = params
+
+    return defaults, project_params
+
+
+def build_environment(params):
+    """
+    Build the environment that hands a project's parameters to a stage.
+
+    Args:
+        params (dict): Parameters for one project (defaults already applied).
+
+    Returns:
+        dict: Copy of os.environ with SPS_<NAME> set for every parameter and
+            prompts disabled, so a missing required parameter stops the stage
+            with an error instead of waiting for input.
+    """
+    env = dict(os.environ)
+    env.update({f"{ENV_PREFIX}{name.upper()}": str(value) for name, value in params.items()})
+    env[NON_INTERACTIVE_ENV] = '1'
+
+    return env
+
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+
+def run_stage_in_project(script_path, project_dir, env):
+    """
+    Run one stage script in one project folder.
+
+    Args:
+        script_path (Path): Stage script.
+        project_dir (Path): Project folder used as working directory.
+        env (dict): Environment of the stage process (see build_environment).
+
+    Returns:
+        dict: Report row (see REPORT_COLUMNS, without 'stage').
+    """
+    script_path = Path(script_path)
+    project_dir = Path(project_dir)
+    status_dir = project_dir / STATUS_DIR_NAME
+    marker = status_dir / f"{script_path.stem}.success"
+    log_file = status_dir / f"{script_path.stem}.batch.log"
+
+    row = {'project': str(project_dir), 'return_code': None, 'duration_s': 0.0,
+           'message': '', 'log_file': ''}
+
+    if not project_dir.is_dir():
+        row.update(status='failed', message='Project folder not found')
+        return row
+
+    marker_before = marker.stat().st_mtime_ns if marker.exists() else None
+
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(
+            [sys.executable, str(script_path)],
+            cwd=project_dir,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+        )
+    except OSError as e:
+        row.update(status='failed', message=f"Could not start {script_path.name}: {e}")
+        return row
+    row['duration_s'] = round(time.perf_counter() - start, 2)
+    row['return_code'] = result.returncode
+
+    status_dir.mkdir(exist_ok=True)
+    log_file.write_text(result.stdout + result.stderr)
+    row['log_file'] = str(log_file)
+
+    marker_written = marker.exists() and marker.stat().st_mtime_ns != marker_before
+
+    if result.returncode == 0 and marker_written:
+        row.update(status='success')
+    else:
+        row.update(status='failed', message=failure_message(result.stdout + result.stderr))
+
+    return row
+
+
+def failure_message(output):
+    """Return the most useful line of a failed run's output."""
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+
+    for line in reversed(lines):
+        positions = [line.find(marker) for marker in ERROR_MARKERS if marker in line]
+        if positions:
+            # prompts have no newline, so drop any prompt text before the error
+            return line[min(positions):]
+
+    return lines[-1] if lines else 'No success marker written'
+
+
+@profile_step()
+def run_batch(stage, projects, defaults, workers=1, script_dir=SCRIPT_DIR):
+    """
+    Run a stage over many project folders.
+
+    Args:
+        stage (str): Stage name (key of STAGES).
+        projects (dict): {project folder: parameter dict}.
+        defaults (dict): Parameters used when a project does not set them.
+        workers (int): Number of projects run at the same time.
+        script_dir (Path): Folder holding the stage scripts.
+
+    Returns:
+        pd.DataFrame: One report row per project, in the given project order.
+    """
+    script_path = Path(script_dir) / STAGES[stage]
+
+    def run_one(project_dir):
+        env = build_environment({**defaults, **projects[project_dir]})
+        return run_stage_in_project(script_path, project_dir, env)
+
+    # each project runs in its own process; the threads only wait for them
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        rows = list(executor.map(run_one, list(projects)))
+
+    report_df = pd.DataFrame(rows)
+    report_df['stage'] = stage
+    report_df['return_code'] = report_df['return_code'].astype('Int64')
+
+    return report_df[REPORT_COLUMNS]
+
+
+# ---------------------------------------------------------------------------
+# Labels
+# ---------------------------------------------------------------------------
+
+def find_label_file(stage, project_dir):
+    """
+    Return the newest BarTender label file a stage wrote in a project folder.
+
+    Args:
+        stage (str): Stage name (key of STAGE_LABEL_FILES).
+        project_dir (Path): Project folder.
+
+    Returns:
+        Path: The label file, or None if there is none.
+    """
+    label_files = list(Path(project_dir).glob(STAGE_LABEL_FILES[stage]))
+    if not label_files:
+        return None
+    return max(label_files, key=lambda path: path.stat().st_mtime_ns)
+
+
+@profile_step()
+def write_label_batch(stage, report_df, batch_path):
+    """
+    Combine the label files of the successful projects into one print batch.
+
+    Args:
+        stage (str): Stage name (key of STAGE_LABEL_FILES).
+        report_df (pd.DataFrame): Report of run_batch.
+        batch_path (Path): Output label file.
+
+    Returns:
+        list: The label files combined, in report order.
+
+    Raises:
+        ValueError: If a label file is not a BarTender label file.
+        OSError: If a label file cannot be read or the batch cannot be written.
+    """
+    succeeded = report_df.loc[report_df['status'] == 'success', 'project']
+    label_files = [path for path in (find_label_file(stage, project) for project in succeeded)
+                   if path is not None]
+
+    write_print_batch(batch_path, label_files)
+
+    return label_files
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def parse_command_line_arguments(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description='Run one SPS pipeline stage over many project folders.')
+
+    parser.add_argument('stage', choices=sorted(STAGES), help='pipeline stage to run')
+    parser.add_argument('projects', nargs='*', type=Path,
+                        help='project folders (in addition to those in the config file)')
+    parser.add_argument('--config', type=Path,
+                        help='JSON file with default and per-project parameters')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of projects processed at the same time (default: 1)')
+    parser.add_argument('--report', type=Path,
+                        help='status report CSV (default: batch_report_<stage>_<date>.csv)')
+    parser.add_argument('--label-batch', type=Path,
+                        help='combine the BarTender label files of all successful projects into this file')
+
+    return parser.parse_args(argv)
+
+
+@instrument_stage
+def main(argv=None):
+    """
+    Run a stage over all requested projects and write the status report.
+    """
+    args = parse_command_line_arguments(argv)
+
+    defaults, projects = {}, {}
+    if args.config is not None:
+        try:
+            defaults, projects = read_batch_config(args.config)
+        except (OSError, ValueError) as e:
+            print(f"FATAL ERROR: Could not read config file: {e}")
+            sys.exit()
+
+    for project_dir in args.projects:
+        projects.setdefault(project_dir.resolve(), {})
+
+    if not projects:
+        print("FATAL ERROR: No project folders given on the command line or in the config file")
+        sys.exit()
+
+    if args.label_batch is not None and args.stage not in STAGE_LABEL_FILES:
+        print(f"FATAL ERROR: Stage {args.stage} writes no BarTender label files "
+              f"(--label-batch works with: {', '.join(sorted(STAGE_LABEL_FILES))})")
+        sys.exit()
+
+    print("=" * 60)
+    print(f"SPS Batch Run: {args.stage} ({STAGES[args.stage]})")
+    print(f"Projects: {len(projects)}, workers: {args.workers}")
+
+    report_df = run_batch(args.stage, projects, defaults, workers=args.workers)
+
+    date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
+    report_path = args.report or Path(f"batch_report_{args.stage}_{date}.csv")
+    report_df.to_csv(report_path, index=False)
+
+    for row in report_df.itertuples():
+        mark = '✅' if row.status == 'success' else '❌'
+        detail = f" - {row.message}" if row.message else ''
+        print(f"{mark} {row.project}{detail}")
+
+    n_failed = int((report_df['status'] != 'success').sum())
+    print(f"\n{len(report_df) - n_failed} succeeded, {n_failed} failed")
+    print(f"Status report: {report_path}")
+
+    if args.label_batch is not None:
+        try:
+            label_files = write_label_batch(args.stage, report_df, args.label_batch)
+        except (OSError, ValueError) as e:
+            print(f"FATAL ERROR: Could not write label print batch {args.label_batch}: {e}")
+            sys.exit()
+        print(f"Label print batch: {args.label_batch} ({len(label_files)} project(s))")
+
+    if n_failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,38 @@
 
 
 
+import argparse
 import sys
 from pathlib import Path
 from datetime import datetime
-from sqlalchemy import create_engine
 import pandas as pd
 import numpy as np
 
+from sps_archive import archive_files, archive_run_name
+from sps_database import (ATTEMPT_PREFIXES, checkpoint_database, record_library_attempts,
+                          upsert_project_summary)
+from sps_esp_export import smear_table, write_smear_bundles, write_smear_files
+from sps_instrumentation import detail, instrument_stage, profile_step
+from sps_plate_files import WRITE_WORKERS
+from sps_snapshot import (archive_project_summary_csv, load_project_summary,
+                          refresh_project_summary_snapshot)
+
+
+# Pool_* column -> attempt column it is taken from
+POOL_FIELDS = {
+    'Pool_source_plate': 'Destination_Plate_Barcode',
+    'Pool_source_well': 'Destination_Well',
+    'Pool_Illumina_index_set': 'Illumina_index_set',
+    'Pool_Illumina_index': 'Illumina_index',
+    'Pool_dilution_factor': 'dilution_factor',
+    'Pool_DNA_conc_ng/uL': 'ng/uL',
+    'Pool_nmole/L': 'nmole/L',
+    'Pool_Avg. Size': 'Avg. Size',
+}
+
+# Pool_* columns set to 0 for libraries that failed every attempt
+POOL_PASSED_ONLY_FIELDS = ['Pool_DNA_conc_ng/uL', 'Pool_nmole/L', 'Pool_Avg. Size']
+
 
 def create_success_marker():
     """Create success marker file for workflow manager integration."""
@@ -63,21 +88,14 @@ def findUpdateFAFile():
 
 ##########################
 ##########################
+@profile_step()
 def readSQLdb():
     
     # path to sqlite db project_summary.db
     sql_db_path = PROJECT_DIR /'project_summary.db'
 
-    # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
-
-    # define sql query
-    query = "SELECT * FROM project_summary"
-    
-    # import sql db into pandas df
-    sql_df = pd.read_sql(query, engine)
-    
-    engine.dispose()
+    # import sql db into pandas df, from the parquet snapshot when it is current
+    sql_df = load_project_summary(sql_db_path)
 
     return sql_df
 ##########################
@@ -137,13 +155,15 @@ def handleFirstAttemptOnly(lib_df):
 
 ##########################
 ##########################
-def updateLibInfo(updated_file_name):
+@profile_step()
+def updateLibInfo(updated_file_name, lib_df=None):
 
     # create df from fa_analysis_summary.txt file
     reduced_df = pd.read_csv(updated_file_name, sep='\t', header=0)
     
-    # create df from project_summary.db sqliute file
-    lib_df = readSQLdb()
+    # create df from project_summary.db sqliute file, unless the workflow
+    # runner passed the project_summary data in
+    lib_df = readSQLdb() if lib_df is None else lib_df.copy()
     
     if 'Total_passed_attempts' in lib_df.columns:
     
@@ -221,102 +241,72 @@ def updateLibInfo(updated_file_name):
 
 ##########################
 ##########################
-def selectPlateForPooling(lib_df):
+def findPoolingAttempt(lib_df, attempt_prefixes=ATTEMPT_PREFIXES):
+    """
+    Index of the library attempt used for pooling, per library.
+
+    The latest attempt that passed is pooled; libraries that never passed
+    fall back to the first attempt.
+
+    Args:
+        lib_df: project_summary data with a <prefix>Passed_library column
+            per attempt
+        attempt_prefixes: column prefix of each attempt, oldest first
 
+    Returns:
+        np.ndarray: position in attempt_prefixes for every library
+    """
+    passed = np.column_stack([pd.to_numeric(lib_df[f'{prefix}Passed_library'], errors='coerce').fillna(0).to_numpy() == 1
+                              for prefix in attempt_prefixes])
+
+    # argmax over the reversed attempts finds the latest passing one
+    latest_passed = len(attempt_prefixes) - 1 - np.argmax(passed[:, ::-1], axis=1)
+
+    return np.where(passed.any(axis=1), latest_passed, 0)
+##########################
+##########################
+
+##########################
+##########################
+@profile_step()
+def selectPlateForPooling(lib_df, attempt_prefixes=ATTEMPT_PREFIXES):
+    """
+    Add the Pool_* columns: plate, well, index, dilution and FA results of
+    the attempt selected by findPoolingAttempt().
+
+    Args:
+        lib_df: project_summary data with every field of POOL_FIELDS (and
+            <prefix>Passed_library) per attempt
+        attempt_prefixes: column prefix of each attempt, oldest first
+            (first attempt '', second attempt 'Redo_', ...)
+
+    Returns:
+        copy of lib_df with the Pool_* columns added
+    """
     # Create Pool columns for ALL samples (both passed and failed)
     # Start with a copy of the entire dataframe
     final_df = lib_df.copy()
 
-    # Initialize Pool columns for ALL samples
-    final_df['Pool_source_plate'] = ""
-    final_df['Pool_source_well'] = ""
-    final_df['Pool_Illumina_index_set'] = ""
-    final_df['Pool_Illumina_index'] = ""
-    final_df['Pool_dilution_factor'] = ""
-    final_df['Pool_DNA_conc_ng/uL'] = 0
-    final_df['Pool_nmole/L'] = 0
-    final_df['Pool_Avg. Size'] = 0
-
-    # For ALL samples, populate Pool source plate/well/index/dilution based on which attempt was made
-    # Preserve original logic: Total_passed_attempts == 2 gets priority, then Redo_Passed_library == 1, then first attempt
-    final_df['Pool_source_plate'] = np.where(
-        final_df['Total_passed_attempts'] == 2,
-        final_df['Redo_Destination_Plate_Barcode'],
-        (np.where(final_df['Redo_Passed_library'] == 1,
-                  final_df['Redo_Destination_Plate_Barcode'],
-                  final_df['Destination_Plate_Barcode']))
-    )
-
-    final_df['Pool_source_well'] = np.where(
-        final_df['Total_passed_attempts'] == 2,
-        final_df['Redo_Destination_Well'],
-        (np.where(final_df['Redo_Passed_library'] == 1,
-                  final_df['Redo_Destination_Well'],
-                  final_df['Destination_Well']))
-    )
-
-    final_df['Pool_Illumina_index_set'] = np.where(
-        final_df['Total_passed_attempts'] == 2,
-        final_df['Redo_Illumina_index_set'],
-        (np.where(final_df['Redo_Passed_library'] == 1,
-                  final_df['Redo_Illumina_index_set'],
-                  final_df['Illumina_index_set']))
-    )
-
-    final_df['Pool_Illumina_index'] = np.where(
-        final_df['Total_passed_attempts'] == 2,
-        final_df['Redo_Illumina_index'],
-        (np.where(final_df['Redo_Passed_library'] == 1,
-                  final_df['Redo_Illumina_index'],
-                  final_df['Illumina_index']))
-    )
-
-    final_df['Pool_dilution_factor'] = np.where(
-        final_df['Total_passed_attempts'] == 2,
-        final_df['Redo_dilution_factor'],
-        (np.where(final_df['Redo_Passed_library'] == 1,
-                  final_df['Redo_dilution_factor'],
-                  final_df['dilution_factor']))
-    )
-    
+    pool_attempt = findPoolingAttempt(final_df, attempt_prefixes)
+
+    # (library, attempt, field) stack of every Pool_* source column, so all
+    # fields are gathered from the selected attempt in one step
+    attempt_columns = [[f'{prefix}{field}' for prefix in attempt_prefixes] for field in POOL_FIELDS.values()]
+    stacked = np.stack([final_df[columns].to_numpy(dtype=object) for columns in attempt_columns], axis=2)
+    pooled = np.take_along_axis(stacked, pool_attempt[:, None, None], axis=1)[:, 0, :]
+
     # For concentration and size values: Only populate for PASSED libraries (Total_passed_attempts >= 1)
-    # Failed libraries (Total_passed_attempts == 0) keep the default values of 0
-    # Preserve original logic for passed libraries: Total_passed_attempts == 2 gets priority, then Redo_Passed_library == 1, then first attempt
-    final_df['Pool_DNA_conc_ng/uL'] = np.where(
-        final_df['Total_passed_attempts'] >= 1,
-        np.where(
-            final_df['Total_passed_attempts'] == 2,
-            final_df['Redo_ng/uL'],
-            (np.where(final_df['Redo_Passed_library'] == 1,
-                      final_df['Redo_ng/uL'],
-                      final_df['ng/uL']))
-        ),
-        0  # Failed libraries get 0
-    )
-
-    final_df['Pool_nmole/L'] = np.where(
-        final_df['Total_passed_attempts'] >= 1,
-        np.where(
-            final_df['Total_passed_attempts'] == 2,
-            final_df['Redo_nmole/L'],
-            (np.where(final_df['Redo_Passed_library'] == 1,
-                      final_df['Redo_nmole/L'],
-                      final_df['nmole/L']))
-        ),
-        0  # Failed libraries get 0
-    )
-
-    final_df['Pool_Avg. Size'] = np.where(
-        final_df['Total_passed_attempts'] >= 1,
-        np.where(
-            final_df['Total_passed_attempts'] == 2,
-            final_df['Redo_Avg. Size'],
-            (np.where(final_df['Redo_Passed_library'] == 1,
-                      final_df['Redo_Avg. Size'],
-                      final_df['Avg. Size']))
-        ),
-        0  # Failed libraries get 0
-    )
+    # Failed libraries (Total_passed_attempts == 0) get 0
+    passed_any = (final_df['Total_passed_attempts'] >= 1).to_numpy()
+
+    for k, (pool_column, columns) in enumerate(zip(POOL_FIELDS, attempt_columns)):
+        # keep the dtype the attempt columns have together
+        values = pooled[:, k].astype(final_df[columns].to_numpy().dtype)
+
+        if pool_column in POOL_PASSED_ONLY_FIELDS:
+            values = np.where(passed_any, values, 0)
+
+        final_df[pool_column] = values
 
     return final_df
 
@@ -325,97 +315,69 @@ def selectPlateForPooling(lib_df):
 
 ##########################
 ##########################
-def generateSmearFile(final_df):
+@profile_step()
+def generateSmearFile(final_df, workers=WRITE_WORKERS, bundle_plates=0):
+    """
+    Write one ESP smear file per library plate and, if bundle_plates is set,
+    one zip upload bundle per pooling batch of bundle_plates plates.
+    """
     # ESP smear file columns: Well, Sample ID, Range, ng/uL, %Total, nmole/L, Avg. Size,
     # %CV, Volume uL, QC Result, Failure Mode, Index Name, PCR Cycles
+    smear_df = smear_table(final_df)
 
-    # create smear_df with relevant columns from final_df, including Destination_Plate_Barcode for grouping
-    smear_df = final_df[['Destination_Well','Illumina Library','Pool_DNA_conc_ng/uL','Pool_nmole/L','Pool_Avg. Size','Pool_Illumina_index','Total_passed_attempts','Destination_Plate_Barcode']].copy()
-    
-    # rename columns to match ESP smear file format (except Destination_Plate_Barcode which we'll use for grouping)
-    smear_df.rename(columns={
-        'Destination_Well': 'Well',
-        'Illumina Library': 'Sample ID',
-        'Pool_DNA_conc_ng/uL': 'ng/uL',
-        'Pool_nmole/L': 'nmole/L',
-        'Pool_Avg. Size': 'Avg. Size',
-        'Pool_Illumina_index': 'Index Name',
-        'Total_passed_attempts': 'QC Result'
-    }, inplace=True)
-
-    # add constant columns with default values
-    smear_df['Range'] = '400 bp to 800 bp'
-    smear_df['%Total'] = 15
-    smear_df['%CV'] = 20
-    smear_df['Volume uL'] = 20
-    smear_df['PCR Cycles'] = 12
-
-    # if smear_df['QC Result'] >=1, set to 'Pass', else 'Fail'
-    smear_df['QC Result'] = smear_df['QC Result'].apply(lambda x: 'Pass' if x >= 1 else 'Fail')
-
-    # if smear_df['QC Result'] == 'Fail', set 'Failure Mode' to 'Sample Problem', else ''
-    smear_df['Failure Mode'] = smear_df['QC Result'].apply(lambda x: 'Sample Problem' if x == 'Fail' else '')
-
-    # Get unique destination plate barcodes
-    unique_plates = smear_df['Destination_Plate_Barcode'].unique()
-    
-    print(f"Found {len(unique_plates)} unique destination plate barcodes: {list(unique_plates)}")
-    
-    # Create separate files for each unique destination plate barcode
-    for plate_barcode in unique_plates:
-        # Filter data for current plate barcode
-        plate_df = smear_df[smear_df['Destination_Plate_Barcode'] == plate_barcode].copy()
-        
-        # Remove the Destination_Plate_Barcode column from the export (as requested)
-        plate_df = plate_df.drop('Destination_Plate_Barcode', axis=1)
-        
-        # Reorder columns for final export
-        plate_df = plate_df[['Well', 'Sample ID', 'Range', 'ng/uL', '%Total', 'nmole/L', 'Avg. Size',
-                             '%CV', 'Volume uL', 'QC Result', 'Failure Mode', 'Index Name', 'PCR Cycles']]
-        
-        # Create filename with plate barcode included
-        smear_file_path = SMEAR_DIR / f'ESP_smear_file_for_upload_{plate_barcode}.csv'
-        
-        # Export plate-specific data to tab delimited file
-        plate_df.to_csv(smear_file_path, index=False)
-        
-        print(f"✓ Created ESP smear file: {smear_file_path} ({len(plate_df)} rows)")
+    plate_counts = smear_df['Destination_Plate_Barcode'].value_counts(sort=False)
+
+    print(f"Found {len(plate_counts)} unique destination plate barcodes: {list(plate_counts.index)}")
+
+    # split into plates once and write all plate files concurrently
+    smear_files = write_smear_files(smear_df, SMEAR_DIR, workers=workers)
 
-    return
+    for plate_barcode, smear_file_path in zip(plate_counts.index, smear_files):
+        detail(f"✓ Created ESP smear file: {smear_file_path} ({plate_counts[plate_barcode]} rows)")
+
+    if bundle_plates:
+        bundles = write_smear_bundles(smear_files, SMEAR_DIR, bundle_plates, workers=workers)
+
+        for bundle_path in bundles:
+            detail(f"✓ Created ESP upload bundle: {bundle_path}")
+
+    return smear_files
 ##########################
 ##########################
 
 
 #########################
 #########################
+@profile_step()
 def createSQLdb(lib_df):
     
     # # make copy of current version so project_summary.db to be archived
     # # the copy will be moved to archive folder at a later step
     # shutil.copy(PROJECT_DIR /'project_summary.db', PROJECT_DIR / 'archive_project_summary.db')
     
-    # archive the older version of sql project_summary.db
-    Path(PROJECT_DIR /
-        "project_summary.db").rename(ARCHIV_DIR / f"archive_project_summary_{date}.db")
-    Path(ARCHIV_DIR / f"archive_project_summary_{date}.db").touch()
-
     sql_db_path = PROJECT_DIR /'project_summary.db'
 
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
-
+    # archive a copy of the older version of sql project_summary.db in the
+    # deduplicated archive store
+    checkpoint_database(sql_db_path)
+    archive_files(ARCHIV_DIR, [(sql_db_path, f"archive_project_summary_{date}.db")],
+                  archive_run_name(Path(__file__).stem, date))
 
-    # Specify the table name and database engine
-    table_name = 'project_summary'
-    
-    # Export the DataFrame to the SQLite database
-    lib_df.to_sql(table_name, engine, if_exists='replace', index=False) 
+    # update project_summary in place to match project_summary.csv, writing only what changed,
+    # and the pass/fail results of every attempt in library_attempts
+    try:
+        upsert_project_summary(lib_df, sql_db_path, complete=True)
+        record_library_attempts(lib_df, sql_db_path)
+    except ValueError as e:
+        print(f'\n\nProblem updating project_summary.db: {e}. Aborting script\n\n')
+        sys.exit()
 
-    engine.dispose()
+    # columnar snapshot read by the next stages (only written when pyarrow is installed)
+    refresh_project_summary_snapshot(sql_db_path)
 
-    # archive the current project_summary.csv
-    Path(PROJECT_DIR /
-        "project_summary.csv").rename(ARCHIV_DIR / f"archive_project_summary_{date}.csv")
-    Path(ARCHIV_DIR / f"archive_project_summary_{date}.csv").touch()
+    # archive the current project_summary.csv (stored as compressed parquet when available)
+    archive_project_summary_csv(PROJECT_DIR / "project_summary.csv", ARCHIV_DIR, date,
+                                run=archive_run_name(Path(__file__).stem, date))
 
     # create updated library info file
     lib_df.to_csv(PROJECT_DIR / 'project_summary.csv', index=False)
@@ -425,16 +387,10 @@ def createSQLdb(lib_df):
 #########################
 
 
-def main():
+def setUpFolders():
     """
-    Main function to conclude the FA analysis and generate an ESP smear file.
-    1. Sets up folder organization and global variables.
-    2. Determines which FA analysis results to use (1st or 2nd attempt
+    Set up folder organization and global variables for the current project.
     """
-    # #########################
-    # set up folder organiztion
-    # #########################
-
     # current_dir = os.path.basename(os.getcwd())
 
     global PROJECT_DIR, LIB_DIR, FIRST_FA_DIR, SECOND_FA_DIR
@@ -457,8 +413,26 @@ def main():
 
     # get current date and time, will add to archive database file name
     date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
+#########################
+#########################
 
 
+@profile_step()
+def concludeFAanalysis(lib_df=None, workers=WRITE_WORKERS, bundle_plates=0):
+    """
+    Select libraries for pooling, write the ESP smear file and update the
+    project database.  setUpFolders() must have been called first.
+
+    Args:
+        lib_df: project_summary data already in memory (e.g. from the
+            workflow runner); read from project_summary.db when None
+        workers: Number of threads writing the ESP smear files
+        bundle_plates: Plates per pooling batch for the zipped ESP upload
+            bundles; 0 writes no bundles
+
+    Returns:
+        DataFrame written to project_summary.db
+    """
     # determine if we should use 1st or 2nd attempt fa results
     # based on which folder exists and contains the appropriate
     # updated_fa_analysis_summary.txt file
@@ -467,7 +441,7 @@ def main():
     # add library pass/fail results from updated_X_fa_analysis.txt
     # to the project_summary.csv file
     # pass/fail results may have been manually modified
-    lib_df = updateLibInfo(updated_file_name)
+    lib_df = updateLibInfo(updated_file_name, lib_df)
 
     # select plates and wells to use for pooling based on
     # pass/fail results and add 'Pool' columns to project_summary_df
@@ -475,13 +449,67 @@ def main():
 
     # generate ESP smear file for clarity upload using 'Pool' columns
     # in final_df
-    generateSmearFile(final_df)
+    generateSmearFile(final_df, workers=workers, bundle_plates=bundle_plates)
 
     # create sqlite database file
     createSQLdb(final_df)
 
     print("\n✓ FA analysis concluded successfully!")
     print("✓ ESP smear file generated for upload")
+
+    return final_df
+#########################
+#########################
+
+
+def parse_command_line_arguments():
+    """
+    Parse command line arguments.
+
+    Returns:
+        argparse.Namespace with the number of writer threads and the
+        plates per ESP upload bundle
+    """
+    parser = argparse.ArgumentParser(
+        description='Select libraries for pooling and generate the ESP smear files.')
+
+    parser.add_argument(
+        '--workers', type=int, default=WRITE_WORKERS,
+        help=f'number of threads writing ESP smear files (default: {WRITE_WORKERS})')
+
+    parser.add_argument(
+        '--bundle-plates', type=int, default=0, metavar='N',
+        help='also zip the smear files into one ESP upload bundle per pooling batch '
+             'of N plates (default: 0, no bundles)')
+
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    if args.bundle_plates < 0:
+        parser.error('--bundle-plates must be 0 or more')
+
+    return args
+#########################
+#########################
+
+
+@instrument_stage
+def main():
+    """
+    Main function to conclude the FA analysis and generate an ESP smear file.
+    1. Sets up folder organization and global variables.
+    2. Determines which FA analysis results to use (1st or 2nd attempt
+    """
+    args = parse_command_line_arguments()
+
+    # #########################
+    # set up folder organiztion
+    # #########################
+    setUpFolders()
+
+    concludeFAanalysis(workers=args.workers, bundle_plates=args.bundle_plates)
     
     # Create success marker for workflow manager integration
     create_success_marker()
@@ -16,14 +16,22 @@ The script expects to be run from the B_first_attempt_fa_result directory and wi
 """
 
 
+import argparse
 import sys
 from pathlib import Path
-import shutil
-from sqlalchemy import create_engine
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from sps_archive import archive_run_name, archive_tree
+from sps_cache import cached_frame, enable_cache
+from sps_fa_smear import copy_smear_files, find_smear_files, parse_smear_files
+from sps_instrumentation import detail, instrument_stage, profile_step
+from sps_parameters import add_parameter_arguments, configure_parameters, get_parameter
+from sps_snapshot import load_project_summary
+from sps_thresholds import (DEFAULT_MIN_FAILED_LIBS, SWEEP_FILE_NAME, add_sweep_arguments, passed_libraries,
+                            sweep_requested, sweep_thresholds, whole_plate_reworks, write_sweep_report)
+
 
 def create_success_marker():
     """Create success marker file for workflow manager integration."""
@@ -58,84 +66,37 @@ ARCHIV_DIR.mkdir(parents=True, exist_ok=True)
 
 ##########################
 ##########################
-def compareFolderFileNames(folder_path, file, folder_name):
-    """
-    Validate that FA plate names in folder match sample names in CSV file.
-    
-    Args:
-        folder_path: Path to the folder containing the FA file
-        file: Name of the FA CSV file
-        folder_name: Name of the FA plate folder
-        
-    Raises:
-        SystemExit: If plate names don't match
-    """
-    # Read FA smear analysis output CSV file
-    fa_df = pd.read_csv(folder_path / file, usecols=['Sample ID'])
-    
-    # Extract unique sample names
-    sample_list = fa_df['Sample ID'].unique().tolist()
-    
-    # Parse plate names from sample IDs and add 'F' suffix to match folder naming
-    plate_list = [s.split('_')[0] + 'F' for s in sample_list]
-    
-    # Validate folder name matches parsed plate names
-    if folder_name not in set(plate_list):
-        print(f'\n\nMismatch between FA plate ID and sample names for plate {folder_name}. Aborting script\n')
-        sys.exit()
-##########################
-##########################
-
-##########################
-##########################
-def getFAfiles(first_dir):
+@profile_step()
+def getFAfiles(first_dir, workers=1):
     """
     Scan directories for FA output files and copy them to the working directory.
     
     Args:
         first_dir: Path to the first attempt FA result directory
+        workers: Number of threads used to read, validate and copy FA files
         
     Returns:
         Tuple of (List of FA file names that were processed, List of FA result directories for archiving)
         
     Raises:
-        SystemExit: If no FA files are found
+        SystemExit: If no FA files are found or a folder name doesn't match its FA file
     """
-    fa_files = []
-    fa_result_dirs_to_archive = []  # NEW: Track directories for archiving
-    
-    for direct in first_dir.iterdir():
-        if direct.is_dir():
-            nxt_dir = direct
-            
-            # scan current directory and find subdirectories
-            for fa in nxt_dir.iterdir():
-                if fa.is_dir():
-                    
-                    # find full path to subdirectories
-                    folder_path = fa
-                    
-                    # extract name of FA plate by parsing the subdirectory name
-                    folder_name = fa.name
-                    folder_name = folder_name.split(' ')[0]
-                    
-                    # search for smear analysis files in each subdirectory
-                    for file_path in fa.iterdir():
-                        if file_path.name.endswith('Smear Analysis Result.csv'):
-                            # confirm folder name matches plate name parsed from
-                            # smear analysis .csv sample names.  Error out if mismatch
-                            compareFolderFileNames(folder_path, file_path.name, folder_name)
-                            
-                            # copy and rename smear analysis to main directory if good match
-                            shutil.copy(file_path, first_dir / f'{folder_name}.csv')
-                            
-                            # add folder name (aka FA plate name) to list
-                            fa_files.append(f'{folder_name}.csv')
-                            
-                            # NEW: Track this directory for archiving
-                            fa_result_dirs_to_archive.append(fa)
-    
-    
+    # scan run folders and FA plate subdirectories once, in name order,
+    # and pair every smear analysis file with its FA plate folder
+    smear_jobs = [(fa, file_path)
+                  for fa, smear_paths in find_smear_files(first_dir)
+                  for file_path in smear_paths]
+
+    # confirm folder name matches plate name parsed from smear analysis .csv
+    # sample names while copying/renaming files to main directory.  Error out if mismatch
+    try:
+        fa_files = copy_smear_files(smear_jobs, first_dir, workers=workers)
+    except ValueError as e:
+        print(f'\n\n{e}. Aborting script\n')
+        sys.exit()
+
+    # track FA plate directories for archiving
+    fa_result_dirs_to_archive = [fa for fa, _ in smear_jobs]
 
     # quit script if directory doesn't contain FA .csv files
     if len(fa_files) == 0:
@@ -149,91 +110,46 @@ def getFAfiles(first_dir):
 
 ##########################
 ##########################
+@profile_step()
 def processFAfiles(my_fa_files):
     """
-    Process FA CSV files into DataFrames with cleaned and standardized data.
+    Parse FA CSV files into one DataFrame with cleaned and standardized data.
     
     Args:
         my_fa_files: List of FA file names to process
         
     Returns:
-        Tuple of (dictionary mapping filenames to DataFrames, list of destination plates)
+        Tuple of (DataFrame of FA results from all files, list of destination plates)
         
     Raises:
         SystemExit: If processing fails or file counts don't match
     """
-    # create dict where  keys are FA file names and value are df's from those files
-    fa_dict = {}
-
-    fa_dest_plates = []
-
-    # loop through all FA files and create df's stored in dict
-    for f in my_fa_files:
-        fa_dict[f] = pd.read_csv(FIRST_DIR / f, usecols=[
-            'Well', 'Sample ID', 'ng/uL', 'nmole/L', 'Avg. Size'])
-
-        fa_dict[f] = fa_dict[f].rename(
-            columns={"Sample ID": "FA_Sample_ID", "Well": "FA_Well"})
-
-        fa_dict[f]['FA_Well'] = fa_dict[f]['FA_Well'].str.replace(
-            ':', '')
-
-        # remove rows with "empty" or "ladder" in sample ID. search is case insensitive
-        fa_dict[f] = fa_dict[f][fa_dict[f]["FA_Sample_ID"].str.contains(
-            'empty', case=False) == False]
-
-        fa_dict[f] = fa_dict[f][fa_dict[f]["FA_Sample_ID"].str.contains(
-            'ladder', case=False) == False]
-
-        fa_dict[f] = fa_dict[f][fa_dict[f]["FA_Sample_ID"].str.contains(
-            'LibStd', case=False) == False]
-
-        # create three new columns by parsing Sample_ID string using "_" as delimiter
-        fa_dict[f][['FA_Destination_plate', 'FA_Sample', 'FA_well_2']
-                   ] = fa_dict[f].FA_Sample_ID.str.split("_", expand=True)
-        
-     
-
-        fa_dict[f]['ng/uL'] = fa_dict[f]['ng/uL'].fillna(0)
-
-        fa_dict[f]['nmole/L'] = fa_dict[f]['nmole/L'].fillna(0)
-
-        fa_dict[f]['Avg. Size'] = fa_dict[f]['Avg. Size'].fillna(0)
-
-        fa_dict[f]['FA_Sample'] = fa_dict[f]['FA_Sample'].astype(str)
-
-        fa_dict[f]['ng/uL'] = fa_dict[f]['ng/uL'].astype(float)
-
-        fa_dict[f]['nmole/L'] = fa_dict[f]['nmole/L'].astype(float)
-
-        fa_dict[f]['Avg. Size'] = fa_dict[f]['Avg. Size'].astype(float)
-
-        # add destination plates in fa file to list fa_dest_plates
-        fa_dest_plates = fa_dest_plates + \
-            fa_dict[f]['FA_Destination_plate'].unique().tolist()       
-    
-        # get rid of unnecessary columsn
-        fa_dict[f].drop(['FA_Destination_plate','FA_well_2','FA_Sample_ID'], inplace=True, axis=1)
-
     # quit script if were not able to process FA input files
-    if len(fa_dict.keys()) == 0:
+    if len(my_fa_files) == 0:
         print("\n\nDid not successfully extract FA files\n\n")
         sys.exit()
 
-    elif len(fa_dict.keys()) != len(fa_dest_plates):
+    # parse all FA files in a single pass (shared with second FA analysis)
+    try:
+        fa_df, fa_dest_plates = parse_smear_files([FIRST_DIR / f for f in my_fa_files])
+    except ValueError as e:
+        print(f"\n\nProblem parsing FA files: {e}\n\n")
+        sys.exit()
+
+    if len(my_fa_files) != len(fa_dest_plates):
         print("\n\nMismatch in number of FA files and destination plates\n\n")
         sys.exit()
 
     # print out list of successfully processed FA files
-    print("\n\n\nList of processed FA output files:\n\n\n")
+    detail("\n\n\nList of processed FA output files:\n\n\n")
 
-    for k in fa_dict.keys():
-        print(f'{k}\n')
+    for k in my_fa_files:
+        detail(f'{k}\n')
 
     # add some blank lines after displaying list of processed FA files
-    print('\n\n\n')
+    detail('\n\n\n')
 
-    return fa_dict, fa_dest_plates
+    return fa_df, fa_dest_plates
 ##########################
 ##########################
 
@@ -241,6 +157,7 @@ def processFAfiles(my_fa_files):
 
 ##########################
 ##########################
+@profile_step()
 def readSQLdb():
     """
     Read project summary data from SQLite database.
@@ -251,17 +168,8 @@ def readSQLdb():
     # path to sqlite db lib_info.db
     sql_db_path = PROJECT_DIR / 'project_summary.db'
 
-    # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
-
-    # define sql query
-    query = "SELECT * FROM project_summary"
-    
-    # import sql db into pandas df
-    sql_df = pd.read_sql(query, engine)
-    
-    
-    engine.dispose()
+    # import sql db into pandas df, from the parquet snapshot when it is current
+    sql_df = load_project_summary(sql_db_path)
 
     return sql_df
 ##########################
@@ -271,13 +179,16 @@ def readSQLdb():
 
 ##########################
 ##########################
-def addFAresults(my_prjct_dir, my_fa_df):
+@profile_step()
+def addFAresults(my_prjct_dir, my_fa_df, my_lib_df=None):
     """
     Merge FA results with project summary data.
     
     Args:
         my_prjct_dir: Project directory path (currently unused)
         my_fa_df: DataFrame containing FA analysis results
+        my_lib_df: project_summary data already in memory (e.g. from the
+            workflow runner); read from project_summary.db when None
         
     Returns:
         Merged DataFrame with FA and project data
@@ -286,7 +197,7 @@ def addFAresults(my_prjct_dir, my_fa_df):
         SystemExit: If merge operation fails or changes row count
     """
     # create df from sqlite db
-    my_lib_df = readSQLdb()
+    my_lib_df = readSQLdb() if my_lib_df is None else my_lib_df.copy()
     
     # conver sample id to string
     my_lib_df['sample_id'] = my_lib_df['sample_id'].astype(str)
@@ -314,13 +225,67 @@ def addFAresults(my_prjct_dir, my_fa_df):
 
 ##########################
 ##########################
-def findPassFailLibs(my_lib_df, my_dest_plates):
+def readThresholds():
+    """
+    Read thresholds.txt of the first attempt FA plates.
+    
+    Returns:
+        DataFrame with DNA conc and size thresholds and dilution factor per FA plate
+        
+    Raises:
+        SystemExit: If thresholds file is missing values
+    """
+    # import df with dna conc and size thresholds for each FA plate
+    thresh_df = cached_frame(FIRST_DIR / "thresholds.txt", 'thresholds', lambda path: pd.read_csv(path, sep="\t", header=0))
+    
+    # make sure threshold file has values for all threshold parameters
+    if thresh_df.isnull().values.any():
+        print('\nThe thresholds.txt file is missing needed values. Aborting\n\n')
+        sys.exit()
+
+    return thresh_df
+##########################
+##########################
+
+
+##########################
+##########################
+def getMinFailedLibs():
+    """
+    Get the number of failed libs per plate that triggers a whole plate rework.
+    
+    Returns:
+        float: min_failed_libs parameter
+        
+    Raises:
+        SystemExit: If the configured value is invalid
+    """
+    # (--param min_failed_libs=N / SPS_MIN_FAILED_LIBS / sps_parameters.json, else prompt)
+    try:
+        return get_parameter(
+            'min_failed_libs',
+            """How many failed libs per plate to trigger whole plate rework?\n 
+              Default threshold is 20: """,
+            default=DEFAULT_MIN_FAILED_LIBS, convert=float)
+    except ValueError as e:
+        print(f"\n\nFATAL ERROR: {e}\nAborting\n\n")
+        sys.exit()
+##########################
+##########################
+
+
+##########################
+##########################
+@profile_step()
+def findPassFailLibs(my_lib_df, my_dest_plates, min_failed_libs=None):
     """
     Apply quality thresholds and identify pass/fail libraries.
     
     Args:
         my_lib_df: DataFrame with merged library and FA data
         my_dest_plates: List of destination plate names
+        min_failed_libs: Failed libs per plate that trigger a whole plate
+            rework; asked for with getMinFailedLibs() when None
         
     Returns:
         DataFrame with pass/fail analysis and rework recommendations
@@ -329,12 +294,7 @@ def findPassFailLibs(my_lib_df, my_dest_plates):
         SystemExit: If thresholds file is missing values
     """
     # import df with dna conc and size thresholds for each FA plate
-    thresh_df = pd.read_csv(FIRST_DIR / "thresholds.txt", sep="\t", header=0)
-    
-    # make sure threshold file has values for all threshold parameters
-    if thresh_df.isnull().values.any():
-        print('\nThe thresholds.txt file is missing needed values. Aborting\n\n')
-        sys.exit()
+    thresh_df = readThresholds()
 
     # add thresholds of my_lib_df
     my_lib_df = my_lib_df.merge(thresh_df, how='outer', left_on=[
@@ -344,13 +304,14 @@ def findPassFailLibs(my_lib_df, my_dest_plates):
     # No additional processing needed - dilution_factor column is ready to use
 
     # get max number of failed libs per plate before triggering whole plate rework
-    min_failed_libs = float(
-        input("""How many failed libs per plate to trigger whole plate rework?\n 
-              Default threshold is 20: """) or 20)
+    if min_failed_libs is None:
+        min_failed_libs = getMinFailedLibs()
 
     # assign pass or fail to each lib based on dna conc and size thresholds
-    my_lib_df['Passed_library'] = np.where(((my_lib_df['nmole/L'] > my_lib_df['DNA_conc_threshold_(nmol/L)']) & (
-        my_lib_df['Avg. Size'] > my_lib_df['Size_theshold_(bp)'])), 1, 0)
+    passed = passed_libraries(my_lib_df['nmole/L'], my_lib_df['Avg. Size'],
+                              my_lib_df['DNA_conc_threshold_(nmol/L)'], my_lib_df['Size_theshold_(bp)'])
+
+    my_lib_df['Passed_library'] = np.where(passed, 1, 0)
 
     # update lib conc info based on the dilution factor.  This is conc in original library plate
     my_lib_df['ng/uL'] = my_lib_df['ng/uL'] * my_lib_df['dilution_factor']
@@ -365,18 +326,8 @@ def findPassFailLibs(my_lib_df, my_dest_plates):
     my_lib_df.drop(['Destination_plate', 'DNA_conc_threshold_(nmol/L)',
                    'Size_theshold_(bp)'], inplace=True, axis=1)
 
-    # create empty list for whole plates that need rework
-    whole_plate_redo = []
-    
-    # identify whole plates that need rework
-    for val, cnt in my_lib_df[(my_lib_df['Passed_library'] == 0)]['Destination_Plate_Barcode'].value_counts().items():
-    
-        if cnt >= min_failed_libs:
-            whole_plate_redo.append(val)
-        
-
-    # sort the list of whole plates that neede to be reworked
-    whole_plate_redo = sorted(whole_plate_redo)
+    # identify whole plates that need rework (sorted)
+    whole_plate_redo = whole_plate_reworks(my_lib_df['Destination_Plate_Barcode'], passed, min_failed_libs)
 
     my_lib_df['Redo_whole_plate'] = ""
 
@@ -388,8 +339,49 @@ def findPassFailLibs(my_lib_df, my_dest_plates):
 ##########################
 ##########################
 
+
+##########################
+##########################
+@profile_step()
+def sweepThresholds(my_lib_df, my_dest_plates, sweep, min_failed_libs):
+    """
+    Compare pass counts and whole plate reworks for a grid of threshold settings.
+    
+    Args:
+        my_lib_df: DataFrame with merged library and FA data (before findPassFailLibs)
+        my_dest_plates: List of destination plate names
+        sweep: (DNA conc thresholds, size thresholds, min_failed_libs values);
+            a None entry uses the values of this run (thresholds.txt, min_failed_libs)
+        min_failed_libs: min_failed_libs used by this run
+        
+    Returns:
+        DataFrame written to threshold_sweep.txt
+    """
+    conc_thresholds, size_thresholds, min_failed_values = sweep
+
+    thresh_df = readThresholds()
+
+    lib_rows = my_lib_df[my_lib_df['Destination_Plate_Barcode'].isin(my_dest_plates)]
+
+    sweep_df = sweep_thresholds(
+        lib_rows['Destination_Plate_Barcode'], lib_rows['nmole/L'], lib_rows['Avg. Size'],
+        conc_thresholds or sorted(thresh_df['DNA_conc_threshold_(nmol/L)'].unique()),
+        size_thresholds or sorted(thresh_df['Size_theshold_(bp)'].unique()),
+        min_failed_values or [min_failed_libs])
+
+    write_sweep_report(sweep_df, FIRST_DIR / SWEEP_FILE_NAME)
+
+    return sweep_df
+##########################
+##########################
+
+@profile_step()
 def archive_fa_results(fa_result_dirs, archive_subdir_name):
-    """Archive FA result directories to permanent storage by copying them"""
+    """Archive FA result directories to permanent storage (originals are kept).
+
+    Files go through the deduplicated archive store, so result folders that
+    were archived before and did not change cost no copy.
+    """
     if not fa_result_dirs:
         return
     
@@ -397,41 +389,81 @@ def archive_fa_results(fa_result_dirs, archive_subdir_name):
     archive_base = PROJECT_DIR / "archived_files"
     archive_dir = archive_base / archive_subdir_name
     archive_dir.mkdir(parents=True, exist_ok=True)
+
+    run = archive_run_name(Path(__file__).stem)
     
     for result_dir in fa_result_dirs:
         if result_dir.exists():
-            dest_path = archive_dir / result_dir.name
-            
-            # Handle existing archives (prevent nesting)
-            if dest_path.exists():
-                shutil.rmtree(dest_path)
-                # print(f"Removing existing archive: {result_dir.name}")
-            
-            # Copy directory to archive (preserves original)
-            shutil.copytree(str(result_dir), str(dest_path))
-            print(f"Archived (copied): {result_dir.name}")
+            # replaces any existing archive of this folder (prevents nesting)
+            archive_tree(archive_base, result_dir, Path(archive_subdir_name) / result_dir.name, run)
+            detail(f"Archived (copied): {result_dir.name}")
 
-def main():
+def parse_command_line_arguments():
     """
-    Main function to orchestrate the FA analysis workflow.
+    Parse command line arguments.
+    
+    Returns:
+        argparse.Namespace with the number of worker threads
+    """
+    parser = argparse.ArgumentParser(
+        description='Analyze first attempt FA results and flag libraries for rework.')
+
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='number of threads used to read and copy FA files (default: 1)')
+
+    add_sweep_arguments(parser)
+
+    add_parameter_arguments(parser)
+
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    try:
+        configure_parameters(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    return args
+
+
+@profile_step()
+def analyzeFAresults(workers=1, my_lib_df=None, sweep=None):
+    """
+    Run the first attempt FA analysis and write its output files.
+    
+    Args:
+        workers: Number of threads used to read and copy FA files
+        my_lib_df: project_summary data already in memory (e.g. from the
+            workflow runner); read from project_summary.db when None
+        sweep: (DNA conc thresholds, size thresholds, min_failed_libs values)
+            to compare in threshold_sweep.txt, or None (see sweepThresholds)
+        
+    Returns:
+        DataFrame written to reduced_fa_analysis_summary.txt
     """
     print("Starting SPS First FA Output Analysis...")
     
     # MODIFIED: Update function call to receive both returns
-    fa_files, fa_result_dirs_to_archive = getFAfiles(FIRST_DIR)
+    fa_files, fa_result_dirs_to_archive = getFAfiles(FIRST_DIR, workers=workers)
 
-    # get dictionary where keys are FA file names and values are df's created from FA files
+    # get one dataframe with the results from all FA files
     # and get a list of destination/lib plate IDs processed
-    fa_lib_dict, fa_dest_plates = processFAfiles(fa_files)
-
-    # create new dataframe combining all entries in dictionary fa_lib_dict
-    fa_df = pd.concat(fa_lib_dict.values(), ignore_index=True)
+    fa_df, fa_dest_plates = processFAfiles(fa_files)
 
     # add FA results to df from lib_info.csv
-    lib_df = addFAresults(PROJECT_DIR, fa_df)
+    lib_df = addFAresults(PROJECT_DIR, fa_df, my_lib_df)
 
     # identify libs that passed/failed based on user provided thresholds
-    fa_summary_df = findPassFailLibs(lib_df, fa_dest_plates)
+    min_failed_libs = getMinFailedLibs() if sweep else None
+
+    fa_summary_df = findPassFailLibs(lib_df, fa_dest_plates, min_failed_libs)
+
+    # compare other threshold settings on the same FA results
+    if sweep:
+        sweepThresholds(lib_df, fa_dest_plates, sweep, min_failed_libs)
 
     # make smaller version of FA summary with only a subset of columns
     reduced_fa_df = fa_summary_df[['sample_id', 'Destination_Plate_Barcode','FA_Well','dilution_factor','ng/uL', 'nmole/L', 'Avg. Size', 'Passed_library', 'Redo_whole_plate']].copy()
@@ -448,6 +480,23 @@ def main():
     # NEW: Archive FA results before creating success marker
     if fa_result_dirs_to_archive:
         archive_fa_results(fa_result_dirs_to_archive, "first_lib_attempt_fa_results")
+
+    return reduced_fa_df
+
+
+@instrument_stage
+def main():
+    """
+    Main function to orchestrate the FA analysis workflow.
+    """
+    args = parse_command_line_arguments()
+
+    # reuse parsed FA and threshold files of an earlier run (.sps_cache)
+    enable_cache(PROJECT_DIR)
+
+    sweep = (args.sweep_conc, args.sweep_size, args.sweep_min_failed) if sweep_requested(args) else None
+
+    analyzeFAresults(workers=args.workers, sweep=sweep)
     
     # Create success marker for workflow manager integration
     create_success_marker()
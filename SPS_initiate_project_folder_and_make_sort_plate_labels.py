@@ -55,6 +55,9 @@ Safety Features:
 """
 
 import argparse
+import csv
+import io
+import os
 import pandas as pd
 import random
 import sys
@@ -63,10 +66,18 @@ from datetime import datetime
 from pathlib import Path
 from sqlalchemy import create_engine, text
 
+from sps_archive import archive_files, archive_run_name
+from sps_bartender import LABEL_LINE_END, label_lines, write_label_file
+from sps_cache import cached_frame, enable_cache
+from sps_database import bootstrap_database, checkpoint_database, reserve_barcode_block
+from sps_input_files import ROLE_COLUMNS, ROLE_SAMPLE_METADATA, missing_columns, read_csv_headers
+from sps_instrumentation import detail, instrument_stage, profile_step
+from sps_parameters import add_parameter_arguments, configure_parameters, get_parameter
+from sps_plate_files import write_text_files
+
 # Constants following implementation guide
 CHARSET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
 LETTERS_ONLY = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-BARTENDER_HEADER = '%BTW% /AF="\\\\BARTENDER\\shared\\templates\\ECHO_BCode8.btw" /D="%Trigger File Name%" /PRN="bcode8" /R=3 /P /DD\r\n\r\n%END%\r\n\r\n\r\n'
 
 # Database and file names
 DATABASE_NAME = "project_summary.db"
@@ -148,7 +159,12 @@ def get_experiment_type():
     print("  3) Other")
     print("")
 
-    response = input("Enter 1, 2, or 3: ").strip()
+    # --param experiment_type=1|2|3 / SPS_EXPERIMENT_TYPE / sps_parameters.json, else prompt
+    try:
+        response = get_parameter('experiment_type', "Enter 1, 2, or 3: ", choices=['1', '2', '3']).strip()
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}")
+        sys.exit()
 
     if response == '1':
         print("✅ Experiment type set to: Standard SPS-CE")
@@ -295,6 +311,7 @@ def _validate_boncat(df):
         sys.exit()
 
 
+@profile_step()
 def read_sample_csv(csv_path, experiment_type=EXPERIMENT_TYPE_SPS_CE):
     """
     Read sample metadata CSV and return DataFrame with validation.
@@ -320,7 +337,7 @@ def read_sample_csv(csv_path, experiment_type=EXPERIMENT_TYPE_SPS_CE):
     """
     try:
         # Read CSV with proper encoding handling (including BOM)
-        df = pd.read_csv(csv_path, encoding='utf-8-sig')
+        df = cached_frame(csv_path, 'sample_metadata', lambda path: pd.read_csv(path, encoding='utf-8-sig'))
 
         # --- Shared validation (identical for all experiment types) ---
         _validate_shared_columns(df, csv_path)
@@ -447,14 +464,20 @@ def _make_plate_names_boncat(sample_df):
     return result_df
 
 
-def generate_simple_barcodes(plates_df, existing_individual_plates_df=None, custom_base_barcode=None):
+def generate_simple_barcodes(plates_df, existing_individual_plates_df=None, custom_base_barcode=None,
+                             db_path=DATABASE_NAME):
     """
     Generate simplified incremental barcodes for all plates.
     
+    The barcode numbers are reserved as one block from the barcode counter in
+    the project database (sps_database.reserve_barcode_block), so two runs
+    started at the same time cannot hand out the same barcode.
+    
     Args:
         plates_df (pd.DataFrame): DataFrame of plates needing barcodes
         existing_individual_plates_df (pd.DataFrame, optional): Existing individual plates to continue numbering
         custom_base_barcode (str, optional): Custom base barcode to use instead of generating random one
+        db_path (Path, optional): Database holding the barcode counter
         
     Returns:
         pd.DataFrame: DataFrame with generated barcodes
@@ -475,17 +498,11 @@ def generate_simple_barcodes(plates_df, existing_individual_plates_df=None, cust
                 # Reuse existing base barcode
             
             # Find the highest existing barcode number to continue from
-            existing_numbers = []
-            for barcode in existing_individual_plates_df['barcode']:
-                if '-' in str(barcode):
-                    try:
-                        number = int(str(barcode).split('-')[-1])
-                        existing_numbers.append(number)
-                    except ValueError:
-                        continue
+            existing_numbers = pd.to_numeric(
+                existing_individual_plates_df['barcode'].astype(str).str.extract(r'-\s*(\d+)\s*$')[0])
             
-            if existing_numbers:
-                start_number = max(existing_numbers) + 1
+            if existing_numbers.notna().any():
+                start_number = int(existing_numbers.max()) + 1
                 # Continue numbering from existing plates
         
         # Generate new base barcode only if no existing plates
@@ -510,13 +527,15 @@ def generate_simple_barcodes(plates_df, existing_individual_plates_df=None, cust
                 base_barcode = first_char + remaining_chars
                 print(f"Generated base barcode: '{base_barcode}'")
         
+        # Reserve the block of numbers in the project database; starts after
+        # the existing plates, or later if another run reserved numbers meanwhile
+        if len(plates_df) > 0:
+            start_number = reserve_barcode_block(db_path, base_barcode, len(plates_df), first_free=start_number)
+        
         # Assign incremental barcodes to all plates
-        for i, idx in enumerate(plates_df.index):
-            barcode_number = start_number + i
-            full_barcode = f"{base_barcode}-{barcode_number}"
-            
-            plates_df.at[idx, 'barcode'] = full_barcode
-            plates_df.at[idx, 'created_timestamp'] = datetime.now().isoformat()
+        barcode_numbers = pd.Series(range(start_number, start_number + len(plates_df)), index=plates_df.index)
+        plates_df['barcode'] = f"{base_barcode}-" + barcode_numbers.astype(str)
+        plates_df['created_timestamp'] = datetime.now().isoformat()
         
         print(f"✅ Generated {len(plates_df)} barcodes: {base_barcode}-{start_number} to {base_barcode}-{start_number + len(plates_df) - 1}")
         
@@ -550,13 +569,13 @@ def validate_barcode_uniqueness(df):
         print("WARNING: No 'barcode' column found for validation")
         return True
     
-    barcodes = df['barcode'].tolist()
-    unique_barcodes = set(barcodes)
+    # hash-based check: duplicated() marks every repeat of a barcode
+    is_duplicate = df['barcode'].duplicated(keep=False)
     
-    is_unique = len(barcodes) == len(unique_barcodes)
+    is_unique = not is_duplicate.any()
     
     if not is_unique:
-        duplicates = [barcode for barcode in unique_barcodes if barcodes.count(barcode) > 1]
+        duplicates = df.loc[is_duplicate, 'barcode'].unique().tolist()
         print(f"Duplicate barcodes found: {duplicates}")
     
     return is_unique
@@ -644,6 +663,27 @@ def save_to_database_smart(sample_metadata_df, new_plates_df, db_path, is_first_
         sys.exit()
 
 
+def bootstrap_project_database(db_path):
+    """
+    Create lookup indexes and enable WAL journaling on the project database.
+    
+    Re-runnable: indexes are only created when missing, and tables replaced by
+    to_sql on a first run get their indexes back on the next call.
+    
+    Args:
+        db_path (Path): Path to database file
+        
+    Raises:
+        SystemExit: If the database cannot be bootstrapped
+    """
+    try:
+        bootstrap_database(db_path)
+    except Exception as e:
+        print(f"FATAL ERROR: Could not create indexes in database {db_path}: {e}")
+        print("Laboratory automation requires reliable data storage for safety.")
+        sys.exit()
+
+
 def save_to_database(sample_metadata_df, individual_plates_df, db_path):
     """
     Save DataFrames to two-table SQLite database using SQLAlchemy.
@@ -659,6 +699,7 @@ def save_to_database(sample_metadata_df, individual_plates_df, db_path):
     return save_to_two_table_database(sample_metadata_df, individual_plates_df, db_path)
 
 
+@profile_step()
 def read_from_two_table_database(db_path):
     """
     Read DataFrames from two-table SQLite database using SQLAlchemy.
@@ -728,30 +769,15 @@ def make_bartender_file(df, output_path):
         SystemExit: If file creation fails
     """
     try:
-        with open(output_path, 'w', newline='') as f:
-            # Write header
-            f.write(BARTENDER_HEADER)
-            
-            # Sort by barcode number in reverse order (highest first)
-            # Extract number from barcode (e.g., "W91ZL-15" -> 15)
-            df_sorted = df.copy()
-            df_sorted['barcode_num'] = df_sorted['barcode'].str.split('-').str[1].astype(int)
-            df_sorted = df_sorted.sort_values('barcode_num', ascending=False)
-            
-            # Sort plate labels in reverse order with separators
-            for i, (_, row) in enumerate(df_sorted.iterrows()):
-                plate_name = row['plate_name']
+        # Sort by barcode number in reverse order (highest first)
+        # Extract number from barcode (e.g., "W91ZL-15" -> 15)
+        barcode_num = df['barcode'].str.split('-').str[1].astype(int).reset_index(drop=True)
+        plate_names = df['plate_name'].iloc[barcode_num.sort_values(ascending=False).index]
+
+        # Standard label (barcode with quoted plate name as label), followed
+        # by a trailing empty line for BarTender compatibility
+        write_label_file(output_path, [label_lines(plate_names, plate_names)], trailer=LABEL_LINE_END)
 
-                # Standard label (barcode with quoted plate name as label
-                f.write(f'{plate_name},"{plate_name}"\r\n')
-                
-                # # Add blank separator line between plate sets (except after last plate)
-                # if i < len(df_sorted) - 1:
-                #     f.write(',\r\n')
-            
-            # Add proper trailing empty lines for BarTender compatibility
-            f.write('\r\n')
-        
         # BarTender file created silently
         
     except Exception as e:
@@ -764,6 +790,9 @@ def detect_sample_metadata_csv():
     """
     Detect and validate sample metadata CSV file in working directory.
     
+    Only the header line of each CSV is read (sps_input_files), and headers
+    are cached in .sps_cache/input_index.json until a file changes.
+    
     Returns:
         Path: Valid sample metadata CSV file path
         
@@ -778,34 +807,32 @@ def detect_sample_metadata_csv():
     ]
     
     # Required subset for processing
-    required_headers = ['Proposal', 'Group_or_abrvSample', 'Sample_full', 'Number_of_sorted_plates']
+    required_headers = ROLE_COLUMNS[ROLE_SAMPLE_METADATA]
     
     # Look for sample_metadata.csv specifically first
     sample_metadata_file = Path('sample_metadata.csv')
     if sample_metadata_file.exists():
-        try:
-            df = pd.read_csv(sample_metadata_file, encoding='utf-8-sig')
-            
-            # Check for all expected headers
-            missing_expected = [col for col in expected_headers if col not in df.columns]
-            if missing_expected:
-                print(f"⚠️  Sample metadata CSV missing some expected columns: {missing_expected}")
-            
-            # Check for required headers
-            missing_required = [col for col in required_headers if col not in df.columns]
-            if missing_required:
-                print(f"FATAL ERROR: Sample metadata CSV missing required columns: {missing_required}")
-                print(f"Required columns: {required_headers}")
-                print("Laboratory automation requires exact column names for safety.")
-                sys.exit()
-            
-            print(f"✅ Found valid sample metadata CSV: {sample_metadata_file}")
-            return sample_metadata_file
-            
-        except Exception as e:
-            print(f"FATAL ERROR: Could not read sample metadata CSV {sample_metadata_file}: {e}")
+        header = read_csv_headers([sample_metadata_file])[sample_metadata_file]
+        if isinstance(header, Exception):
+            print(f"FATAL ERROR: Could not read sample metadata CSV {sample_metadata_file}: {header}")
             print("Laboratory automation requires valid CSV format for safety.")
             sys.exit()
+        
+        # Check for all expected headers
+        missing_expected = [col for col in expected_headers if col not in header]
+        if missing_expected:
+            print(f"⚠️  Sample metadata CSV missing some expected columns: {missing_expected}")
+        
+        # Check for required headers
+        missing_required = missing_columns(header, ROLE_SAMPLE_METADATA)
+        if missing_required:
+            print(f"FATAL ERROR: Sample metadata CSV missing required columns: {missing_required}")
+            print(f"Required columns: {required_headers}")
+            print("Laboratory automation requires exact column names for safety.")
+            sys.exit()
+        
+        print(f"✅ Found valid sample metadata CSV: {sample_metadata_file}")
+        return sample_metadata_file
     
     # If sample_metadata.csv doesn't exist, search for other CSV files
     csv_files = [f for f in Path('.').glob('*.csv') if f.name != 'sample_metadata.csv']
@@ -817,20 +844,16 @@ def detect_sample_metadata_csv():
         print("Laboratory automation requires valid input files for safety.")
         sys.exit()
     
-    # Check all CSV files for validity first
+    # Check all CSV files for validity first (header line only)
     valid_csv_files = []
-    for csv_file in csv_files:
-        try:
-            df = pd.read_csv(csv_file, encoding='utf-8-sig')
-            
-            # Check for required headers
-            missing_required = [col for col in required_headers if col not in df.columns]
-            if not missing_required:
-                valid_csv_files.append(csv_file)
-                
-        except Exception as e:
-            print(f"⚠️  Skipping invalid CSV file {csv_file}: {e}")
+    for csv_file, header in read_csv_headers(csv_files).items():
+        if isinstance(header, Exception):
+            print(f"⚠️  Skipping invalid CSV file {csv_file}: {header}")
             continue
+        
+        # Check for required headers
+        if not missing_columns(header, ROLE_SAMPLE_METADATA):
+            valid_csv_files.append(csv_file)
     
     # Check if we found multiple valid CSV files
     if len(valid_csv_files) > 1:
@@ -1078,7 +1101,14 @@ def get_additional_standard_plates(is_first_run=True):
     """
     # Ask user interactively
     while True:
-        response = input("Add additional standard plates to existing samples? (y/n): ").lower().strip()
+        # --param add_standard_plates=y|n / SPS_ADD_STANDARD_PLATES / sps_parameters.json, else prompt
+        try:
+            response = get_parameter(
+                'add_standard_plates', "Add additional standard plates to existing samples? (y/n): ",
+                choices=['y', 'yes', 'n', 'no']).lower().strip()
+        except ValueError as e:
+            print(f"FATAL ERROR: {e}")
+            sys.exit()
         if response in ['y', 'yes']:
             # User wants additional standard plates - look for file
             print("Looking for 'additional_standard_plates.txt' file...")
@@ -1132,6 +1162,7 @@ def get_custom_plates(is_first_run=True):
     #         print("Please enter 'y' for yes or 'n' for no.")
 
 
+@profile_step()
 def create_project_folder_structure():
     """
     Create the standardized project folder structure.
@@ -1269,10 +1300,13 @@ def archive_database_file(db_path, folders):
     stem = db_path.stem  # "project_summary"
     suffix = db_path.suffix  # ".db"
     archive_name = f"{stem}_{timestamp}{suffix}"
-    archive_path = archive_dir / archive_name
     
-    # Copy instead of move to preserve original for in-place updates
-    shutil.copy2(str(db_path), str(archive_path))
+    # Fold any WAL content into the database file so the copy is complete
+    checkpoint_database(db_path)
+
+    # Copy (into the deduplicated archive store) instead of move to preserve
+    # original for in-place updates
+    archive_files(archive_dir, [(db_path, archive_name)], archive_run_name(Path(__file__).stem, timestamp))
     # Database archived silently
 
 
@@ -1374,9 +1408,9 @@ def archive_csv_file(csv_file_path, folders):
     stem = csv_file_path.stem  # "sample_metadata"
     suffix = csv_file_path.suffix  # ".csv"
     archive_name = f"{stem}_{timestamp}{suffix}"
-    archive_path = archive_dir / archive_name
     
-    shutil.move(str(csv_file_path), str(archive_path))
+    archive_files(archive_dir, [(csv_file_path, archive_name)],
+                  archive_run_name(Path(__file__).stem, timestamp), move=True)
     # Archived CSV file
 
 
@@ -1416,24 +1450,114 @@ def manage_csv_files(sample_metadata_df, individual_plates_df, folders):
     create_updated_csv_files(sample_metadata_df, individual_plates_df)
 
 
+# Pre-rendered layout templates, keyed by template path (see load_plate_layout_template)
+_LAYOUT_TEMPLATE_CACHE = {}
+
+
+def _csv_field(value):
+    """Format one value as a CSV field the way DataFrame.to_csv writes it."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    value = str(value)
+    if value == '':
+        return ''
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='').writerow([value])
+    return buffer.getvalue()
+
+
+def load_plate_layout_template(template_path):
+    """
+    Parse a plate layout template once into a text template for string filling.
+
+    The template is read with pandas and rendered to CSV once, so every fixed
+    field is formatted exactly as the former per-plate DataFrame round trip
+    wrote it.  ``Plate_ID`` on every row and ``Sample`` on every row whose
+    ``Type`` is not ``unused`` become ``{plate_id}`` / ``{sample}``
+    placeholders for str.format.  Results are cached per template path.
+
+    Args:
+        template_path (Path): Template CSV with ``Plate_ID``, ``Sample`` and
+            ``Type`` columns.
+
+    Returns:
+        str: Layout text with ``{plate_id}`` and ``{sample}`` placeholders.
+
+    Raises:
+        Exception: If the template cannot be read or lacks a required column.
+    """
+    if template_path in _LAYOUT_TEMPLATE_CACHE:
+        return _LAYOUT_TEMPLATE_CACHE[template_path]
+
+    template_df = pd.read_csv(template_path, encoding='utf-8-sig')
+
+    missing_columns = [c for c in ('Plate_ID', 'Sample', 'Type') if c not in template_df.columns]
+    if missing_columns:
+        raise ValueError(f"missing column(s): {', '.join(missing_columns)}")
+
+    # Column buffer: every field as to_csv formats it (Sample as object,
+    # since the template CSV reads it as float64 when all values are blank)
+    template_df['Sample'] = template_df['Sample'].astype(object)
+    header, *cells = csv.reader(io.StringIO(template_df.to_csv(index=False, lineterminator='\n')))
+
+    plate_col = template_df.columns.get_loc('Plate_ID')
+    sample_col = template_df.columns.get_loc('Sample')
+    filled_rows = (template_df['Type'] != 'unused').to_numpy()
+
+    # Literal braces in fixed fields are doubled for str.format
+    cells = [[field.replace('{', '{{').replace('}', '}}') for field in row] for row in cells]
+    for row, filled in zip(cells, filled_rows):
+        row[plate_col] = '{plate_id}'
+        if filled:
+            row[sample_col] = '{sample}'
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator=os.linesep)
+    writer.writerow(field.replace('{', '{{').replace('}', '}}') for field in header)
+    writer.writerows(cells)
+
+    _LAYOUT_TEMPLATE_CACHE[template_path] = buffer.getvalue()
+    return _LAYOUT_TEMPLATE_CACHE[template_path]
+
+
+def render_plate_layout(layout_template, plate_name, sample_abbrev):
+    """
+    Fill a pre-rendered layout template for one plate.
+
+    Args:
+        layout_template (str): Text from load_plate_layout_template().
+        plate_name (str): Value for ``Plate_ID`` on every row.
+        sample_abbrev: Value for ``Sample`` on every non-``unused`` row.
+
+    Returns:
+        str: Plate layout CSV text.
+    """
+    return layout_template.format(plate_id=_csv_field(plate_name), sample=_csv_field(sample_abbrev))
+
+
 def generate_plate_layout_files(new_plates_df, experiment_type, folders):
     """
     Generate a plate layout CSV for each standard (non-custom) plate produced
     during this run.  Only called when experiment_type is sps_ce or boncat.
 
     For each plate the function:
-      1. Reads the appropriate template CSV from the script's own directory
-         (``standar_sort_plate_layouts/``).
+      1. Uses the appropriate template CSV from the script's own directory
+         (``standar_sort_plate_layouts/``), parsed once per run
+         (load_plate_layout_template).
       2. Fills ``Plate_ID`` with the plate name on every row.
       3. Fills ``Sample`` with the plate's ``sample`` value (Group_or_abrvSample)
-         for every row whose ``Type`` is ``sample``; all other rows are left as-is.
+         for every row whose ``Type`` is not ``unused``; all other rows are
+         left as-is.
       4. Writes the result to
          ``2_sort_plates_and_amplify_genomes/A_sort_plate_layouts/<plate_name>_plate_layout.csv``
          in the current working directory (the user's project folder).
 
-    A FATAL ERROR is raised if the output file already exists — this prevents
-    accidental overwrites and catches logic errors where the same plate name
-    would be generated twice.
+    All layouts are rendered by filling the text template and written
+    concurrently (sps_plate_files.write_text_files).
+
+    A FATAL ERROR is raised if an output file already exists, or if the same
+    plate name would be generated twice — this prevents accidental
+    overwrites.  All plates are checked before any file is written.
 
     Args:
         new_plates_df (pd.DataFrame): DataFrame of plates added during this run.
@@ -1467,28 +1591,30 @@ def generate_plate_layout_files(new_plates_df, experiment_type, folders):
         sys.exit()
 
     try:
-        template_df = pd.read_csv(template_path, encoding='utf-8-sig')
+        layout_template = load_plate_layout_template(template_path)
     except Exception as e:
         print(f"FATAL ERROR: Could not read plate layout template {template_path}: {e}")
         print("Laboratory automation requires valid template files for safety.")
         sys.exit()
 
     output_dir = folders['sort_plate_layouts']
-    layout_files_written = 0
-
-    for _, row in new_plates_df.iterrows():
-        # Skip custom plates — no standard layout applies
-        if row.get('is_custom', False):
-            continue
-
-        plate_name = row['plate_name']
-        sample_abbrev = row['sample']
 
-        output_path = output_dir / f"{plate_name}_plate_layout.csv"
-
-        # Safety check: refuse to overwrite an existing layout file
-        if output_path.exists():
-            print(f"FATAL ERROR: Plate layout file already exists: {output_path}")
+    # Skip custom plates — no standard layout applies
+    if 'is_custom' in new_plates_df.columns:
+        standard_plates_df = new_plates_df[~new_plates_df['is_custom'].astype(bool)]
+    else:
+        standard_plates_df = new_plates_df
+
+    plate_names = standard_plates_df['plate_name'].tolist()
+    file_names = [f"{plate_name}_plate_layout.csv" for plate_name in plate_names]
+
+    # Safety check: refuse to overwrite an existing layout file, or to write
+    # the same layout twice in this run (one directory listing for all plates)
+    existing_files = {path.name for path in output_dir.iterdir()} if output_dir.exists() else set()
+    seen_files = set()
+    for plate_name, file_name in zip(plate_names, file_names):
+        if file_name in existing_files or file_name in seen_files:
+            print(f"FATAL ERROR: Plate layout file already exists: {output_dir / file_name}")
             print(f"A layout file for plate '{plate_name}' was found in:")
             print(f"  {output_dir}")
             print("This indicates a duplicate plate name was generated, or a previous")
@@ -1496,30 +1622,22 @@ def generate_plate_layout_files(new_plates_df, experiment_type, folders):
             print("before re-running the script.")
             print("Laboratory automation requires unique plate identifiers for safety.")
             sys.exit()
+        seen_files.add(file_name)
 
-        # Build the per-plate layout by copying the template and filling fields
-        plate_df = template_df.copy()
-
-        # Fill Plate_ID on every row
-        plate_df['Plate_ID'] = plate_name
-
-        # Ensure Sample column is object dtype before assigning strings
-        # (template CSV reads it as float64 when all values are blank)
-        plate_df['Sample'] = plate_df['Sample'].astype(object)
-
-        # Fill Sample for all non-unused rows (sample, neg_cntrl, pos_cntrl, etc.)
-        plate_df.loc[plate_df['Type'] != 'unused', 'Sample'] = sample_abbrev
+    layout_files = [
+        (output_dir / file_name, render_plate_layout(layout_template, plate_name, sample_abbrev))
+        for plate_name, file_name, sample_abbrev in zip(plate_names, file_names, standard_plates_df['sample'])
+    ]
 
-        try:
-            plate_df.to_csv(output_path, index=False)
-            layout_files_written += 1
-        except Exception as e:
-            print(f"FATAL ERROR: Could not write plate layout file {output_path}: {e}")
-            print("Laboratory automation requires reliable file output for safety.")
-            sys.exit()
+    try:
+        write_text_files(layout_files)
+    except Exception as e:
+        print(f"FATAL ERROR: Could not write plate layout file: {e}")
+        print("Laboratory automation requires reliable file output for safety.")
+        sys.exit()
 
-    if layout_files_written > 0:
-        print(f"✅ Generated {layout_files_written} plate layout file(s) → {output_dir}")
+    if layout_files:
+        print(f"✅ Generated {len(layout_files)} plate layout file(s) → {output_dir}")
 
 
 def archive_existing_files(file_list, folders):
@@ -1537,9 +1655,9 @@ def archive_existing_files(file_list, folders):
     for file_path in file_list:
         if file_path.exists():
             archive_name = f"{timestamp}_{file_path.name}"
-            archive_path = archive_dir / archive_name
-            shutil.move(str(file_path), str(archive_path))
-            print(f"📁 Archived: {file_path} → {archive_path}")
+            archive_path = archive_files(archive_dir, [(file_path, archive_name)],
+                                         archive_run_name(Path(__file__).stem, timestamp), move=True)[0]
+            detail(f"📁 Archived: {file_path} → {archive_path}")
             archived_count += 1
     
     if archived_count > 0:
@@ -1554,6 +1672,7 @@ def print_header():
     # print("=" * 60)
 
 
+@profile_step()
 def process_first_run(experiment_type, pre_validated_sample_df=None, pre_validated_csv_file=None):
     """
     Handle first run: plate generation and custom plates.
@@ -1679,6 +1798,7 @@ def process_additional_standard_plates(existing_sample_df, additional_plates, ex
     return pd.DataFrame(additional_plates_list) if additional_plates_list else pd.DataFrame()
 
 
+@profile_step()
 def process_subsequent_run(existing_sample_df, existing_plates_df, experiment_type=EXPERIMENT_TYPE_SPS_CE):
     """
     Handle subsequent run: additional plates, custom plates.
@@ -1743,6 +1863,7 @@ def process_subsequent_run(existing_sample_df, existing_plates_df, experiment_ty
     return sample_df, plates_df, custom_plates_processed, additional_plates_processed
 
 
+@profile_step()
 def process_barcodes(plates_df, existing_plates_df, custom_base_barcode=None):
     """
     Generate and validate barcodes for new plates.
@@ -1781,6 +1902,7 @@ def process_barcodes(plates_df, existing_plates_df, custom_base_barcode=None):
     return plates_df, final_plates_df
 
 
+@profile_step()
 def finalize_files_and_database(sample_df, final_plates_df, new_plates_df, folders, is_first_run=True, custom_plates_processed=False, additional_plates_processed=False, existing_sample_df=None, experiment_type=EXPERIMENT_TYPE_OTHER):
     """
     Handle all file operations: archiving, saving, organizing.
@@ -1802,6 +1924,9 @@ def finalize_files_and_database(sample_df, final_plates_df, new_plates_df, folde
     
     # Smart database save - only update what actually changes
     save_to_database_smart(sample_df, new_plates_df, DATABASE_NAME, is_first_run, existing_sample_df)
+
+    # Create lookup indexes and enable WAL (safe to repeat on every run)
+    bootstrap_project_database(DATABASE_NAME)
     
     # Generate BarTender file with timestamp
     timestamp = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
@@ -1858,9 +1983,19 @@ def parse_command_line_arguments():
         help='Custom 5-character base barcode (e.g., REX12). Must start with a letter and contain only uppercase letters and digits.'
     )
     
-    return parser.parse_args()
+    add_parameter_arguments(parser)
+    
+    args = parser.parse_args()
+    
+    try:
+        configure_parameters(args)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    return args
 
 
+@instrument_stage
 def main():
     """
     Main script execution following laboratory safety standards.
@@ -1884,6 +2019,10 @@ def main():
     args = parse_command_line_arguments()
     custom_base_barcode = args.custom_base_barcode
 
+    # reuse the parsed sample metadata CSV of an earlier run (hidden
+    # .sps_cache folder, not part of the project folder tree)
+    enable_cache(Path.cwd())
+
     print_header()
 
     # Determine run type and get existing data
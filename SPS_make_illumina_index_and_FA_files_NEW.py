@@ -38,12 +38,24 @@ Safety Features:
 - Comprehensive validation with detailed error reporting
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 import sys
 from datetime import datetime
 from pathlib import Path
-from sqlalchemy import create_engine
+
+from sps_archive import archive_files, archive_run_name
+from sps_bartender import interleave_labels, label_lines, write_label_file
+from sps_cache import cached_frame, enable_cache
+from sps_database import checkpoint_database, record_library_attempts, write_project_summary
+from sps_input_files import ROLE_GRID_TABLE, missing_columns, read_csv_headers
+from sps_instrumentation import detail, instrument_stage, profile_step
+from sps_parameters import add_parameter_arguments, configure_parameters, get_parameter
+from sps_plate_files import fa_upload_table, write_plate_files
+from sps_plate_geometry import stamp_384_to_96, well_to_row_col
+from sps_snapshot import (archive_project_summary_csv, load_project_summary,
+                          refresh_project_summary_snapshot)
 
 
 def create_success_marker():
@@ -63,19 +75,9 @@ def create_success_marker():
         sys.exit()
 
 
-# Global well lists for plate formats
-WELL_LIST_96W = ['A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'G1', 'H1', 'A2', 'B2', 'C2', 'D2', 'E2', 'F2', 'G2', 'H2', 'A3', 'B3', 'C3',
-                 'D3', 'E3', 'F3', 'G3', 'H3', 'A4', 'B4', 'C4', 'D4', 'E4', 'F4', 'G4', 'H4', 'A5', 'B5', 'C5', 'D5', 'E5', 'F5', 'G5',
-                 'H5', 'A6', 'B6', 'C6', 'D6', 'E6', 'F6', 'G6', 'H6', 'A7', 'B7', 'C7', 'D7', 'E7', 'F7', 'G7', 'H7', 'A8', 'B8', 'C8',
-                 'D8', 'E8', 'F8', 'G8', 'H8', 'A9', 'B9', 'C9', 'D9', 'E9', 'F9', 'G9', 'H9', 'A10', 'B10', 'C10', 'D10', 'E10', 'F10', 'G10',
-                 'H10', 'A11', 'B11', 'C11', 'D11', 'E11', 'F11', 'G11', 'H11', 'A12', 'B12', 'C12', 'D12', 'E12', 'F12', 'G12', 'H12']
-
-WELL_LIST_384W = ['A1', 'C1', 'E1', 'G1', 'I1', 'K1', 'M1', 'O1', 'A3', 'C3', 'E3', 'G3', 'I3', 'K3', 'M3', 'O3', 'A5', 'C5', 'E5', 'G5',
-                  'I5', 'K5', 'M5', 'O5', 'A7', 'C7', 'E7', 'G7', 'I7', 'K7', 'M7', 'O7', 'A9', 'C9', 'E9', 'G9', 'I9', 'K9', 'M9', 'O9',
-                  'A11', 'C11', 'E11', 'G11', 'I11', 'K11', 'M11', 'O11', 'A13', 'C13', 'E13', 'G13', 'I13', 'K13', 'M13', 'O13', 'A15',
-                  'C15', 'E15', 'G15', 'I15', 'K15', 'M15', 'O15', 'A17', 'C17', 'E17', 'G17', 'I17', 'K17', 'M17', 'O17', 'A19', 'C19',
-                  'E19', 'G19', 'I19', 'K19', 'M19', 'O19', 'A21', 'C21', 'E21', 'G21', 'I21', 'K21', 'M21', 'O21', 'A23', 'C23', 'E23',
-                  'G23', 'I23', 'K23', 'M23', 'O23']
+# Columns added to the combined grid table to trace samples back to their file
+GRID_FILE_COLUMN = '_grid_file'
+GRID_ROW_COLUMN = '_grid_row'
 
 
 def create_directories():
@@ -136,22 +138,7 @@ def create_directories():
     return BASE_DIR, PROJECT_DIR, LIB_DIR, ECHO_DIR, FA_DIR, INDEX_DIR, ANALYZE_DIR, FTRAN_DIR, ARCHIVE_DIR
 
 
-def get_plate_type():
-    """Get plate configuration and well mappings (adapted from original)."""
-    # Create conversion dictionaries
-    convert_96_to_384_plate = dict(zip(WELL_LIST_96W, WELL_LIST_384W))
-    convert_384_to_96_plate = dict(zip(WELL_LIST_384W, WELL_LIST_96W))
-    
-    # Use 95-well format (standard for CE and SPS)
-    well_list_95w_1_empty = ['A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'G1', 'H1', 'A2', 'B2', 'C2', 'D2', 'E2', 'F2', 'G2', 'H2', 'A3', 'B3', 'C3',
-                             'D3', 'E3', 'F3', 'G3', 'H3', 'A4', 'B4', 'C4', 'D4', 'E4', 'F4', 'G4', 'H4', 'A5', 'B5', 'C5', 'D5', 'E5', 'F5', 'G5',
-                             'H5', 'A6', 'B6', 'C6', 'D6', 'E6', 'F6', 'G6', 'H6', 'A7', 'B7', 'C7', 'D7', 'E7', 'F7', 'G7', 'H7', 'A8', 'B8', 'C8',
-                             'D8', 'E8', 'F8', 'G8', 'H8', 'A9', 'B9', 'C9', 'D9', 'E9', 'F9', 'G9', 'H9', 'A10', 'B10', 'C10', 'D10', 'E10', 'F10', 'G10',
-                             'H10', 'A11', 'B11', 'C11', 'D11', 'E11', 'F11', 'G11', 'H11', 'A12', 'B12', 'C12', 'D12', 'E12', 'F12', 'G12']
-    
-    return well_list_95w_1_empty, convert_96_to_384_plate, convert_384_to_96_plate
-
-
+@profile_step()
 def read_project_database(base_dir):
     """Read the existing project_summary.db into a pandas DataFrame."""
     db_path = base_dir / 'project_summary.db'
@@ -160,10 +147,8 @@ def read_project_database(base_dir):
         raise FileNotFoundError(f"Database file not found: {db_path}")
     
     try:
-        engine = create_engine(f'sqlite:///{db_path}')
-        query = "SELECT * FROM project_summary"
-        db_df = pd.read_sql(query, engine)
-        engine.dispose()
+        # read the parquet snapshot instead when it is newer than the database
+        db_df = load_project_summary(db_path)
         
         print(f"Successfully read {len(db_df)} rows from project_summary.db")
         return db_df
@@ -172,6 +157,7 @@ def read_project_database(base_dir):
         raise RuntimeError(f"Error reading database: {e}")
 
 
+@profile_step()
 def read_multiple_grid_tables(grid_table_files):
     """Read and concatenate multiple grid table files with comprehensive validation.
     
@@ -231,11 +217,10 @@ def read_multiple_grid_tables(grid_table_files):
             raise FileNotFoundError(f"Grid table file not found: {filename}")
         
         try:
-            grid_df = pd.read_csv(grid_path)
+            grid_df = cached_frame(grid_path, 'grid_table', lambda path: pd.read_csv(path, encoding='utf-8-sig'))
             
             # Validate required columns
-            required_cols = ['Well', 'Library Plate Label', 'Illumina Library', 'Library Plate Container Barcode', 'Nucleic Acid ID']
-            missing_cols = [col for col in required_cols if col not in grid_df.columns]
+            missing_cols = missing_columns(grid_df.columns, ROLE_GRID_TABLE)
             
             if missing_cols:
                 raise ValueError(f"Missing required columns in {filename}: {missing_cols}")
@@ -243,32 +228,72 @@ def read_multiple_grid_tables(grid_table_files):
             # Store dataframe with source file info
             grid_dataframes.append((filename, grid_df))
             
-            print(f"Successfully read {len(grid_df)} rows from {Path(filename).name}")
+            detail(f"Successfully read {len(grid_df)} rows from {Path(filename).name}")
             
         except Exception as e:
             raise RuntimeError(f"Error reading grid table {filename}: {e}")
     
+    # Concatenate all dataframes, remembering the source file and CSV row of each sample
+    combined_df = combine_grid_tables(grid_dataframes)
+    
     # Detect duplicate samples across files (FATAL if found)
-    duplicate_report = detect_duplicate_samples(grid_dataframes)
+    duplicate_report = detect_duplicate_samples(combined_df)
     print("✅ No duplicate samples detected across grid tables")
     
-    # Concatenate all dataframes
-    combined_df = pd.concat([df for _, df in grid_dataframes], ignore_index=True)
+    combined_df = combined_df.drop(columns=[GRID_FILE_COLUMN, GRID_ROW_COLUMN])
     
     print(f"Successfully combined {len(grid_dataframes)} grid table file(s) with {len(combined_df)} total samples")
     
     return combined_df
 
 
-def detect_duplicate_samples(grid_dataframes):
+def combine_grid_tables(grid_dataframes):
+    """Concatenate grid tables, adding the source file and CSV row of every sample.
+    
+    Args:
+        grid_dataframes (list): List of (filename, dataframe) tuples
+        
+    Returns:
+        pd.DataFrame: All grid table rows in file order, with GRID_FILE_COLUMN
+        (filename) and GRID_ROW_COLUMN (row number in the CSV file, header = 1)
+    """
+    return pd.concat(
+        [df.assign(**{GRID_FILE_COLUMN: filename, GRID_ROW_COLUMN: df.index + 2})
+         for filename, df in grid_dataframes],
+        ignore_index=True)
+
+
+def _later_duplicates(combined_df, key):
+    """Return (later occurrences, their first occurrences) of duplicated key values.
+    
+    Both DataFrames are aligned row by row and ordered like combined_df, so each
+    later occurrence is reported against the first sample with the same key.
+    """
+    is_later = key.duplicated(keep='first')
+    if not is_later.any():
+        return combined_df.iloc[:0], combined_df.iloc[:0]
+    
+    # key value -> row of its first occurrence
+    first_rows = pd.Series(np.flatnonzero(~key.duplicated(keep='first')), index=key[~is_later])
+    
+    later = combined_df[is_later.to_numpy()]
+    first = combined_df.iloc[first_rows.reindex(key[is_later]).to_numpy()]
+    
+    return later, first
+
+
+def detect_duplicate_samples(combined_df):
     """Detect duplicate samples across multiple grid tables with comprehensive validation.
     
     This function performs critical safety validation by detecting duplicate samples
     across multiple grid table files using multiple criteria. Any duplicates found
     result in FATAL ERROR termination to prevent laboratory automation errors.
     
+    All criteria are checked column-wise on the combined grid table, so the
+    cost grows linearly with the number of samples across all files.
+    
     Args:
-        grid_dataframes (list): List of (filename, dataframe) tuples
+        combined_df (pd.DataFrame): Grid tables combined by combine_grid_tables()
         
     Returns:
         dict: Empty dict if no duplicates found (function exits on duplicates)
@@ -305,94 +330,58 @@ def detect_duplicate_samples(grid_dataframes):
         Laboratory safety requires unique samples across all grid tables.
         Please resolve duplicates before proceeding.
     """
-    all_samples = []
     duplicate_report = {}
     
-    # Collect all samples with their source file information
-    for filename, df in grid_dataframes:
-        for idx, row in df.iterrows():
-            # Check for empty/NaN Nucleic Acid ID - this is a fatal error
-            nucleic_acid_id = row['Nucleic Acid ID']
-            if pd.isna(nucleic_acid_id) or str(nucleic_acid_id).strip() == '':
-                error_msg = f"FATAL ERROR: Empty or missing Nucleic Acid ID found!\n\n"
-                error_msg += f"File: {filename}\n"
-                error_msg += f"Row: {idx + 2}\n"  # +2 because pandas is 0-indexed and CSV has header
-                error_msg += f"Well: {row['Well']}\n"
-                error_msg += f"Plate: {row['Library Plate Label']}\n\n"
-                error_msg += "All samples must have valid Nucleic Acid IDs for laboratory safety.\n"
-                error_msg += "Please verify data integrity before proceeding."
-                raise ValueError(error_msg)
-            
-            sample_info = {
-                'filename': filename,
-                'well': row['Well'],
-                'plate_label': row['Library Plate Label'],
-                'nucleic_acid_id': nucleic_acid_id,
-                'container_barcode': row['Library Plate Container Barcode'],
-                'well_plate_key': f"{row['Well']}_{row['Library Plate Label']}",
-                'container_well_key': f"{row['Library Plate Container Barcode']}_{row['Well']}"
-            }
-            all_samples.append(sample_info)
-    
-    # Check for duplicates using multiple criteria
-    duplicates_found = False
+    # Check for empty/NaN Nucleic Acid IDs first - this is a fatal error
+    nucleic_acid_ids = combined_df['Nucleic Acid ID']
+    empty_ids = nucleic_acid_ids.isna() | (nucleic_acid_ids.astype(str).str.strip() == '')
+    if empty_ids.any():
+        row = combined_df[empty_ids.to_numpy()].iloc[0]
+        error_msg = f"FATAL ERROR: Empty or missing Nucleic Acid ID found!\n\n"
+        error_msg += f"File: {row[GRID_FILE_COLUMN]}\n"
+        error_msg += f"Row: {row[GRID_ROW_COLUMN]}\n"
+        error_msg += f"Well: {row['Well']}\n"
+        error_msg += f"Plate: {row['Library Plate Label']}\n\n"
+        error_msg += "All samples must have valid Nucleic Acid IDs for laboratory safety.\n"
+        error_msg += "Please verify data integrity before proceeding."
+        raise ValueError(error_msg)
+    
+    wells = combined_df['Well'].astype(str)
     
     # Check 1: (Well, Library Plate Label) combination duplicates
-    well_plate_seen = {}
-    for sample in all_samples:
-        key = sample['well_plate_key']
-        if key in well_plate_seen:
-            duplicates_found = True
-            if 'well_plate_duplicates' not in duplicate_report:
-                duplicate_report['well_plate_duplicates'] = []
-            duplicate_report['well_plate_duplicates'].append({
-                'key': key,
-                'first_file': well_plate_seen[key]['filename'],
-                'second_file': sample['filename'],
-                'well': sample['well'],
-                'plate_label': sample['plate_label']
-            })
-        else:
-            well_plate_seen[key] = sample
+    later, first = _later_duplicates(
+        combined_df, wells + '_' + combined_df['Library Plate Label'].astype(str))
+    if len(later):
+        duplicate_report['well_plate_duplicates'] = [
+            {'first_file': first_file, 'second_file': second_file, 'well': well, 'plate_label': plate_label}
+            for first_file, second_file, well, plate_label in zip(
+                first[GRID_FILE_COLUMN], later[GRID_FILE_COLUMN], later['Well'], later['Library Plate Label'])
+        ]
     
     # Check 2: Nucleic Acid ID duplicates
-    nucleic_acid_seen = {}
-    for sample in all_samples:
-        key = sample['nucleic_acid_id']
-        if key in nucleic_acid_seen:
-            duplicates_found = True
-            if 'nucleic_acid_duplicates' not in duplicate_report:
-                duplicate_report['nucleic_acid_duplicates'] = []
-            duplicate_report['nucleic_acid_duplicates'].append({
-                'nucleic_acid_id': key,
-                'first_file': nucleic_acid_seen[key]['filename'],
-                'second_file': sample['filename'],
-                'first_well': nucleic_acid_seen[key]['well'],
-                'second_well': sample['well']
-            })
-        else:
-            nucleic_acid_seen[key] = sample
+    later, first = _later_duplicates(combined_df, nucleic_acid_ids)
+    if len(later):
+        duplicate_report['nucleic_acid_duplicates'] = [
+            {'nucleic_acid_id': nucleic_acid_id, 'first_file': first_file, 'second_file': second_file,
+             'first_well': first_well, 'second_well': second_well}
+            for nucleic_acid_id, first_file, second_file, first_well, second_well in zip(
+                later['Nucleic Acid ID'], first[GRID_FILE_COLUMN], later[GRID_FILE_COLUMN],
+                first['Well'], later['Well'])
+        ]
     
     # Check 3: (Container Barcode, Well) combination duplicates
-    container_well_seen = {}
-    for sample in all_samples:
-        key = sample['container_well_key']
-        if key in container_well_seen:
-            duplicates_found = True
-            if 'container_well_duplicates' not in duplicate_report:
-                duplicate_report['container_well_duplicates'] = []
-            duplicate_report['container_well_duplicates'].append({
-                'key': key,
-                'first_file': container_well_seen[key]['filename'],
-                'second_file': sample['filename'],
-                'container_barcode': sample['container_barcode'],
-                'well': sample['well']
-            })
-        else:
-            container_well_seen[key] = sample
+    later, first = _later_duplicates(
+        combined_df, combined_df['Library Plate Container Barcode'].astype(str) + '_' + wells)
+    if len(later):
+        duplicate_report['container_well_duplicates'] = [
+            {'first_file': first_file, 'second_file': second_file, 'container_barcode': barcode, 'well': well}
+            for first_file, second_file, barcode, well in zip(
+                first[GRID_FILE_COLUMN], later[GRID_FILE_COLUMN],
+                later['Library Plate Container Barcode'], later['Well'])
+        ]
     
     # If duplicates found, raise fatal error
-    if duplicates_found:
+    if duplicate_report:
         error_msg = "FATAL ERROR: Duplicate samples detected across grid tables!\n\n"
         
         if 'well_plate_duplicates' in duplicate_report:
@@ -427,43 +416,6 @@ def detect_duplicate_samples(grid_dataframes):
     return duplicate_report
 
 
-def convert_well_to_row_col(well_position):
-    """Convert well position string (e.g., 'C2') to numeric row and column."""
-    if pd.isna(well_position) or not isinstance(well_position, str):
-        raise ValueError(f"Invalid well position: {well_position}")
-    
-    well_str = str(well_position).strip().upper()
-    
-    if len(well_str) < 2:
-        raise ValueError(f"Invalid well position format: {well_position}")
-    
-    # Extract row letter and column number
-    row_letter = well_str[0]
-    col_str = well_str[1:]
-    
-    # Validate row letter is A-Z
-    if not row_letter.isalpha() or len(row_letter) != 1:
-        raise ValueError(f"Invalid well position format: {well_position}")
-    
-    # Validate row letter is within reasonable range (A-P for 384-well)
-    if ord(row_letter) < ord('A') or ord(row_letter) > ord('P'):
-        raise ValueError(f"Invalid well position format: {well_position}")
-    
-    try:
-        # Convert row letter to number (A=1, B=2, etc.)
-        row_num = ord(row_letter) - ord('A') + 1
-        col_num = int(col_str)
-        
-        # Validate column number is reasonable (1-24 for 384-well)
-        if col_num < 1 or col_num > 24:
-            raise ValueError(f"Invalid well position format: {well_position}")
-        
-        return row_num, col_num
-        
-    except (ValueError, IndexError) as e:
-        raise ValueError(f"Invalid well position format: {well_position}")
-
-
 def identify_missing_samples(db_df, combined_grid_df):
     """Identify samples present in database but missing from grid tables.
     
@@ -512,47 +464,33 @@ def identify_missing_samples(db_df, combined_grid_df):
         All database samples must be present in grid tables for laboratory safety.
         Please verify grid table completeness before proceeding.
     """
-    # Create merge keys for comparison
-    db_keys = db_df[['Destination_Well', 'Destination_plate_name']].copy()
-    db_keys['db_key'] = db_keys['Destination_Well'] + '_' + db_keys['Destination_plate_name']
-    
-    grid_keys = combined_grid_df[['Well', 'Library Plate Label']].copy()
-    grid_keys['grid_key'] = grid_keys['Well'] + '_' + grid_keys['Library Plate Label']
-    
-    # Find database samples not present in grid tables
-    db_key_set = set(db_keys['db_key'])
-    grid_key_set = set(grid_keys['grid_key'])
-    
-    missing_keys = db_key_set - grid_key_set
-    
-    if missing_keys:
-        # Create detailed missing samples report
-        missing_samples = []
-        for missing_key in missing_keys:
-            well, plate = missing_key.split('_', 1)
-            db_sample = db_df[(db_df['Destination_Well'] == well) &
-                             (db_df['Destination_plate_name'] == plate)]
-            if not db_sample.empty:
-                sample_info = db_sample.iloc[0]
-                missing_samples.append({
-                    'Destination_Well': well,
-                    'Destination_plate_name': plate,
-                    'internal_name': sample_info.get('internal_name', 'N/A'),
-                    'plate_id': sample_info.get('plate_id', 'N/A'),
-                    'source_well': sample_info.get('source_well', 'N/A')
-                })
-        
-        missing_df = pd.DataFrame(missing_samples)
+    # Anti-join: database samples whose (well, plate) is not in any grid table
+    grid_keys = combined_grid_df[['Well', 'Library Plate Label']].drop_duplicates()
+    grid_keys.columns = ['Destination_Well', 'Destination_plate_name']
+    
+    db_keys = db_df[['Destination_Well', 'Destination_plate_name']]
+    in_grid = db_keys.merge(grid_keys, how='left', indicator=True)['_merge'].to_numpy() == 'both'
+    
+    if not in_grid.all():
+        # Create detailed missing samples report (first database row per missing key)
+        missing_df = db_df[~in_grid].drop_duplicates(subset=['Destination_Well', 'Destination_plate_name'])
+        missing_df = pd.DataFrame({
+            'Destination_Well': missing_df['Destination_Well'],
+            'Destination_plate_name': missing_df['Destination_plate_name'],
+            'internal_name': missing_df.get('internal_name', 'N/A'),
+            'plate_id': missing_df.get('plate_id', 'N/A'),
+            'source_well': missing_df.get('source_well', 'N/A')
+        })
         
         # Create detailed error message
-        error_msg = f"FATAL ERROR: {len(missing_samples)} samples from database not found in grid tables!\n\n"
+        error_msg = f"FATAL ERROR: {len(missing_df)} samples from database not found in grid tables!\n\n"
         error_msg += "Missing Samples:\n"
         error_msg += "Destination_Well | Destination_Plate | Internal_Name | Source_Plate | Source_Well\n"
         error_msg += "-" * 80 + "\n"
         
-        for _, sample in missing_df.iterrows():
-            error_msg += f"{sample['Destination_Well']:15} | {sample['Destination_plate_name']:16} | "
-            error_msg += f"{sample['internal_name']:13} | {sample['plate_id']:12} | {sample['source_well']}\n"
+        for sample in missing_df.itertuples(index=False):
+            error_msg += f"{sample.Destination_Well:15} | {sample.Destination_plate_name:16} | "
+            error_msg += f"{sample.internal_name:13} | {sample.plate_id:12} | {sample.source_well}\n"
         
         error_msg += "\nAll database samples must be present in grid tables for laboratory safety.\n"
         error_msg += "Please verify grid table completeness before proceeding."
@@ -563,6 +501,7 @@ def identify_missing_samples(db_df, combined_grid_df):
     return pd.DataFrame()  # Return empty DataFrame if no missing samples
 
 
+@profile_step()
 def validate_and_merge_data(db_df, grid_df):
     """Merge database and grid table data with validation."""
     print("Validating and merging data...")
@@ -601,25 +540,29 @@ def validate_and_merge_data(db_df, grid_df):
     return merged_df
 
 
+@profile_step()
 def archive_existing_files(base_dir, archive_dir):
     """Archive existing project_summary.db and .csv files with timestamp."""
     timestamp = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
+    run = archive_run_name(Path(__file__).stem, timestamp)
     
-    # Archive database file
+    # Archive database file (moved into the deduplicated archive store)
     db_file = base_dir / "project_summary.db"
     if db_file.exists():
-        archive_db = archive_dir / f"archive_project_summary_{timestamp}.db"
-        db_file.rename(archive_db)
+        # fold any WAL content into the database file before moving it
+        checkpoint_database(db_file)
+        archive_db = archive_files(archive_dir, [(db_file, f"archive_project_summary_{timestamp}.db")],
+                                   run, move=True)[0]
         # print(f"Archived database to: {archive_db}")
     
-    # Archive CSV file
+    # Archive CSV file (stored as compressed parquet when pyarrow is available)
     csv_file = base_dir / "project_summary.csv"
     if csv_file.exists():
-        archive_csv = archive_dir / f"archive_project_summary_{timestamp}.csv"
-        csv_file.rename(archive_csv)
+        archive_csv = archive_project_summary_csv(csv_file, archive_dir, timestamp, run=run)
         # print(f"Archived CSV to: {archive_csv}")
 
 
+@profile_step()
 def update_database(merged_df, base_dir):
     """Create new database and CSV files from merged data."""
     # Reorder columns as requested
@@ -643,9 +586,13 @@ def update_database(merged_df, base_dir):
     
     # Create new SQLite database
     db_path = base_dir / 'project_summary.db'
-    engine = create_engine(f'sqlite:///{db_path}')
-    merged_df_ordered.to_sql('project_summary', engine, if_exists='replace', index=False)
-    engine.dispose()
+    write_project_summary(merged_df_ordered, db_path)
+
+    # first attempt of every library; replaces attempts of an earlier run
+    record_library_attempts(merged_df_ordered, db_path, replace=True)
+
+    # columnar snapshot read by the next stages (only written when pyarrow is installed)
+    refresh_project_summary_snapshot(db_path)
     
     # Create new CSV file
     csv_path = base_dir / 'project_summary.csv'
@@ -654,15 +601,16 @@ def update_database(merged_df, base_dir):
     # print(f"Created new database and CSV with {len(merged_df_ordered)} rows")
 
 
+@profile_step()
 def prepare_echo_data(merged_df):
     """Prepare data for Echo transfer files."""
     echo_df = merged_df.copy()
     
     # Convert well positions to numeric row/column with final column names
     # Use 'source_well' column from database for source positions (where samples come from)
-    echo_df['Source Row'], echo_df['Source Column'] = zip(*echo_df['source_well'].apply(convert_well_to_row_col))
+    echo_df['Source Row'], echo_df['Source Column'] = well_to_row_col(echo_df['source_well'])
     # Use 'Destination_Well' for destination positions (where samples go to)
-    echo_df['Destination Row'], echo_df['Destination Column'] = zip(*echo_df['Destination_Well'].apply(convert_well_to_row_col))
+    echo_df['Destination Row'], echo_df['Destination Column'] = well_to_row_col(echo_df['Destination_Well'])
     
     # Create Echo file format
     echo_df = echo_df.rename(columns={
@@ -681,47 +629,38 @@ def prepare_echo_data(merged_df):
     return echo_final
 
 
-def make_echo_files(echo_df, directories):
-    """Generate Echo transfer files grouped by destination plate."""
-    BASE_DIR, PROJECT_DIR, LIB_DIR, ECHO_DIR, FA_DIR, INDEX_DIR, ANALYZE_DIR, FTRAN_DIR, ARCHIVE_DIR = directories
+def extract_plate_number(plate_name):
+    """Sort key for source plate names like "Prtist.13" (number after the last dot)."""
+    try:
+        # Extract number after the last dot
+        return int(plate_name.split('.')[-1])
+    except (ValueError, IndexError):
+        # If no number found, return the original string for alphabetical sort
+        return plate_name
+
+
+def echo_file(dest_plate, plate_data):
+    """Build the Echo transfer file of one destination plate."""
+    # Get unique source plates for this destination and sort them numerically
+    source_plates_sorted = sorted(plate_data['Source Plate Barcode'].unique(), key=extract_plate_number)
+    source_names = '_'.join(source_plates_sorted)
     
-    # Group by destination plate
-    dest_plates = echo_df['Destination Plate Barcode'].unique()
+    # Create filename: destination_source1_source2_etc.csv
+    filename = f"{dest_plate}_{source_names}.csv"
     
-    for dest_plate in dest_plates:
-        plate_data = echo_df[echo_df['Destination Plate Barcode'] == dest_plate].copy()
-        
-        # Get unique source plates for this destination and sort them numerically
-        source_plates = plate_data['Source Plate Barcode'].unique()
-        # Sort numerically by extracting the number from plate names like "Prtist.13"
-        def extract_plate_number(plate_name):
-            try:
-                # Extract number after the last dot
-                return int(plate_name.split('.')[-1])
-            except (ValueError, IndexError):
-                # If no number found, return the original string for alphabetical sort
-                return plate_name
-        
-        source_plates_sorted = sorted(source_plates, key=extract_plate_number)
-        source_names = '_'.join(source_plates_sorted)
-        
-        # Create filename: destination_source1_source2_etc.csv
-        filename = f"{dest_plate}_{source_names}.csv"
-        
-        # Sort by destination column and row
-        plate_data = plate_data.sort_values(['Destination Column', 'Destination Row'])
-        
-        # Save file
-        plate_data.to_csv(ECHO_DIR / filename, index=False)
-        # print(f"Created Echo file: {filename}")
+    # Sort by destination column and row
+    plate_data = plate_data.sort_values(['Destination Column', 'Destination Row'])
+    
+    return plate_data, filename, {'index': False}
 
 
-def create_illum_dataframe(merged_df, convert_384_to_96):
+@profile_step()
+def create_illum_dataframe(merged_df):
     """Prepare Illumina index data (adapted from original)."""
     illum_df = merged_df[['Destination_Plate_Barcode', 'Destination_Well', 'Illumina_index_set']].copy()
     
     # Convert 384-well to 96-well positions
-    illum_df['Destination_Well_96'] = illum_df['Destination_Well'].replace(convert_384_to_96)
+    illum_df['Destination_Well_96'] = stamp_384_to_96(illum_df['Destination_Well'])
     
     # Set primer volume
     illum_df['Primer_volume_(uL)'] = 2
@@ -739,30 +678,21 @@ def create_illum_dataframe(merged_df, convert_384_to_96):
     return illum_df
 
 
-def make_illumina_files(illum_df, directories):
-    """Generate Illumina index transfer files."""
-    BASE_DIR, PROJECT_DIR, LIB_DIR, ECHO_DIR, FA_DIR, INDEX_DIR, ANALYZE_DIR, FTRAN_DIR, ARCHIVE_DIR = directories
-    
-    dest_plates = illum_df['Lib_plate_ID'].unique()
+def illumina_file(dest_plate, plate_data):
+    """Build the Illumina index transfer file of one library plate."""
+    # Add "h" prefix for Hamilton scanner
+    plate_data = plate_data.assign(Lib_plate_ID="h" + plate_data['Lib_plate_ID'].astype(str))
     
-    for dest_plate in dest_plates:
-        plate_data = illum_df[illum_df['Lib_plate_ID'] == dest_plate].copy()
-        
-        # Add "h" prefix for Hamilton scanner
-        plate_data['Lib_plate_ID'] = "h" + plate_data['Lib_plate_ID'].astype(str)
-        
-        # Save file
-        filename = f"Illumina_index_transfer_{dest_plate}.csv"
-        plate_data.to_csv(INDEX_DIR / filename, index=False)
-        # print(f"Created Illumina file: {filename}")
+    return plate_data, f"Illumina_index_transfer_{dest_plate}.csv", {'index': False}
 
 
-def create_fa_dataframe(merged_df, convert_384_to_96):
+@profile_step()
+def create_fa_dataframe(merged_df):
     """Prepare FA data (adapted from original)."""
     FA_df = merged_df[['Destination_Plate_Barcode', 'sample_id']].copy()
     
     # Convert 384-well to 96-well positions
-    FA_df['Destination_Well_96'] = merged_df['Destination_Well'].replace(convert_384_to_96)
+    FA_df['Destination_Well_96'] = stamp_384_to_96(merged_df['Destination_Well'])
     
     # Convert sample_id to string
     FA_df['sample_id'] = FA_df['sample_id'].astype(str)
@@ -776,61 +706,35 @@ def create_fa_dataframe(merged_df, convert_384_to_96):
     return FA_df
 
 
-def make_fa_files(FA_df, directories):
-    """Generate FA upload files."""
-    BASE_DIR, PROJECT_DIR, LIB_DIR, ECHO_DIR, FA_DIR, INDEX_DIR, ANALYZE_DIR, FTRAN_DIR, ARCHIVE_DIR = directories
-    
-    dest_plates = FA_df['Destination_Plate_Barcode'].unique()
+def fa_file(dest_plate, plate_data):
+    """Build the FA upload file of one library plate.
+
+    All 96 wells in column-major order, numbered from 1, with empty wells
+    named 'empty_well' and the ladder in H12.
+    """
+    fa_table = fa_upload_table(plate_data['Destination_Well_96'], plate_data['name'])
     
-    for dest_plate in dest_plates:
-        # Create dataframe with all 96 wells
-        tmp_fa_df = pd.DataFrame(WELL_LIST_96W, columns=["Well"])
-        
-        # Merge with plate data
-        plate_data = FA_df[FA_df['Destination_Plate_Barcode'] == dest_plate]
-        tmp_fa_df = tmp_fa_df.merge(plate_data, how='outer', left_on=['Well'], right_on=['Destination_Well_96'])
-        
-        # Sort by column first (1-12), then by row (A-H) within each column
-        # Extract row letter and column number for sorting
-        tmp_fa_df['Row_Letter'] = tmp_fa_df['Well'].str[0]
-        tmp_fa_df['Column_Number'] = tmp_fa_df['Well'].str[1:].astype(int)
-        
-        # Sort by column number first, then by row letter
-        tmp_fa_df = tmp_fa_df.sort_values(['Column_Number', 'Row_Letter'])
-        
-        # Drop the temporary sorting columns
-        tmp_fa_df = tmp_fa_df.drop(columns=['Row_Letter', 'Column_Number'])
-        
-        # Reset and set index starting from 1
-        tmp_fa_df = tmp_fa_df.reset_index(drop=True)
-        tmp_fa_df.index = range(1, len(tmp_fa_df) + 1)
-        
-        # Fill empty wells
-        tmp_fa_df['name'] = tmp_fa_df['name'].fillna('empty_well')
-        
-        # Set ladder in H12
-        tmp_fa_df.loc[tmp_fa_df['Well'] == 'H12', 'name'] = "ladder_1"
-        
-        # Clean up columns
-        tmp_fa_df = tmp_fa_df[['Well', 'name']]
-        
-        # Save file
-        filename = f"FA_upload_{dest_plate}.csv"
-        tmp_fa_df.to_csv(FA_DIR / filename, index=True, header=False)
-        # print(f"Created FA file: {filename}")
+    return fa_table, f"FA_upload_{dest_plate}.csv", {'index': True, 'header': False}
 
 
+@profile_step()
 def make_dilution_dataframe(merged_df):
     """Create dilution transfer dataframe."""
     # Ask user for dilution factor
-    dilution_factor = float(input("What is the desired fold-dilution for libraries loaded into the FA plate? (default 5): ") or 5)
+    # (--param dilution_factor=N / SPS_DILUTION_FACTOR / sps_parameters.json, else prompt)
+    try:
+        dilution_factor = get_parameter(
+            'dilution_factor',
+            "What is the desired fold-dilution for libraries loaded into the FA plate? (default 5): ",
+            default=5, convert=float)
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}")
+        sys.exit()
     
     dilution_df = merged_df[['Destination_Plate_Barcode', 'Destination_Well']].copy()
     
     # Convert 384-well to 96-well positions for FA
-    convert_384_to_96 = dict(zip(WELL_LIST_384W, WELL_LIST_96W))
-    
-    dilution_df['FA_Well'] = dilution_df['Destination_Well'].replace(convert_384_to_96)
+    dilution_df['FA_Well'] = stamp_384_to_96(dilution_df['Destination_Well'])
     dilution_df['dilution_factor'] = dilution_factor
     
     # Rename columns
@@ -858,24 +762,32 @@ def make_dilution_dataframe(merged_df):
     return dilution_df
 
 
-def make_dilution_files(dilution_df, directories):
-    """Generate dilution transfer files."""
-    BASE_DIR, PROJECT_DIR, LIB_DIR, ECHO_DIR, FA_DIR, INDEX_DIR, ANALYZE_DIR, FTRAN_DIR, ARCHIVE_DIR = directories
+def dilution_file(dest_plate, plate_data):
+    """Build the FA dilution transfer file of one library plate."""
+    # Add "h" prefix for Hamilton scanner
+    plate_data = plate_data.assign(Library_Plate_Barcode='h' + plate_data['Library_Plate_Barcode'])
     
-    dest_plates = dilution_df['Library_Plate_Barcode'].unique()
+    return plate_data, f"FA_plate_transfer_{dest_plate}.csv", {'index': False}
+
+
+@profile_step()
+def make_plate_files(echo_df, illum_df, fa_df, dilution_df, directories):
+    """Write the Echo, Illumina index, FA upload and dilution files of every plate.
+
+    Each frame is split into plates once and all files are written in one
+    pass through a thread pool (sps_plate_files.write_plate_files).
+    """
+    BASE_DIR, PROJECT_DIR, LIB_DIR, ECHO_DIR, FA_DIR, INDEX_DIR, ANALYZE_DIR, FTRAN_DIR, ARCHIVE_DIR = directories
     
-    for dest_plate in dest_plates:
-        plate_data = dilution_df[dilution_df['Library_Plate_Barcode'] == dest_plate].copy()
-        
-        # Add "h" prefix for Hamilton scanner
-        plate_data['Library_Plate_Barcode'] = 'h' + plate_data['Library_Plate_Barcode']
-        
-        # Save file
-        filename = f"FA_plate_transfer_{dest_plate}.csv"
-        plate_data.to_csv(FTRAN_DIR / filename, index=False)
-        # print(f"Created dilution file: {filename}")
+    write_plate_files([
+        (echo_df, 'Destination Plate Barcode', ECHO_DIR, echo_file),
+        (illum_df, 'Lib_plate_ID', INDEX_DIR, illumina_file),
+        (fa_df, 'Destination_Plate_Barcode', FA_DIR, fa_file),
+        (dilution_df, 'Library_Plate_Barcode', FTRAN_DIR, dilution_file),
+    ])
 
 
+@profile_step()
 def make_threshold_file(merged_df, directories):
     """Generate threshold file for FA analysis."""
     BASE_DIR, PROJECT_DIR, LIB_DIR, ECHO_DIR, FA_DIR, INDEX_DIR, ANALYZE_DIR, FTRAN_DIR, ARCHIVE_DIR = directories
@@ -896,40 +808,25 @@ def make_threshold_file(merged_df, directories):
     # print("Created threshold file: thresholds.txt")
 
 
+@profile_step()
 def make_bartender_labels(merged_df, directories):
     """Generate Bartender barcode label file."""
     BASE_DIR, PROJECT_DIR, LIB_DIR, ECHO_DIR, FA_DIR, INDEX_DIR, ANALYZE_DIR, FTRAN_DIR, ARCHIVE_DIR = directories
     
-    dest_list = sorted(merged_df['Destination_Plate_Barcode'].unique().tolist())
-    
-    # Bartender header
-    header = '%BTW% /AF="\\\\BARTENDER\\shared\\templates\\ECHO_BCode8.btw" /D="%Trigger File Name%" /PRN="bcode8" /R=3 /P /DD\r\n\r\n%END%\r\n\r\n\r\n'
+    # Reverse sort for printing order
+    plates = pd.Series(sorted(merged_df['Destination_Plate_Barcode'].unique().tolist(), reverse=True), dtype=object)
     
     filename = "BARTENDER_Library_IlluminaIndex_FA_plate_labels.txt"
     
-    with open(filename, "w") as bc_file:
-        bc_file.write(header)
-        
-        # Reverse sort for printing order
-        dest_list.reverse()
-        
+    write_label_file(LIB_DIR / filename, [
         # FA run plates
-        for plate in dest_list:
-            bc_file.write(f'{plate}F,"FA.run {plate}F"\r\n')
-        bc_file.write(',\r\n')
-        
+        label_lines(plates + 'F', 'FA.run ' + plates + 'F'),
         # FA dilution plates
-        for plate in dest_list:
-            bc_file.write(f'{plate}D,"FA.dilute {plate}D"\r\n')
-        bc_file.write(',\r\n')
-        
+        label_lines(plates + 'D', 'FA.dilute ' + plates + 'D'),
         # Library plates
-        for plate in dest_list:
-            bc_file.write(f'h{plate},"     h{plate}"\r\n')
-            bc_file.write(f'{plate},"SPS.lib.plate {plate}"\r\n')
-    
-    # Move to library directory
-    Path(filename).rename(LIB_DIR / filename)
+        interleave_labels(label_lines('h' + plates, '     h' + plates),
+                          label_lines(plates, 'SPS.lib.plate ' + plates)),
+    ])
     # print(f"Created Bartender file: {filename}")
 
 
@@ -946,22 +843,27 @@ def find_csv_files(base_dir):
     return csv_files
 
 
-def validate_grid_table_columns(csv_file):
-    """Check if CSV file has required grid table columns without full validation."""
-    required_cols = ['Well', 'Library Plate Label', 'Illumina Library', 'Library Plate Container Barcode', 'Nucleic Acid ID']
+def validate_grid_table_columns(csv_file, header=None):
+    """Check if CSV file has required grid table columns without full validation.
     
-    try:
-        # Read only the header row to check columns
-        df_header = pd.read_csv(csv_file, nrows=0)
-        missing_cols = [col for col in required_cols if col not in df_header.columns]
-        
-        if not missing_cols:
-            return True, None
-        else:
-            return False, f"Missing columns: {missing_cols}"
-            
-    except Exception as e:
-        return False, f"Error reading file: {e}"
+    Args:
+        csv_file (Path): CSV file to check
+        header (list or Exception, optional): Header already read with
+            sps_input_files.read_csv_headers; read from the file when None
+    """
+    if header is None:
+        # Read only the header line to check columns
+        header = read_csv_headers([csv_file])[Path(csv_file)]
+    
+    if isinstance(header, Exception):
+        return False, f"Error reading file: {header}"
+    
+    missing_cols = missing_columns(header, ROLE_GRID_TABLE)
+    
+    if not missing_cols:
+        return True, None
+    else:
+        return False, f"Missing columns: {missing_cols}"
 
 
 def find_all_grid_tables(base_dir):
@@ -1017,12 +919,13 @@ def find_all_grid_tables(base_dir):
         print("\nPlease ensure your grid table file is in the current directory.")
         sys.exit()
     
-    # Validate each CSV file
+    # Validate each CSV file (header lines only, cached in .sps_cache/input_index.json)
     valid_files = []
     invalid_files = []
+    headers = read_csv_headers(csv_files)
     
     for csv_file in csv_files:
-        is_valid, error_msg = validate_grid_table_columns(csv_file)
+        is_valid, error_msg = validate_grid_table_columns(csv_file, headers[csv_file])
         if is_valid:
             valid_files.append(csv_file)
         else:
@@ -1044,9 +947,9 @@ def find_all_grid_tables(base_dir):
         sys.exit()
     
     # Return all valid files
-    print(f"Found {len(valid_files)} valid grid table file(s):")
+    detail(f"Found {len(valid_files)} valid grid table file(s):")
     for valid_file in valid_files:
-        print(f"- {valid_file.name}")
+        detail(f"- {valid_file.name}")
     
     return [str(f) for f in valid_files]
 
@@ -1084,6 +987,24 @@ def auto_detect_grid_table(base_dir):
     return find_all_grid_tables(base_dir)
 
 
+def parse_command_line_arguments():
+    """Parse command line arguments (parameter options for the prompts)."""
+    parser = argparse.ArgumentParser(
+        description='Create Illumina index, Echo and FA files for SPS library creation.')
+    
+    add_parameter_arguments(parser)
+    
+    args = parser.parse_args()
+    
+    try:
+        configure_parameters(args)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    return args
+
+
+@instrument_stage
 def main():
     """Main execution function with enhanced multi-grid table processing.
     
@@ -1120,6 +1041,11 @@ def main():
         All validation errors are FATAL and terminate execution with
         detailed error messages and resolution guidance.
     """
+    parse_command_line_arguments()
+    
+    # reuse parsed grid tables of an earlier run (.sps_cache)
+    enable_cache(Path.cwd())
+    
     try:
         # Create directory structure
         print("Creating directory structure...")
@@ -1129,9 +1055,6 @@ def main():
         # Auto-detect grid table files (supports multiple files)
         grid_table_files = auto_detect_grid_table(BASE_DIR)
         
-        # Get plate configuration
-        well_list, convert_96_to_384, convert_384_to_96 = get_plate_type()
-        
         # Read input data
         print("Reading input data...")
         db_df = read_project_database(BASE_DIR)
@@ -1154,25 +1077,15 @@ def main():
         # Generate all output files
         print("\nGenerating output files...")
         
-        # Generate Echo transfer files
-        print("Creating Echo transfer files...")
+        # Prepare Echo, Illumina index, FA and dilution data
         echo_df = prepare_echo_data(merged_df)
-        make_echo_files(echo_df, directories)
-        
-        # Generate Illumina index files
-        print("Creating Illumina index files...")
-        illum_df = create_illum_dataframe(merged_df, convert_384_to_96)
-        make_illumina_files(illum_df, directories)
-        
-        # Generate FA files
-        print("Creating FA files...")
-        fa_df = create_fa_dataframe(merged_df, convert_384_to_96)
-        make_fa_files(fa_df, directories)
-        
-        # Generate dilution files
-        print("Creating dilution files...")
+        illum_df = create_illum_dataframe(merged_df)
+        fa_df = create_fa_dataframe(merged_df)
         dilution_df = make_dilution_dataframe(merged_df)
-        make_dilution_files(dilution_df, directories)
+        
+        # Generate Echo transfer, Illumina index, FA and dilution files
+        print("Creating Echo transfer, Illumina index, FA and dilution files...")
+        make_plate_files(echo_df, illum_df, fa_df, dilution_df, directories)
         
         # Generate threshold file
         print("Creating threshold file...")
@@ -18,10 +18,14 @@ CRITICAL REQUIREMENTS:
 
 import sys
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from sqlalchemy import create_engine
 
+from sps_cache import cached_frame, enable_cache
+from sps_instrumentation import detail, instrument_stage, profile_step
+
 # ---------------------------------------------------------------------------
 # Module-level constants
 # ---------------------------------------------------------------------------
@@ -43,11 +47,48 @@ OUTPUT_COLUMNS = [
     'Dest_plate',
 ]
 
+# Kinetics file columns that end up in OUTPUT_COLUMNS (before rename_columns)
+KINETICS_INPUT_COLUMNS = [
+    'Plate_ID',
+    'Well',
+    'Well_Row',
+    'Well_Col',
+    'Row',
+    'Col',
+    'Sample',
+    'Type',
+    'number_of_cells/capsules',
+    'Group_1',
+    'Group_2',
+    'Group_3',
+    'Delta_Fluorescence',
+    'Crossing_Point',
+    'Pass_Fail',
+]
+
+# Label columns are read as text; numeric columns keep pandas' inference so
+# that summary_MDA_results.csv is written exactly as before
+KINETICS_TEXT_DTYPES = {
+    'Plate_ID': str,
+    'Well': str,
+    'Well_Row': str,
+    'Sample': str,
+    'Type': str,
+    'Group_1': str,
+    'Group_2': str,
+    'Group_3': str,
+    'Pass_Fail': str,
+}
+
+# Threads reading kinetics files in load_and_process_plates (1 = one at a time)
+READ_WORKERS = 8
+
 
 # ---------------------------------------------------------------------------
 # Phase 1 Functions
 # ---------------------------------------------------------------------------
 
+@profile_step()
 def read_individual_plates_from_database(db_path):
     """
     Read the individual_plates table from the SQLite project database.
@@ -92,6 +133,7 @@ def read_individual_plates_from_database(db_path):
     return df
 
 
+@profile_step()
 def scan_kinetics_files(wga_results_dir):
     """
     Find all *_amplification_kinetics_summary.csv files in the B_WGA_results/
@@ -124,6 +166,7 @@ def scan_kinetics_files(wga_results_dir):
     return files
 
 
+@profile_step()
 def validate_layout_files(kinetics_files, layout_dir):
     """
     For each kinetics file, verify that a corresponding plate layout CSV exists
@@ -177,7 +220,7 @@ def validate_layout_files(kinetics_files, layout_dir):
     return result
 
 
-def read_kinetics_file(kinetics_path):
+def read_kinetics_file(kinetics_path, columns=None):
     """
     Read a single amplification kinetics CSV file and validate that its
     Plate_ID column matches the plate name embedded in the filename.
@@ -188,9 +231,12 @@ def read_kinetics_file(kinetics_path):
     Args:
         kinetics_path (Path): Path to a single
             *_amplification_kinetics_summary.csv file.
+        columns (list[str], optional): Read only these columns (those present
+            in the file), with the label columns as text
+            (KINETICS_TEXT_DTYPES). Default: all columns, dtypes inferred.
 
     Returns:
-        pd.DataFrame: DataFrame with all columns from the kinetics file.
+        pd.DataFrame: DataFrame with the columns from the kinetics file.
 
     Raises:
         SystemExit: If the file cannot be read, or if the Plate_ID column does
@@ -201,14 +247,27 @@ def read_kinetics_file(kinetics_path):
     SUFFIX = "_amplification_kinetics_summary.csv"
     plate_name_from_file = kinetics_path.name.replace(SUFFIX, "")
 
+    read_kwargs = {}
+    cache_kind = "kinetics"
+    if columns is not None:
+        wanted = set(columns)
+        read_kwargs = {
+            "usecols": lambda col: col in wanted,
+            "dtype": {col: dtype for col, dtype in KINETICS_TEXT_DTYPES.items() if col in wanted},
+        }
+        cache_kind = "kinetics:" + ",".join(sorted(wanted))
+
     try:
-        df = pd.read_csv(kinetics_path, encoding="utf-8-sig")
+        df = cached_frame(kinetics_path, cache_kind,
+                          lambda path: pd.read_csv(path, encoding="utf-8-sig", **read_kwargs))
     except Exception as e:
         print(f"FATAL ERROR: Could not read kinetics file {kinetics_path}: {e}")
         sys.exit()
 
-    unique_ids = df["Plate_ID"].unique().tolist()
-    if len(unique_ids) != 1 or unique_ids[0] != plate_name_from_file:
+    # An empty file has no Plate_ID values, which counts as a mismatch
+    plate_ids = df["Plate_ID"]
+    if plate_ids.empty or (plate_ids != plate_name_from_file).any():
+        unique_ids = plate_ids.unique().tolist()
         print(
             f"FATAL ERROR: Plate_ID mismatch in {kinetics_path}: "
             f"filename says '{plate_name_from_file}' but Plate_ID column contains {unique_ids}"
@@ -254,16 +313,42 @@ def sort_by_crossing_point(df):
     return df.sort_values("Crossing_Point", ascending=True, na_position="last").reset_index(drop=True)
 
 
-def load_and_process_plates(kinetics_files, plates_df):
+def process_kinetics_file(kinetics_path):
+    """
+    Read one kinetics file (output columns only), then filter and sort it.
+
+    Runs in the reader threads of load_and_process_plates.
+
+    Args:
+        kinetics_path (Path): Path to a *_amplification_kinetics_summary.csv file.
+
+    Returns:
+        pd.DataFrame: The plate's passing wells, lowest Crossing_Point first.
+
+    Raises:
+        SystemExit: As read_kinetics_file.
+    """
+    df = read_kinetics_file(kinetics_path, columns=KINETICS_INPUT_COLUMNS)
+    return sort_by_crossing_point(filter_wells(df))
+
+
+@profile_step()
+def load_and_process_plates(kinetics_files, plates_df, workers=READ_WORKERS):
     """
     Load all kinetics files, filter and sort each one, then concatenate them
     in barcode order.
 
+    Files are read, filtered and sorted in a thread pool (only the columns
+    needed for OUTPUT_COLUMNS are read); the results are concatenated in
+    barcode order whatever order the threads finish in.
+
     Args:
         kinetics_files (list[Path]): List of kinetics file paths (from
             scan_kinetics_files).
         plates_df (pd.DataFrame): The individual_plates DataFrame from the
             database (from read_individual_plates_from_database).
+        workers (int): Number of reader threads; 1 reads the files one at a
+            time in the calling thread.
 
     Returns:
         pd.DataFrame: Concatenated DataFrame of all filtered+sorted plates,
@@ -306,15 +391,16 @@ def load_and_process_plates(kinetics_files, plates_df):
 
         sorted_plate_names = sorted(file_lookup.keys(), key=_barcode_sort_key)
 
-        # Step 5: Process each plate in barcode order
-        processed_dfs = []
-        for plate_name in sorted_plate_names:
-            kinetics_path = file_lookup[plate_name]
-            df = read_kinetics_file(kinetics_path)
-            filtered_df = filter_wells(df)
-            sorted_df = sort_by_crossing_point(filtered_df)
-            print(f"  Processing: {plate_name} ({len(sorted_df)} wells after filtering)")
-            processed_dfs.append(sorted_df)
+        # Step 5: Read, filter and sort each plate; results stay in barcode order
+        sorted_paths = [file_lookup[plate_name] for plate_name in sorted_plate_names]
+        if workers > 1 and len(sorted_paths) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                processed_dfs = list(executor.map(process_kinetics_file, sorted_paths))
+        else:
+            processed_dfs = [process_kinetics_file(path) for path in sorted_paths]
+
+        for plate_name, sorted_df in zip(sorted_plate_names, processed_dfs):
+            detail(f"  Processing: {plate_name} ({len(sorted_df)} wells after filtering)")
 
         # Step 6: Concatenate all DataFrames
         result = pd.concat(processed_dfs, ignore_index=True)
@@ -384,6 +470,7 @@ def remap_type_values(df):
     return result
 
 
+@profile_step()
 def assign_dest_plate(df):
     """
     Assign sequential Dest_plate integer values to all rows in 83-row bins.
@@ -431,6 +518,7 @@ def select_and_reorder_columns(df):
 # Phase 4 Functions
 # ---------------------------------------------------------------------------
 
+@profile_step()
 def write_output_csv(df, output_dir):
     """
     Create the output directory if needed and write the final DataFrame to
@@ -485,6 +573,7 @@ def create_success_marker():
     print(f"✅ Success marker created: .workflow_status/SPS_process_WGA_results.success")
 
 
+@instrument_stage
 def main():
     """
     Orchestrate the full SPS Process WGA Results pipeline.
@@ -498,6 +587,9 @@ def main():
     layout_dir = Path("2_sort_plates_and_amplify_genomes/A_sort_plate_layouts")
     output_dir = Path("2_sort_plates_and_amplify_genomes/C_WGA_summary_and_SPITS")
 
+    # reuse parsed kinetics files of an earlier run (.sps_cache)
+    enable_cache(Path.cwd())
+
     # Read database
     plates_df = read_individual_plates_from_database(db_path)
 
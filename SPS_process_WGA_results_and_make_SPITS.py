@@ -8,10 +8,15 @@ import numpy as np
 import sys
 import random
 import string
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, text
 from pathlib import Path
 from datetime import datetime
 
+from sps_database import write_project_summary
+from sps_instrumentation import instrument_stage, profile_step
+from sps_plate_geometry import QUADRANT_WELLS_384, WELL_INDEX_96, WELLS_96
+from sps_snapshot import refresh_project_summary_snapshot
+
 # Constants
 MAX_SAMPLES_PER_PLATE = 83  # Each Illumina index set has at least 83 validated indexes; set to 83 for consistency
 NUM_ILLUMINA_INDEX_SETS = 4  # Number of available Illumina index sets (PE17-PE20)
@@ -25,6 +30,7 @@ PE20_EXCLUDE = ['A1','H1','A12','H12','D2','B3','E7','C9','E10','A11','D11','E11
 
 ##########################
 ##########################
+@profile_step()
 def importSCdata(input_file):
     df = pd.read_csv(input_file,header=0, usecols=['Plate_id','Well','Type','Dest_plate','Row','Col'], dtype={'Col':'int','Dest_plate':'int'})
     
@@ -64,6 +70,7 @@ def countLibsPerPlate(df):
 
 ##########################
 ##########################
+@profile_step()
 def assignLibPlateID(df):
     
     # generate unique 6 digit ID destination/lib creation plate, first digit is a letter
@@ -85,25 +92,21 @@ def assignLibPlateID(df):
 
 ##########################
 ##########################
+@profile_step()
 def assignPlatePositions(df):
     
-    ######## add new column with numbers to be used for determining position
-    df['number'] = df.index + 1 
-
-    # find the lowest df index number for each destination plate
-    df3 = df.groupby(['Dest_plate'])['number'].min().reset_index()
-
-    # make dict where destination plate is the key and lowest index number is the value
-    dest_dict = dict(zip(df3['Dest_plate'], df3['number']))
-
-    # add column with the lowest index value for the dest plate indicated in each row
-    df['base'] = df['Dest_plate'].map(dest_dict)
+    # integer code for each destination plate, and the lowest df index number
+    # of each plate (rows of a plate are consecutive after importSCdata's sort)
+    plate_codes, plates = pd.factorize(df['Dest_plate'])
+    number = df.index.to_numpy() + 1
+    base = np.full(len(plates), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(base, plate_codes, number)
 
     # substract the base (i.e. lowest index number from each dest plate) from the rows index +1
     # this gives a new column where the first row with the same dest plate will start with 1
     # and the next row is 2, and so on.  The first row of each dest plate starts at 1 and increments
     # up for each row in the dest plate
-    df['Plate_position_number'] = df.number - df.base + 1
+    df['Plate_position_number'] = number - base[plate_codes] + 1
     
     # confirm position number is >=1 and <=MAX_SAMPLES_PER_PLATE
     if (df['Plate_position_number'] < 1).any() | (df['Plate_position_number'] > MAX_SAMPLES_PER_PLATE).any():
@@ -115,7 +118,7 @@ def assignPlatePositions(df):
 
 
     # remove unnecessary columns
-    df.drop(['Row','Col','number','base'], axis=1, inplace = True)
+    df.drop(['Row','Col'], axis=1, inplace = True)
 
     return df
 ##########################
@@ -123,37 +126,6 @@ def assignPlatePositions(df):
 
 
 
-##########################
-##########################
-def makeConversionKey():
-
-    # define list of destination well positions for a 96-well and 384-well plates
-    well_list_96w = ['A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'G1', 'H1', 'A2', 'B2', 'C2', 'D2', 'E2', 'F2', 'G2', 'H2', 'A3', 'B3', 'C3',
-                      'D3', 'E3', 'F3', 'G3', 'H3', 'A4', 'B4', 'C4', 'D4', 'E4', 'F4', 'G4', 'H4', 'A5', 'B5', 'C5', 'D5', 'E5', 'F5', 'G5',
-                      'H5', 'A6', 'B6', 'C6', 'D6', 'E6', 'F6', 'G6', 'H6', 'A7', 'B7', 'C7', 'D7', 'E7', 'F7', 'G7', 'H7', 'A8', 'B8', 'C8',
-                      'D8', 'E8', 'F8', 'G8', 'H8', 'A9', 'B9', 'C9', 'D9', 'E9', 'F9', 'G9', 'H9', 'A10', 'B10', 'C10', 'D10', 'E10', 'F10', 'G10',
-                      'H10', 'A11', 'B11', 'C11', 'D11', 'E11', 'F11', 'G11', 'H11', 'A12', 'B12', 'C12', 'D12', 'E12', 'F12', 'G12', 'H12']
-
-    well_list_384w = ['A1', 'C1', 'E1', 'G1', 'I1', 'K1', 'M1', 'O1', 'A3', 'C3', 'E3', 'G3', 'I3', 'K3', 'M3', 'O3', 'A5', 'C5', 'E5', 'G5',
-                       'I5', 'K5', 'M5', 'O5', 'A7', 'C7', 'E7', 'G7', 'I7', 'K7', 'M7', 'O7', 'A9', 'C9', 'E9', 'G9', 'I9', 'K9', 'M9', 'O9',
-                       'A11', 'C11', 'E11', 'G11', 'I11', 'K11', 'M11', 'O11', 'A13', 'C13', 'E13', 'G13', 'I13', 'K13', 'M13', 'O13', 'A15',
-                       'C15', 'E15', 'G15', 'I15', 'K15', 'M15', 'O15', 'A17', 'C17', 'E17', 'G17', 'I17', 'K17', 'M17', 'O17', 'A19', 'C19',
-                       'E19', 'G19', 'I19', 'K19', 'M19', 'O19', 'A21', 'C21', 'E21', 'G21', 'I21', 'K21', 'M21', 'O21', 'A23', 'C23', 'E23',
-                       'G23', 'I23', 'K23', 'M23', 'O23']
-     
-    # make dict with key = 96well position and value = equivalent 384well position
-    # assuming 96-well plates stamped into upper left corner of 384well plate (A1 = A1)
-    convert_96w_to_384w = dict(zip(well_list_96w, well_list_384w))
-
-    # make dict with key = 384well position and value = equivalent 96well position
-    # assuming 96-well plates stamped into upper left corner of 384well plate (A1 = A1)
-    convert_384w_to_96w = dict(zip(well_list_384w, well_list_96w))
-    
-    return convert_96w_to_384w, convert_384w_to_96w, well_list_96w
-##########################
-##########################
-
-
 ##########################
 ##########################
 def makeIlluminaIndexSetToUse(well_list_96w):
@@ -187,48 +159,70 @@ def makeIlluminaIndexSetToUse(well_list_96w):
 
 ##########################
 ##########################
-def assignIlluminaIndex(df,ill_set_list ,illum_dict, convert_96w_to_384w):
+def makeIndexWellTable(ill_set_list, illum_dict):
     
-    # get list of uniqued destination plate IDs
-    dest_list = sorted(df['Dest_plate'].unique().tolist())
+    # 2D array where row i is index set ill_set_list[i] and column p-1 is the
+    # 96-well position (index into WELLS_96) of plate position number p in that
+    # set, e.g. PE17_1 : B1 -> table[0, 0] = 1.  Unused cells are -1
+    set_lengths = [0] * len(ill_set_list)
+    for key in illum_dict:
+        ill_set, _, number = key.rpartition('_')
+        if ill_set in ill_set_list and number.isdigit():
+            set_code = ill_set_list.index(ill_set)
+            set_lengths[set_code] = max(set_lengths[set_code], int(number))
+    table = np.full((len(ill_set_list), max(set_lengths, default=0)), -1, dtype=np.int64)
 
+    for set_code, ill_set in enumerate(ill_set_list):
+        wells = [illum_dict.get(f'{ill_set}_{i + 1}') for i in range(set_lengths[set_code])]
+        table[set_code, :len(wells)] = WELL_INDEX_96.get_indexer(wells)
 
-    # select random starting index set (0 to NUM_ILLUMINA_INDEX_SETS-1)
-    rand_index_set_start = random.randint(0, NUM_ILLUMINA_INDEX_SETS - 1)
+    return table
+##########################
+##########################
 
-    # create empty dict
-    dest_id_dict = {}
+##########################
+##########################
+@profile_step()
+def assignIlluminaIndex(df,ill_set_list ,illum_dict):
+    
+    # integer code for each destination plate, in sorted order of the plate IDs
+    dest_codes, dest_list = pd.factorize(df['Dest_plate'], sort=True)
 
-    ## createdest_id_dict were keys are destination plate IDs and values are illumin index set#
-    # the modulo is used because the number of destination plates might exceed the number
-    # of index sets, so the module wraps around ill_set list
-    for cnt, dp in enumerate(dest_list):
-        id_set = str(ill_set_list[(cnt+rand_index_set_start) % len(ill_set_list)])
-        dest_id_dict[dp] = id_set
 
+    # select random starting index set (0 to NUM_ILLUMINA_INDEX_SETS-1)
+    rand_index_set_start = random.randint(0, NUM_ILLUMINA_INDEX_SETS - 1)
 
-    # add new column with nextera index set for each library plate
-    df['Illumina_set'] = df['Dest_plate'].replace(dest_id_dict) + "_" + df['Plate_position_number'].astype(str)
+    ## index set code of each destination plate; the modulo is used because the number of
+    # destination plates might exceed the number of index sets, so the module wraps around ill_set list
+    set_codes = (dest_codes + rand_index_set_start) % len(ill_set_list)
 
-    # add new column with well position of nextera index set in 96 well format
-    df['Dest_well_96'] = df['Illumina_set'].replace(illum_dict)
 
-    # add new column with well postion of nextera index set in 384 well format
-    df['Dest_well_384'] = df['Dest_well_96'].replace(convert_96w_to_384w)
+    # add new column with nextera index set and position number for each library (e.g. PE17_12)
+    positions = df['Plate_position_number'].to_numpy()
+    df['Illumina_set'] = (np.asarray(ill_set_list, dtype=object)[set_codes] + "_"
+                          + df['Plate_position_number'].astype(str))
+
+    # look up the 96 well index of each (index set, position number); positions
+    # outside the index set get -1
+    table = makeIndexWellTable(ill_set_list, illum_dict)
+    valid = (positions >= 1) & (positions <= table.shape[1])
+    well_index = np.full(len(df), -1, dtype=np.int64)
+    well_index[valid] = table[set_codes[valid], positions[valid] - 1]
     
     
-    # confirm that destination wells do no match Illumina set or
-    # contain null values. The former would happen if Illumins set
-    # was not in illum_dict
-    s = df['Dest_well_96'].isin(df['Illumina_set'])
-
-    if s.any() | df['Dest_well_384'].isnull().any():
+    # confirm that every library got a well of its Illumina set. A library
+    # would not get one if its Illumina set was not in illum_dict
+    if (well_index < 0).any():
 
         print('\n\nERROR: Problem assigning destination wells.')
         print('Check Illumina index set assignments and well mappings.')
         print('Aborting script.\n')
 
         sys.exit()
+
+    # add new columns with well position of nextera index set in 96 and 384 well format
+    df['Dest_well_96'] = np.asarray(WELLS_96, dtype=object)[well_index]
+    df['Dest_well_384'] = QUADRANT_WELLS_384[1][well_index]
     
     return df
 ##########################
@@ -239,6 +233,7 @@ def assignIlluminaIndex(df,ill_set_list ,illum_dict, convert_96w_to_384w):
 
 ##########################
 ##########################
+@profile_step()
 def lookupEchoIdFromDatabase(df, db_path):
     """
     Look up Echo liquid handler plate barcodes from project_summary.db.
@@ -254,11 +249,15 @@ def lookupEchoIdFromDatabase(df, db_path):
     Returns:
         pd.DataFrame: DataFrame with echo_id column added
     """
-    # Read individual_plates table from database
+    # Read barcodes of the plates in the input file from the individual_plates
+    # table (indexed lookup on plate_name)
+    plate_names = df['Plate_id'].dropna().unique().tolist()
+    query = text('SELECT plate_name, barcode FROM individual_plates WHERE plate_name IN :plate_names'
+                 ).bindparams(bindparam('plate_names', expanding=True))
     try:
         engine = create_engine(f'sqlite:///{db_path}')
         with engine.connect() as conn:
-            plates_df = pd.read_sql('SELECT plate_name, barcode FROM individual_plates', conn)
+            plates_df = pd.read_sql(query, conn, params={'plate_names': plate_names})
         engine.dispose()
     except Exception as e:
         print(f'\n\nERROR: Could not read database {db_path}: {e}')
@@ -362,6 +361,7 @@ def addSPITScolumns(df):
 
 ##########################
 ##########################
+@profile_step()
 def makeSPITSformat(df):
     
     # Updated SPITS format: remove Pool column, add empty columns as requested
@@ -462,6 +462,7 @@ def prepareDatabaseDataframe(df):
 
 ##########################
 ##########################
+@profile_step()
 def createProjectSummaryCSV(final_df):
     """
     Create CSV file with processed SPITS data
@@ -477,6 +478,7 @@ def createProjectSummaryCSV(final_df):
 
 ##########################
 ##########################
+@profile_step()
 def createSQLdb(final_df):
     """
     Create SQLite database with processed SPITS data
@@ -488,17 +490,11 @@ def createSQLdb(final_df):
     # Use current working directory for database (following SPS script pattern)
     sql_db_path = Path.cwd() / 'project_summary.db'
     
-    # Create SQLAlchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}')
-    
-    # Specify table name
-    table_name = 'project_summary'
-    
-    # Export DataFrame to SQLite database
-    final_df.to_sql(table_name, engine, if_exists='replace', index=False)
-    
-    # Close engine connection
-    engine.dispose()
+    # Create project_summary table with the declared schema
+    write_project_summary(final_df, sql_db_path)
+
+    # columnar snapshot read by the next stages (only written when pyarrow is installed)
+    refresh_project_summary_snapshot(sql_db_path)
     
     return final_df
 ##########################
@@ -509,6 +505,7 @@ def createSQLdb(final_df):
 ##### MAIN PROGRAM
 ##########################
 
+@instrument_stage
 def main():
     """
     Main function to process single cell data and generate SPITS output with database functionality
@@ -541,8 +538,9 @@ def main():
     # the number will be used later to assign a nextera index to each well
     df = assignPlatePositions(df)
 
-    # generate dicts that convert 96w to 384w format, and vice versa
-    convert_96w_to_384w, convert_384w_to_96w, well_list_96w = makeConversionKey()
+    # 96-well positions in column order (A1, B1, ... H12); the 96w <-> 384w
+    # conversion tables are precomputed in sps_plate_geometry
+    well_list_96w = list(WELLS_96)
 
     # create illum_dict were key is set name plus position number in list (e.g. PE17_1, PE17_2, PE17_3 ...)
     # and value is the barcode well as that list position number (e.g. PE17_1 : B1, PE17_2 : C1, PE17_3 : D1 ...)
@@ -550,7 +548,7 @@ def main():
 
     # assign well positions in dest/lib plate and
     # assign Illumina indexes to be used with each samples
-    df = assignIlluminaIndex(df,ill_set_list,illum_dict, convert_96w_to_384w)
+    df = assignIlluminaIndex(df,ill_set_list,illum_dict)
 
     # look up echo IDs from project_summary.db
     df = lookupEchoIdFromDatabase(df, db_path)
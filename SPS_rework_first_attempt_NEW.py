@@ -6,14 +6,23 @@
 # Script automatically looks for updated_fa_analysis_summary.txt in the B_first_attempt_fa_result directory
 
 
+import argparse
 import sys
-import string
 from datetime import datetime
 from pathlib import Path
-from sqlalchemy import create_engine
 import pandas as pd
 import numpy as np
 
+from sps_archive import archive_files, archive_run_name
+from sps_bartender import SECTION_SEPARATOR, interleave_labels, label_lines, write_label_file
+from sps_database import checkpoint_database, record_library_attempts, upsert_project_summary
+from sps_instrumentation import instrument_stage, profile_step
+from sps_parameters import add_parameter_arguments, configure_parameters, get_parameter
+from sps_plate_files import fa_upload_table, write_plate_files
+from sps_plate_geometry import row_letters_to_numbers
+from sps_snapshot import (archive_project_summary_csv, load_project_summary,
+                          refresh_project_summary_snapshot)
+
 
 def create_success_marker():
     """Create success marker file for workflow manager integration."""
@@ -32,14 +41,6 @@ def create_success_marker():
         sys.exit()
 
 
-# define list of destination well positions for a 96-well
-well_list_96w = ['A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'G1', 'H1', 'A2', 'B2', 'C2', 'D2', 'E2', 'F2', 'G2', 'H2', 'A3', 'B3', 'C3',
-                 'D3', 'E3', 'F3', 'G3', 'H3', 'A4', 'B4', 'C4', 'D4', 'E4', 'F4', 'G4', 'H4', 'A5', 'B5', 'C5', 'D5', 'E5', 'F5', 'G5',
-                 'H5', 'A6', 'B6', 'C6', 'D6', 'E6', 'F6', 'G6', 'H6', 'A7', 'B7', 'C7', 'D7', 'E7', 'F7', 'G7', 'H7', 'A8', 'B8', 'C8',
-                 'D8', 'E8', 'F8', 'G8', 'H8', 'A9', 'B9', 'C9', 'D9', 'E9', 'F9', 'G9', 'H9', 'A10', 'B10', 'C10', 'D10', 'E10', 'F10', 'G10',
-                 'H10', 'A11', 'B11', 'C11', 'D11', 'E11', 'F11', 'G11', 'H11', 'A12', 'B12', 'C12', 'D12', 'E12', 'F12', 'G12', 'H12']
-
-
 PROJECT_DIR = Path.cwd()
 
 MAKE_DIR = PROJECT_DIR / "1_make_library_analyze_fa"
@@ -76,6 +77,7 @@ SECOND_FA_DIR.mkdir(parents=True, exist_ok=True)
 
 ##########################
 ##########################
+@profile_step()
 def readSQLdb():
     """
     Read the project summary database and return as pandas DataFrame.
@@ -90,16 +92,8 @@ def readSQLdb():
     # path to sqlite db lib_info.db
     sql_db_path = PROJECT_DIR /'project_summary.db'
 
-    # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
-
-    # define sql query
-    query = "SELECT * FROM project_summary"
-    
-    # import sql db into pandas df
-    sql_df = pd.read_sql(query, engine)
-    
-    engine.dispose()
+    # import sql db into pandas df, from the parquet snapshot when it is current
+    sql_df = load_project_summary(sql_db_path)
 
     return sql_df
 ##########################
@@ -110,14 +104,16 @@ def readSQLdb():
 
 ##########################
 ##########################
-def updateLibInfo():
+@profile_step()
+def updateLibInfo(sql_df=None):
     # create df from fa_analysis_summary.txt file
     reduced_df = pd.read_csv(FIRST_DIR / "updated_fa_analysis_summary.txt", sep='\t', header=0)
 
     reduced_df['Redo_whole_plate'] = reduced_df['Redo_whole_plate'].fillna('')
 
-    # read projet_summary.db sql db
-    sql_df = readSQLdb()
+    # read projet_summary.db sql db, unless the workflow runner passed it in
+    if sql_df is None:
+        sql_df = readSQLdb()
 
     sql_df = sql_df.merge(reduced_df, how='outer', left_on=[
                           'sample_id','Destination_Plate_Barcode'], right_on=['sample_id','Destination_Plate_Barcode'], suffixes=('', '_y'))
@@ -133,23 +129,28 @@ def updateLibInfo():
 
 #########################
 #########################
+@profile_step()
 def createSQLdb(project_df, date):
     
-    Path(PROJECT_DIR /
-         "project_summary.db").rename(ARCHIV_DIR / f"archive_project_summary_{date}.db")
-    Path(ARCHIV_DIR / f"archive_project_summary_{date}.db").touch()
-
     sql_db_path = PROJECT_DIR /'project_summary.db'
 
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    # archive a copy of the older version of sql project_summary.db in the
+    # deduplicated archive store
+    checkpoint_database(sql_db_path)
+    archive_files(ARCHIV_DIR, [(sql_db_path, f"archive_project_summary_{date}.db")],
+                  archive_run_name(Path(__file__).stem, date))
 
-    # Specify the table name and database engine
-    table_name = 'project_summary'
-    
-    # Export the DataFrame to the SQLite database
-    project_df.to_sql(table_name, engine, if_exists='replace', index=False) 
+    # update project_summary in place to match project_summary.csv, writing only what changed,
+    # and add the rework attempts (plus first attempt FA results) to library_attempts
+    try:
+        upsert_project_summary(project_df, sql_db_path, complete=True)
+        record_library_attempts(project_df, sql_db_path)
+    except ValueError as e:
+        print(f'\n\nProblem updating project_summary.db: {e}. Aborting script\n\n')
+        sys.exit()
 
-    engine.dispose()
+    # columnar snapshot read by the next stages (only written when pyarrow is installed)
+    refresh_project_summary_snapshot(sql_db_path)
 
     return
 #########################
@@ -160,6 +161,7 @@ def createSQLdb(project_df, date):
 ##########################
 ##########################
 # update project database with samples the went into Library creation
+@profile_step()
 def updateProjectDatabase(lib_df, wp_redo_df):
 
     # get current date and time, will add to archive database file name
@@ -173,13 +175,14 @@ def updateProjectDatabase(lib_df, wp_redo_df):
     # call function to archive old project_summary.db and generate new one
     createSQLdb(project_df, date)
 
-    # archive .csv veresion of project_summary
-    Path(PROJECT_DIR /
-         "project_summary.csv").rename(ARCHIV_DIR / f"archive_project_summary_{date}.csv")
-    Path(ARCHIV_DIR / f"archive_project_summary_{date}.csv").touch()
+    # archive .csv veresion of project_summary (stored as compressed parquet when available)
+    archive_project_summary_csv(PROJECT_DIR / "project_summary.csv", ARCHIV_DIR, date,
+                                run=archive_run_name(Path(__file__).stem, date))
 
     # create updated project database file
     project_df.to_csv(PROJECT_DIR / 'project_summary.csv', index=False)
+
+    return project_df
     
 ##########################
 ##########################
@@ -187,9 +190,22 @@ def updateProjectDatabase(lib_df, wp_redo_df):
 
 ##########################
 ##########################
+class NoReworkNeeded(Exception):
+    """No library plate is flagged for a whole plate redo."""
+
+
 def noRework(lib_df, wp_redo_df):
     """
     Handle case where no rework is needed.
+    Raises NoReworkNeeded instead of exiting, so callers running the stages
+    in process (SPS_run_workflow.py) can skip to conclude; main() tells the
+    user to skip the rework step in the workflow manager.
+    """
+    raise NoReworkNeeded("No plates need to be reworked.")
+
+
+def printNoReworkSteps():
+    """
     Inform user to use workflow manager to skip rework step.
     """
     print("\n" + "="*60)
@@ -203,11 +219,6 @@ def noRework(lib_df, wp_redo_df):
     print("3. Select 'No Rework Needed' option")
     print("4. Proceed directly to conclude FA analysis")
     print("="*60)
-    
-    # # Create success marker for workflow manager integration
-    # create_success_marker()
-    
-    sys.exit()
 
 ##########################
 ##########################
@@ -216,6 +227,7 @@ def noRework(lib_df, wp_redo_df):
 
 ##########################
 ##########################
+@profile_step()
 def getReworkFiles(lib_df):
     """
     Identify plates that need rework and prepare rework DataFrame.
@@ -228,7 +240,7 @@ def getReworkFiles(lib_df):
                      with additional columns for rework plate IDs and parameters
                      
     Side Effects:
-        - Calls noRework() and exits if no plates need rework
+        - Calls noRework(), which raises NoReworkNeeded, if no plates need rework
         - Prompts user for dilution factor input
     """
     # get list of library plates that need whole palte redo
@@ -237,7 +249,7 @@ def getReworkFiles(lib_df):
     wp_redo_df = lib_df[lib_df['Destination_Plate_Barcode'].isin(
         whole_plate_redo)].copy()
     
-    # terminate script if no rework necessary
+    # stop if no rework necessary
     if wp_redo_df.shape[0] == 0:
         noRework(lib_df,wp_redo_df)
 
@@ -272,8 +284,15 @@ def getReworkFiles(lib_df):
     wp_redo_df['Redo_Illumina_index'] = wp_redo_df['Illumina_index']
     
     # ask user the fold dilution used to set up FA plate
-    dilution_factor = float(input(
-        "\n\n What is the desired fold-dilution for libraries loaded into the FA plate? (default 5): ") or 5)
+    # (--param dilution_factor=N / SPS_DILUTION_FACTOR / sps_parameters.json, else prompt)
+    try:
+        dilution_factor = get_parameter(
+            'dilution_factor',
+            "\n\n What is the desired fold-dilution for libraries loaded into the FA plate? (default 5): ",
+            default=5, convert=float)
+    except ValueError as e:
+        print(f"\n\nFATAL ERROR: {e}\nAborting\n\n")
+        sys.exit()
     
     wp_redo_df['Redo_dilution_factor'] = dilution_factor
     
@@ -285,7 +304,7 @@ def getReworkFiles(lib_df):
 
 ##########################
 ##########################
-def makeEchoFiles(wp_redo_df):
+def makeEchoDataframe(wp_redo_df):
 
     echo_df = wp_redo_df.copy()
     
@@ -306,8 +325,7 @@ def makeEchoFiles(wp_redo_df):
     echo_df['Source Column'] = echo_df['source_well'].astype(
         str).str[1:]
 
-    echo_df['Source Row'] = echo_df['Source Row'].apply(
-        lambda x: 1 + string.ascii_uppercase.index(x))
+    echo_df['Source Row'] = row_letters_to_numbers(echo_df['Source Row'])
 
 
     echo_df['Destination Row'] = echo_df['Redo_Destination_Well'].astype(
@@ -315,8 +333,7 @@ def makeEchoFiles(wp_redo_df):
     echo_df['Destination Column'] = echo_df['Redo_Destination_Well'].astype(
         str).str[1:]
 
-    echo_df['Destination Row'] = echo_df['Destination Row'].apply(
-        lambda x: 1 + string.ascii_uppercase.index(x))
+    echo_df['Destination Row'] = row_letters_to_numbers(echo_df['Destination Row'])
 
     echo_df['Transfer Volume'] = 500
 
@@ -338,17 +355,18 @@ def makeEchoFiles(wp_redo_df):
 
     dest_list = echo_df['Destination_Plate_Barcode'].unique().tolist()
 
-    # create echo transfer files
-    for d in dest_list:
-        tmp_df = echo_df.loc[echo_df['Destination_Plate_Barcode'] == d].copy()
+    return echo_df, dest_list
+##########################
+##########################
 
-        # create echo transfer file
-        tmp_df.to_csv(ECHO_DIR /
-                      f'REDO_echo_transfer_{d}.csv', index=False)
-        
 
 
-    return echo_df, dest_list
+##########################
+##########################
+def echoFile(d, tmp_df):
+
+    # echo transfer file of one redo plate
+    return tmp_df, f'REDO_echo_transfer_{d}.csv', {'index': False}
 ##########################
 ##########################
 
@@ -405,34 +423,13 @@ def createFAdataframe(wp_redo_df):
 
 #########################
 #########################
-def makeFAfiles(FA_df, dest_list, well_list_96w):
-
-    for d in dest_list:
-        # make df with single column of data.  Column contains all wells in 96-well plate
-        tmp_fa_df = pd.DataFrame(well_list_96w)
+def FAfile(d, tmp_fa_df):
 
-        tmp_fa_df.columns = ["Well"]
+    # all 96 wells sorted by well name (A1, A10, A11, ...), index begins at 1 instead of 0.  Index column will be added to FA input file.
+    # empty wells are named 'empty_well' and H12 is the ladder
+    tmp_fa_df = fa_upload_table(tmp_fa_df['Redo_FA_Well'], tmp_fa_df['name'], sort_wells=True)
 
-        tmp_fa_df = tmp_fa_df.merge(FA_df.loc[FA_df['Redo_Destination_Plate_Barcode'] == d], how='outer', left_on=['Well'],
-                                    right_on=['Redo_FA_Well'])
-
-        # updated index so begins at 1 instead of 0.  Index column will be added to FA input file
-        tmp_fa_df.index = range(1, tmp_fa_df.shape[0]+1)
-
-        tmp_fa_df.drop(['Redo_Destination_Plate_Barcode', 'Redo_FA_Well'],
-                       inplace=True, axis=1)
-
-        tmp_fa_df['name'] = tmp_fa_df['name'].fillna('empty_well')
-
-        tmp_fa_df.loc[tmp_fa_df.Well == 'H12', 'name'] = "ladder_1"
-
-        # tmp_fa_df.loc[tmp_fa_df.Well == 'A1', 'name'] = "LibStd_A1"
-
-        # tmp_fa_df.loc[tmp_fa_df.Well == 'A12', 'name'] = "LibStd_A12"
-
-        # tmp_fa_df.loc[tmp_fa_df.Well == 'H1', 'name'] = "LibStd_H1"
-
-        tmp_fa_df.to_csv(FA_DIR / f'FA_upload_{d}.csv', index=True, header=False)
+    return tmp_fa_df, f'FA_upload_{d}.csv', {'index': True, 'header': False}
 
 #########################
 #########################
@@ -440,22 +437,16 @@ def makeFAfiles(FA_df, dest_list, well_list_96w):
 
 #########################
 #########################
-def makeIlluminaFiles(illum_df, dest_list):
-    # create illumin index transfer files
-    for d in dest_list:
-        
-        tmp_name = d.replace(".","-")
-        
-        
-        tmp_illum_df = illum_df.loc[illum_df['Lib_plate_ID'] == d].copy()
+def illuminaFile(d, tmp_illum_df):
+
+    tmp_name = d.replace(".","-")
 
-        # add "h" prefix to lib plate ID because barcode label on plate side read by
-        # hamilton scanner has "h" prefix
-        tmp_illum_df['Lib_plate_ID'] = "h" + \
-            tmp_illum_df['Lib_plate_ID'].astype(str)
+    # add "h" prefix to lib plate ID because barcode label on plate side read by
+    # hamilton scanner has "h" prefix
+    tmp_illum_df = tmp_illum_df.assign(Lib_plate_ID="h" + tmp_illum_df['Lib_plate_ID'].astype(str))
 
-        # create illumina index transfer file
-        tmp_illum_df.to_csv(INDEX_DIR / f'Illumina_index_transfer_{tmp_name}.csv', index=False)
+    # illumina index transfer file
+    return tmp_illum_df, f'Illumina_index_transfer_{tmp_name}.csv', {'index': False}
         
         
 #########################
@@ -464,56 +455,22 @@ def makeIlluminaFiles(illum_df, dest_list):
 
 #########################
 #########################
+@profile_step()
 def makeBarcodeLabels(wp_redo_df, dest_list):
 
+    # reverse sort the dest_list
+    plates = pd.Series(dest_list[::-1], dtype=object)
 
-    # this was older format for bartender templates.  The newer version below changes "/" to "\"
-    # in the path to the template files  AF="*"
-    # x = '%BTW% /AF="//BARTENDER/shared/templates/ECHO_BCode8.btw" /D="%Trigger File Name%" /PRN="bcode8" /R=3 /P /DD\r\n\r\n%END%\r\n\r\n\r\n'
-
-    # add info to start of barcode print file indicating the template and printer to use
-    x = '%BTW% /AF="\\\BARTENDER\shared\\templates\ECHO_BCode8.btw" /D="%Trigger File Name%" /PRN="bcode8" /R=3 /P /DD\r\n\r\n%END%\r\n\r\n\r\n'
-
-
-    bc_file = open(SECOND_ATMPT_DIR / "BARTENDER_Redo_Library_FA_plates.txt", "w")
-
-    bc_file.writelines(x)
-
-    # reversse sort the dest_list
-    dest_list.reverse()
-    
-    
-    # for p in dest_list:
-    #     bc_file.writelines(f'{p}F,"FA.run {p}F"\r\n')  
-    
-    # bc_file.writelines(',\r\n')
-    
-    # for p in dest_list:
-    #     bc_file.writelines(f'{p}D,"FA.dilute {p}D"\r\n')
-  
-    
-    # bc_file.writelines(',\r\n')
-
-    # add barcodes of library destination plates, dna source plates
-    for p in dest_list:
-
-        bc_file.writelines(f'{p}F,"FA.run {p}F"\r\n')
-
-        bc_file.writelines(f'{p}D,"FA.dilute {p}D"\r\n')
-        
-        bc_file.writelines(f'h{p},"     h{p}"\r\n')
-        
-        bc_file.writelines(f'{p},"SPS.lib.plate {p}"\r\n')
-
-        bc_file.writelines(',\r\n')
-      
-        
-
-
-
-    bc_file.close()
-    
-   
+    # add barcodes of FA, dilution and library destination plates, one group
+    # of labels per plate followed by a blank label; the header indicates the
+    # template and printer to use
+    write_label_file(SECOND_ATMPT_DIR / "BARTENDER_Redo_Library_FA_plates.txt", [
+        interleave_labels(label_lines(plates + 'F', 'FA.run ' + plates + 'F'),
+                          label_lines(plates + 'D', 'FA.dilute ' + plates + 'D'),
+                          label_lines('h' + plates, '     h' + plates),
+                          label_lines(plates, 'SPS.lib.plate ' + plates),
+                          [SECTION_SEPARATOR] * len(plates)),
+    ])
     
     
 #########################
@@ -523,6 +480,7 @@ def makeBarcodeLabels(wp_redo_df, dest_list):
 
 #########################
 #########################
+@profile_step()
 def makeThreshold(wp_redo_df, dest_list):
 
     
@@ -604,32 +562,153 @@ def makeDilution(wp_redo_df):
 
 #########################
 #########################
-def makeDilutionFile(dilution_df, dest_list):
-    # create echo transfer files
-    for d in dest_list:
-        tmp_df = dilution_df.loc[dilution_df['Library_Plate_Barcode'] == d].copy(
-        )
-        
-        adj_plate_name = d.replace(".","-")
+def dilutionFile(d, tmp_df):
 
-        # had "h" prefix to library plate for reading barcode on Hamilton Star
-        tmp_df['Library_Plate_Barcode'] = 'h'+tmp_df['Library_Plate_Barcode']
+    adj_plate_name = d.replace(".","-")
 
-        # # create echo transfer file
-        # tmp_df.to_csv(FTRAN_DIR / f'FA_plate_transfer_{d}.csv', index=False)
-        
-        # create echo transfer file
-        tmp_df.to_csv(FTRAN_DIR / f'FA_plate_transfer_{adj_plate_name}.csv', index=False)
+    # had "h" prefix to library plate for reading barcode on Hamilton Star
+    tmp_df = tmp_df.assign(Library_Plate_Barcode='h'+tmp_df['Library_Plate_Barcode'])
+
+    # FA plate transfer file
+    return tmp_df, f'FA_plate_transfer_{adj_plate_name}.csv', {'index': False}
+#########################
+#########################
+
+
+#########################
+#########################
+@profile_step()
+def makePlateFiles(echo_df, illum_df, FA_df, dilution_df):
+
+    # split each df into redo plates once and write the echo, illumina index,
+    # FA upload and FA plate transfer files of all plates in one pass
+    try:
+        write_plate_files([
+            (echo_df, 'Destination_Plate_Barcode', ECHO_DIR, echoFile),
+            (illum_df, 'Lib_plate_ID', INDEX_DIR, illuminaFile),
+            (FA_df, 'Redo_Destination_Plate_Barcode', FA_DIR, FAfile),
+            (dilution_df, 'Library_Plate_Barcode', FTRAN_DIR, dilutionFile),
+        ])
+    except ValueError as e:
+        print(f'\n\nFATAL ERROR: {e}\nAborting\n\n')
+        sys.exit()
 
     return
 #########################
 #########################
 
 
+##########################
+##########################
+def parse_command_line_arguments():
+    """
+    Parse command line arguments.
+    
+    Returns:
+        argparse.Namespace with the prompt parameter options
+    """
+    parser = argparse.ArgumentParser(
+        description='Generate rework files for libraries that failed the first FA analysis.')
+
+    add_parameter_arguments(parser)
+
+    args = parser.parse_args()
+
+    try:
+        configure_parameters(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    return args
+##########################
+##########################
+
+
+
+##########################
+##########################
+@profile_step()
+def reworkLibraries(sql_df=None):
+    """
+    Generate all rework files and update the project database.
+    
+    Args:
+        sql_df (pd.DataFrame): project_summary data already in memory (e.g. from
+            the workflow runner); read from project_summary.db when None
+            
+    Returns:
+        pd.DataFrame: project_summary data as written to project_summary.db
+        
+    Exits:
+    - If no input file found: sys.exit()
+
+    Raises:
+        NoReworkNeeded: If no plates need rework (raised by noRework())
+    """
+    # path to updated_fa_analysis_summary.txt file from first FA analysis
+    # this file may have been manually updated from the original reduced_fa_analysis_summary.txt
+    updated_file_name = FIRST_DIR / "updated_fa_analysis_summary.txt"
+
+    # check if the required input file exists
+    if not updated_file_name.exists():
+        print(f'\n\nCould not find file {updated_file_name} \nAborting\n\n')
+        sys.exit()
+
+    print("Starting SPS library rework process...")
+    
+    # add library pass/fail results from reduced_fa_analysis file
+    # to the df created from project_summary.db
+    print("Reading library information and FA analysis results...")
+    lib_df = updateLibInfo(sql_df)
+
+    # generate df with just plates needing whole plate rework
+    print("Identifying plates that need rework...")
+    wp_redo_df = getReworkFiles(lib_df)
+
+    # make df that will be used ot create echo transfer files
+    echo_df, dest_list = makeEchoDataframe(wp_redo_df)
+
+    # create df just for making Illumin index transfer files for loading indexes after tagmentation reaction
+    illum_df = createIllumDataframe(wp_redo_df)
+
+    # make FA_df for generating FA files
+    FA_df = createFAdataframe(wp_redo_df)
+
+    # create df with info necessary for makign the FA plates
+    dilution_df = makeDilution(wp_redo_df)
+
+    # make echo transfer, Illumina index transfer, FA upload and
+    # hamilton FA plate transfer files
+    print("Creating Echo, Illumina index, FA upload and dilution transfer files...")
+    makePlateFiles(echo_df, illum_df, FA_df, dilution_df)
+
+    # make .txt for printing barcodes of echo, library, FA, and dilution plates
+    print("Creating barcode label files...")
+    makeBarcodeLabels(wp_redo_df, dest_list)
+
+    # make threshold.txt file for FA output analysis in next step of SIP wetlab process
+    print("Creating threshold files...")
+    makeThreshold(wp_redo_df,dest_list)
+
+    # updated the project_summary.csv file with info about plates needing rework
+    print("Updating project database...")
+    project_df = updateProjectDatabase(lib_df, wp_redo_df)
+    
+    print(f"\n✓ Script completed successfully!")
+    print(f"✓ Processed {len(dest_list)} plates for rework")
+    # print(f"✓ Files created in: \n{SECOND_ATMPT_DIR}")
+
+    return project_df
+##########################
+##########################
+
+
+
 #########################
 # MAIN PROGRAM
 ##########################
 
+@instrument_stage
 def main():
     """
     Main function to process library rework for failed plates in the SPS workflow.
@@ -664,72 +743,19 @@ def main():
     
     Exits:
     - If no input file found: sys.exit()
-    - If no rework needed: calls noRework() which does sys.exit()
+    - If no rework needed: prints the next steps and does sys.exit()
     """
-    # path to updated_fa_analysis_summary.txt file from first FA analysis
-    # this file may have been manually updated from the original reduced_fa_analysis_summary.txt
-    updated_file_name = FIRST_DIR / "updated_fa_analysis_summary.txt"
-
-    # check if the required input file exists
-    if not updated_file_name.exists():
-        print(f'\n\nCould not find file {updated_file_name} \nAborting\n\n')
-        sys.exit()
+    parse_command_line_arguments()
 
     try:
-        print("Starting SPS library rework process...")
-        
-        # add library pass/fail results from reduced_fa_analysis file
-        # to the df created from project_summary.db
-        print("Reading library information and FA analysis results...")
-        lib_df = updateLibInfo()
-
-        # generate df with just plates needing whole plate rework
-        print("Identifying plates that need rework...")
-        wp_redo_df = getReworkFiles(lib_df)
-
-        # make df that will be used ot create echo transfer files, then creat echo transfer files
-        print("Creating Echo transfer files...")
-        echo_df, dest_list = makeEchoFiles(wp_redo_df)
-
-        # create df just for making Illumin index transfer files for loading indexes after tagmentation reaction
-        print("Creating Illumina index transfer files...")
-        illum_df = createIllumDataframe(wp_redo_df)
-
-        # make FA_df for generating FA files
-        print("Creating FA upload files...")
-        FA_df = createFAdataframe(wp_redo_df)
-
-        # make upload files for FA runs
-        makeFAfiles(FA_df, dest_list, well_list_96w)
-
-        # make transfer files for adding Illumina indexes
-        makeIlluminaFiles(illum_df, dest_list)
-
-        # make .txt for printing barcodes of echo, library, FA, and dilution plates
-        print("Creating barcode label files...")
-        makeBarcodeLabels(wp_redo_df, dest_list)
-
-        # make threshold.txt file for FA output analysis in next step of SIP wetlab process
-        print("Creating threshold files...")
-        makeThreshold(wp_redo_df,dest_list)
-
-        # create df with info necessary for makign the FA plates
-        print("Creating dilution transfer files...")
-        dilution_df = makeDilution(wp_redo_df)
-
-        # make hamilton transfer files for setting up FA plate
-        makeDilutionFile(dilution_df, dest_list)
-
-        # updated the project_summary.csv file with info about plates needing rework
-        print("Updating project database...")
-        updateProjectDatabase(lib_df, wp_redo_df)
-        
-        print(f"\n✓ Script completed successfully!")
-        print(f"✓ Processed {len(dest_list)} plates for rework")
-        # print(f"✓ Files created in: \n{SECOND_ATMPT_DIR}")
+        reworkLibraries()
         
         # Create success marker for workflow manager integration
         create_success_marker()
+
+    except NoReworkNeeded:
+        printNoReworkSteps()
+        sys.exit()
         
     except FileNotFoundError as e:
         print(f"\n✗ File not found error: {e}")
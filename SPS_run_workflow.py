@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+"""
+SPS Run Workflow
+
+Runs several FA analysis stages of one project in a single process:
+
+    first_fa -> rework -> second_fa -> conclude
+
+project_summary.db is read once at the start.  The project_summary data is
+handed from stage to stage in memory and only persisted at the stages'
+checkpoints (rework and conclude write project_summary.db/.csv exactly as
+the stand-alone scripts do).  After every stage the same
+.workflow_status/<script>.success marker as the stand-alone script is
+written, and when the run passes the rework decision point the decision
+script's marker and workflow_state.json are updated too, so the external
+workflow manager sees the same state as after running the scripts one by
+one.  The decision follows the first FA results: when no library plate is
+flagged for rework, "no" is recorded and rework and second_fa are skipped.
+
+The FA analysis stages write reduced_*fa_analysis_summary.txt for manual
+review; the next stage reads the reviewed updated_*fa_analysis_summary.txt.
+Without --accept-fa-results the run stops after an FA analysis stage so the
+results can be reviewed; with it the reduced summary is accepted unchanged.
+
+Prompt answers are read with sps_parameters (--param NAME=VALUE,
+SPS_<NAME>, sps_parameters.json).
+
+USAGE: python SPS_run_workflow.py [--stages first_fa,rework,...]
+                                  [--accept-fa-results] [--workers N]
+                                  [--param NAME=VALUE ...] [--non-interactive]
+
+CRITICAL REQUIREMENTS:
+- Run from the project directory (same directory as project_summary.db)
+"""
+
+import argparse
+import importlib
+import shutil
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from sps_cache import enable_cache
+from sps_instrumentation import instrument_stage
+from sps_parameters import add_parameter_arguments, configure_parameters
+from sps_snapshot import load_project_summary
+
+# ---------------------------------------------------------------------------
+# Module-level constants
+# ---------------------------------------------------------------------------
+
+STAGE_ORDER = ['first_fa', 'rework', 'second_fa', 'conclude']
+
+STAGE_MODULES = {
+    'first_fa': 'SPS_first_FA_output_analysis_NEW',
+    'rework': 'SPS_rework_first_attempt_NEW',
+    'second_fa': 'SPS_second_FA_output_analysis_NEW',
+    'conclude': 'SPS_conclude_FA_analysis_generate_ESP_smear_file',
+}
+
+DECISION_MODULE = 'decision_second_attempt'
+
+FA_DIR = Path("1_make_library_analyze_fa")
+
+# FA analysis stage -> (summary written by the stage, reviewed summary read next)
+FA_SUMMARY_FILES = {
+    'first_fa': (FA_DIR / "B_first_attempt_fa_result" / "reduced_fa_analysis_summary.txt",
+                 FA_DIR / "B_first_attempt_fa_result" / "updated_fa_analysis_summary.txt"),
+    'second_fa': (FA_DIR / "D_second_attempt_fa_result" / "reduced_2nd_fa_analysis_summary.txt",
+                  FA_DIR / "D_second_attempt_fa_result" / "updated_2nd_fa_analysis_summary.txt"),
+}
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def run_stage(stage, project_df, workers=1):
+    """
+    Run one stage in process.
+
+    The stage modules are imported here, not at the top of this script,
+    because they bind the project folder (Path.cwd()) when imported.
+
+    Args:
+        stage (str): Stage name (one of STAGE_ORDER).
+        project_df (pd.DataFrame): Current project_summary data.
+        workers (int): Threads used by the FA analysis stages for FA files.
+
+    Returns:
+        tuple: project_summary data after the stage, and the FA summary
+            written by an FA analysis stage (None for the other stages).
+    """
+    module = importlib.import_module(STAGE_MODULES[stage])
+
+    fa_summary_df = None
+    if stage in ('first_fa', 'second_fa'):
+        # FA analysis stages only write review files; project_summary is unchanged
+        fa_summary_df = module.analyzeFAresults(workers=workers, my_lib_df=project_df)
+    elif stage == 'rework':
+        project_df = module.reworkLibraries(project_df)
+    elif stage == 'conclude':
+        module.setUpFolders()
+        project_df = module.concludeFAanalysis(project_df)
+
+    module.create_success_marker()
+
+    return project_df, fa_summary_df
+
+
+def rework_needed(fa_summary_df):
+    """
+    Return True if the first FA results flag a library plate for rework.
+
+    Uses the rule of SPS_rework_first_attempt_NEW.getReworkFiles(), which
+    reworks whole plates only (Redo_whole_plate == True).
+    """
+    return bool((fa_summary_df['Redo_whole_plate'] == True).any())
+
+
+def record_rework_decision(rework):
+    """
+    Record the rework decision the way decision_second_attempt.py does.
+
+    Args:
+        rework (bool): True if the rework stages follow the first FA analysis.
+    """
+    decision = importlib.import_module(DECISION_MODULE)
+
+    decision.update_workflow_state("yes" if rework else "no")
+    decision.create_success_marker()
+
+
+def decide_rework(fa_summary_df, pending):
+    """
+    Record the rework decision for the first FA results and return the stages to run next.
+
+    Without plates to rework, rework and second_fa are skipped and the run
+    goes on with conclude.  With plates to rework, the run stops before a
+    conclude that would skip the rework.
+
+    Args:
+        fa_summary_df (pd.DataFrame): First FA summary (reviewed or accepted).
+        pending (list): Stages still to run.
+
+    Returns:
+        list: Stages to run next.
+    """
+    rework = rework_needed(fa_summary_df)
+    record_rework_decision(rework)
+
+    if not rework:
+        skipped = [stage for stage in pending if stage in ('rework', 'second_fa')]
+        if skipped:
+            print(f"\nNo library plate needs rework: skipping {', '.join(skipped)}")
+        return [stage for stage in pending if stage not in skipped]
+
+    if pending and 'rework' not in pending:
+        print("\nLibrary plates need rework; the rework stages must run before conclude.")
+        print("Run --stages rework,second_fa,conclude")
+        return []
+
+    return pending
+
+
+def accept_fa_results(stage):
+    """
+    Use the FA summary written by an FA analysis stage as the reviewed summary.
+    """
+    reduced_file, updated_file = FA_SUMMARY_FILES[stage]
+    shutil.copyfile(reduced_file, updated_file)
+    print(f"Accepted {reduced_file.name} unchanged as {updated_file.name}")
+
+
+def run_workflow(stages, workers=1, accept_results=False):
+    """
+    Run stages in order, passing the project_summary data along in memory.
+
+    Args:
+        stages (list): Stage names in STAGE_ORDER order.
+        workers (int): Threads used by the FA analysis stages for FA files.
+        accept_results (bool): Accept FA analysis summaries without review.
+
+    Returns:
+        list: Stages that were completed.
+    """
+    project_df = load_project_summary(Path.cwd() / 'project_summary.db')
+    reviewed_first_fa = FA_SUMMARY_FILES['first_fa'][1]
+
+    pending = list(stages)
+    completed = []
+    decided = False
+    while pending:
+        # a run resuming at rework after the review decides on the reviewed results
+        if pending[0] == 'rework' and not decided and reviewed_first_fa.exists():
+            decided = True
+            pending = decide_rework(pd.read_csv(reviewed_first_fa, sep='\t'), pending)
+            continue
+
+        stage = pending.pop(0)
+
+        print("\n" + "=" * 60)
+        print(f"Stage: {stage}")
+        print("=" * 60)
+
+        project_df, fa_summary_df = run_stage(stage, project_df, workers=workers)
+        completed.append(stage)
+
+        if not pending:
+            break
+
+        if stage in FA_SUMMARY_FILES:
+            if not accept_results:
+                print(f"\nStopping for review of {FA_SUMMARY_FILES[stage][0]}.")
+                print(f"Save the reviewed file as {FA_SUMMARY_FILES[stage][1].name}, then run "
+                      f"--stages {','.join(pending)}")
+                break
+            accept_fa_results(stage)
+
+        if stage == 'first_fa':
+            decided = True
+            pending = decide_rework(fa_summary_df, pending)
+
+    return completed
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def parse_stages(value):
+    """Parse and validate a comma separated list of stages."""
+    stages = [stage.strip() for stage in value.split(',') if stage.strip()]
+
+    unknown = [stage for stage in stages if stage not in STAGE_ORDER]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage(s) {unknown}; choose from {STAGE_ORDER}")
+
+    positions = [STAGE_ORDER.index(stage) for stage in stages]
+    if positions != sorted(set(positions)):
+        raise argparse.ArgumentTypeError(
+            f"stages must be in workflow order {STAGE_ORDER} without repeats")
+
+    if 'rework' in stages and 'second_fa' not in stages and 'conclude' in stages:
+        raise argparse.ArgumentTypeError(
+            "second_fa must run between rework and conclude")
+
+    return stages
+
+
+def parse_command_line_arguments(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description='Run SPS FA analysis stages of one project in a single process.')
+
+    parser.add_argument('--stages', type=parse_stages, default=list(STAGE_ORDER),
+                        help=f"comma separated stages (default: {','.join(STAGE_ORDER)})")
+    parser.add_argument('--accept-fa-results', action='store_true',
+                        help='use FA analysis summaries unchanged instead of stopping for review')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of threads used to read and copy FA files (default: 1)')
+
+    add_parameter_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    try:
+        configure_parameters(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    return args
+
+
+@instrument_stage
+def main(argv=None):
+    """
+    Run the requested stages for the project in the current directory.
+    """
+    args = parse_command_line_arguments(argv)
+
+    if not (Path.cwd() / 'project_summary.db').exists():
+        print(f"FATAL ERROR: Database file not found: {Path.cwd() / 'project_summary.db'}")
+        sys.exit()
+
+    # the stage modules live next to this script
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+    # reuse parsed FA and threshold files of an earlier run (.sps_cache)
+    enable_cache(Path.cwd())
+
+    completed = run_workflow(args.stages, workers=args.workers,
+                             accept_results=args.accept_fa_results)
+
+    print(f"\n✅ Completed stages: {', '.join(completed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,14 +19,22 @@ Author: Laboratory Automation Team
 Version: 2.0 (Refactored for pathlib and improved error handling)
 """
 
+import argparse
 import sys
 from pathlib import Path
-import shutil
-from sqlalchemy import create_engine
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from sps_archive import archive_run_name, archive_tree
+from sps_cache import cached_frame, enable_cache
+from sps_fa_smear import copy_smear_files, find_smear_files, parse_smear_files
+from sps_instrumentation import detail, instrument_stage, profile_step
+from sps_parameters import add_parameter_arguments, configure_parameters, get_parameter
+from sps_snapshot import load_project_summary
+from sps_thresholds import (DEFAULT_MIN_FAILED_LIBS, SWEEP_FILE_NAME, add_sweep_arguments, passed_libraries,
+                            sweep_requested, sweep_thresholds, write_sweep_report)
+
 
 def create_success_marker():
     """Create success marker file for workflow manager integration."""
@@ -61,51 +69,14 @@ ARCHIV_DIR.mkdir(parents=True, exist_ok=True)
 
 ##########################
 ##########################
-def compareFolderFileNames(folder_path, file, folder_name):
-    """
-    Validate that FA plate names in folder match sample names in CSV file.
-    
-    Args:
-        folder_path: Path to the folder containing the FA file
-        file: Name of the FA CSV file
-        folder_name: Name of the FA plate folder
-        
-    Raises:
-        SystemExit: If plate names don't match
-    """
-    # print(f"Validating plate names for {folder_name}...")
-    
-    # Read FA smear analysis output CSV file
-    fa_df = pd.read_csv(folder_path / file, usecols=['Sample ID'])
-    
-    # Extract unique sample names
-    sample_list = fa_df['Sample ID'].unique().tolist()
-    
-    # Parse plate names from sample IDs and add 'F' suffix to match folder naming
-    # For second attempt, expect .2F pattern
-    plate_list = [s.split('_')[0] + 'F' for s in sample_list]
-    
-    # print(f"  Sample IDs found: {len(sample_list)} samples")
-    # print(f"  Parsed plate names: {set(plate_list)}")
-    # print(f"  Folder name: {folder_name}")
-    
-    # Validate folder name matches parsed plate names
-    if folder_name not in set(plate_list):
-        print(f'\n\nMismatch between FA plate ID and sample names for plate {folder_name}. Aborting script\n')
-        sys.exit()
-    
-    # print(f"  ✓ Validation passed for {folder_name}")
-##########################
-##########################
-
-##########################
-##########################
-def getFAfiles(second_dir):
+@profile_step()
+def getFAfiles(second_dir, workers=1):
     """
     Scan directories for second attempt FA output files and copy them to the working directory.
     
     Args:
         second_dir: Path to the second attempt FA result directory
+        workers: Number of threads used to read, validate and copy FA files
         
     Returns:
         Tuple of (List of FA file names that were processed, List of FA result directories for archiving)
@@ -113,81 +84,42 @@ def getFAfiles(second_dir):
     Raises:
         SystemExit: If no FA files are found or copying fails
     """
-    # print(f"Scanning for FA files in: {second_dir}")
-    fa_files = []
-    fa_result_dirs_to_archive = []  # NEW: Track directories for archiving
-    
     if not second_dir.exists():
         print(f"ERROR: Second attempt directory does not exist: {second_dir}")
         sys.exit()
     
-    for direct in second_dir.iterdir():
-        if direct.is_dir():
-            # print(f"Processing date directory: {direct.name}")
-            nxt_dir = direct
-            
-            # scan current directory and find subdirectories
-            for fa in nxt_dir.iterdir():
-                if fa.is_dir():
-                    # print(f"  Found FA plate directory: {fa.name}")
-                    
-                    # find full path to subdirectories
-                    folder_path = fa
-                    
-                    # extract name of FA plate by parsing the subdirectory name
-                    folder_name = fa.name
-                    folder_name = folder_name.split(' ')[0]
-                    # print(f"  Parsed plate name: {folder_name}")
-                    
-                    # search for smear analysis files in each subdirectory
-                    smear_files = []
-                    for file_path in fa.iterdir():
-                        if file_path.name.endswith('Smear Analysis Result.csv'):
-                            smear_files.append(file_path)
-                            # print(f"    Found smear analysis file: {file_path.name}")
-                    
-                    if not smear_files:
-                        print(f"    No smear analysis files found in {fa.name}")
-                        continue
-                    
-                    # Process the first smear analysis file found
-                    source_file = smear_files[0]
-                    
-                    # confirm folder name matches plate name parsed from
-                    # smear analysis .csv sample names.  Error out if mismatch
-                    compareFolderFileNames(folder_path, source_file.name, folder_name)
-                    
-                    # copy and rename smear analysis to main directory if good match
-                    dest_file = second_dir / f'{folder_name}.csv'
-                    # print(f"    Copying {source_file} -> {dest_file}")
-                    
-                    try:
-                        shutil.copy(source_file, dest_file)
-                        
-                        # Verify the copy was successful
-                        if dest_file.exists():
-                            file_size = dest_file.stat().st_size
-                            # print(f"    ✓ Copy successful: {dest_file} ({file_size} bytes)")
-                            fa_files.append(f'{folder_name}.csv')
-                            
-                            # NEW: Track this directory for archiving
-                            fa_result_dirs_to_archive.append(fa)
-                        else:
-                            print(f"    ERROR: Copy failed - destination file does not exist: {dest_file}")
-                            sys.exit()
-                            
-                    except Exception as e:
-                        print(f"    ERROR: Failed to copy file: {e}")
-                        sys.exit()
+    # scan run folders and FA plate subdirectories once, in name order
+    smear_jobs = []
+    for fa, smear_paths in find_smear_files(second_dir):
+        if not smear_paths:
+            detail(f"    No smear analysis files found in {fa.name}")
+            continue
+
+        # Process the first smear analysis file found
+        smear_jobs.append((fa, smear_paths[0]))
+
+    # confirm folder name matches plate name parsed from smear analysis .csv
+    # sample names while copying/renaming files to main directory.  Error out if mismatch
+    try:
+        fa_files = copy_smear_files(smear_jobs, second_dir, workers=workers)
+    except ValueError as e:
+        print(f'\n\n{e}. Aborting script\n')
+        sys.exit()
+    except Exception as e:
+        print(f"    ERROR: Failed to copy file: {e}")
+        sys.exit()
+
+    # track FA plate directories for archiving
+    fa_result_dirs_to_archive = [fa for fa, _ in smear_jobs]
 
     # quit script if directory doesn't contain FA .csv files
     if len(fa_files) == 0:
         print("\n\nDid not find any FA output files. Aborting program\n\n")
         sys.exit()
     
-    print(f"\nSuccessfully processed {len(fa_files)} FA files:")
+    detail(f"\nSuccessfully processed {len(fa_files)} FA files:")
     for f in fa_files:
-        print(f"  - {f}")
+        detail(f"  - {f}")
     
     # return both lists
     return fa_files, fa_result_dirs_to_archive
@@ -196,117 +128,49 @@ def getFAfiles(second_dir):
 
 ##########################
 ##########################
+@profile_step()
 def processFAfiles(my_fa_files):
     """
-    Process second attempt FA CSV files into DataFrames with cleaned and standardized data.
+    Parse second attempt FA CSV files into one DataFrame with cleaned and standardized data.
     
     Args:
         my_fa_files: List of FA file names to process
         
     Returns:
-        Tuple of (dictionary mapping filenames to DataFrames, list of destination plates)
+        Tuple of (DataFrame of FA results from all files, list of destination plates)
         
     Raises:
         SystemExit: If processing fails or file counts don't match
     """
-    # print(f"\nProcessing {len(my_fa_files)} FA files...")
-    
-    # create dict where  keys are FA file names and value are df's from those files
-    fa_dict = {}
+    # quit script if were not able to process FA input files
+    if len(my_fa_files) == 0:
+        print("\n\nDid not successfully extract FA files\n\n")
+        sys.exit()
 
-    fa_dest_plates = []
+    fa_paths = [SECOND_DIR / f for f in my_fa_files]
 
-    # loop through all FA files and create df's stored in dict
-    for f in my_fa_files:
-        # print(f"Processing file: {f}")
-        
-        file_path = SECOND_DIR / f
+    for file_path in fa_paths:
         if not file_path.exists():
             print(f"ERROR: FA file not found: {file_path}")
             sys.exit()
-        
-        try:
-            fa_dict[f] = pd.read_csv(file_path, usecols=[
-                'Well', 'Sample ID', 'ng/uL', 'nmole/L', 'Avg. Size'])
-            
-            # print(f"  Read {len(fa_dict[f])} rows from {f}")
-
-            fa_dict[f] = fa_dict[f].rename(
-                columns={"Sample ID": "Redo_FA_Sample_ID", "Well": "Redo_FA_Well", 
-                        "ng/uL": "Redo_ng/uL", "nmole/L": "Redo_nmole/L", "Avg. Size": "Redo_Avg. Size"})
-
-            fa_dict[f]['Redo_FA_Well'] = fa_dict[f]['Redo_FA_Well'].str.replace(
-                ':', '')
-
-            # remove rows with "empty" or "ladder" in sample ID. search is case insensitive
-            initial_rows = len(fa_dict[f])
-            
-            fa_dict[f] = fa_dict[f][fa_dict[f]["Redo_FA_Sample_ID"].str.contains(
-                'empty', case=False) == False]
 
-            fa_dict[f] = fa_dict[f][fa_dict[f]["Redo_FA_Sample_ID"].str.contains(
-                'ladder', case=False) == False]
-
-            fa_dict[f] = fa_dict[f][fa_dict[f]["Redo_FA_Sample_ID"].str.contains(
-                'LibStd', case=False) == False]
-            
-            filtered_rows = len(fa_dict[f])
-            # print(f"  Filtered out {initial_rows - filtered_rows} control rows, {filtered_rows} samples remaining")
-
-            # create three new columns by parsing Sample_ID string using "_" as delimiter
-            fa_dict[f][['Redo_FA_Destination_plate', 'Redo_FA_Sample', 'Redo_FA_well_2']
-                       ] = fa_dict[f].Redo_FA_Sample_ID.str.split("_", expand=True)
-            
-
-            fa_dict[f]['Redo_ng/uL'] = fa_dict[f]['Redo_ng/uL'].fillna(0)
-
-            fa_dict[f]['Redo_nmole/L'] = fa_dict[f]['Redo_nmole/L'].fillna(0)
-
-            fa_dict[f]['Redo_Avg. Size'] = fa_dict[f]['Redo_Avg. Size'].fillna(0)
-
-            fa_dict[f]['Redo_FA_Sample'] = fa_dict[f]['Redo_FA_Sample'].astype(str)
-
-            fa_dict[f]['Redo_ng/uL'] = fa_dict[f]['Redo_ng/uL'].astype(float)
-
-            fa_dict[f]['Redo_nmole/L'] = fa_dict[f]['Redo_nmole/L'].astype(float)
-
-            fa_dict[f]['Redo_Avg. Size'] = fa_dict[f]['Redo_Avg. Size'].astype(float)
-
-            # add destination plates in fa file to list fa_dest_plates
-            dest_plates = fa_dict[f]['Redo_FA_Destination_plate'].unique().tolist()
-            fa_dest_plates.extend(dest_plates)
-            # print(f"  Destination plates: {dest_plates}")
-        
-            # get rid of unnecessary columns
-            fa_dict[f].drop(['Redo_FA_Destination_plate','Redo_FA_well_2','Redo_FA_Sample_ID','Redo_FA_Well'], inplace=True, axis=1)
-            
-            # print(f"  ✓ Successfully processed {f}")
-            
-        except Exception as e:
-            print(f"ERROR processing {f}: {e}")
-            sys.exit()
-
-    # quit script if were not able to process FA input files
-    if len(fa_dict.keys()) == 0:
-        print("\n\nDid not successfully extract FA files\n\n")
+    # parse all FA files in a single pass (shared with first FA analysis)
+    try:
+        fa_df, fa_dest_plates = parse_smear_files(fa_paths, prefix='Redo_')
+    except Exception as e:
+        print(f"ERROR processing FA files: {e}")
         sys.exit()
 
-    elif len(fa_dict.keys()) != len(set(fa_dest_plates)):
-        print(f"\n\nMismatch in number of FA files ({len(fa_dict.keys())}) and destination plates ({len(set(fa_dest_plates))})\n\n")
-        print(f"FA files: {list(fa_dict.keys())}")
+    # FA well of the second attempt is not carried forward
+    fa_df = fa_df.drop(columns=['Redo_FA_Well'])
+
+    if len(my_fa_files) != len(set(fa_dest_plates)):
+        print(f"\n\nMismatch in number of FA files ({len(my_fa_files)}) and destination plates ({len(set(fa_dest_plates))})\n\n")
+        print(f"FA files: {list(my_fa_files)}")
         print(f"Destination plates: {set(fa_dest_plates)}")
         sys.exit()
 
-    # # print out list of successfully processed FA files
-    # print("\n\n\nList of processed FA output files:\n\n\n")
-
-    # for k in fa_dict.keys():
-    #     print(f'{k}\n')
-
-    # # add some blank lines after displaying list of processed FA files
-    # print('\n\n\n')
-
-    return fa_dict, list(set(fa_dest_plates))
+    return fa_df, list(set(fa_dest_plates))
 ##########################
 ##########################
 
@@ -314,6 +178,7 @@ def processFAfiles(my_fa_files):
 
 ##########################
 ##########################
+@profile_step()
 def readSQLdb():
     """
     Read project summary data from SQLite database.
@@ -330,23 +195,15 @@ def readSQLdb():
         print(f"ERROR: Database file not found: {sql_db_path}")
         sys.exit()
 
-    # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
-
-    # define sql query
-    query = "SELECT * FROM project_summary"
-    
     try:
-        # import sql db into pandas df
-        sql_df = pd.read_sql(query, engine)
+        # import sql db into pandas df, from the parquet snapshot when it is current
+        sql_df = load_project_summary(sql_db_path)
         # print(f"  Read {len(sql_df)} rows from database")
         
-        engine.dispose()
         return sql_df
         
     except Exception as e:
         print(f"ERROR reading database: {e}")
-        engine.dispose()
         sys.exit()
 ##########################
 ##########################
@@ -355,13 +212,16 @@ def readSQLdb():
 
 ##########################
 ##########################
-def addFAresults(my_prjct_dir, my_fa_df):
+@profile_step()
+def addFAresults(my_prjct_dir, my_fa_df, my_lib_df=None):
     """
     Merge second attempt FA results with project summary data.
     
     Args:
         my_prjct_dir: Project directory path (currently unused)
         my_fa_df: DataFrame containing second attempt FA analysis results
+        my_lib_df: project_summary data already in memory (e.g. from the
+            workflow runner); read from project_summary.db when None
         
     Returns:
         Merged DataFrame with FA and project data
@@ -372,7 +232,7 @@ def addFAresults(my_prjct_dir, my_fa_df):
     print("\nMerging FA results with project summary...")
     
     # create df from sqlite db
-    my_lib_df = readSQLdb()
+    my_lib_df = readSQLdb() if my_lib_df is None else my_lib_df.copy()
     
     # convert sample id to string
     my_lib_df['sample_id'] = my_lib_df['sample_id'].astype(str)
@@ -410,35 +270,56 @@ def addFAresults(my_prjct_dir, my_fa_df):
 
 ##########################
 ##########################
-def findPassFailLibs(my_lib_df, my_dest_plates):
+def readThresholds():
     """
-    Apply quality thresholds and identify pass/fail libraries for second attempt.
+    Read thresholds.txt of the second attempt FA plates.
     
-    Args:
-        my_lib_df: DataFrame with merged library and FA data
-        my_dest_plates: List of destination plate names
-        
     Returns:
-        Tuple of (DataFrame with pass/fail analysis, DataFrame with double-failed samples)
+        DataFrame with DNA conc and size thresholds and dilution factor per FA plate
         
     Raises:
-        SystemExit: If thresholds file is missing values or dilution factor issues
+        SystemExit: If thresholds file is missing or is missing values
     """
-    print("\nApplying quality thresholds...")
-    
     # import df with dna conc and size thresholds for each FA plate
     thresh_file = SECOND_DIR / "thresholds.txt"
     if not thresh_file.exists():
         print(f"ERROR: Thresholds file not found: {thresh_file}")
         sys.exit()
         
-    thresh_df = pd.read_csv(thresh_file, sep="\t", header=0)
+    thresh_df = cached_frame(thresh_file, 'thresholds', lambda path: pd.read_csv(path, sep="\t", header=0))
     # print(f"  Read thresholds for {len(thresh_df)} plates")
     
     # make sure threshold file has values for all threshold parameters
     if thresh_df.isnull().values.any():
         print('\nThe thresholds.txt file is missing needed values. Aborting\n\n')
         sys.exit()
+
+    return thresh_df
+##########################
+##########################
+
+
+##########################
+##########################
+@profile_step()
+def findPassFailLibs(my_lib_df, my_dest_plates):
+    """
+    Apply quality thresholds and identify pass/fail libraries for second attempt.
+    
+    Args:
+        my_lib_df: DataFrame with merged library and FA data
+        my_dest_plates: List of destination plate names
+        
+    Returns:
+        Tuple of (DataFrame with pass/fail analysis, DataFrame with double-failed samples)
+        
+    Raises:
+        SystemExit: If thresholds file is missing values or dilution factor issues
+    """
+    print("\nApplying quality thresholds...")
+    
+    # import df with dna conc and size thresholds for each FA plate
+    thresh_df = readThresholds()
     
     thresh_df = thresh_df.rename(columns={"dilution_factor": "Redo_dilution_factor"})
 
@@ -452,7 +333,14 @@ def findPassFailLibs(my_lib_df, my_dest_plates):
     # determine what to do if dilution factors differ
     if my_lib_df['compare_dilution_factors'].any() == False:
         
-        val = input('\n\nThe dilution factor in the thresholds file does not match value in project_summary.csv. Is the thresholds.txt file correct? (Y/N): ')
+        try:
+            val = get_parameter(
+                'confirm_dilution_factor',
+                '\n\nThe dilution factor in the thresholds file does not match value in project_summary.csv. Is the thresholds.txt file correct? (Y/N): ',
+                choices=['Y', 'N'])
+        except ValueError as e:
+            print(f"\n\nFATAL ERROR: {e}\nAborting\n\n")
+            sys.exit()
     
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -470,8 +358,10 @@ def findPassFailLibs(my_lib_df, my_dest_plates):
     my_lib_df.drop(columns=['Redo_dilution_factor_y','compare_dilution_factors'], inplace=True)
 
     # assign pass or fail to each lib based on dna conc and size thresholds
-    my_lib_df['Redo_Passed_library'] = np.where(((my_lib_df['Redo_nmole/L'] > my_lib_df['DNA_conc_threshold_(nmol/L)']) & (
-        my_lib_df['Redo_Avg. Size'] > my_lib_df['Size_theshold_(bp)'])), 1, 0)
+    passed = passed_libraries(my_lib_df['Redo_nmole/L'], my_lib_df['Redo_Avg. Size'],
+                              my_lib_df['DNA_conc_threshold_(nmol/L)'], my_lib_df['Size_theshold_(bp)'])
+
+    my_lib_df['Redo_Passed_library'] = np.where(passed, 1, 0)
 
     # update lib conc info based on the dilution factor.  This is conc in original library plate
     my_lib_df['Redo_ng/uL'] = my_lib_df['Redo_ng/uL'] * my_lib_df['Redo_dilution_factor']
@@ -507,8 +397,48 @@ def findPassFailLibs(my_lib_df, my_dest_plates):
 ##########################
 ##########################
 
+
+##########################
+##########################
+@profile_step()
+def sweepThresholds(my_lib_df, my_dest_plates, sweep):
+    """
+    Compare pass counts and whole plate reworks for a grid of threshold settings.
+    
+    Args:
+        my_lib_df: DataFrame with merged library and FA data (before findPassFailLibs)
+        my_dest_plates: List of rework plate names
+        sweep: (DNA conc thresholds, size thresholds, min_failed_libs values);
+            None entries use the thresholds.txt values and DEFAULT_MIN_FAILED_LIBS
+        
+    Returns:
+        DataFrame written to threshold_sweep.txt
+    """
+    conc_thresholds, size_thresholds, min_failed_values = sweep
+
+    thresh_df = readThresholds()
+
+    lib_rows = my_lib_df[my_lib_df['Redo_Destination_Plate_Barcode'].isin(my_dest_plates)]
+
+    sweep_df = sweep_thresholds(
+        lib_rows['Redo_Destination_Plate_Barcode'], lib_rows['Redo_nmole/L'], lib_rows['Redo_Avg. Size'],
+        conc_thresholds or sorted(thresh_df['DNA_conc_threshold_(nmol/L)'].unique()),
+        size_thresholds or sorted(thresh_df['Size_theshold_(bp)'].unique()),
+        min_failed_values or [DEFAULT_MIN_FAILED_LIBS])
+
+    write_sweep_report(sweep_df, SECOND_DIR / SWEEP_FILE_NAME)
+
+    return sweep_df
+##########################
+##########################
+
+@profile_step()
 def archive_fa_results(fa_result_dirs, archive_subdir_name):
-    """Archive FA result directories to permanent storage by copying them"""
+    """Archive FA result directories to permanent storage (originals are kept).
+
+    Files go through the deduplicated archive store, so result folders that
+    were archived before and did not change cost no copy.
+    """
     if not fa_result_dirs:
         return
     
@@ -516,45 +446,82 @@ def archive_fa_results(fa_result_dirs, archive_subdir_name):
     archive_base = PROJECT_DIR / "archived_files"
     archive_dir = archive_base / archive_subdir_name
     archive_dir.mkdir(parents=True, exist_ok=True)
+
+    run = archive_run_name(Path(__file__).stem)
     
     for result_dir in fa_result_dirs:
         if result_dir.exists():
-            dest_path = archive_dir / result_dir.name
-            
-            # Handle existing archives (prevent nesting)
-            if dest_path.exists():
-                shutil.rmtree(dest_path)
-                # print(f"Removing existing archive: {result_dir.name}")
-            
-            # Copy directory to archive (preserves original)
-            shutil.copytree(str(result_dir), str(dest_path))
-            print(f"Archived (copied): {result_dir.name}")
+            # replaces any existing archive of this folder (prevents nesting)
+            archive_tree(archive_base, result_dir, Path(archive_subdir_name) / result_dir.name, run)
+            detail(f"Archived (copied): {result_dir.name}")
 
-def main():
+def parse_command_line_arguments():
     """
-    Main function to orchestrate the second attempt FA analysis workflow.
+    Parse command line arguments.
+    
+    Returns:
+        argparse.Namespace with the number of worker threads
+    """
+    parser = argparse.ArgumentParser(
+        description='Analyze second attempt FA results and find libraries that failed both attempts.')
+
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='number of threads used to read and copy FA files (default: 1)')
+
+    add_sweep_arguments(parser)
+
+    add_parameter_arguments(parser)
+
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    try:
+        configure_parameters(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    return args
+
+
+@profile_step()
+def analyzeFAresults(workers=1, my_lib_df=None, sweep=None):
+    """
+    Run the second attempt FA analysis and write its output files.
+    
+    Args:
+        workers: Number of threads used to read and copy FA files
+        my_lib_df: project_summary data already in memory (e.g. from the
+            workflow runner); read from project_summary.db when None
+        sweep: (DNA conc thresholds, size thresholds, min_failed_libs values)
+            to compare in threshold_sweep.txt, or None (see sweepThresholds)
+        
+    Returns:
+        DataFrame written to reduced_2nd_fa_analysis_summary.txt
     """
     print("Starting SPS Second FA Output Analysis...")
     # print(f"Working directory: {PROJECT_DIR}")
     # print(f"Second attempt directory: {SECOND_DIR}")
     
     # MODIFIED: Update function call to receive both returns
-    fa_files, fa_result_dirs_to_archive = getFAfiles(SECOND_DIR)
+    fa_files, fa_result_dirs_to_archive = getFAfiles(SECOND_DIR, workers=workers)
 
-    # get dictionary where keys are FA file names and values are df's created from FA files
+    # get one dataframe with the results from all FA files
     # and get a list of destination/lib plate IDs processed
-    fa_lib_dict, fa_dest_plates = processFAfiles(fa_files)
-
-    # create new dataframe combining all entries in dictionary fa_lib_dict
-    fa_df = pd.concat(fa_lib_dict.values(), ignore_index=True)
-    # print(f"Combined FA data: {len(fa_df)} samples")
+    fa_df, fa_dest_plates = processFAfiles(fa_files)
 
     # add FA results to df from project summary database
-    lib_df = addFAresults(PROJECT_DIR, fa_df)
+    lib_df = addFAresults(PROJECT_DIR, fa_df, my_lib_df)
 
     # identify libs that passed/failed based on user provided thresholds
     fa_summary_df, double_fail_df = findPassFailLibs(lib_df, fa_dest_plates)
 
+    # compare other threshold settings on the same FA results
+    if sweep:
+        sweepThresholds(lib_df, fa_dest_plates, sweep)
+
     # make smaller version of FA summary with only a subset of columns
     reduced_fa_df = fa_summary_df[['sample_id', 'Redo_Destination_Plate_Barcode', 'Redo_FA_Well', 'Redo_dilution_factor',
                                   'Redo_ng/uL', 'Redo_nmole/L', 'Redo_Avg. Size', 'Redo_Passed_library',
@@ -576,6 +543,23 @@ def main():
     # NEW: Archive FA results before creating success marker
     if fa_result_dirs_to_archive:
         archive_fa_results(fa_result_dirs_to_archive, "second_lib_attempt_fa_results")
+
+    return reduced_fa_df
+
+
+@instrument_stage
+def main():
+    """
+    Main function to orchestrate the second attempt FA analysis workflow.
+    """
+    args = parse_command_line_arguments()
+
+    # reuse parsed FA and threshold files of an earlier run (.sps_cache)
+    enable_cache(PROJECT_DIR)
+
+    sweep = (args.sweep_conc, args.sweep_size, args.sweep_min_failed) if sweep_requested(args) else None
+
+    analyzeFAresults(workers=args.workers, sweep=sweep)
     
     # Create success marker for workflow manager integration
     create_success_marker()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: single-pass FA smear parser vs. the legacy per-file loop.
+
+Writes synthetic "Smear Analysis Result.csv" files (96 wells each, including
+ladder / empty / LibStd controls) to a temporary directory, parses them with
+the legacy processFAfiles loop and with sps_fa_smear.parse_smear_files,
+checks the results are identical and reports the timings.
+
+Usage:
+    python benchmarks/bench_fa_smear_parser.py [--plates 200] [--repeat 3]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_fa_smear import parse_smear_files
+
+
+ROWS = 'ABCDEFGH'
+
+
+def write_synthetic_smear_files(out_dir, num_plates, seed=0):
+    """Write num_plates synthetic FA smear files and return their paths."""
+    rng = np.random.default_rng(seed)
+    wells = [f'{row}{col}' for col in range(1, 13) for row in ROWS]
+    paths = []
+
+    for p in range(1, num_plates + 1):
+        plate = f'XUPVQ-{p}'
+        sample_ids = [f'{plate}_{p * 1000 + i}_{well}' for i, well in enumerate(wells)]
+        sample_ids[-1] = 'ladder_1'
+        sample_ids[-2] = 'Empty'
+        sample_ids[-3] = 'LibStd_1'
+
+        smear_df = pd.DataFrame({
+            'Well': [f'{w[0]}:{w[1:]}' for w in wells],
+            'Sample ID': sample_ids,
+            'Range': '400 bp to 800 bp',
+            'ng/uL': rng.uniform(0, 5, len(wells)).round(3),
+            '%Total': 15,
+            'nmole/L': rng.uniform(0, 20, len(wells)).round(3),
+            'Avg. Size': rng.uniform(300, 800, len(wells)).round(0),
+            '%CV': 20,
+        })
+        path = Path(out_dir) / f'{plate}F.csv'
+        smear_df.to_csv(path, index=False)
+        paths.append(path)
+
+    return paths
+
+
+def legacy_process_fa_files(fa_paths):
+    """Per-file loop used by processFAfiles before the shared parser."""
+    fa_dict = {}
+    fa_dest_plates = []
+
+    for f in fa_paths:
+        fa_dict[f] = pd.read_csv(f, usecols=['Well', 'Sample ID', 'ng/uL', 'nmole/L', 'Avg. Size'])
+        fa_dict[f] = fa_dict[f].rename(columns={"Sample ID": "FA_Sample_ID", "Well": "FA_Well"})
+        fa_dict[f]['FA_Well'] = fa_dict[f]['FA_Well'].str.replace(':', '')
+        fa_dict[f] = fa_dict[f][fa_dict[f]["FA_Sample_ID"].str.contains('empty', case=False) == False]
+        fa_dict[f] = fa_dict[f][fa_dict[f]["FA_Sample_ID"].str.contains('ladder', case=False) == False]
+        fa_dict[f] = fa_dict[f][fa_dict[f]["FA_Sample_ID"].str.contains('LibStd', case=False) == False]
+        fa_dict[f][['FA_Destination_plate', 'FA_Sample', 'FA_well_2']
+                   ] = fa_dict[f].FA_Sample_ID.str.split("_", expand=True)
+        fa_dict[f]['ng/uL'] = fa_dict[f]['ng/uL'].fillna(0)
+        fa_dict[f]['nmole/L'] = fa_dict[f]['nmole/L'].fillna(0)
+        fa_dict[f]['Avg. Size'] = fa_dict[f]['Avg. Size'].fillna(0)
+        fa_dict[f]['FA_Sample'] = fa_dict[f]['FA_Sample'].astype(str)
+        fa_dict[f]['ng/uL'] = fa_dict[f]['ng/uL'].astype(float)
+        fa_dict[f]['nmole/L'] = fa_dict[f]['nmole/L'].astype(float)
+        fa_dict[f]['Avg. Size'] = fa_dict[f]['Avg. Size'].astype(float)
+        fa_dest_plates = fa_dest_plates + fa_dict[f]['FA_Destination_plate'].unique().tolist()
+        fa_dict[f].drop(['FA_Destination_plate', 'FA_well_2', 'FA_Sample_ID'], inplace=True, axis=1)
+
+    fa_df = pd.concat(fa_dict.values(), ignore_index=True)
+
+    return fa_df, fa_dest_plates
+
+
+def best_of(func, repeat):
+    """Return (best wall time in seconds, last result) over repeat runs."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plates', type=int, default=200, help='number of FA plates (default 200)')
+    parser.add_argument('--repeat', type=int, default=3, help='timing repeats (default 3)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_synthetic_smear_files(tmp, args.plates)
+
+        legacy_time, (legacy_df, legacy_plates) = best_of(
+            lambda: legacy_process_fa_files(paths), args.repeat)
+        shared_time, (shared_df, shared_plates) = best_of(
+            lambda: parse_smear_files(paths), args.repeat)
+
+    pd.testing.assert_frame_equal(legacy_df[shared_df.columns], shared_df)
+    assert legacy_plates == shared_plates
+
+    print(f"FA plates parsed:         {args.plates} ({len(shared_df)} libraries)")
+    print(f"legacy per-file loop:     {legacy_time:.3f} s")
+    print(f"single-pass parser:       {shared_time:.3f} s")
+    print(f"speedup:                  {legacy_time / shared_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: columnar grid table validation vs. the legacy row loops.
+
+Builds synthetic grid tables (one 384-well library plate each) and a
+matching project database, then runs the duplicate and missing-sample
+checks of SPS_make_illumina_index_and_FA_files_NEW.py against the legacy
+iterrows / per-key filtering versions.  The missing-sample check is timed
+with one whole grid table absent, the case that was quadratic before.
+
+Usage:
+    python benchmarks/bench_grid_validation.py [--grids 50] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from SPS_make_illumina_index_and_FA_files_NEW import (
+    combine_grid_tables,
+    detect_duplicate_samples,
+    identify_missing_samples,
+)
+from sps_plate_geometry import WELLS_384
+
+
+def make_grid_tables(num_grids):
+    """Return [(filename, grid_df)] with 384 unique samples per grid table."""
+    grids = []
+    for g in range(1, num_grids + 1):
+        plate = f'27-{810000 + g}'
+        grids.append((f'grid_table_{g}.csv', pd.DataFrame({
+            'Well': list(WELLS_384),
+            'Library Plate Label': plate,
+            'Illumina Library': [f'LIB{g}{i}' for i in range(len(WELLS_384))],
+            'Library Plate Container Barcode': f'XYZ{g:03d}',
+            'Nucleic Acid ID': [f'{plate}_{i}' for i in range(len(WELLS_384))],
+        })))
+    return grids
+
+
+def make_database(grids):
+    """Return a project database frame with one row per grid table sample."""
+    combined = pd.concat([df for _, df in grids], ignore_index=True)
+    return pd.DataFrame({
+        'Destination_Well': combined['Well'],
+        'Destination_plate_name': combined['Library Plate Label'],
+        'internal_name': combined['Nucleic Acid ID'],
+        'plate_id': 'Prtist.13',
+        'source_well': 'A1',
+    })
+
+
+def legacy_detect_duplicate_samples(grid_dataframes):
+    """Row loop used by detect_duplicate_samples before the columnar version."""
+    all_samples = []
+    for filename, df in grid_dataframes:
+        for idx, row in df.iterrows():
+            all_samples.append({
+                'filename': filename,
+                'well': row['Well'],
+                'nucleic_acid_id': row['Nucleic Acid ID'],
+                'well_plate_key': f"{row['Well']}_{row['Library Plate Label']}",
+                'container_well_key': f"{row['Library Plate Container Barcode']}_{row['Well']}",
+            })
+
+    duplicates = []
+    for key_name in ('well_plate_key', 'nucleic_acid_id', 'container_well_key'):
+        seen = {}
+        for sample in all_samples:
+            if sample[key_name] in seen:
+                duplicates.append((seen[sample[key_name]]['filename'], sample['filename']))
+            else:
+                seen[sample[key_name]] = sample
+    return duplicates
+
+
+def legacy_missing_samples(db_df, combined_grid_df):
+    """Per-key filtering used by identify_missing_samples before the anti-join."""
+    db_keys = set(db_df['Destination_Well'] + '_' + db_df['Destination_plate_name'])
+    grid_keys = set(combined_grid_df['Well'] + '_' + combined_grid_df['Library Plate Label'])
+
+    missing_samples = []
+    for missing_key in db_keys - grid_keys:
+        well, plate = missing_key.split('_', 1)
+        db_sample = db_df[(db_df['Destination_Well'] == well) &
+                          (db_df['Destination_plate_name'] == plate)]
+        missing_samples.append(db_sample.iloc[0]['internal_name'])
+    return missing_samples
+
+
+def best_of(func, repeat):
+    """Return (best wall time in seconds, last result) over repeat runs."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def columnar_missing_count(db_df, grid_df):
+    """Run identify_missing_samples and return the number of missing samples."""
+    try:
+        identify_missing_samples(db_df, grid_df)
+    except ValueError as e:
+        return int(str(e).split()[2])
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--grids', type=int, default=50, help='number of grid tables (default 50)')
+    parser.add_argument('--repeat', type=int, default=3, help='timing repeats (default 3)')
+    args = parser.parse_args()
+
+    grids = make_grid_tables(args.grids)
+    db_df = make_database(grids)
+    # one grid table was not exported: all of its samples are missing
+    partial_grid_df = pd.concat([df for _, df in grids[:-1]], ignore_index=True)
+
+    legacy_dup_time, legacy_dups = best_of(lambda: legacy_detect_duplicate_samples(grids), args.repeat)
+    columnar_dup_time, report = best_of(
+        lambda: detect_duplicate_samples(combine_grid_tables(grids)), args.repeat)
+    assert legacy_dups == [] and report == {}
+
+    legacy_missing_time, legacy_missing = best_of(
+        lambda: legacy_missing_samples(db_df, partial_grid_df), args.repeat)
+    columnar_missing_time, n_missing = best_of(
+        lambda: columnar_missing_count(db_df, partial_grid_df), args.repeat)
+    assert len(legacy_missing) == n_missing == len(grids[-1][1])
+
+    print(f"grid tables:              {args.grids} ({len(db_df)} wells)")
+    print(f"duplicates, legacy:       {legacy_dup_time:.3f} s")
+    print(f"duplicates, columnar:     {columnar_dup_time:.3f} s")
+    print(f"speedup:                  {legacy_dup_time / columnar_dup_time:.1f}x")
+    print(f"missing ({n_missing}), legacy:   {legacy_missing_time:.3f} s")
+    print(f"missing, anti-join:       {columnar_missing_time:.3f} s")
+    print(f"speedup:                  {legacy_missing_time / columnar_missing_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: integer-coded plate position / Illumina index assignment vs. the
+legacy groupby and Series.replace version.
+
+Builds a synthetic summary_MDA_results table (83 libraries per destination
+plate) and runs assignPlatePositions + assignIlluminaIndex of
+SPS_process_WGA_results_and_make_SPITS.py against the legacy versions
+(groupby/min/map for positions, Series.replace with dicts for the index
+set and well lookups, isin validation).  Both runs use the same random
+index set start, and the results are checked to be identical.
+
+Usage:
+    python benchmarks/bench_index_assignment.py [--wells 50000] [--repeat 3]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from SPS_process_WGA_results_and_make_SPITS import (
+    MAX_SAMPLES_PER_PLATE,
+    NUM_ILLUMINA_INDEX_SETS,
+    assignIlluminaIndex,
+    assignPlatePositions,
+    makeIlluminaIndexSetToUse,
+)
+from sps_plate_geometry import WELLS_96, stamp_96_to_384
+
+
+def make_libraries(num_wells):
+    """Return a frame shaped like importSCdata + assignLibPlateID output."""
+    wells = [WELLS_96[i % len(WELLS_96)] for i in range(num_wells)]
+    dest_plate = [i // MAX_SAMPLES_PER_PLATE + 1 for i in range(num_wells)]
+    df = pd.DataFrame({
+        'Plate_id': [f'509735_WCBP1PR.{i // len(WELLS_96) + 1}' for i in range(num_wells)],
+        'Well': wells,
+        'Type': 'sample',
+        'Dest_plate': dest_plate,
+        'Row': [well[0] for well in wells],
+        'Col': [int(well[1:]) for well in wells],
+    })
+    df['Pool'] = df['Dest_plate']
+    df['Dest_plate'] = 'K7ZQ2M.' + df['Dest_plate'].astype(str)
+    return df
+
+
+def legacy_assign_plate_positions(df):
+    """groupby/min/map round-trip used by assignPlatePositions before."""
+    df['number'] = df.index + 1
+    df3 = df.groupby(['Dest_plate'])['number'].min().reset_index()
+    dest_dict = dict(zip(df3['Dest_plate'], df3['number']))
+    df['base'] = df['Dest_plate'].map(dest_dict)
+    df['Plate_position_number'] = df.number - df.base + 1
+    assert not ((df['Plate_position_number'] < 1).any() | (df['Plate_position_number'] > MAX_SAMPLES_PER_PLATE).any())
+    df.drop(['Row', 'Col', 'number', 'base'], axis=1, inplace=True)
+    return df
+
+
+def legacy_assign_illumina_index(df, ill_set_list, illum_dict):
+    """Series.replace with dicts used by assignIlluminaIndex before."""
+    dest_list = sorted(df['Dest_plate'].unique().tolist())
+    rand_index_set_start = random.randint(0, NUM_ILLUMINA_INDEX_SETS - 1)
+    dest_id_dict = {}
+    for cnt, dp in enumerate(dest_list):
+        dest_id_dict[dp] = str(ill_set_list[(cnt + rand_index_set_start) % len(ill_set_list)])
+    df['Illumina_set'] = df['Dest_plate'].replace(dest_id_dict) + "_" + df['Plate_position_number'].astype(str)
+    df['Dest_well_96'] = df['Illumina_set'].replace(illum_dict)
+    df['Dest_well_384'] = stamp_96_to_384(df['Dest_well_96'])
+    s = df['Dest_well_96'].isin(df['Illumina_set'])
+    assert not (s.any() | df['Dest_well_384'].isnull().any())
+    return df
+
+
+def run(position_fn, index_fn, libraries, ill_set_list, illum_dict, seed):
+    random.seed(seed)
+    df = position_fn(libraries.copy())
+    return index_fn(df, ill_set_list, illum_dict)
+
+
+def best_of(func, repeat):
+    """Return (best wall time in seconds, last result) over repeat runs."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--wells', type=int, default=50000, help='number of libraries (default 50000)')
+    parser.add_argument('--repeat', type=int, default=3, help='timing repeats (default 3)')
+    args = parser.parse_args()
+
+    libraries = make_libraries(args.wells)
+    ill_set_list, illum_dict = makeIlluminaIndexSetToUse(list(WELLS_96))
+
+    legacy_time, legacy = best_of(
+        lambda: run(legacy_assign_plate_positions, legacy_assign_illumina_index,
+                    libraries, ill_set_list, illum_dict, seed=1), args.repeat)
+    coded_time, coded = best_of(
+        lambda: run(assignPlatePositions, assignIlluminaIndex,
+                    libraries, ill_set_list, illum_dict, seed=1), args.repeat)
+
+    pd.testing.assert_frame_equal(coded, legacy)
+
+    print(f"libraries:        {args.wells} ({libraries['Dest_plate'].nunique()} destination plates)")
+    print(f"legacy:           {legacy_time:.3f} s")
+    print(f"integer-coded:    {coded_time:.3f} s")
+    print(f"speedup:          {legacy_time / coded_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pytest-benchmark suite: hot functions of every stage on synthetic projects.
+
+Each scale in SPS_BENCH_PLATES (default 10,100; up to 1000 plates) gets a
+synthetic project from synthetic_project.make_project with WELLS libraries
+per plate and a second FA attempt.  Later stages start from the output of
+the earlier stages' functions, so every benchmark sees the data it would see
+in a real run.  The parsed-input cache stays off, so file parsing is timed.
+
+The file is not collected by the normal test run; name it explicitly:
+
+    python -m pytest benchmarks/bench_stages.py
+    SPS_BENCH_PLATES=10,100,1000 python -m pytest benchmarks/bench_stages.py
+
+To track regressions, save a baseline and compare later runs against it:
+
+    python -m pytest benchmarks/bench_stages.py --benchmark-autosave
+    python -m pytest benchmarks/bench_stages.py --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+
+import importlib
+import os
+import random
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from synthetic_project import DILUTION_FACTOR, make_project
+from sps_esp_export import smear_table, write_smear_files
+from sps_fa_smear import SMEAR_FILE_SUFFIX, parse_smear_files
+from sps_snapshot import load_project_summary
+
+
+BENCH_PLATES_ENV = 'SPS_BENCH_PLATES'
+
+DEFAULT_PLATES = '10,100'
+
+WELLS = 80
+
+SCALES = [int(n) for n in os.environ.get(BENCH_PLATES_ENV, DEFAULT_PLATES).split(',') if n.strip()]
+
+# prompts answered the way the smoke tests answer them
+STAGE_PARAMETERS = {
+    'SPS_MIN_FAILED_LIBS': '20',
+    'SPS_DILUTION_FACTOR': str(DILUTION_FACTOR),
+    'SPS_CONFIRM_DILUTION_FACTOR': 'Y',
+}
+
+# the grid table columns make_illumina adds to the SPITS database
+GRID_COLUMNS = ['sample_id', 'Destination_Plate_Barcode', 'Illumina Library']
+
+
+# ===========================================================================
+# Fixtures
+# ===========================================================================
+
+@pytest.fixture(scope='module')
+def stages(tmp_path_factory):
+    """Stage modules, imported outside the repository.
+
+    Some stage scripts create their project folders on import, relative to
+    the working directory.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(tmp_path_factory.mktemp('imports'))
+        return {name: importlib.import_module(module) for name, module in [
+            ('initiate', 'SPS_initiate_project_folder_and_make_sort_plate_labels'),
+            ('wga', 'SPS_process_WGA_results'),
+            ('spits', 'SPS_process_WGA_results_and_make_SPITS'),
+            ('illumina', 'SPS_make_illumina_index_and_FA_files_NEW'),
+            ('first_fa', 'SPS_first_FA_output_analysis_NEW'),
+            ('rework', 'SPS_rework_first_attempt_NEW'),
+            ('second_fa', 'SPS_second_FA_output_analysis_NEW'),
+            ('conclude', 'SPS_conclude_FA_analysis_generate_ESP_smear_file'),
+        ]}
+
+
+@pytest.fixture(scope='module', params=SCALES, ids=lambda n: f'{n}plates')
+def project(request, tmp_path_factory, stages):
+    """Synthetic project plus the in-memory output of every stage."""
+    paths = make_project(tmp_path_factory.mktemp('project') / 'project', plates=request.param,
+                         wells=WELLS, attempts=2)
+
+    with pytest.MonkeyPatch.context() as mp:
+        for name, value in STAGE_PARAMETERS.items():
+            mp.setenv(name, value)
+        _point_stages_at(mp, stages, paths)
+
+        data = dict(paths)
+        data['smear_files'] = sorted(paths['first_fa_dir'].glob(f'*/*/*{SMEAR_FILE_SUFFIX}'))
+        data['redo_smear_files'] = sorted(paths['second_fa_dir'].glob(f'*/*/*{SMEAR_FILE_SUFFIX}'))
+
+        # initiate
+        data['sample_df'] = stages['initiate'].read_sample_csv(paths['sample_csv'])
+
+        # process WGA results
+        data['plates_df'] = stages['wga'].read_individual_plates_from_database(paths['db'])
+        data['kinetics_df'] = stages['wga'].load_and_process_plates(paths['kinetics_files'], data['plates_df'])
+        mda_csv = paths['root'] / 'summary_MDA_results.csv'
+        _mda_summary(stages['wga'], data['kinetics_df']).to_csv(mda_csv, index=False)
+        data['mda_csv'] = mda_csv
+
+        # make illumina index and FA files
+        summary_df = load_project_summary(paths['db'])
+        data['spits_df'] = summary_df.drop(columns=GRID_COLUMNS)
+        data['grid_df'] = stages['illumina'].read_multiple_grid_tables([str(p) for p in paths['grid_tables']])
+        data['merged_df'] = stages['illumina'].validate_and_merge_data(data['spits_df'], data['grid_df'])
+
+        # first FA analysis
+        data['summary_df'] = summary_df
+        data['fa_df'], data['fa_plates'] = parse_smear_files(data['smear_files'])
+        lib_df = stages['first_fa'].addFAresults(None, data['fa_df'], summary_df)
+        data['first_fa_df'] = stages['first_fa'].findPassFailLibs(lib_df, data['fa_plates'])
+
+        # rework, merged into project_summary as updateProjectDatabase does
+        data['redo_df'] = stages['rework'].getReworkFiles(data['first_fa_df'])
+        project_df = data['first_fa_df'].merge(data['redo_df'], on='sample_id', how='outer', suffixes=('', '_y'))
+        data['rework_df'] = project_df.drop(columns=project_df.filter(regex='_y$').columns)
+
+        # second FA analysis
+        data['redo_fa_df'], data['redo_plates'] = parse_smear_files(data['redo_smear_files'], prefix='Redo_')
+        lib_df = stages['second_fa'].addFAresults(None, data['redo_fa_df'], data['rework_df'])
+        data['second_fa_df'], _ = stages['second_fa'].findPassFailLibs(lib_df, data['redo_plates'])
+
+    return data
+
+
+@pytest.fixture
+def staged(project, stages, monkeypatch):
+    """The project, with prompts answered and stage folders pointing at it."""
+    for name, value in STAGE_PARAMETERS.items():
+        monkeypatch.setenv(name, value)
+    _point_stages_at(monkeypatch, stages, project)
+    return project
+
+
+def _point_stages_at(mp, stages, paths):
+    """Redirect the stage folders read by the benchmarked functions."""
+    mp.setattr(stages['first_fa'], 'FIRST_DIR', paths['first_fa_dir'])
+    mp.setattr(stages['second_fa'], 'SECOND_DIR', paths['second_fa_dir'])
+
+
+def _mda_summary(wga, kinetics_df):
+    """summary_MDA_results.csv content, as process_WGA_results writes it."""
+    return wga.select_and_reorder_columns(
+        wga.assign_dest_plate(wga.remap_type_values(wga.rename_columns(kinetics_df))))
+
+
+# ===========================================================================
+# Initiate project
+# ===========================================================================
+
+def test_initiate_read_sample_csv(benchmark, staged, stages):
+    initiate = stages['initiate']
+
+    def run():
+        return initiate.make_plate_names(initiate.read_sample_csv(staged['sample_csv']))
+
+    plates_df = benchmark(run)
+    assert len(plates_df) == len(staged['plates_df'])
+
+
+def test_initiate_generate_barcodes(benchmark, staged, stages):
+    initiate = stages['initiate']
+    plates_df = initiate.make_plate_names(staged['sample_df'])
+
+    result = benchmark(initiate.generate_simple_barcodes, plates_df.copy(), None, 'BENCH',
+                       db_path=staged['db'])
+    assert initiate.validate_barcode_uniqueness(result)
+
+
+# ===========================================================================
+# Process WGA results
+# ===========================================================================
+
+def test_wga_load_and_process_plates(benchmark, staged, stages):
+    result = benchmark(stages['wga'].load_and_process_plates, staged['kinetics_files'], staged['plates_df'])
+    pd.testing.assert_frame_equal(result, staged['kinetics_df'])
+
+
+def test_wga_summary_transforms(benchmark, staged, stages):
+    result = benchmark(_mda_summary, stages['wga'], staged['kinetics_df'])
+    assert len(result) == len(staged['kinetics_df'])
+
+
+# ===========================================================================
+# Process WGA results and make SPITS
+# ===========================================================================
+
+def test_spits_assign_libraries(benchmark, staged, stages):
+    spits = stages['spits']
+    ill_set_list, illum_dict = spits.makeIlluminaIndexSetToUse(list(spits.WELLS_96))
+
+    def run():
+        random.seed(0)
+        df = spits.assignLibPlateID(spits.importSCdata(staged['mda_csv']))
+        return spits.assignIlluminaIndex(spits.assignPlatePositions(df), ill_set_list, illum_dict)
+
+    result = benchmark(run)
+    assert result['Dest_well_384'].notna().all()
+
+
+# ===========================================================================
+# Make Illumina index and FA files
+# ===========================================================================
+
+def test_illumina_read_grid_tables(benchmark, staged, stages):
+    grid_files = [str(p) for p in staged['grid_tables']]
+
+    result = benchmark(stages['illumina'].read_multiple_grid_tables, grid_files)
+    assert len(result) == len(staged['spits_df'])
+
+
+def test_illumina_validate_and_merge(benchmark, staged, stages):
+    illumina = stages['illumina']
+
+    def run():
+        illumina.identify_missing_samples(staged['spits_df'], staged['grid_df'])
+        return illumina.validate_and_merge_data(staged['spits_df'], staged['grid_df'])
+
+    result = benchmark(run)
+    assert len(result) == len(staged['spits_df'])
+
+
+def test_illumina_plate_tables(benchmark, staged, stages):
+    illumina = stages['illumina']
+    merged_df = staged['merged_df']
+
+    def run():
+        return (illumina.prepare_echo_data(merged_df), illumina.create_illum_dataframe(merged_df),
+                illumina.create_fa_dataframe(merged_df), illumina.make_dilution_dataframe(merged_df))
+
+    tables = benchmark(run)
+    assert all(len(table) == len(merged_df) for table in tables)
+
+
+# ===========================================================================
+# First FA analysis
+# ===========================================================================
+
+def test_first_fa_parse_smear_files(benchmark, staged):
+    fa_df, fa_plates = benchmark(parse_smear_files, staged['smear_files'])
+    assert len(fa_df) == len(staged['summary_df'])
+    assert len(fa_plates) == len(staged['smear_files'])
+
+
+def test_first_fa_pass_fail(benchmark, staged, stages):
+    first_fa = stages['first_fa']
+
+    def run():
+        lib_df = first_fa.addFAresults(None, staged['fa_df'], staged['summary_df'])
+        return first_fa.findPassFailLibs(lib_df, staged['fa_plates'])
+
+    result = benchmark(run)
+    redo_plates = set(result.loc[result['Redo_whole_plate'] == True, 'Destination_Plate_Barcode'])
+    assert redo_plates == set(staged['rework_barcodes'])
+
+
+# ===========================================================================
+# Rework
+# ===========================================================================
+
+def test_rework_tables(benchmark, staged, stages):
+    rework = stages['rework']
+
+    def run():
+        redo_df = rework.getReworkFiles(staged['first_fa_df'])
+        return (rework.makeEchoDataframe(redo_df), rework.createIllumDataframe(redo_df),
+                rework.createFAdataframe(redo_df), rework.makeDilution(redo_df))
+
+    (echo_df, dest_list), *_ = benchmark(run)
+    assert sorted(dest_list) == sorted(f'{barcode}.2' for barcode in staged['rework_barcodes'])
+
+
+# ===========================================================================
+# Second FA analysis
+# ===========================================================================
+
+def test_second_fa_parse_smear_files(benchmark, staged):
+    redo_fa_df, _ = benchmark(parse_smear_files, staged['redo_smear_files'], prefix='Redo_')
+    assert len(redo_fa_df) == len(staged['redo_df'])
+
+
+def test_second_fa_pass_fail(benchmark, staged, stages):
+    second_fa = stages['second_fa']
+
+    def run():
+        lib_df = second_fa.addFAresults(None, staged['redo_fa_df'], staged['rework_df'])
+        return second_fa.findPassFailLibs(lib_df, staged['redo_plates'])
+
+    lib_df, double_fail_df = benchmark(run)
+    assert len(lib_df) == len(staged['summary_df'])
+    assert len(double_fail_df) < len(staged['redo_df'])
+
+
+# ===========================================================================
+# Conclude FA analysis
+# ===========================================================================
+
+def test_conclude_select_plate_for_pooling(benchmark, staged, stages):
+    result = benchmark(stages['conclude'].selectPlateForPooling, staged['second_fa_df'])
+    # libraries that passed their second attempt are pooled from the rework plates
+    assert result['Pool_source_plate'].str.endswith('.2').any()
+
+
+def test_conclude_esp_smear_files(benchmark, staged, stages, tmp_path):
+    final_df = stages['conclude'].selectPlateForPooling(staged['second_fa_df'])
+
+    smear_files = benchmark(lambda: write_smear_files(smear_table(final_df), tmp_path))
+    assert len(smear_files) == final_df['Destination_Plate_Barcode'].nunique()
+
+
+def test_project_summary_load(benchmark, staged):
+    result = benchmark(load_project_summary, staged['db'])
+    assert len(result) == len(staged['summary_df'])
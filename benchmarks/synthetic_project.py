@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic SPS project generator for the benchmark suite.
+
+Writes a project folder with the inputs every stage reads, at a chosen scale
+(plates x wells x attempts):
+
+    sample_metadata.csv                      initiate (one row per sample)
+    project_summary.db                       sample_metadata, individual_plates
+                                             and project_summary tables as left
+                                             by library creation
+    project_summary.csv                      CSV copy of project_summary
+    grid_table_<n>.csv                       make_illumina (one per 12 plates)
+    2_sort_plates_and_amplify_genomes/
+        B_WGA_results/
+            <plate>_amplification_kinetics_summary.csv
+    1_make_library_analyze_fa/
+        B_first_attempt_fa_result/
+            thresholds.txt
+            <run>/<barcode>F <run>/<run> <barcode>F Smear Analysis Result.csv
+        D_second_attempt_fa_result/          attempts=2 only
+            thresholds.txt
+            <run>/<barcode>.2F <run>/...
+    2_pooling/                               empty, as left by library
+        A_smear_file_for_ESP_upload/         creation
+        B_assign_libs_to_pools/ ...
+
+Every sort plate yields one library plate of `wells` libraries.  With
+attempts=2 every REWORK_EVERY-th library plate fails its first FA attempt
+completely (so first FA analysis flags it for a whole plate redo) and its
+rework plate gets second-attempt smear results.  Values are drawn from a
+seeded generator, so a given scale always produces the same files.
+
+Usage:
+    python benchmarks/synthetic_project.py OUT_DIR [--plates 100] [--wells 80] [--attempts 2]
+"""
+
+import argparse
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_database import DATABASE_NAME, write_project_summary
+from sps_fa_smear import SMEAR_FILE_SUFFIX
+from sps_plate_geometry import STAMP_96_TO_384, WELLS_96, WELLS_384
+from SPS_initiate_project_folder_and_make_sort_plate_labels import save_to_two_table_database
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+PROJECT = '509735'
+
+SORT_BASE_BARCODE = 'MKD50'
+
+# destination plate name prefix, as assigned by the SPITS script
+DEST_PLATE_BASE = 'K7ZQ2M'
+
+PLATES_PER_SAMPLE = 4
+
+PLATES_PER_GRID_TABLE = 12
+
+# H12 of every FA plate holds the ladder
+MAX_WELLS = len(WELLS_96) - 1
+
+# wells at the end of every sort plate that hold negative controls
+NEG_CONTROL_WELLS = 8
+
+INDEX_SETS = ['PE17', 'PE18', 'PE19', 'PE20']
+
+# with attempts=2, every REWORK_EVERY-th library plate is reworked
+REWORK_EVERY = 4
+
+DNA_CONC_THRESHOLD = 5
+SIZE_THRESHOLD = 530
+DILUTION_FACTOR = 5
+
+FIRST_RUN = '2026_01_01'
+SECOND_RUN = '2026_02_01'
+
+KINETICS_SUFFIX = '_amplification_kinetics_summary.csv'
+
+# header as written by the WGA instrument export
+KINETICS_EXPORT_COLUMNS = [
+    'Plate_ID', 'Well_Row', 'Well_Col', 'Well', 'Sample', 'Type',
+    'number_of_cells/capsules', 'Group_1', 'Group_2', 'Group_3',
+    'Delta_Fluorescence', 'Crossing_Point', 'Pass_Fail',
+]
+
+# project folders, relative to the project root
+WGA_RESULTS_DIR = Path('2_sort_plates_and_amplify_genomes') / 'B_WGA_results'
+FIRST_FA_DIR = Path('1_make_library_analyze_fa') / 'B_first_attempt_fa_result'
+SECOND_FA_DIR = Path('1_make_library_analyze_fa') / 'D_second_attempt_fa_result'
+
+# pooling folders library creation makes for the later stages
+POOLING_DIRS = [Path('2_pooling') / name for name in
+                ['A_smear_file_for_ESP_upload', 'B_assign_libs_to_pools', 'C_finish_pooling', 'D_pooling_and_rework']]
+
+
+# ---------------------------------------------------------------------------
+# Tables
+# ---------------------------------------------------------------------------
+
+def make_sample_metadata(num_plates):
+    """Return the sample metadata CSV table (PLATES_PER_SAMPLE plates per sample)."""
+    num_samples = -(-num_plates // PLATES_PER_SAMPLE)
+    plates = np.full(num_samples, PLATES_PER_SAMPLE)
+    plates[-1] = num_plates - PLATES_PER_SAMPLE * (num_samples - 1)
+
+    return pd.DataFrame({
+        'Proposal': PROJECT,
+        'Group_or_abrvSample': [f'S{i:04d}' for i in range(1, num_samples + 1)],
+        'Sample_full': [f'synthetic_sample_{i}' for i in range(1, num_samples + 1)],
+        'Number_of_sorted_plates': plates,
+    })
+
+
+def make_individual_plates(sample_df):
+    """Return the individual_plates table for a sample metadata table."""
+    samples = np.repeat(sample_df['Group_or_abrvSample'].to_numpy(), sample_df['Number_of_sorted_plates'])
+    plate_numbers = np.concatenate([np.arange(1, n + 1) for n in sample_df['Number_of_sorted_plates']])
+
+    return pd.DataFrame({
+        'plate_name': [f'{PROJECT}_{sample}.{n}' for sample, n in zip(samples, plate_numbers)],
+        'project': PROJECT,
+        'sample': samples,
+        'plate_number': plate_numbers,
+        'is_custom': False,
+        'barcode': [f'{SORT_BASE_BARCODE}-{i}' for i in range(1, len(samples) + 1)],
+        'created_timestamp': '2026-01-01T00:00:00',
+    })
+
+
+def make_project_summary(plates_df, wells):
+    """Return the project_summary table as written by library creation.
+
+    One library plate per sort plate, `wells` libraries per plate in FA
+    plate (96-well) order, stamped into the first quadrant of the 384-well
+    library plate.
+    """
+    num_plates = len(plates_df)
+    plate = np.repeat(np.arange(1, num_plates + 1), wells)
+    position = np.tile(np.arange(wells), num_plates)
+    well_96 = np.asarray(WELLS_96, dtype=object)[position]
+    index_set = np.asarray(INDEX_SETS, dtype=object)[(plate - 1) % len(INDEX_SETS)]
+    sample_id = 100000 + np.arange(len(plate))
+
+    return pd.DataFrame({
+        'sample_id': sample_id,
+        'internal_name': [f'{PROJECT}_{i}' for i in sample_id],
+        'plate_id': plates_df['plate_name'].to_numpy()[plate - 1],
+        'echo_id': plates_df['barcode'].to_numpy()[plate - 1],
+        'source_well': np.asarray(WELLS_384, dtype=object)[position],
+        'type': 'sample',
+        'Destination_plate_name': [f'{DEST_PLATE_BASE}.{p}' for p in plate],
+        'Destination_Plate_Barcode': [library_barcode(p) for p in plate],
+        'Destination_Well': [STAMP_96_TO_384[well] for well in well_96],
+        'Illumina_index_set': index_set,
+        'Illumina_index': [f'{s}_{p + 1}' for s, p in zip(index_set, position)],
+        'Illumina Library': [f'G{i:07d}' for i in sample_id],
+    })
+
+
+def make_grid_table(summary_df):
+    """Return the LIMS grid table rows for project_summary rows."""
+    return pd.DataFrame({
+        'Well': summary_df['Destination_Well'].to_numpy(),
+        'Library Plate Label': summary_df['Destination_plate_name'].to_numpy(),
+        'Illumina Library': summary_df['Illumina Library'].to_numpy(),
+        'Library Plate Container Barcode': summary_df['Destination_Plate_Barcode'].to_numpy(),
+        'Nucleic Acid ID': summary_df['sample_id'].to_numpy(),
+    })
+
+
+def make_kinetics_table(plate_name, rng):
+    """Return a 384-well WGA kinetics export for one sort plate."""
+    n = len(WELLS_384)
+    wells = np.asarray(WELLS_384, dtype=object)
+    crossing_point = np.round(rng.uniform(8, 30, n), 2)
+    crossing_point[rng.random(n) < 0.05] = np.nan
+    types = np.where(np.arange(n) >= n - NEG_CONTROL_WELLS, 'neg_cntrl', 'sample')
+
+    return pd.DataFrame({
+        'Plate_ID': plate_name,
+        'Well_Row': [well[0] for well in wells],
+        'Well_Col': [int(well[1:]) for well in wells],
+        'Well': wells,
+        'Sample': plate_name.split('_')[1].split('.')[0],
+        'Type': types,
+        'number_of_cells/capsules': rng.integers(1, 4, n),
+        'Group_1': 'Rep1',
+        'Group_2': 'BONCAT+',
+        'Group_3': '',
+        'Delta_Fluorescence': np.round(rng.uniform(0, 150, n), 3),
+        'Crossing_Point': crossing_point,
+        'Pass_Fail': np.where(rng.random(n) < 0.85, 'Pass', 'Fail'),
+    }, columns=KINETICS_EXPORT_COLUMNS)
+
+
+def make_smear_table(barcode, sample_ids, pass_rate, rng):
+    """Return a 96-well FA smear result for one FA plate.
+
+    Libraries fill the first wells; the remaining wells are empty and H12
+    holds the ladder.
+    """
+    n_libs = len(sample_ids)
+    passed = rng.random(n_libs) < pass_rate
+    nmole = np.where(passed, rng.uniform(DNA_CONC_THRESHOLD + 1, 40, n_libs), rng.uniform(0, DNA_CONC_THRESHOLD, n_libs))
+    size = np.where(passed, rng.uniform(SIZE_THRESHOLD + 20, 900, n_libs), rng.uniform(200, 900, n_libs))
+    n_empty = len(WELLS_96) - 1 - n_libs
+
+    return pd.DataFrame({
+        'Well': [f'{well[0]}:{well[1:]}' for well in WELLS_96],
+        'Sample ID': ([f'{barcode}_{s}_{well}' for s, well in zip(sample_ids, WELLS_96)]
+                      + ['empty'] * n_empty + ['ladder_1']),
+        'Range': '400 bp to 800 bp',
+        'ng/uL': np.round(np.concatenate([nmole * size * 0.00066, np.zeros(n_empty + 1)]), 4),
+        '%Total': 15,
+        'nmole/L': np.round(np.concatenate([nmole, np.zeros(n_empty + 1)]), 4),
+        'Avg. Size': np.round(np.concatenate([size, np.zeros(n_empty + 1)]), 1),
+    })
+
+
+def make_thresholds(barcodes):
+    """Return a thresholds.txt table for FA plates."""
+    return pd.DataFrame({
+        'Destination_plate': barcodes,
+        'DNA_conc_threshold_(nmol/L)': DNA_CONC_THRESHOLD,
+        'Size_theshold_(bp)': SIZE_THRESHOLD,
+        'dilution_factor': DILUTION_FACTOR,
+    })
+
+
+def library_barcode(plate):
+    """Container barcode of library plate number `plate`."""
+    return f'27-{810000 + plate}'
+
+
+def rework_barcodes(num_plates):
+    """Library plates reworked with attempts=2, in plate order."""
+    return [library_barcode(p) for p in range(1, num_plates + 1, REWORK_EVERY)]
+
+
+# ---------------------------------------------------------------------------
+# Project folder
+# ---------------------------------------------------------------------------
+
+def make_project(root, plates=10, wells=80, attempts=1, seed=0):
+    """Write a synthetic project folder.
+
+    Args:
+        root: Project folder; replaced if it exists.
+        plates: Number of sort plates (= library plates = FA plates).
+        wells: Libraries per library plate (at most MAX_WELLS).
+        attempts: 1, or 2 to add second-attempt FA results for the
+            reworked plates.
+        seed: Seed of the value generator.
+
+    Returns:
+        dict: Paths of the generated inputs ('root', 'db', 'sample_csv',
+            'grid_tables', 'kinetics_files', 'first_fa_dir',
+            'second_fa_dir') and the 'rework_barcodes' (empty with
+            attempts=1).
+
+    Raises:
+        ValueError: If a scale argument is out of range.
+    """
+    if plates < 1 or not 1 <= wells <= MAX_WELLS or attempts not in (1, 2):
+        raise ValueError(f"Need plates >= 1, 1 <= wells <= {MAX_WELLS} and attempts 1 or 2")
+
+    root = Path(root)
+    shutil.rmtree(root, ignore_errors=True)
+    root.mkdir(parents=True)
+    rng = np.random.default_rng(seed)
+
+    sample_df = make_sample_metadata(plates)
+    sample_df.to_csv(root / 'sample_metadata.csv', index=False)
+
+    plates_df = make_individual_plates(sample_df)
+    summary_df = make_project_summary(plates_df, wells)
+
+    db_path = root / DATABASE_NAME
+    save_to_two_table_database(sample_df, plates_df, db_path)
+    write_project_summary(summary_df, db_path)
+    summary_df.to_csv(root / 'project_summary.csv', index=False)
+
+    grid_tables = []
+    for start in range(0, plates, PLATES_PER_GRID_TABLE):
+        rows = summary_df.iloc[start * wells:(start + PLATES_PER_GRID_TABLE) * wells]
+        grid_path = root / f'grid_table_{start // PLATES_PER_GRID_TABLE + 1}.csv'
+        make_grid_table(rows).to_csv(grid_path, index=False)
+        grid_tables.append(grid_path)
+
+    wga_dir = root / WGA_RESULTS_DIR
+    wga_dir.mkdir(parents=True)
+    kinetics_files = []
+    for plate_name in plates_df['plate_name']:
+        kinetics_path = wga_dir / f'{plate_name}{KINETICS_SUFFIX}'
+        make_kinetics_table(plate_name, rng).to_csv(kinetics_path, index=False)
+        kinetics_files.append(kinetics_path)
+
+    for pooling_dir in POOLING_DIRS:
+        (root / pooling_dir).mkdir(parents=True)
+
+    reworked = rework_barcodes(plates) if attempts == 2 else []
+    sample_ids = summary_df.groupby('Destination_Plate_Barcode', sort=False)['sample_id'].agg(list)
+
+    first_fa_dir = root / FIRST_FA_DIR
+    for barcode, ids in sample_ids.items():
+        pass_rate = 0.0 if barcode in reworked else 0.95
+        _write_smear_file(first_fa_dir, FIRST_RUN, barcode, make_smear_table(barcode, ids, pass_rate, rng))
+    make_thresholds(sample_ids.index).to_csv(first_fa_dir / 'thresholds.txt', sep='\t', index=False)
+
+    second_fa_dir = None
+    if reworked:
+        second_fa_dir = root / SECOND_FA_DIR
+        for barcode in reworked:
+            redo_barcode = f'{barcode}.2'
+            smear_df = make_smear_table(redo_barcode, sample_ids[barcode], 0.8, rng)
+            _write_smear_file(second_fa_dir, SECOND_RUN, redo_barcode, smear_df)
+        make_thresholds([f'{barcode}.2' for barcode in reworked]).to_csv(
+            second_fa_dir / 'thresholds.txt', sep='\t', index=False)
+
+    return {
+        'root': root,
+        'db': db_path,
+        'sample_csv': root / 'sample_metadata.csv',
+        'grid_tables': grid_tables,
+        'kinetics_files': kinetics_files,
+        'first_fa_dir': first_fa_dir,
+        'second_fa_dir': second_fa_dir,
+        'rework_barcodes': reworked,
+    }
+
+
+def fill_redo_thresholds(root):
+    """Enter the DNA thresholds rework leaves blank in the second attempt thresholds.txt, as the lab does."""
+    thresh_path = Path(root) / SECOND_FA_DIR / 'thresholds.txt'
+    thresh_df = pd.read_csv(thresh_path, sep='\t')
+    thresh_df['DNA_conc_threshold_(nmol/L)'] = DNA_CONC_THRESHOLD
+    thresh_df.to_csv(thresh_path, sep='\t', index=False)
+
+
+def _write_smear_file(result_dir, run, barcode, smear_df):
+    """Write one smear file into <run>/<barcode>F <run>/ below an FA result folder."""
+    plate_dir = result_dir / run / f'{barcode}F {run}'
+    plate_dir.mkdir(parents=True)
+    smear_df.to_csv(plate_dir / f'{run} {barcode}F {SMEAR_FILE_SUFFIX}', index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('out_dir', type=Path)
+    parser.add_argument('--plates', type=int, default=10)
+    parser.add_argument('--wells', type=int, default=80)
+    parser.add_argument('--attempts', type=int, default=1, choices=[1, 2])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        paths = make_project(args.out_dir, args.plates, args.wells, args.attempts, args.seed)
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}")
+        sys.exit()
+
+    print(f"Wrote synthetic project {paths['root']}: {args.plates} plates x {args.wells} wells, "
+          f"{len(paths['rework_barcodes'])} reworked plates")
+
+
+if __name__ == '__main__':
+    main()
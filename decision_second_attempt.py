@@ -10,11 +10,15 @@ Author: Laboratory Automation Team
 Version: 1.0 (Initial implementation for workflow manager integration)
 """
 
+import argparse
 import datetime
 import json
 import sys
 from pathlib import Path
 
+from sps_instrumentation import instrument_stage
+from sps_parameters import add_parameter_arguments, configure_parameters, get_parameter
+
 
 def create_success_marker():
     """Create success marker file for workflow manager integration."""
@@ -61,8 +65,28 @@ def update_workflow_state(choice):
         json.dump(state, f, indent=2)
 
 
+def parse_command_line_arguments():
+    """Parse command line arguments (parameter options for the decision prompt)."""
+    parser = argparse.ArgumentParser(
+        description='Decide whether a second rework attempt is needed.')
+
+    add_parameter_arguments(parser)
+
+    args = parser.parse_args()
+
+    try:
+        configure_parameters(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    return args
+
+
+@instrument_stage
 def main():
     """Main decision logic for second attempt determination."""
+    parse_command_line_arguments()
+
     print("\n" + "="*60)
     print("SPS-CE WORKFLOW DECISION POINT")
     print("="*60)
@@ -74,7 +98,13 @@ def main():
     
     choice = None
     while True:
-        user_input = input("\nEnter your choice (YES/NO): ").strip().upper()
+        # --param second_attempt=YES|NO / SPS_SECOND_ATTEMPT / sps_parameters.json, else prompt
+        try:
+            user_input = get_parameter('second_attempt', "\nEnter your choice (YES/NO): ",
+                                       choices=['YES', 'Y', 'NO', 'N']).strip().upper()
+        except ValueError as e:
+            print(f"FATAL ERROR: {e}")
+            sys.exit()
         
         if user_input in ['YES', 'Y']:
             print("\n✅ Decision recorded: Second rework attempt will be performed")
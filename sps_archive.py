@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed, deduplicated store for archived_files.
+
+Every archived file is stored once under archived_files/.store/objects,
+named by the SHA-256 of its content.  The familiar archive names
+(archive_project_summary_<date>.db, first_lib_attempt_fa_results/<run>/...)
+are hard links to those objects, so archiving an unchanged file costs no
+extra disk space and no copy.  Where hard links are not possible (e.g. the
+archive lives on another file system) the object is copied instead.
+
+Deduplication is per whole file: a file that changed at all is stored as a
+full new object.  project_summary.db changes on every rework and conclude
+run, so each of those runs stores a full copy of the database, as the
+plain archive copies did before.
+
+Archived files are read-only.  Objects are stored with mode 0444 because
+they are shared, and an archive name is a hard link with the same mode as
+its object, so editing one archived file cannot change other runs.
+(Archive copies used to be writable.)  To work on an archived file, copy
+it or restore the run: restored files are writable copies.
+
+Each script run records a JSON manifest in archived_files/.store/manifests
+listing the archive name, digest and size of every file it archived.  Any
+past run can be rebuilt from its manifest:
+
+    python sps_archive.py list [archived_files]
+    python sps_archive.py restore <run> <destination> [--archive-dir DIR]
+
+Digests of source files are cached in a hash index keyed by path, size,
+modification time and inode, so unchanged sources (e.g. FA result folders
+that are archived again on every run) are neither re-read nor re-copied.
+Changed files are read and stored in full.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+STORE_DIR_NAME = '.store'
+
+OBJECTS_DIR_NAME = 'objects'
+
+MANIFESTS_DIR_NAME = 'manifests'
+
+HASH_INDEX_NAME = 'hash_index.json'
+
+ARCHIVE_DATE_FORMAT = "%Y_%m_%d-Time%H-%M-%S"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+# ---------------------------------------------------------------------------
+# Store layout
+# ---------------------------------------------------------------------------
+
+def store_dir(archive_dir):
+    """Return the blob store directory of an archive directory."""
+    return Path(archive_dir) / STORE_DIR_NAME
+
+
+def object_path(archive_dir, digest):
+    """Return the object path for a SHA-256 digest."""
+    return store_dir(archive_dir) / OBJECTS_DIR_NAME / digest[:2] / digest[2:]
+
+
+def manifest_path(archive_dir, run):
+    """Return the manifest path of an archive run."""
+    return store_dir(archive_dir) / MANIFESTS_DIR_NAME / f'{run}.json'
+
+
+def archive_run_name(label, date=None):
+    """Return the run name '<date>_<label>' used for a manifest.
+
+    Args:
+        label: Name of the archiving script or step.
+        date: Timestamp string in ARCHIVE_DATE_FORMAT (default: now).
+    """
+    if date is None:
+        date = datetime.now().strftime(ARCHIVE_DATE_FORMAT)
+    return f'{date}_{label}'
+
+
+# ---------------------------------------------------------------------------
+# Archiving
+# ---------------------------------------------------------------------------
+
+def archive_files(archive_dir, files, run, move=False):
+    """Archive files into the store and link them under their archive names.
+
+    Args:
+        archive_dir: Archive directory (archived_files).
+        files: List of (source_path, archive_name) tuples.  archive_name is
+            relative to archive_dir and may contain sub directories.
+        run: Run name of the manifest the files are recorded in.  Calls with
+            the same run name add to the same manifest.
+        move: Remove the source files after archiving (like a rename)
+            instead of leaving them in place.
+
+    Returns:
+        List of archived paths, in the order of files.
+    """
+    archive_dir = Path(archive_dir)
+    hash_index = _load_hash_index(archive_dir)
+
+    archived_paths = []
+    entries = {}
+
+    for source_path, archive_name in files:
+        source_path = Path(source_path)
+        digest = _file_digest(source_path, hash_index)
+        size = source_path.stat().st_size
+
+        _store_object(archive_dir, source_path, digest, move)
+
+        dest_path = archive_dir / archive_name
+        _link_object(object_path(archive_dir, digest), dest_path)
+
+        entries[Path(archive_name).as_posix()] = {'sha256': digest, 'size': size}
+        archived_paths.append(dest_path)
+
+    _save_hash_index(archive_dir, hash_index)
+    _update_manifest(archive_dir, run, entries)
+
+    return archived_paths
+
+
+def archive_tree(archive_dir, source_dir, archive_name, run):
+    """Archive a directory tree, replacing any earlier archive of the same name.
+
+    Args:
+        archive_dir: Archive directory (archived_files).
+        source_dir: Directory to archive; it is left in place.
+        archive_name: Directory name relative to archive_dir.
+        run: Run name of the manifest the files are recorded in.
+
+    Returns:
+        Path of the archived directory.
+    """
+    source_dir = Path(source_dir)
+    dest_dir = Path(archive_dir) / archive_name
+
+    # the archived tree mirrors the source exactly, so stale files are dropped
+    if dest_dir.exists():
+        shutil.rmtree(dest_dir)
+    dest_dir.mkdir(parents=True)
+
+    files = []
+    for root, dir_names, file_names in os.walk(source_dir):
+        dir_names.sort()
+        rel_root = Path(root).relative_to(source_dir)
+        (dest_dir / rel_root).mkdir(parents=True, exist_ok=True)
+        for file_name in sorted(file_names):
+            files.append((Path(root) / file_name, Path(archive_name) / rel_root / file_name))
+
+    archive_files(archive_dir, files, run)
+
+    return dest_dir
+
+
+def _store_object(archive_dir, source_path, digest, move):
+    """Put the content of source_path into the store unless it is already there."""
+    obj_path = object_path(archive_dir, digest)
+
+    if obj_path.exists():
+        if move:
+            source_path.unlink()
+        return
+
+    obj_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # write to a temporary name first so a half-written object never exists
+    fd, tmp_name = tempfile.mkstemp(dir=obj_path.parent, prefix='.tmp-')
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+
+    try:
+        if move:
+            try:
+                os.replace(source_path, tmp_path)
+            except OSError:
+                shutil.copy2(source_path, tmp_path)
+                source_path.unlink()
+        else:
+            # never link the live source: it may be updated in place later
+            shutil.copy2(source_path, tmp_path)
+
+        # objects are shared by every archive name linked to them
+        tmp_path.chmod(0o444)
+        os.replace(tmp_path, obj_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _link_object(obj_path, dest_path):
+    """Make dest_path a hard link to obj_path, copying if linking fails."""
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest_path.with_name(f'.{dest_path.name}.tmp')
+
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    try:
+        os.link(obj_path, tmp_path)
+    except OSError:
+        shutil.copy2(obj_path, tmp_path)
+
+    os.replace(tmp_path, dest_path)
+
+
+# ---------------------------------------------------------------------------
+# Hashing
+# ---------------------------------------------------------------------------
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_digest(path, hash_index):
+    """Return the digest of path, from the hash index when the file is unchanged."""
+    stat = path.stat()
+    key = str(path.resolve())
+    signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+    cached = hash_index.get(key)
+    if cached is not None and cached[:3] == signature:
+        return cached[3]
+
+    digest = file_digest(path)
+    hash_index[key] = signature + [digest]
+    return digest
+
+
+def _load_hash_index(archive_dir):
+    """Load the source digest cache, or an empty one."""
+    index_path = store_dir(archive_dir) / HASH_INDEX_NAME
+    try:
+        with open(index_path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_hash_index(archive_dir, hash_index):
+    """Write the source digest cache, dropping entries for missing files."""
+    hash_index = {key: value for key, value in hash_index.items() if Path(key).exists()}
+    _write_json(store_dir(archive_dir) / HASH_INDEX_NAME, hash_index)
+
+
+# ---------------------------------------------------------------------------
+# Manifests and restore
+# ---------------------------------------------------------------------------
+
+def _update_manifest(archive_dir, run, entries):
+    """Add entries to the manifest of a run."""
+    path = manifest_path(archive_dir, run)
+
+    manifest = read_manifest(archive_dir, run) if path.exists() else {
+        'run': run,
+        'created': datetime.now().strftime(ARCHIVE_DATE_FORMAT),
+        'files': {},
+    }
+    manifest['files'].update(entries)
+
+    _write_json(path, manifest)
+
+
+def read_manifest(archive_dir, run):
+    """Read the manifest of an archive run.
+
+    Raises:
+        FileNotFoundError: If no manifest exists for run.
+    """
+    with open(manifest_path(archive_dir, run)) as fh:
+        return json.load(fh)
+
+
+def list_runs(archive_dir):
+    """Return the names of all archive runs, oldest first."""
+    manifests_dir = store_dir(archive_dir) / MANIFESTS_DIR_NAME
+    if not manifests_dir.exists():
+        return []
+    return sorted(path.stem for path in manifests_dir.glob('*.json'))
+
+
+def restore_run(archive_dir, run, dest_dir):
+    """Rebuild the files of an archive run under dest_dir.
+
+    Restored files are independent, writable copies of the stored objects.
+
+    Args:
+        archive_dir: Archive directory holding the store.
+        run: Run name of the manifest to restore.
+        dest_dir: Directory that receives the files under their archive names.
+
+    Returns:
+        List of restored paths.
+
+    Raises:
+        FileNotFoundError: If the manifest or one of its objects is missing.
+        ValueError: If a stored object does not match its recorded digest.
+    """
+    dest_dir = Path(dest_dir)
+    manifest = read_manifest(archive_dir, run)
+
+    restored_paths = []
+    for archive_name, entry in sorted(manifest['files'].items()):
+        obj_path = object_path(archive_dir, entry['sha256'])
+        if not obj_path.exists():
+            raise FileNotFoundError(f'Archived object missing for {archive_name}: {obj_path}')
+
+        dest_path = dest_dir / archive_name
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(obj_path, dest_path)
+
+        if file_digest(dest_path) != entry['sha256']:
+            raise ValueError(f'Restored file {archive_name} does not match its archived digest')
+
+        restored_paths.append(dest_path)
+
+    return restored_paths
+
+
+def _write_json(path, data):
+    """Write JSON atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'.{path.name}.tmp')
+    with open(tmp_path, 'w') as fh:
+        json.dump(data, fh, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def parse_command_line_arguments(argv=None):
+    """Parse the archive store command line."""
+    parser = argparse.ArgumentParser(
+        description='List or restore runs recorded in the archived_files store.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help='list archive runs')
+    list_parser.add_argument('archive_dir', nargs='?', default='archived_files',
+                             help='archive directory (default: archived_files)')
+
+    restore_parser = subparsers.add_parser('restore', help='rebuild the files of a run')
+    restore_parser.add_argument('run', help='run name as shown by "list"')
+    restore_parser.add_argument('dest_dir', help='directory that receives the files')
+    restore_parser.add_argument('--archive-dir', default='archived_files',
+                                help='archive directory (default: archived_files)')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_command_line_arguments(argv)
+
+    if args.command == 'list':
+        for run in list_runs(args.archive_dir):
+            manifest = read_manifest(args.archive_dir, run)
+            print(f"{run}\t{len(manifest['files'])} files")
+        return
+
+    try:
+        restored = restore_run(args.archive_dir, args.run, args.dest_dir)
+    except (OSError, ValueError) as e:
+        print(f"FATAL ERROR: Could not restore archive run {args.run}: {e}")
+        sys.exit()
+
+    print(f"Restored {len(restored)} files from {args.run} to {args.dest_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BarTender barcode label files for the SPS scripts.
+
+A label file starts with BARTENDER_HEADER (template and printer for the
+label printer) followed by one line per label:
+
+    <barcode>,"<label text>"\r\n
+
+Label sections (e.g. all FA plates, then all dilution plates) are
+separated by a blank label line (SECTION_SEPARATOR).
+
+label_lines() renders a whole column of labels with vectorized string
+operations, interleave_labels() merges aligned columns into per-plate
+groups (e.g. h<plate> followed by <plate>), and write_label_file() writes
+the header and all sections with a single buffered writelines() call.
+
+write_print_batch() combines the label files of several projects into
+one file, so one print job covers a whole batch of projects.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+BARTENDER_HEADER = ('%BTW% /AF="\\\\BARTENDER\\shared\\templates\\ECHO_BCode8.btw" '
+                    '/D="%Trigger File Name%" /PRN="bcode8" /R=3 /P /DD\r\n\r\n%END%\r\n\r\n\r\n')
+
+LABEL_LINE_END = '\r\n'
+
+# blank label printed between label sections
+SECTION_SEPARATOR = ',' + LABEL_LINE_END
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def label_lines(barcodes, texts):
+    """Render label lines for aligned columns of barcodes and label texts.
+
+    Args:
+        barcodes: Series, array or list of barcodes.
+        texts: Label texts, aligned with barcodes.
+
+    Returns:
+        list: Lines 'barcode,"text"\\r\\n', in input order.
+    """
+    barcodes = pd.Series(np.asarray(barcodes, dtype=object), dtype=object).astype(str)
+    texts = pd.Series(np.asarray(texts, dtype=object), dtype=object).astype(str)
+
+    return (barcodes + ',"' + texts + '"' + LABEL_LINE_END).tolist()
+
+
+def interleave_labels(*line_lists):
+    """Interleave aligned label line lists: a1, b1, a2, b2, ...
+
+    Args:
+        *line_lists: Label line lists of equal length (one per label kind).
+
+    Returns:
+        list: One group of labels per position, in input order.
+    """
+    if not line_lists:
+        return []
+
+    return np.column_stack([np.asarray(lines, dtype=object) for lines in line_lists]).ravel().tolist()
+
+
+def render_label_file(sections, trailer=''):
+    """Return the chunks of a label file: header, sections, trailer.
+
+    Args:
+        sections: Iterable of label line lists; consecutive sections are
+            separated by SECTION_SEPARATOR.
+        trailer: Text written after the last section.
+
+    Returns:
+        list: Text chunks to be written in order.
+    """
+    chunks = [BARTENDER_HEADER]
+    for i, lines in enumerate(sections):
+        if i:
+            chunks.append(SECTION_SEPARATOR)
+        chunks.extend(lines)
+    if trailer:
+        chunks.append(trailer)
+    return chunks
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def write_label_file(path, sections, trailer=''):
+    """Write a BarTender label file in one buffered writelines() call.
+
+    Args:
+        path: Output file.
+        sections: Iterable of label line lists (see render_label_file).
+        trailer: Text written after the last section.
+
+    Returns:
+        Path: The written file.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    path = Path(path)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.writelines(render_label_file(sections, trailer))
+    return path
+
+
+def read_label_lines(path):
+    """Read the label lines of a label file (without header and blank lines).
+
+    Section separators inside the file are kept; separators and blank
+    lines at the end are dropped.
+
+    Args:
+        path: BarTender label file written by write_label_file().
+
+    Returns:
+        list: Label lines with their line ends.
+
+    Raises:
+        ValueError: If the file does not start with BARTENDER_HEADER.
+        OSError: If the file cannot be read.
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        text = f.read()
+
+    if not text.startswith(BARTENDER_HEADER):
+        raise ValueError(f"Not a BarTender label file: {path}")
+
+    lines = text[len(BARTENDER_HEADER):].splitlines(keepends=True)
+    while lines and lines[-1].strip() in ('', ','):
+        lines.pop()
+    return lines
+
+
+def write_print_batch(path, label_files, trailer=LABEL_LINE_END):
+    """Combine the label files of several projects into one print batch.
+
+    Each file's labels become one section, in the given file order, so the
+    projects are separated by a blank label.
+
+    Args:
+        path: Output file.
+        label_files: Label files to combine (e.g. one per project).
+        trailer: Text written after the last section.
+
+    Returns:
+        Path: The written file.
+
+    Raises:
+        ValueError: If a file is not a BarTender label file.
+        OSError: If a file cannot be read or the batch cannot be written.
+    """
+    sections = [lines for lines in (read_label_lines(label_file) for label_file in label_files) if lines]
+    return write_label_file(path, sections, trailer)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Project-local cache of parsed input files.
+
+Re-running a stage after a fix used to parse every FA smear file, grid
+table, kinetics summary, sample metadata CSV and thresholds.txt again.
+cached_frame() keeps the parsed DataFrame in .sps_cache/ inside the project
+folder and returns the cached copy while the file is unchanged.
+
+An entry is keyed by the kind of parse (which reader, which columns), the
+file size and a BLAKE2 digest of the file content.  Path and modification
+time are deliberately not part of the key: FA smear files are copied into
+the result folder on every run, which gives them a new modification time
+but not new content.  Hashing a file is much cheaper than parsing it.
+
+The cache is bounded to MAX_CACHE_BYTES; when a new entry pushes it over
+the limit, the least recently used entries are removed (a hit refreshes the
+entry's modification time).  Entries are pandas pickles written atomically,
+so concurrent readers never see a partial entry.  The cache is only an
+accelerator: unreadable entries are parsed again, and a folder that cannot
+be written just goes without a cache.
+
+The cache is off until a stage's main() calls enable_cache() for its
+project folder, so functions called directly (tests, other scripts) parse
+as before.  Setting SPS_NO_CACHE=1 keeps it off.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+CACHE_DIR_NAME = '.sps_cache'
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+NO_CACHE_ENV = 'SPS_NO_CACHE'
+
+# bump when a cached parse changes; older entries are then never hit again
+CACHE_VERSION = 1
+
+ENTRY_SUFFIX = '.pkl'
+
+_HASH_CHUNK = 1024 * 1024
+
+# cache folder of the running stage (None: cache off)
+_cache_dir = None
+_max_bytes = MAX_CACHE_BYTES
+
+# serializes eviction between reader threads of one stage
+_evict_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+def enable_cache(project_dir, max_bytes=MAX_CACHE_BYTES):
+    """Turn the cache on for a project folder.
+
+    Args:
+        project_dir: Project folder; entries go to <project_dir>/.sps_cache.
+        max_bytes: Size limit of the cache folder.
+
+    Returns:
+        Path: The cache folder, or None if SPS_NO_CACHE is set.
+    """
+    global _cache_dir, _max_bytes
+
+    if os.environ.get(NO_CACHE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'y'):
+        _cache_dir = None
+        return None
+
+    _cache_dir = Path(project_dir) / CACHE_DIR_NAME
+    _max_bytes = max_bytes
+    return _cache_dir
+
+
+def disable_cache():
+    """Turn the cache off (cached_frame() parses every time)."""
+    global _cache_dir
+    _cache_dir = None
+
+
+def current_cache_dir():
+    """Return the cache folder of the running stage (None if the cache is off)."""
+    return _cache_dir
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+def cached_frame(path, kind, parse):
+    """Return parse(path), from the cache when the file content is unchanged.
+
+    Args:
+        path: Input file.
+        kind: Name of the parse, including anything that changes its
+            result (e.g. 'kinetics:Plate_ID,Well,...').
+        parse: Function path -> DataFrame.  Errors it raises are passed on
+            and nothing is cached.
+
+    Returns:
+        pd.DataFrame: The parsed frame (a fresh copy on every call).
+    """
+    cache_dir = _cache_dir
+    if cache_dir is None:
+        return parse(path)
+
+    try:
+        entry = cache_dir / f'{entry_key(path, kind)}{ENTRY_SUFFIX}'
+    except OSError:
+        # unreadable input: let the parser report it
+        return parse(path)
+
+    try:
+        frame = pd.read_pickle(entry)
+        os.utime(entry)
+        return frame
+    except Exception:
+        pass
+
+    frame = parse(path)
+    _store(entry, frame)
+    return frame
+
+
+def entry_key(path, kind):
+    """Return the cache key of a file for one kind of parse.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+            size += len(chunk)
+
+    key = hashlib.blake2b(digest_size=16)
+    key.update(f'{CACHE_VERSION}\0{pd.__version__}\0{kind}\0{size}\0'.encode('utf-8'))
+    key.update(digest.digest())
+    return key.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+def _store(entry, frame):
+    """Write an entry atomically, then evict down to the size limit."""
+    tmp_path = entry.with_name(f'{entry.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        entry.parent.mkdir(exist_ok=True)
+        frame.to_pickle(tmp_path)
+        os.replace(tmp_path, entry)
+    except Exception:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        return
+
+    with _evict_lock:
+        evict(entry.parent, _max_bytes)
+
+
+def evict(cache_dir, max_bytes):
+    """Remove least recently used entries until the folder fits max_bytes.
+
+    Returns:
+        list: Names of the removed entries.
+    """
+    entries = []
+    try:
+        with os.scandir(cache_dir) as it:
+            for item in it:
+                if item.name.endswith(ENTRY_SUFFIX):
+                    try:
+                        stat = item.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, item.name))
+    except OSError:
+        return []
+
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(Path(cache_dir) / name)
+        except OSError:
+            continue
+        total -= size
+        removed.append(name)
+
+    return removed
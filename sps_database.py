@@ -0,0 +1,756 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Data-access layer for the project_summary table in project_summary.db.
+
+Earlier versions of the SPS scripts read the whole project_summary table into
+pandas and wrote it back with DataFrame.to_sql(if_exists='replace'), which
+rebuilt the table and dropped its indexes on every stage.  This module
+declares the table itself (CREATE TABLE with a primary key on sample_id and
+the column types DataFrame.to_sql gives the data, so readers see the same
+types as before) and offers two write paths:
+
+- write_project_summary(): (re)creates the table from a DataFrame.  Used by
+  the stages that define the table layout (SPITS and library creation).
+- upsert_project_summary(): column-wise UPSERT keyed on sample_id inside a
+  single transaction.  Only cells whose value changed are updated, new
+  columns are added with ALTER TABLE and new samples are inserted.  Used by
+  the stages that add results to existing libraries (rework and conclude).
+  With complete=True the DataFrame is the whole table, as it is written to
+  project_summary.csv: columns and samples it no longer has are removed, so
+  project_summary.db and project_summary.csv describe the same table.
+
+reserve_barcode_block() hands out plate barcode numbers from a counter row
+per base barcode in the barcode_counters table.  A block is reserved with
+one UPSERT ... RETURNING statement, so label runs started at the same time
+never get the same numbers.
+
+record_library_attempts() keeps the library_attempts table: one row per
+library attempt (sample_id, attempt_no) with its plate, well, index, FA
+results and pass flag.  The wide project_summary layout repeats these
+fields as Redo_* columns for the rework attempt; here each attempt is a row,
+so a stage adds rows for the attempts it makes and updates only the
+attempt fields that changed.  The library_attempts_wide view pivots the
+table back into the legacy wide columns (read_library_attempts_wide()).
+This is a transition step: the stages still write the wide columns to
+project_summary as well, because project_summary.csv and its readers use
+that layout.  Until they read the view instead, the view gives the same
+values as project_summary, including a 0 Passed_library flag for attempts a
+library never had.
+
+bootstrap_database() creates the lookup indexes and switches the database
+to WAL journaling.  It is idempotent and can be re-run on existing projects:
+
+    python sps_database.py bootstrap [path/to/project_summary.db]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, event
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+DATABASE_NAME = 'project_summary.db'
+
+PROJECT_SUMMARY_TABLE = 'project_summary'
+
+PROJECT_SUMMARY_KEY = 'sample_id'
+
+# temporary table upsert_project_summary() compares the new rows in
+STAGED_TABLE = 'project_summary_staged'
+
+# One row per library attempt; see record_library_attempts()
+LIBRARY_ATTEMPTS_TABLE = 'library_attempts'
+
+# Pivot of library_attempts into the wide project_summary columns
+LIBRARY_ATTEMPTS_VIEW = 'library_attempts_wide'
+
+# project_summary column prefix of each library attempt, oldest first
+# (attempt_no 1 is the first attempt, 2 the rework attempt)
+ATTEMPT_PREFIXES = ['', 'Redo_']
+
+# library_attempts column -> project_summary field (without attempt prefix)
+LIBRARY_ATTEMPT_FIELDS = {
+    'plate': 'Destination_Plate_Barcode',
+    'well': 'Destination_Well',
+    'fa_well': 'FA_Well',
+    'index_set': 'Illumina_index_set',
+    'illumina_index': 'Illumina_index',
+    'dilution_factor': 'dilution_factor',
+    'conc_ng_ul': 'ng/uL',
+    'conc_nmol_l': 'nmole/L',
+    'avg_size': 'Avg. Size',
+    'passed': 'Passed_library',
+}
+
+# Declared SQLite types of the library_attempts columns.  FA measurements are
+# always floats; dilution factors and pass flags may be integers, floats or ''
+# depending on the stage, so they get no type and are stored as written.
+LIBRARY_ATTEMPT_TYPES = {
+    'plate': 'TEXT',
+    'well': 'TEXT',
+    'fa_well': 'TEXT',
+    'index_set': 'TEXT',
+    'illumina_index': 'TEXT',
+    'dilution_factor': '',
+    'conc_ng_ul': 'REAL',
+    'conc_nmol_l': 'REAL',
+    'avg_size': 'REAL',
+    'passed': '',
+}
+
+# Lookup indexes: (index name, table, column).  Created only when the table
+# and column exist, so the list is safe for databases at any workflow stage.
+DATABASE_INDEXES = [
+    ('idx_project_summary_sample_id', 'project_summary', 'sample_id'),
+    ('idx_project_summary_destination_plate_barcode', 'project_summary', 'Destination_Plate_Barcode'),
+    ('idx_individual_plates_plate_name', 'individual_plates', 'plate_name'),
+    ('idx_individual_plates_barcode', 'individual_plates', 'barcode'),
+    ('idx_library_attempts_plate', LIBRARY_ATTEMPTS_TABLE, 'plate'),
+]
+
+# Next free barcode number per base barcode (see reserve_barcode_block)
+BARCODE_COUNTER_TABLE = 'barcode_counters'
+
+# Per-connection pragmas.  synchronous=NORMAL is durable in WAL mode and
+# avoids an fsync per transaction; busy_timeout lets a second process wait
+# for a write lock instead of failing immediately.
+CONNECTION_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': '-20000',
+    'busy_timeout': '5000',
+}
+
+# Journal mode set by bootstrap_database().  WAL is persistent (stored in the
+# database file).  Use DELETE for databases on network file systems that do
+# not support the shared memory WAL needs.
+DEFAULT_JOURNAL_MODE = 'WAL'
+
+
+# ---------------------------------------------------------------------------
+# Connections and reads
+# ---------------------------------------------------------------------------
+
+def get_engine(db_path):
+    """Return a SQLAlchemy engine for a project database file.
+
+    Every connection opened by the engine gets the CONNECTION_PRAGMAS.
+    """
+    engine = create_engine(f'sqlite:///{Path(db_path)}')
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in CONNECTION_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+        cursor.close()
+
+    return engine
+
+
+def read_project_summary(db_path):
+    """Read the project_summary table into a DataFrame.
+
+    Args:
+        db_path: Path to project_summary.db.
+
+    Returns:
+        pandas.DataFrame with one row per library.
+    """
+    engine = get_engine(db_path)
+    try:
+        return pd.read_sql(f'SELECT * FROM {quote_identifier(PROJECT_SUMMARY_TABLE)}', engine)
+    finally:
+        engine.dispose()
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+def write_project_summary(df, db_path):
+    """Create (or replace) the project_summary table from a DataFrame.
+
+    The columns get the types DataFrame.to_sql would give them (see
+    column_type()) and the table a primary key on sample_id when the
+    DataFrame has that column.  The table is dropped, created and
+    filled inside one transaction.
+
+    Args:
+        df: Complete project summary, one row per library.
+        db_path: Path to project_summary.db (created if missing).
+    """
+    engine = get_engine(db_path)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS {quote_identifier(PROJECT_SUMMARY_TABLE)}')
+            conn.exec_driver_sql(create_table_sql(df))
+            _insert_rows(conn, df)
+            create_indexes(conn)
+    finally:
+        engine.dispose()
+
+
+def upsert_project_summary(df, db_path, key=PROJECT_SUMMARY_KEY, complete=False):
+    """Apply a DataFrame to project_summary as a column-wise UPSERT.
+
+    Inside one transaction:
+    1. Columns missing from the table are added with ALTER TABLE
+    2. The DataFrame is loaded into a temporary table with the same column
+       types, and for every column only rows whose value differs from the
+       stored value are updated (one UPDATE ... FROM per column, compared
+       in SQL)
+    3. Rows whose key is not in the table yet are inserted
+
+    By default columns and rows of the table that are not in the DataFrame
+    are left untouched.  With complete=True the DataFrame is the whole
+    table: rows whose key it does not have are deleted, and columns it
+    adds after the stored ones are added as above.  Only if stored
+    columns were dropped, reordered or changed type is the table rebuilt
+    from the DataFrame.  Either way the result is the table
+    DataFrame.to_sql(if_exists='replace') would write.  If the table does
+    not exist it is created.
+
+    Args:
+        df: Project summary rows to apply; must contain the key column with
+            unique values.
+        db_path: Path to project_summary.db.
+        key: Column identifying a library.
+        complete: df holds every column and row of project_summary.
+
+    Returns:
+        Dict with the number of 'inserted_rows', 'deleted_rows',
+        'added_columns', 'dropped_columns' and 'updated_cells', and
+        'rebuilt' (True if the table was rebuilt).
+
+    Raises:
+        ValueError: If the key column is missing (from the DataFrame or the
+            existing table) or has duplicate values.
+    """
+    if key not in df.columns:
+        raise ValueError(f"Cannot update {PROJECT_SUMMARY_TABLE}: column '{key}' is missing")
+
+    key_text = df[key].astype(str)
+    if key_text.duplicated().any():
+        duplicates = sorted(key_text[key_text.duplicated()].unique().tolist())
+        raise ValueError(f"Cannot update {PROJECT_SUMMARY_TABLE}: duplicate {key} values {duplicates[:10]}")
+
+    summary = {'inserted_rows': 0, 'deleted_rows': 0, 'added_columns': 0, 'dropped_columns': 0,
+               'updated_cells': 0, 'rebuilt': False}
+    table = quote_identifier(PROJECT_SUMMARY_TABLE)
+    staged = quote_identifier(STAGED_TABLE)
+    key_column = quote_identifier(key)
+
+    engine = get_engine(db_path)
+    try:
+        with engine.begin() as conn:
+            table_layout = table_column_types(conn, PROJECT_SUMMARY_TABLE)
+
+            if not table_layout:
+                conn.exec_driver_sql(create_table_sql(df))
+                _insert_rows(conn, df)
+                create_indexes(conn)
+                summary['inserted_rows'] = len(df)
+                return summary
+
+            if key not in table_layout:
+                raise ValueError(
+                    f"Cannot update {PROJECT_SUMMARY_TABLE}: table has no '{key}' column")
+
+            new_layout = {col: column_type(df[col]) for col in df.columns}
+            if complete and list(new_layout.items())[:len(table_layout)] != list(table_layout.items()):
+                # columns were dropped, reordered or changed type: SQLite
+                # cannot alter these in place, so write the table anew
+                stored_keys = pd.read_sql(f'SELECT {key_column} FROM {table}', conn)[key].astype(str)
+                conn.exec_driver_sql(f'DROP TABLE {table}')
+                conn.exec_driver_sql(create_table_sql(df))
+                _insert_rows(conn, df)
+                create_indexes(conn)
+                summary.update(inserted_rows=int((~key_text.isin(stored_keys)).sum()),
+                               deleted_rows=int((~stored_keys.isin(key_text)).sum()),
+                               added_columns=len(set(new_layout) - set(table_layout)),
+                               dropped_columns=len(set(table_layout) - set(new_layout)),
+                               rebuilt=True)
+                return summary
+
+            duplicates = conn.exec_driver_sql(
+                f'SELECT count(*) - count(DISTINCT {key_column}) FROM {table}').scalar_one()
+            if duplicates:
+                raise ValueError(
+                    f"Cannot update {PROJECT_SUMMARY_TABLE}: table has duplicate {key} values")
+
+            # columns new to the table are appended
+            for col in df.columns:
+                if col not in table_layout:
+                    conn.exec_driver_sql(
+                        f'ALTER TABLE {table} ADD COLUMN {quote_identifier(col)} {new_layout[col]}')
+                    table_layout[col] = new_layout[col]
+                    summary['added_columns'] += 1
+
+            # stage the DataFrame with the table's column types, so values get
+            # the same type conversions as in the table and are compared in SQL
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS {staged}')
+            conn.exec_driver_sql(
+                f'CREATE TEMP TABLE {staged} (\n    '
+                + ',\n    '.join(f'{quote_identifier(col)} {table_layout[col]}' for col in df.columns)
+                + f',\n    PRIMARY KEY ({key_column})\n)')
+            _insert_rows(conn, df, STAGED_TABLE)
+
+            if complete:
+                summary['deleted_rows'] = conn.exec_driver_sql(
+                    f'DELETE FROM {table} WHERE {key_column} NOT IN (SELECT {key_column} FROM {staged})').rowcount
+
+            # update only the cells that changed, one column at a time
+            for col in df.columns:
+                if col == key:
+                    continue
+                column = quote_identifier(col)
+                summary['updated_cells'] += conn.exec_driver_sql(
+                    f'UPDATE {table} SET {column} = s.{column} FROM {staged} AS s '
+                    f'WHERE {table}.{key_column} = s.{key_column} AND {table}.{column} IS NOT s.{column}').rowcount
+
+            # insert libraries that are not in the table yet
+            columns = ', '.join(quote_identifier(col) for col in df.columns)
+            summary['inserted_rows'] = conn.exec_driver_sql(
+                f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {staged} '
+                f'WHERE {key_column} NOT IN (SELECT {key_column} FROM {table})').rowcount
+
+            conn.exec_driver_sql(f'DROP TABLE {staged}')
+    finally:
+        engine.dispose()
+
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# Library attempts
+# ---------------------------------------------------------------------------
+
+def record_library_attempts(df, db_path, attempt_prefixes=ATTEMPT_PREFIXES, replace=False):
+    """Add the library attempts of a project summary DataFrame to library_attempts.
+
+    Every attempt with a plate becomes a (sample_id, attempt_no) row.  New
+    attempts are inserted; for attempts already in the table only the
+    fields present in the DataFrame are written, and only when their value
+    changed.  Runs in one transaction.
+
+    Args:
+        df: Project summary in the wide layout (first attempt fields, then
+            the same fields with each attempt prefix).
+        db_path: Path to project_summary.db.
+        attempt_prefixes: project_summary column prefix of each attempt,
+            oldest first.
+        replace: Delete all stored attempts first (library creation).
+
+    Returns:
+        Dict with the number of 'inserted_rows' and 'updated_rows'.
+
+    Raises:
+        ValueError: If the sample_id column is missing or an attempt has
+            duplicate sample_id values.
+    """
+    if PROJECT_SUMMARY_KEY not in df.columns:
+        raise ValueError(f"Cannot update {LIBRARY_ATTEMPTS_TABLE}: column '{PROJECT_SUMMARY_KEY}' is missing")
+
+    summary = {'inserted_rows': 0, 'updated_rows': 0}
+    table = quote_identifier(LIBRARY_ATTEMPTS_TABLE)
+
+    engine = get_engine(db_path)
+    try:
+        with engine.begin() as conn:
+            create_library_attempts(conn, attempt_prefixes)
+
+            if replace:
+                conn.exec_driver_sql(f'DELETE FROM {table}')
+
+            for attempt_df in _library_attempt_frames(df, attempt_prefixes):
+                if attempt_df.empty:
+                    continue
+
+                if attempt_df[PROJECT_SUMMARY_KEY].astype(str).duplicated().any():
+                    raise ValueError(
+                        f"Cannot update {LIBRARY_ATTEMPTS_TABLE}: duplicate {PROJECT_SUMMARY_KEY} values "
+                        f"in attempt {attempt_df['attempt_no'].iloc[0]}")
+
+                before = conn.exec_driver_sql(f'SELECT count(*) FROM {table}').scalar_one()
+                changed = _upsert_rows(conn, attempt_df, ['sample_id', 'attempt_no'], LIBRARY_ATTEMPTS_TABLE)
+                inserted = conn.exec_driver_sql(f'SELECT count(*) FROM {table}').scalar_one() - before
+
+                summary['inserted_rows'] += inserted
+                summary['updated_rows'] += changed - inserted
+    finally:
+        engine.dispose()
+
+    return summary
+
+
+def read_library_attempts(db_path):
+    """Read the library_attempts table, ordered by sample_id and attempt_no."""
+    engine = get_engine(db_path)
+    try:
+        return pd.read_sql(
+            f'SELECT * FROM {quote_identifier(LIBRARY_ATTEMPTS_TABLE)} ORDER BY sample_id, attempt_no', engine)
+    finally:
+        engine.dispose()
+
+
+def read_library_attempts_wide(db_path):
+    """Read the library attempts in the legacy wide project_summary layout.
+
+    Returns:
+        pandas.DataFrame with one row per library: sample_id, the fields of
+        every attempt (Destination_Plate_Barcode, ..., Redo_Destination_Plate_Barcode,
+        ...) and Total_passed_attempts.
+    """
+    engine = get_engine(db_path)
+    try:
+        return pd.read_sql(f'SELECT * FROM {quote_identifier(LIBRARY_ATTEMPTS_VIEW)}', engine)
+    finally:
+        engine.dispose()
+
+
+def create_library_attempts(conn, attempt_prefixes=ATTEMPT_PREFIXES):
+    """Create the library_attempts table and index, and (re)create its wide view.
+
+    The table is keyed and stored in (sample_id, attempt_no) order (WITHOUT
+    ROWID), so the view's GROUP BY sample_id is one ordered scan.
+    """
+    column_defs = ['"sample_id" TEXT NOT NULL', '"attempt_no" INTEGER NOT NULL']
+    column_defs += [f'{quote_identifier(col)} {LIBRARY_ATTEMPT_TYPES[col]}'.rstrip()
+                    for col in LIBRARY_ATTEMPT_FIELDS]
+    column_defs.append('PRIMARY KEY ("sample_id", "attempt_no")')
+
+    conn.exec_driver_sql(
+        f'CREATE TABLE IF NOT EXISTS {quote_identifier(LIBRARY_ATTEMPTS_TABLE)} (\n    '
+        + ',\n    '.join(column_defs) + '\n) WITHOUT ROWID')
+
+    create_indexes(conn)
+
+    # a library without a result for an attempt has not passed it: 0, as in
+    # the <prefix>Passed_library columns of project_summary
+    pivot_columns = []
+    for attempt_no, prefix in enumerate(attempt_prefixes, start=1):
+        for col, field in LIBRARY_ATTEMPT_FIELDS.items():
+            value = f'MAX(CASE WHEN attempt_no = {attempt_no} THEN {quote_identifier(col)} END)'
+            if col == 'passed':
+                value = f'COALESCE({value}, 0)'
+            pivot_columns.append(f'{value} AS {quote_identifier(prefix + field)}')
+    pivot_columns.append('SUM(CASE WHEN passed = 1 THEN 1 ELSE 0 END) AS "Total_passed_attempts"')
+
+    conn.exec_driver_sql(f'DROP VIEW IF EXISTS {quote_identifier(LIBRARY_ATTEMPTS_VIEW)}')
+    conn.exec_driver_sql(
+        f'CREATE VIEW {quote_identifier(LIBRARY_ATTEMPTS_VIEW)} AS\nSELECT sample_id,\n    '
+        + ',\n    '.join(pivot_columns)
+        + f'\nFROM {quote_identifier(LIBRARY_ATTEMPTS_TABLE)}\nGROUP BY sample_id')
+
+
+def _library_attempt_frames(df, attempt_prefixes):
+    """Yield one library_attempts DataFrame per attempt of a wide project summary.
+
+    Only libraries with a plate for the attempt are included, and only the
+    fields present in df become columns.
+    """
+    for attempt_no, prefix in enumerate(attempt_prefixes, start=1):
+        plate_column = prefix + LIBRARY_ATTEMPT_FIELDS['plate']
+        if plate_column not in df.columns:
+            continue
+
+        plates = df[plate_column]
+        made = plates.notna() & (plates.astype(str).str.strip() != '')
+
+        attempt_df = pd.DataFrame({'sample_id': df.loc[made, PROJECT_SUMMARY_KEY].astype(str),
+                                   'attempt_no': attempt_no})
+        for col, field in LIBRARY_ATTEMPT_FIELDS.items():
+            if prefix + field in df.columns:
+                attempt_df[col] = df.loc[made, prefix + field]
+
+        yield attempt_df
+
+
+# ---------------------------------------------------------------------------
+# Barcode counters
+# ---------------------------------------------------------------------------
+
+def reserve_barcode_block(db_path, base_barcode, count, first_free=1):
+    """Reserve consecutive barcode numbers for a base barcode.
+
+    The counter row of the base barcode is created on first use and advanced
+    by count in a single UPSERT ... RETURNING statement, so the block is
+    reserved atomically even when several processes reserve at once.
+    Numbers are never handed out twice; a run that fails after reserving
+    leaves a gap.
+
+    Args:
+        db_path: Path to project_summary.db (created if missing).
+        base_barcode: Base barcode, e.g. 'ABC12'.
+        count: Number of barcodes to reserve.
+        first_free: Lowest number the block may start at, e.g. one more than
+            the highest number already used by the project's plates.
+
+    Returns:
+        First reserved number; the block is first .. first + count - 1.
+
+    Raises:
+        ValueError: If count is less than 1.
+    """
+    if count < 1:
+        raise ValueError(f"Cannot reserve {count} barcodes for '{base_barcode}'")
+
+    table = quote_identifier(BARCODE_COUNTER_TABLE)
+
+    engine = get_engine(db_path)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                f'CREATE TABLE IF NOT EXISTS {table} '
+                f'(base_barcode TEXT PRIMARY KEY, next_number INTEGER NOT NULL)')
+            next_number = conn.exec_driver_sql(
+                f'INSERT INTO {table} (base_barcode, next_number) VALUES (?, ?) '
+                f'ON CONFLICT (base_barcode) DO UPDATE SET next_number = max(next_number, ?) + ? '
+                f'RETURNING next_number',
+                (base_barcode, int(first_free) + count, int(first_free), count)).scalar_one()
+    finally:
+        engine.dispose()
+
+    return next_number - count
+
+
+# ---------------------------------------------------------------------------
+# Schema bootstrap
+# ---------------------------------------------------------------------------
+
+def bootstrap_database(db_path, journal_mode=DEFAULT_JOURNAL_MODE):
+    """Create lookup indexes and set the journal mode of a project database.
+
+    Safe to run any number of times, on new or existing databases: indexes
+    are created with IF NOT EXISTS and only for tables/columns that exist.
+
+    Args:
+        db_path: Path to project_summary.db.
+        journal_mode: SQLite journal mode, 'WAL' (default) or 'DELETE'.
+
+    Returns:
+        List of index names present after the bootstrap.
+    """
+    engine = get_engine(db_path)
+    try:
+        with engine.connect() as conn:
+            # journal_mode cannot be changed inside a transaction
+            conn.exec_driver_sql(f'PRAGMA journal_mode = {journal_mode}')
+            conn.commit()
+
+        with engine.begin() as conn:
+            created = create_indexes(conn)
+            conn.exec_driver_sql('PRAGMA optimize')
+    finally:
+        engine.dispose()
+
+    return created
+
+
+def create_indexes(conn):
+    """Create the DATABASE_INDEXES whose table and column exist.
+
+    Args:
+        conn: Open SQLAlchemy connection.
+
+    Returns:
+        List of index names that exist after the call.
+    """
+    created = []
+    table_info = {}
+
+    for index_name, table_name, column in DATABASE_INDEXES:
+        if table_name not in table_info:
+            rows = conn.exec_driver_sql(f'PRAGMA table_info({quote_identifier(table_name)})').fetchall()
+            table_info[table_name] = {row[1]: row[5] for row in rows}
+
+        columns = table_info[table_name]
+
+        # a single-column primary key is already indexed
+        primary_key = [col for col, pk in columns.items() if pk]
+        if primary_key == [column]:
+            continue
+
+        if column in columns:
+            conn.exec_driver_sql(
+                f'CREATE INDEX IF NOT EXISTS {quote_identifier(index_name)} '
+                f'ON {quote_identifier(table_name)} ({quote_identifier(column)})')
+            created.append(index_name)
+
+    return created
+
+
+def checkpoint_database(db_path):
+    """Fold the WAL file back into the database file.
+
+    Call before copying or renaming project_summary.db so the copy contains
+    every committed transaction.  Does nothing if the database does not exist.
+    """
+    if not Path(db_path).exists():
+        return
+
+    engine = get_engine(db_path)
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        engine.dispose()
+
+
+# ---------------------------------------------------------------------------
+# SQL helpers
+# ---------------------------------------------------------------------------
+
+def quote_identifier(name):
+    """Quote a table or column name for SQLite (names may contain '/', '.' or spaces)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def column_type(series):
+    """Return the SQLite type DataFrame.to_sql gives a column.
+
+    Follows the type inference of pandas.io.sql, so project_summary keeps
+    the column types (and SQLite type affinities) the stages wrote with
+    to_sql, e.g. an object column of 1 and '' is TEXT and stores '1'.
+    """
+    inferred = pd.api.types.infer_dtype(series, skipna=True)
+
+    if inferred in ('datetime64', 'datetime'):
+        if pd.api.types.is_datetime64_any_dtype(series) and series.dt.tz is not None:
+            return 'TIMESTAMP'
+        return 'DATETIME'
+    if inferred == 'timedelta64':
+        return 'BIGINT'
+    if inferred == 'floating':
+        return 'FLOAT'
+    if inferred == 'integer':
+        dtype_name = series.dtype.name.lower()
+        if dtype_name in ('int8', 'uint8', 'int16'):
+            return 'SMALLINT'
+        if dtype_name == 'int32':
+            return 'INTEGER'
+        return 'BIGINT'
+    if inferred == 'boolean':
+        return 'BOOLEAN'
+    if inferred == 'date':
+        return 'DATE'
+    if inferred == 'time':
+        return 'TIME'
+    return 'TEXT'
+
+
+def create_table_sql(df, table_name=PROJECT_SUMMARY_TABLE, key=PROJECT_SUMMARY_KEY):
+    """Return the CREATE TABLE statement for a project summary DataFrame."""
+    column_defs = [f'{quote_identifier(col)} {column_type(df[col])}'
+                   for col in df.columns]
+
+    if key in df.columns:
+        column_defs.append(f'PRIMARY KEY ({quote_identifier(key)})')
+
+    return f'CREATE TABLE {quote_identifier(table_name)} (\n    ' + ',\n    '.join(column_defs) + '\n)'
+
+
+def table_column_names(conn, table_name):
+    """Return the column names of a table ([] if the table does not exist)."""
+    return list(table_column_types(conn, table_name))
+
+
+def table_column_types(conn, table_name):
+    """Return {column: declared type} of a table in column order ({} if it does not exist)."""
+    rows = conn.exec_driver_sql(f'PRAGMA table_info({quote_identifier(table_name)})').fetchall()
+    return {row[1]: row[2] for row in rows}
+
+
+def _insert_rows(conn, df, table_name=PROJECT_SUMMARY_TABLE):
+    """Insert all rows of a DataFrame with one executemany call."""
+    if df.empty:
+        return
+
+    columns = ', '.join(quote_identifier(col) for col in df.columns)
+    placeholders = ', '.join('?' for _ in df.columns)
+    rows = list(zip(*(_python_values(df[col]) for col in df.columns)))
+
+    conn.exec_driver_sql(
+        f'INSERT INTO {quote_identifier(table_name)} ({columns}) VALUES ({placeholders})', rows)
+
+
+def _upsert_rows(conn, df, key_columns, table_name):
+    """Insert rows, or update the non-key columns of existing rows that changed.
+
+    Returns:
+        Number of rows inserted or updated.
+    """
+    columns = list(df.columns)
+    value_columns = [col for col in columns if col not in key_columns]
+
+    statement = (f'INSERT INTO {quote_identifier(table_name)} '
+                 f'({", ".join(quote_identifier(col) for col in columns)}) '
+                 f'VALUES ({", ".join("?" for _ in columns)}) '
+                 f'ON CONFLICT ({", ".join(quote_identifier(col) for col in key_columns)}) ')
+    if value_columns:
+        statement += ('DO UPDATE SET '
+                      + ', '.join(f'{quote_identifier(col)} = excluded.{quote_identifier(col)}'
+                                  for col in value_columns)
+                      + ' WHERE '
+                      + ' OR '.join(f'{quote_identifier(col)} IS NOT excluded.{quote_identifier(col)}'
+                                    for col in value_columns))
+    else:
+        statement += 'DO NOTHING'
+
+    rows = list(zip(*(_python_values(df[col]) for col in columns)))
+
+    return conn.exec_driver_sql(statement, rows).rowcount
+
+
+def _python_values(series):
+    """Convert a Series to a list of values sqlite3 can bind (NaN -> None)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    values = series.astype(object).where(series.notna(), None).tolist()
+
+    return [v.item() if isinstance(v, np.generic) else v for v in values]
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def main():
+    """Run database maintenance commands from the command line."""
+    parser = argparse.ArgumentParser(description='Project database maintenance.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    bootstrap_parser = subparsers.add_parser(
+        'bootstrap', help='create lookup indexes and enable WAL journaling')
+    bootstrap_parser.add_argument(
+        'db_path', nargs='?', default=DATABASE_NAME,
+        help=f'database file (default: ./{DATABASE_NAME})')
+    bootstrap_parser.add_argument(
+        '--journal-mode', default=DEFAULT_JOURNAL_MODE, choices=['WAL', 'DELETE'],
+        help='journal mode; use DELETE on network file systems without WAL support')
+
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"FATAL ERROR: Database file not found: {args.db_path}")
+        sys.exit(1)
+
+    indexes = bootstrap_database(args.db_path, journal_mode=args.journal_mode)
+
+    print(f"✅ Bootstrapped {args.db_path} ({args.journal_mode} journal, {len(indexes)} indexes)")
+    for index_name in indexes:
+        print(f"  - {index_name}")
+
+
+if __name__ == '__main__':
+    main()
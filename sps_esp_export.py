@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ESP smear file export for the conclude stage.
+
+ESP takes one smear file per library plate.  smear_table() derives every
+smear column for all libraries at once (QC Result and Failure Mode with
+np.where instead of a row-wise apply), write_smear_files() splits the table
+into plates in one pass and writes the plate files through the
+sps_plate_files thread pool, and write_smear_bundles() optionally packs the
+plate files into one zip upload bundle per pooling batch (a fixed number of
+consecutive library plates), so a batch is uploaded as a single file.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import numpy as np
+
+from sps_plate_files import WRITE_WORKERS, write_plate_files
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+PLATE_COLUMN = 'Destination_Plate_Barcode'
+
+# ESP smear file column -> project_summary column it is taken from
+SMEAR_SOURCE_COLUMNS = {
+    'Well': 'Destination_Well',
+    'Sample ID': 'Illumina Library',
+    'ng/uL': 'Pool_DNA_conc_ng/uL',
+    'nmole/L': 'Pool_nmole/L',
+    'Avg. Size': 'Pool_Avg. Size',
+    'Index Name': 'Pool_Illumina_index',
+}
+
+# ESP smear file columns with the same value for every library
+SMEAR_CONSTANTS = {
+    'Range': '400 bp to 800 bp',
+    '%Total': 15,
+    '%CV': 20,
+    'Volume uL': 20,
+    'PCR Cycles': 12,
+}
+
+SMEAR_FILE_COLUMNS = ['Well', 'Sample ID', 'Range', 'ng/uL', '%Total', 'nmole/L', 'Avg. Size',
+                      '%CV', 'Volume uL', 'QC Result', 'Failure Mode', 'Index Name', 'PCR Cycles']
+
+SMEAR_FILE_PREFIX = 'ESP_smear_file_for_upload_'
+
+BUNDLE_FILE_PREFIX = 'ESP_smear_upload_batch_'
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def smear_table(final_df):
+    """Derive the ESP smear columns of every library.
+
+    Args:
+        final_df: project_summary data with the Pool_* columns and
+            Total_passed_attempts.
+
+    Returns:
+        pd.DataFrame: SMEAR_FILE_COLUMNS plus Destination_Plate_Barcode,
+        one row per library in final_df order.  Libraries that passed at
+        least one attempt are 'Pass'; the others are 'Fail' with failure
+        mode 'Sample Problem'.
+    """
+    smear_df = final_df[list(SMEAR_SOURCE_COLUMNS.values())].set_axis(list(SMEAR_SOURCE_COLUMNS), axis=1)
+
+    for col, value in SMEAR_CONSTANTS.items():
+        smear_df[col] = value
+
+    passed = (final_df['Total_passed_attempts'] >= 1).to_numpy()
+    smear_df['QC Result'] = np.where(passed, 'Pass', 'Fail').astype(object)
+    smear_df['Failure Mode'] = np.where(passed, '', 'Sample Problem').astype(object)
+
+    smear_df[PLATE_COLUMN] = final_df[PLATE_COLUMN]
+
+    return smear_df[SMEAR_FILE_COLUMNS + [PLATE_COLUMN]]
+
+
+def smear_file_name(plate):
+    """File name of a plate's ESP smear file."""
+    return f'{SMEAR_FILE_PREFIX}{plate}.csv'
+
+
+def _smear_file(plate, plate_df):
+    return plate_df[SMEAR_FILE_COLUMNS], smear_file_name(plate), {'index': False}
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def write_smear_files(smear_df, out_dir, workers=WRITE_WORKERS):
+    """Write one ESP smear file per library plate.
+
+    Args:
+        smear_df: Result of smear_table().
+        out_dir: Output folder.
+        workers: Number of writer threads.
+
+    Returns:
+        list: Paths of the written files, in order of first appearance of
+        the plates.
+    """
+    return write_plate_files([(smear_df, PLATE_COLUMN, out_dir, _smear_file)], workers=workers)
+
+
+def write_smear_bundles(smear_files, out_dir, plates_per_bundle, workers=WRITE_WORKERS):
+    """Zip the plate smear files into one upload bundle per pooling batch.
+
+    Batches are plates_per_bundle consecutive plate files.  Bundles left by
+    an earlier export are removed first, so the folder only holds the
+    bundles of this export.
+
+    Args:
+        smear_files: Paths from write_smear_files(), in plate order.
+        out_dir: Folder for the zip files.
+        plates_per_bundle: Number of plates per pooling batch (at least 1).
+        workers: Number of threads compressing bundles.
+
+    Returns:
+        list: Paths of the zip files (ESP_smear_upload_batch_01.zip, ...).
+
+    Raises:
+        ValueError: If plates_per_bundle is less than 1.
+    """
+    if plates_per_bundle < 1:
+        raise ValueError(f"plates per upload bundle must be at least 1, got {plates_per_bundle}")
+
+    out_dir = Path(out_dir)
+    for old_bundle in out_dir.glob(f'{BUNDLE_FILE_PREFIX}*.zip'):
+        if re.fullmatch(rf'{BUNDLE_FILE_PREFIX}\d+\.zip', old_bundle.name):
+            old_bundle.unlink()
+
+    smear_files = [Path(path) for path in smear_files]
+    batches = [smear_files[i:i + plates_per_bundle] for i in range(0, len(smear_files), plates_per_bundle)]
+    width = max(2, len(str(len(batches))))
+
+    bundles = [(out_dir / f'{BUNDLE_FILE_PREFIX}{n:0{width}d}.zip', batch)
+               for n, batch in enumerate(batches, start=1)]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(executor.map(lambda bundle: _write_bundle(*bundle), bundles))
+
+
+def _write_bundle(zip_path, files):
+    with ZipFile(zip_path, 'w', compression=ZIP_DEFLATED) as zf:
+        for path in files:
+            zf.write(path, arcname=path.name)
+    return zip_path
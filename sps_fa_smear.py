@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared Fragment Analyzer (FA) smear file parser.
+
+Both FA analysis scripts (SPS_first_FA_output_analysis_NEW.py and
+SPS_second_FA_output_analysis_NEW.py) read the "Smear Analysis Result.csv"
+files exported by the Fragment Analyzer.  This module parses a whole batch
+of those files in a single pass:
+
+1. Every file is read with explicit dtypes and only the needed columns
+2. All files are concatenated into one DataFrame
+3. Control wells (empty / ladder / LibStd) are removed with one combined,
+   case-insensitive regex
+4. Sample IDs are split once into destination plate, sample and well
+
+Column names can be prefixed (e.g. "Redo_") so the same parser serves the
+first and second library attempts.
+
+It also discovers the smear files in an FA result directory
+(<result dir>/<run folder>/<FA plate folder>/...Smear Analysis Result.csv)
+with a single os.scandir pass and copies them into the result directory,
+optionally with a thread pool for slow network shares.
+"""
+
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sps_cache import cached_frame
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+SMEAR_FILE_SUFFIX = 'Smear Analysis Result.csv'
+
+SMEAR_COLUMNS = ['Well', 'Sample ID', 'ng/uL', 'nmole/L', 'Avg. Size']
+
+SMEAR_DTYPES = {
+    'Well': str,
+    'Sample ID': str,
+    'ng/uL': 'float64',
+    'nmole/L': 'float64',
+    'Avg. Size': 'float64',
+}
+
+# FA wells that are not libraries: empty wells, size ladder and library standards
+CONTROL_SAMPLE_PATTERN = r'empty|ladder|LibStd'
+
+SMEAR_VALUE_COLUMNS = ['ng/uL', 'nmole/L', 'Avg. Size']
+
+_SMEAR_CACHE_KIND = 'fa_smear:' + ','.join(f'{col}={dtype}' for col, dtype in SMEAR_DTYPES.items())
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def read_smear_file(fa_path):
+    """Read the columns used for library QC from one FA smear file.
+
+    Args:
+        fa_path: Path to a "Smear Analysis Result.csv" file (or a renamed copy).
+
+    Returns:
+        pandas.DataFrame with the SMEAR_COLUMNS, read with SMEAR_DTYPES
+        (from the parsed-input cache when it is on, see sps_cache).
+    """
+    return cached_frame(fa_path, _SMEAR_CACHE_KIND,
+                        lambda path: pd.read_csv(path, usecols=SMEAR_COLUMNS, dtype=SMEAR_DTYPES))
+
+
+def parse_smear_files(fa_paths, prefix=''):
+    """Parse a batch of FA smear files into one library-level DataFrame.
+
+    Args:
+        fa_paths: Ordered list of smear CSV paths.
+        prefix: Prefix added to every output column, '' for the first
+            library attempt and 'Redo_' for the second.
+
+    Returns:
+        Tuple (fa_df, fa_dest_plates):
+            fa_df: One row per library with columns {prefix}FA_Well,
+                {prefix}ng/uL, {prefix}nmole/L, {prefix}Avg. Size and
+                {prefix}FA_Sample, in file order.
+            fa_dest_plates: Destination plates found in each file, in file
+                order (one entry per plate per file).
+
+    Raises:
+        ValueError: If a library Sample ID does not split into exactly
+            <plate>_<sample>_<well>.
+    """
+    frames = [read_smear_file(fa_path) for fa_path in fa_paths]
+
+    if not frames:
+        return pd.DataFrame(columns=_output_columns(prefix)), []
+
+    # remember which file each row came from so plates can be listed per file
+    file_index = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+
+    fa_df = pd.concat(frames, ignore_index=True)
+
+    # one combined case-insensitive scan for all control wells.  Rows with a
+    # missing Sample ID are treated as controls, as they were before
+    is_control = fa_df['Sample ID'].str.contains(
+        CONTROL_SAMPLE_PATTERN, case=False, regex=True, na=True).to_numpy(dtype=bool)
+
+    fa_df = fa_df.loc[~is_control].reset_index(drop=True)
+    file_index = file_index[~is_control]
+
+    # single split of Sample ID into destination plate, sample and well
+    id_parts = fa_df['Sample ID'].str.split('_', expand=True)
+
+    if not fa_df.empty and id_parts.shape[1] != 3:
+        bad_ids = fa_df.loc[id_parts.notna().sum(axis=1) != 3, 'Sample ID']
+        bad_files = sorted({Path(fa_paths[i]).name for i in file_index[bad_ids.index]})
+        raise ValueError(
+            f"FA Sample IDs must have the form <plate>_<sample>_<well>. "
+            f"Unexpected IDs {bad_ids.tolist()[:5]} in {bad_files}")
+
+    fa_df['FA_Well'] = fa_df['Well'].str.replace(':', '')
+
+    fa_df['FA_Sample'] = id_parts[1].astype(str) if not fa_df.empty else pd.Series(dtype=str)
+
+    fa_df[SMEAR_VALUE_COLUMNS] = fa_df[SMEAR_VALUE_COLUMNS].fillna(0).astype(float)
+
+    # destination plates listed per file in file order, as the scripts expect
+    if fa_df.empty:
+        fa_dest_plates = []
+    else:
+        plate_per_file = pd.DataFrame({'file': file_index, 'plate': id_parts[0]})
+        fa_dest_plates = plate_per_file.drop_duplicates()['plate'].tolist()
+
+    fa_df = fa_df[['FA_Well'] + SMEAR_VALUE_COLUMNS + ['FA_Sample']]
+
+    fa_df.columns = _output_columns(prefix)
+
+    return fa_df, fa_dest_plates
+
+
+def _output_columns(prefix):
+    """Return the parser output column names with the given prefix."""
+    return [f'{prefix}{col}' for col in ['FA_Well'] + SMEAR_VALUE_COLUMNS + ['FA_Sample']]
+
+
+# ---------------------------------------------------------------------------
+# Discovery and copy
+# ---------------------------------------------------------------------------
+
+def find_smear_files(result_dir):
+    """Find smear files in every FA plate folder below an FA result directory.
+
+    The directory is expected to contain one folder per FA run, each holding
+    one folder per FA plate.  Folders are visited in name order so the result
+    (and everything merged downstream) is deterministic.
+
+    Args:
+        result_dir: FA result directory, e.g. B_first_attempt_fa_result.
+
+    Returns:
+        List of (plate_dir, smear_paths) tuples, one per FA plate folder,
+        where smear_paths is the name-sorted list of smear files found in it
+        (possibly empty).
+    """
+    plate_folders = []
+
+    for run_entry in _sorted_subdirs(result_dir):
+        for plate_entry in _sorted_subdirs(run_entry.path):
+            with os.scandir(plate_entry.path) as entries:
+                smear_paths = sorted(
+                    Path(entry.path) for entry in entries
+                    if entry.name.endswith(SMEAR_FILE_SUFFIX) and entry.is_file())
+
+            plate_folders.append((Path(plate_entry.path), smear_paths))
+
+    return plate_folders
+
+
+def fa_plate_name(plate_dir):
+    """Return the FA plate name encoded in an FA plate folder name."""
+    return Path(plate_dir).name.split(' ')[0]
+
+
+def copy_smear_files(smear_jobs, dest_dir, workers=1):
+    """Validate and copy smear files into dest_dir as <FA plate name>.csv.
+
+    Each file is read once: its bytes are checked against the FA plate folder
+    name (Sample IDs must start with the plate name, which carries an extra
+    'F' in the folder name) and then written to the destination.  With
+    workers > 1 the files are handled concurrently.  If several files map to
+    the same destination the last one wins, as with a serial copy.
+
+    Args:
+        smear_jobs: Ordered list of (plate_dir, smear_path) tuples.
+        dest_dir: Directory that receives the renamed copies.
+        workers: Number of threads used for reading and copying.
+
+    Returns:
+        List of destination file names in the same order as smear_jobs.
+
+    Raises:
+        ValueError: If a folder name does not match the Sample IDs of its file.
+        OSError: If a file cannot be read or written.
+    """
+    dest_dir = Path(dest_dir)
+    dest_names = [f'{fa_plate_name(plate_dir)}.csv' for plate_dir, _ in smear_jobs]
+
+    # only the last job writing to a destination may copy, so concurrent
+    # jobs never write the same file
+    last_writer = {name: i for i, name in enumerate(dest_names)}
+
+    def copy_one(i):
+        plate_dir, smear_path = smear_jobs[i]
+        data = Path(smear_path).read_bytes()
+        check_plate_name(data, fa_plate_name(plate_dir))
+        if last_writer[dest_names[i]] == i:
+            (dest_dir / dest_names[i]).write_bytes(data)
+        return dest_names[i]
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map() keeps results in job order
+            return list(executor.map(copy_one, range(len(smear_jobs))))
+
+    return [copy_one(i) for i in range(len(smear_jobs))]
+
+
+def check_plate_name(smear_data, folder_name):
+    """Check an FA plate folder name against the Sample IDs in its smear file.
+
+    Args:
+        smear_data: Raw bytes of a smear CSV file.
+        folder_name: FA plate name parsed from the folder name.
+
+    Raises:
+        ValueError: If no Sample ID belongs to the FA plate.
+    """
+    sample_ids = pd.read_csv(io.BytesIO(smear_data), usecols=['Sample ID'],
+                             dtype={'Sample ID': str})['Sample ID'].dropna()
+
+    plate_names = set(sample_ids.str.split('_').str[0] + 'F')
+
+    if folder_name not in plate_names:
+        raise ValueError(
+            f'Mismatch between FA plate ID and sample names for plate {folder_name}')
+
+
+def _sorted_subdirs(path):
+    """Return the subdirectory entries of path sorted by name."""
+    with os.scandir(path) as entries:
+        return sorted((entry for entry in entries if entry.is_dir()), key=lambda e: e.name)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Input CSV classification by header for the SPS scripts.
+
+The scripts find their input files (sample metadata, grid tables, ...) by
+looking at the column headers of the CSV files in a folder.  Project folders
+also hold large exported CSVs, so read_csv_headers() reads only the first
+CSV record of each file (UTF-8, with or without BOM) instead of parsing the
+whole file.
+
+Headers are cached in one small index, input_index.json in the project's
+.sps_cache/ folder (sps_cache), keyed by folder, file name, modification time
+and size, so a file is only read again after it changed.  Nothing is written
+into the scanned folders.  The index is a cache: it is only used while a
+stage has called sps_cache.enable_cache() (and SPS_NO_CACHE is not set), it
+is rebuilt when it is missing or unreadable, and a cache folder that cannot
+be written just goes without one.
+
+file_role() identifies what a header belongs to:
+
+    sample_metadata   sample_metadata.csv for the label / folder script
+    grid_table        library grid table for library creation
+    kinetics_summary  <plate>_amplification_kinetics_summary.csv (WGA results)
+    fa_smear          Fragment Analyzer "Smear Analysis Result.csv"
+"""
+
+import csv
+import io
+import json
+import os
+from pathlib import Path
+
+from sps_cache import current_cache_dir
+from sps_fa_smear import SMEAR_COLUMNS
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+ROLE_SAMPLE_METADATA = 'sample_metadata'
+ROLE_GRID_TABLE = 'grid_table'
+ROLE_KINETICS_SUMMARY = 'kinetics_summary'
+ROLE_FA_SMEAR = 'fa_smear'
+
+# Columns a header must contain for each role, in the order file_role() tries them
+ROLE_COLUMNS = {
+    ROLE_SAMPLE_METADATA: ['Proposal', 'Group_or_abrvSample', 'Sample_full', 'Number_of_sorted_plates'],
+    ROLE_GRID_TABLE: ['Well', 'Library Plate Label', 'Illumina Library', 'Library Plate Container Barcode',
+                      'Nucleic Acid ID'],
+    ROLE_KINETICS_SUMMARY: ['Plate_ID', 'Well', 'Pass_Fail'],
+    ROLE_FA_SMEAR: list(SMEAR_COLUMNS),
+}
+
+# header index inside the sps_cache folder
+INDEX_FILE_NAME = 'input_index.json'
+
+# bump when the cached header format changes; older indexes are ignored
+INDEX_VERSION = 2
+
+
+# ---------------------------------------------------------------------------
+# Headers
+# ---------------------------------------------------------------------------
+
+def read_header(path):
+    """Read the column names of a CSV file from its first non-blank record.
+
+    Args:
+        path: CSV file, UTF-8 with or without BOM.
+
+    Returns:
+        list: Column names as written (not stripped).
+
+    Raises:
+        ValueError: If the file has no header record.
+        OSError, UnicodeDecodeError, csv.Error: If the file cannot be read.
+    """
+    with open(path, 'rb') as f:
+        lines = []
+        for line in f:
+            lines.append(line)
+            record = _parse_record(b''.join(lines), strict=True)
+            if record is None:
+                # a quoted column name continues on the next line
+                continue
+            if record:
+                return record
+            # blank lines before the header are skipped, as read_csv does
+            lines = []
+
+        if lines:
+            record = _parse_record(b''.join(lines), strict=False)
+            if record:
+                return record
+
+    raise ValueError(f"No columns to parse from file {path}")
+
+
+def _parse_record(data, strict):
+    """Parse the first CSV record of data (None if a quoted field is unfinished)."""
+    text = io.StringIO(data.decode('utf-8-sig'), newline='')
+    try:
+        return next(csv.reader(text, strict=strict), [])
+    except csv.Error:
+        return None
+
+
+def read_csv_headers(paths):
+    """Read the headers of several CSV files through the header index.
+
+    Args:
+        paths: Iterable of CSV file paths.
+
+    Returns:
+        dict: Path -> list of column names, or the exception raised while
+        reading that file.
+    """
+    paths = [Path(p) for p in paths]
+    headers = {}
+
+    cache_dir = current_cache_dir()
+    folders = _load_index(cache_dir) if cache_dir is not None else {}
+    changed = False
+
+    by_folder = {}
+    for path in paths:
+        by_folder.setdefault(path.parent, []).append(path)
+
+    for folder, folder_paths in by_folder.items():
+        folder_key = _folder_key(folder)
+        index = folders.get(folder_key)
+        if not isinstance(index, dict):
+            index = {}
+
+        for path in folder_paths:
+            try:
+                stat = path.stat()
+                entry = index.get(path.name)
+                if (isinstance(entry, dict) and isinstance(entry.get('header'), list)
+                        and entry.get('mtime_ns') == stat.st_mtime_ns and entry.get('size') == stat.st_size):
+                    headers[path] = list(entry['header'])
+                    continue
+
+                headers[path] = read_header(path)
+                index[path.name] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                                    'header': headers[path]}
+                changed = True
+            except (OSError, UnicodeDecodeError, ValueError, csv.Error) as e:
+                headers[path] = e
+                changed = index.pop(path.name, None) is not None or changed
+
+        # drop entries of files that no longer exist
+        stale = [name for name in index if not (folder / name).exists()]
+        for name in stale:
+            del index[name]
+        changed = changed or bool(stale)
+
+        if index:
+            folders[folder_key] = index
+        else:
+            changed = folders.pop(folder_key, None) is not None or changed
+
+    # drop folders that no longer exist
+    gone = [key for key in folders if not Path(key).is_dir()]
+    for key in gone:
+        del folders[key]
+
+    if cache_dir is not None and (changed or gone):
+        _save_index(cache_dir, folders)
+
+    return headers
+
+
+# ---------------------------------------------------------------------------
+# Roles
+# ---------------------------------------------------------------------------
+
+def missing_columns(header, role):
+    """Return the required columns of a role that are not in header."""
+    return [col for col in ROLE_COLUMNS[role] if col not in header]
+
+
+def file_role(header):
+    """Identify the input file a header belongs to.
+
+    Args:
+        header: List of column names.
+
+    Returns:
+        str: The first role in ROLE_COLUMNS whose columns are all present,
+        or None.
+    """
+    for role in ROLE_COLUMNS:
+        if not missing_columns(header, role):
+            return role
+    return None
+
+
+def classify_csv_files(paths):
+    """Return {path: role} for CSV files (None if unreadable or unknown)."""
+    return {path: (None if isinstance(header, Exception) else file_role(header))
+            for path, header in read_csv_headers(paths).items()}
+
+
+# ---------------------------------------------------------------------------
+# Header index
+# ---------------------------------------------------------------------------
+
+def _folder_key(folder):
+    """Return the index key of a scanned folder (its absolute path)."""
+    return str(Path(folder).resolve())
+
+
+def _load_index(cache_dir):
+    """Return {folder key: {file name: entry}} ({} if there is no usable index)."""
+    try:
+        data = json.loads((cache_dir / INDEX_FILE_NAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+        return {}
+
+    folders = data.get('folders')
+    return dict(folders) if isinstance(folders, dict) else {}
+
+
+def _save_index(cache_dir, folders):
+    """Write the index atomically; a cache folder that cannot be written is skipped."""
+    index_path = cache_dir / INDEX_FILE_NAME
+    tmp_path = cache_dir / f'{INDEX_FILE_NAME}.{os.getpid()}.tmp'
+    try:
+        cache_dir.mkdir(exist_ok=True)
+        tmp_path.write_text(json.dumps({'version': INDEX_VERSION, 'folders': folders}), encoding='utf-8')
+        os.replace(tmp_path, index_path)
+    except OSError:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
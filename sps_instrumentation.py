@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-stage timing and memory profiles for the SPS pipeline stages.
+
+Every stage script wraps its main() with @instrument_stage.  A run then
+writes .workflow_status/<script>_<date>.profile.json next to the stage's
+success marker with:
+
+- wall time, exit status and memory peak of the whole run
+- the project files read and written and the SQLite databases opened
+  (counted with an audit hook on open(), os.rename/os.remove and
+  sqlite3.connect; files outside the project folder, such as Python
+  modules, are not counted)
+- one entry per step: the stage's main functions are decorated with
+  @profile_step (or use it as a context manager), which records wall
+  time, rows (length of a returned DataFrame, or set step.rows), files
+  and memory peak of each step.  Nested steps have a larger depth.
+
+By default the memory peak is the process's maximum resident set size
+(getrusage ru_maxrss), which costs nothing to read.  It includes the
+interpreter and imported libraries and never goes down, so a step's peak
+is the highest RSS reached by the end of that step.  tracemalloc gives the
+peak of Python allocations per step instead, but slows a stage down
+several times, so it is only started on request.
+
+Environment switches (set them for one run or in the batch runner):
+
+- SPS_PROFILE=1: also dump a cProfile of the run to
+  .workflow_status/<script>_<date>.prof (read with pstats or snakeviz)
+- SPS_QUIET=1: suppress the per-file progress lines printed with detail()
+- SPS_TRACE_MEMORY=1: measure memory peaks with tracemalloc (Python
+  allocations per step; makes the stage several times slower)
+"""
+
+import cProfile
+import functools
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from sps_parameters import TRUE_VALUES
+
+try:
+    import resource
+    HAVE_RESOURCE = True
+except ImportError:
+    # not available on Windows: no memory peaks without tracemalloc
+    HAVE_RESOURCE = False
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+STATUS_DIR = Path('.workflow_status')
+
+PROFILE_ENV = 'SPS_PROFILE'
+
+QUIET_ENV = 'SPS_QUIET'
+
+TRACE_MEMORY_ENV = 'SPS_TRACE_MEMORY'
+
+PROFILE_SUFFIX = '.profile.json'
+
+# memory peak source recorded in the profile ('memory')
+MEMORY_TRACEMALLOC = 'tracemalloc'
+MEMORY_MAX_RSS = 'max_rss'
+
+CPROFILE_SUFFIX = '.prof'
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+
+# profile of the running stage (None when no stage is instrumented)
+_run = None
+
+_audit_hook_installed = False
+
+
+# ---------------------------------------------------------------------------
+# Switches
+# ---------------------------------------------------------------------------
+
+def is_quiet():
+    """True if per-file progress lines are suppressed (SPS_QUIET)."""
+    return os.environ.get(QUIET_ENV, '').lower() in TRUE_VALUES
+
+
+def detail(message):
+    """Print a per-file progress line unless SPS_QUIET is set."""
+    if not is_quiet():
+        print(message)
+
+
+def _cprofile_requested():
+    return os.environ.get(PROFILE_ENV, '').lower() in TRUE_VALUES
+
+
+def _trace_memory():
+    return os.environ.get(TRACE_MEMORY_ENV, '').lower() in TRUE_VALUES
+
+
+# ---------------------------------------------------------------------------
+# Steps
+# ---------------------------------------------------------------------------
+
+class profile_step:
+    """Record one step of the running stage.
+
+    Use as a decorator (the step is named after the function and rows is
+    taken from a returned DataFrame) or as a context manager:
+
+        with profile_step('write plate files') as step:
+            ...
+            step.rows = len(df)
+
+    Does nothing when no stage is instrumented.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.rows = None
+        self._entry = None
+
+    def __call__(self, func):
+        name = self.name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _run is None:
+                return func(*args, **kwargs)
+
+            with profile_step(name) as step:
+                result = func(*args, **kwargs)
+                step.rows = _row_count(result)
+            return result
+
+        return wrapper
+
+    def __enter__(self):
+        if _run is not None:
+            self._entry = _run.start_step(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._entry is not None:
+            _run.end_step(self._entry, self.rows)
+            self._entry = None
+        return False
+
+
+def _row_count(result):
+    """Rows of a step result: a DataFrame, or the first DataFrame of a tuple/list."""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    if isinstance(result, (tuple, list)):
+        for item in result:
+            if isinstance(item, (pd.DataFrame, pd.Series)):
+                return len(item)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def instrument_stage(func):
+    """Decorate a stage script's main() to write a profile of every run.
+
+    The profile is written when main() returns, exits with sys.exit() or
+    raises; the outcome is kept as status 'completed', 'exited' (with the
+    exit code) or 'failed'.  If a stage is already instrumented (e.g. the
+    workflow runner calls another stage's main), the call is recorded as a
+    step instead.
+    """
+    stage = Path(inspect.getfile(func)).stem
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _run
+
+        if _run is not None:
+            return profile_step(stage)(func)(*args, **kwargs)
+
+        _run = _StageRun(stage)
+        try:
+            result = func(*args, **kwargs)
+        except SystemExit as e:
+            _run.finish('exited', exit_code=e.code)
+            raise
+        except BaseException as e:
+            _run.finish('failed', error=f'{type(e).__name__}: {e}')
+            raise
+        else:
+            _run.finish('completed')
+            return result
+        finally:
+            run, _run = _run, None
+            run.write()
+
+    return wrapper
+
+
+class _StageRun:
+    """Timings, files and memory of one instrumented stage run."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.project_dir = Path.cwd()
+        self.started = datetime.now()
+        self.date = self.started.strftime("%Y_%m_%d-Time%H-%M-%S")
+        self.status = None
+        self.exit_code = None
+        self.error = None
+        self.steps = []
+
+        _install_audit_hook()
+
+        self._own_tracemalloc = _trace_memory() and not tracemalloc.is_tracing()
+        if self._own_tracemalloc:
+            tracemalloc.start()
+        self._traced = tracemalloc.is_tracing()
+        if self._traced:
+            self.memory = MEMORY_TRACEMALLOC
+        else:
+            self.memory = MEMORY_MAX_RSS if HAVE_RESOURCE else None
+
+        self._profiler = None
+        if _cprofile_requested():
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+        # the run itself is the outermost entry of the stack
+        self._root = self._new_entry(self.stage, depth=-1)
+        self._stack = [self._root]
+
+    # -- steps ---------------------------------------------------------------
+
+    def start_step(self, name):
+        parent = self._stack[-1]
+        parent['peak'] = max(parent['peak'], self._peak())
+        self._reset_peak()
+
+        entry = self._new_entry(name, depth=len(self._stack) - 1)
+        self.steps.append(entry)
+        self._stack.append(entry)
+        return entry
+
+    def end_step(self, entry, rows):
+        if not any(open_entry is entry for open_entry in self._stack[1:]):
+            return
+
+        # steps end in reverse order of starting; close any left open
+        while self._stack[-1] is not entry and len(self._stack) > 1:
+            self._close(self._stack.pop())
+
+        self._close(self._stack.pop())
+        entry['rows'] = rows
+        self._stack[-1]['peak'] = max(self._stack[-1]['peak'], entry['peak'])
+
+    def record_file(self, path, kind):
+        """Record a project file touched by all running steps ('files_read',
+        'files_written' or 'databases')."""
+        for entry in self._stack:
+            entry[kind].add(path)
+
+    # -- run -----------------------------------------------------------------
+
+    def finish(self, status, exit_code=None, error=None):
+        self.status = status
+        self.exit_code = exit_code
+        self.error = error
+
+        while len(self._stack) > 1:
+            self._close(self._stack.pop())
+        self._close(self._root)
+
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+
+    def profile(self):
+        """The run as a JSON-serializable dict."""
+        return {
+            'stage': self.stage,
+            'project_dir': str(self.project_dir),
+            'argv': sys.argv[1:],
+            'started': self.started.isoformat(timespec='seconds'),
+            'status': self.status,
+            'exit_code': self.exit_code if isinstance(self.exit_code, (int, type(None))) else str(self.exit_code),
+            'error': self.error,
+            **self._summary(self._root),
+            'memory': self.memory,
+            'cprofile': self._cprofile_path().name if self._profiler is not None else None,
+            'steps': [{'name': entry['name'], 'depth': entry['depth'], **self._summary(entry)}
+                      for entry in self.steps],
+        }
+
+    def write(self):
+        """Write the profile (and cProfile dump) to .workflow_status/."""
+        try:
+            status_dir = self.project_dir / STATUS_DIR
+            status_dir.mkdir(exist_ok=True)
+
+            if self._profiler is not None:
+                self._profiler.dump_stats(self._cprofile_path())
+
+            profile_path = status_dir / f'{self.stage}_{self.date}{PROFILE_SUFFIX}'
+            with open(profile_path, 'w') as f:
+                json.dump(self.profile(), f, indent=2)
+                f.write('\n')
+        except OSError as e:
+            print(f"WARNING: Could not write stage profile: {e}")
+            return None
+
+        return profile_path
+
+    # -- helpers -------------------------------------------------------------
+
+    def _cprofile_path(self):
+        return self.project_dir / STATUS_DIR / f'{self.stage}_{self.date}{CPROFILE_SUFFIX}'
+
+    def _new_entry(self, name, depth):
+        return {'name': name, 'depth': depth, 'start': time.perf_counter(), 'wall_s': None,
+                'rows': None, 'files_read': set(), 'files_written': set(), 'databases': set(), 'peak': 0}
+
+    def _close(self, entry):
+        entry['wall_s'] = time.perf_counter() - entry['start']
+        entry['peak'] = max(entry['peak'], self._peak())
+        self._reset_peak()
+
+    def _summary(self, entry):
+        return {
+            'wall_s': round(entry['wall_s'], 4) if entry['wall_s'] is not None else None,
+            'rows': entry['rows'],
+            'files_read': len(entry['files_read']),
+            'files_written': len(entry['files_written']),
+            'databases': sorted(entry['databases']),
+            'peak_memory_mb': round(entry['peak'] / 2**20, 2) if self.memory else None,
+        }
+
+    def _peak(self):
+        if self._traced:
+            return tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        if self.memory == MEMORY_MAX_RSS:
+            # kilobytes on Linux, bytes on macOS
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == 'darwin' else max_rss * 1024
+        return 0
+
+    @staticmethod
+    def _reset_peak():
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+
+# ---------------------------------------------------------------------------
+# File tracking
+# ---------------------------------------------------------------------------
+
+def _install_audit_hook():
+    """Install the open() audit hook once per process (hooks cannot be removed)."""
+    global _audit_hook_installed
+
+    if not _audit_hook_installed:
+        sys.addaudithook(_audit_open)
+        _audit_hook_installed = True
+
+
+def _audit_open(event, args):
+    if _run is None:
+        return
+
+    if event == 'open':
+        path, mode, flags = args
+        if mode is not None:
+            writing = any(c in mode for c in 'wax+')
+        else:
+            writing = bool(flags & _WRITE_FLAGS)
+        _record_path(path, 'files_written' if writing else 'files_read')
+
+    elif event in ('os.rename', 'os.remove'):
+        _record_path(args[1] if event == 'os.rename' else args[0], 'files_written')
+
+    elif event == 'sqlite3.connect':
+        _record_path(args[0], 'databases')
+
+
+def _record_path(path, kind):
+    """Record a path relative to the project folder; paths outside it are ignored."""
+    if not isinstance(path, (str, bytes, os.PathLike)):
+        return
+
+    path = Path(os.fsdecode(path))
+    if path.is_absolute():
+        try:
+            path = path.relative_to(_run.project_dir)
+        except ValueError:
+            # modules, libraries and other files outside the project
+            return
+
+    _run.record_file(str(path), kind)
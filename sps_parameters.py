@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Non-interactive parameter layer shared by the SPS pipeline stages.
+
+Values that the stages used to ask for with input() (the whole-plate rework
+threshold, the FA dilution factor, the experiment type, ...) are looked up in
+this order:
+
+1. Command line: --param NAME=VALUE (repeatable)
+2. Environment: SPS_<NAME>, e.g. SPS_MIN_FAILED_LIBS=10
+3. Parameters file: JSON object given with --params-file or SPS_PARAMS_FILE,
+   otherwise sps_parameters.json in the project directory (if present)
+4. The original interactive prompt
+
+With --non-interactive (or SPS_NON_INTERACTIVE=1) step 4 is replaced by the
+parameter's default, and a parameter without a default is an error.  Stages
+can therefore be chained in one unattended run.
+
+Every stage script calls add_parameter_arguments() on its argument parser and
+configure_parameters() with the parsed arguments at the start of main().
+"""
+
+import json
+import os
+from pathlib import Path
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+PARAMS_FILE_NAME = 'sps_parameters.json'
+
+ENV_PREFIX = 'SPS_'
+
+PARAMS_FILE_ENV = 'SPS_PARAMS_FILE'
+
+NON_INTERACTIVE_ENV = 'SPS_NON_INTERACTIVE'
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+
+# parameters from the command line / parameters file of the running stage
+_cli_params = {}
+_file_params = None
+_params_file = None
+_non_interactive = False
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+def add_parameter_arguments(parser):
+    """Add --param, --params-file and --non-interactive to an argument parser."""
+    parser.add_argument(
+        '--param', action='append', default=[], metavar='NAME=VALUE',
+        help='answer for a prompt, e.g. --param min_failed_libs=10 (repeatable)')
+    parser.add_argument(
+        '--params-file', type=Path,
+        help=f'JSON file with parameter values (default: {PARAMS_FILE_NAME} if present)')
+    parser.add_argument(
+        '--non-interactive', action='store_true',
+        help='never prompt; use defaults and fail on missing parameters')
+
+
+def configure_parameters(args):
+    """Configure the parameter sources from parsed command line arguments.
+
+    Args:
+        args: argparse.Namespace from a parser set up with
+            add_parameter_arguments().
+
+    Raises:
+        ValueError: If a --param value is not NAME=VALUE.
+    """
+    cli_params = {}
+    for item in args.param:
+        name, sep, value = item.partition('=')
+        if not sep or not name.strip():
+            raise ValueError(f"--param must have the form NAME=VALUE, got '{item}'")
+        cli_params[name.strip().lower()] = value
+
+    set_parameters(cli_params, params_file=args.params_file,
+                   non_interactive=args.non_interactive)
+
+
+def set_parameters(cli_params=None, params_file=None, non_interactive=False):
+    """Set the parameter sources directly (used by configure_parameters and tests).
+
+    Args:
+        cli_params: Dict of parameter values with the highest priority.
+        params_file: Path of a JSON parameters file, or None for the default.
+        non_interactive: Never prompt, even if SPS_NON_INTERACTIVE is not set.
+    """
+    global _cli_params, _file_params, _params_file, _non_interactive
+
+    _cli_params = dict(cli_params or {})
+    _params_file = params_file
+    _file_params = None
+    _non_interactive = non_interactive
+
+
+def is_non_interactive():
+    """True if prompts are disabled by the command line or the environment."""
+    return _non_interactive or os.environ.get(NON_INTERACTIVE_ENV, '').lower() in TRUE_VALUES
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+def get_parameter(name, prompt, default=None, convert=str, choices=None):
+    """Return a parameter value from the configured sources or a prompt.
+
+    Args:
+        name: Parameter name, e.g. 'min_failed_libs'.
+        prompt: Text of the interactive prompt used as the last resort.
+        default: Value used for an empty prompt answer and in
+            non-interactive mode.
+        convert: Function applied to the value, e.g. float.
+        choices: Accepted values (compared case-insensitively) for values
+            that do not come from the prompt; prompt answers are checked by
+            the calling stage as before.
+
+    Returns:
+        The converted value.
+
+    Raises:
+        ValueError: If the value cannot be converted or is not one of
+            choices, or if it is missing in non-interactive mode.
+    """
+    value, source = _lookup(name)
+
+    if value is None:
+        if is_non_interactive():
+            if default is None:
+                raise ValueError(
+                    f"Parameter '{name}' is required in non-interactive mode. Set it with "
+                    f"--param {name}=VALUE, {ENV_PREFIX}{name.upper()} or {PARAMS_FILE_NAME}")
+            value, source = default, 'default'
+        else:
+            answer = input(prompt)
+            if answer == '' and default is not None:
+                return convert(default)
+            return convert(answer)
+
+    value = str(value).strip()
+
+    if choices is not None and value.lower() not in [str(c).lower() for c in choices]:
+        raise ValueError(f"Invalid value '{value}' for parameter '{name}' from {source}. "
+                         f"Expected one of {list(choices)}")
+
+    try:
+        return convert(value)
+    except ValueError:
+        raise ValueError(f"Invalid value '{value}' for parameter '{name}' from {source}")
+
+
+def _lookup(name):
+    """Return (value, source description) of a parameter, or (None, None)."""
+    name = name.lower()
+
+    if name in _cli_params:
+        return _cli_params[name], f'--param {name}'
+
+    env_name = f'{ENV_PREFIX}{name.upper()}'
+    if env_name in os.environ:
+        return os.environ[env_name], env_name
+
+    file_params, file_path = _load_params_file()
+    if name in file_params:
+        return file_params[name], str(file_path)
+
+    return None, None
+
+
+def _load_params_file():
+    """Load the parameters file once; returns (params dict, path)."""
+    global _file_params
+
+    path = _params_file or os.environ.get(PARAMS_FILE_ENV)
+    explicit = path is not None
+    path = Path(path) if explicit else Path.cwd() / PARAMS_FILE_NAME
+
+    if _file_params is None:
+        if not path.exists():
+            if explicit:
+                raise ValueError(f"Parameters file not found: {path}")
+            _file_params = {}
+        else:
+            try:
+                with open(path) as fh:
+                    params = json.load(fh)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Parameters file {path} is not valid JSON: {e}")
+            if not isinstance(params, dict):
+                raise ValueError(f"Parameters file {path} must contain a JSON object")
+            _file_params = {str(key).lower(): value for key, value in params.items()}
+
+    return _file_params, path
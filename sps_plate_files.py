@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-plate output files (Echo, Illumina index, FA upload, FA dilution).
+
+Library creation and rework write one file per library plate for each of
+several file families.  write_plate_files() splits every family's frame
+into plates in one pass (pd.factorize + one stable argsort instead of a
+boolean mask per plate), builds each plate's file with the family's build
+function and writes all files of all families through one thread pool.
+
+A build function takes (plate, plate_df) and returns
+(output DataFrame, file name, to_csv keyword arguments).
+
+FA upload files are built from a precomputed 96-well column-major template
+(fa_upload_table) instead of merging and sorting a new 96-row frame per
+plate.  The rework stage's redo FA upload files keep their well-name order
+(A1, A10, A11, A12, A2, ...) with sort_wells=True.
+
+Files that are already rendered as text (e.g. sort plate layouts) are
+written through the same thread pool with write_text_files().
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sps_plate_geometry import WELL_INDEX_96, WELLS_96
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# threads writing plate files; to_csv spends much of its time in file I/O
+WRITE_WORKERS = 8
+
+EMPTY_WELL_NAME = 'empty_well'
+
+LADDER_WELL = 'H12'
+
+LADDER_NAME = 'ladder_1'
+
+# FA upload template: 96 wells column-major, numbered from 1
+_FA_TEMPLATE_WELLS = np.array(WELLS_96, dtype=object)
+_FA_TEMPLATE_WELLS.setflags(write=False)
+
+_FA_TEMPLATE_INDEX = pd.RangeIndex(1, len(WELLS_96) + 1)
+
+_LADDER_POSITION = WELL_INDEX_96.get_loc(LADDER_WELL)
+
+# template positions sorted by well name (A1, A10, A11, A12, A2, ...), the
+# order of the redo FA upload files
+_FA_NAME_ORDER = np.argsort(_FA_TEMPLATE_WELLS.astype(str), kind='stable')
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def split_rows_by_plate(plates):
+    """Return {plate: row positions} for a column of plate barcodes.
+
+    Plates are in order of first appearance (like Series.unique()) and row
+    positions keep the frame order within each plate.  Rows without a plate
+    are left out.
+
+    Args:
+        plates: Series or array of plate barcodes.
+
+    Returns:
+        dict: plate -> numpy array of row positions (for DataFrame.iloc).
+    """
+    codes, uniques = pd.factorize(np.asarray(plates, dtype=object))
+
+    order = np.argsort(codes, kind='stable')
+    order = order[codes[order] >= 0]
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+    return dict(zip(uniques, np.split(order, np.cumsum(counts)[:-1])))
+
+
+def fa_upload_table(wells, names, sort_wells=False):
+    """Fill the 96-well FA upload template for one plate.
+
+    Args:
+        wells: 96-well positions of the plate's libraries.
+        names: FA sample names, aligned with wells.
+        sort_wells: List the wells sorted by name (A1, A10, A11, A12, A2,
+            ...) instead of column-major.
+
+    Returns:
+        pd.DataFrame: Columns Well and name for all 96 wells in column-major
+        (or well-name) order, index 1-96.  Wells without a library are
+        'empty_well' and H12 holds the ladder.
+
+    Raises:
+        ValueError: If a well is not a 96-well position or is used twice.
+    """
+    wells = pd.Series(wells, dtype=object)
+    positions = WELL_INDEX_96.get_indexer(wells)
+
+    if (positions < 0).any():
+        raise ValueError(f"Invalid FA well position: {wells[positions < 0].iloc[0]}")
+    if len(np.unique(positions)) != len(positions):
+        raise ValueError(f"FA well used twice on one plate: {wells[wells.duplicated()].iloc[0]}")
+
+    fa_names = np.full(len(_FA_TEMPLATE_WELLS), EMPTY_WELL_NAME, dtype=object)
+    fa_names[positions] = pd.Series(names, dtype=object).fillna(EMPTY_WELL_NAME).to_numpy()
+    fa_names[_LADDER_POSITION] = LADDER_NAME
+
+    if sort_wells:
+        return pd.DataFrame({'Well': _FA_TEMPLATE_WELLS[_FA_NAME_ORDER], 'name': fa_names[_FA_NAME_ORDER]},
+                            index=_FA_TEMPLATE_INDEX)
+
+    return pd.DataFrame({'Well': _FA_TEMPLATE_WELLS, 'name': fa_names}, index=_FA_TEMPLATE_INDEX)
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def write_plate_files(families, workers=WRITE_WORKERS):
+    """Write one file per plate for every file family.
+
+    Args:
+        families: Iterable of (frame, plate column, output folder, build
+            function) tuples.  The build function is called with
+            (plate, rows of frame for that plate) and returns
+            (DataFrame, file name, to_csv keyword arguments).
+        workers: Number of writer threads.
+
+    Returns:
+        list: Paths of the written files, family by family in plate order.
+    """
+    jobs = []
+    for frame, plate_column, out_dir, build_file in families:
+        for plate, rows in split_rows_by_plate(frame[plate_column]).items():
+            jobs.append((build_file, plate, frame.iloc[rows], Path(out_dir)))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(executor.map(lambda job: _write_plate_file(*job), jobs))
+
+
+def write_text_files(files, workers=WRITE_WORKERS):
+    """Write rendered text files through a thread pool.
+
+    Args:
+        files: Iterable of (path, text) pairs.  Text is written as UTF-8
+            without newline translation.
+        workers: Number of writer threads.
+
+    Returns:
+        list: Paths of the written files, in input order.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(executor.map(lambda file: _write_text_file(*file), files))
+
+
+def _write_text_file(path, text):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    return path
+
+
+def _write_plate_file(build_file, plate, plate_df, out_dir):
+    out_df, file_name, csv_kwargs = build_file(plate, plate_df)
+    path = out_dir / file_name
+    out_df.to_csv(path, **csv_kwargs)
+    return path
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plate geometry lookup tables shared by the SPS scripts.
+
+All tables are built once at import and are read-only: well lists are
+tuples, numeric tables are numpy arrays with the writeable flag cleared,
+and name -> value tables are pandas Index objects or MappingProxyType.
+
+Wells are numbered column-major (A1, B1, ..., H1, A2, ...), the order used
+for FA upload files and Illumina index sets.  A 96-well plate stamped into
+a 384-well plate lands in one of four quadrants:
+
+    quadrant 1: A1 -> A1 (odd rows, odd columns)
+    quadrant 2: A1 -> A2 (odd rows, even columns)
+    quadrant 3: A1 -> B1 (even rows, odd columns)
+    quadrant 4: A1 -> B2 (even rows, even columns)
+
+SPS library plates use quadrant 1 (STAMP_96_TO_384 / STAMP_384_TO_96).
+
+The conversion functions take a whole column (Series or list) and convert
+it with one indexer lookup and numpy take, instead of one Python call per
+well.
+"""
+
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------------------------------------------------------
+# Tables
+# ---------------------------------------------------------------------------
+
+ROW_LETTERS_96 = 'ABCDEFGH'
+
+ROW_LETTERS_384 = 'ABCDEFGHIJKLMNOP'
+
+N_COLUMNS_96 = 12
+
+N_COLUMNS_384 = 24
+
+
+def _readonly(values, dtype=None):
+    """Return values as a numpy array that cannot be modified."""
+    array = np.array(values, dtype=dtype)
+    array.setflags(write=False)
+    return array
+
+
+def _column_major_wells(row_letters, n_columns):
+    return tuple(f'{row}{col}' for col in range(1, n_columns + 1) for row in row_letters)
+
+
+WELLS_96 = _column_major_wells(ROW_LETTERS_96, N_COLUMNS_96)
+
+WELLS_384 = _column_major_wells(ROW_LETTERS_384, N_COLUMNS_384)
+
+# well name -> position in WELLS_96 / WELLS_384 (Index.get_indexer gives -1 for unknown wells)
+WELL_INDEX_96 = pd.Index(WELLS_96)
+
+WELL_INDEX_384 = pd.Index(WELLS_384)
+
+# 1-based row and column numbers, aligned with WELLS_96 / WELLS_384
+ROWS_96 = _readonly([ROW_LETTERS_96.index(well[0]) + 1 for well in WELLS_96])
+
+COLUMNS_96 = _readonly([int(well[1:]) for well in WELLS_96])
+
+ROWS_384 = _readonly([ROW_LETTERS_384.index(well[0]) + 1 for well in WELLS_384])
+
+COLUMNS_384 = _readonly([int(well[1:]) for well in WELLS_384])
+
+# row letter -> row number (A=1, ..., P=16)
+ROW_NUMBERS = MappingProxyType({row: i + 1 for i, row in enumerate(ROW_LETTERS_384)})
+
+# quadrant -> (row offset, column offset) of the 96-well stamp in a 384-well plate
+QUADRANT_OFFSETS = MappingProxyType({1: (0, 0), 2: (0, 1), 3: (1, 0), 4: (1, 1)})
+
+# quadrant -> 384-well positions of the 96 wells, aligned with WELLS_96
+QUADRANT_WELLS_384 = MappingProxyType({
+    quadrant: _readonly([
+        f'{ROW_LETTERS_384[2 * (row - 1) + row_offset]}{2 * (col - 1) + col_offset + 1}'
+        for row, col in zip(ROWS_96, COLUMNS_96)], dtype=object)
+    for quadrant, (row_offset, col_offset) in QUADRANT_OFFSETS.items()
+})
+
+# quadrant and 96-well position of every 384-well position, aligned with WELLS_384
+QUADRANTS_384 = _readonly([2 * ((row - 1) % 2) + (col - 1) % 2 + 1
+                           for row, col in zip(ROWS_384, COLUMNS_384)])
+
+WELLS_96_OF_384 = _readonly([f'{ROW_LETTERS_96[(row - 1) // 2]}{(col - 1) // 2 + 1}'
+                             for row, col in zip(ROWS_384, COLUMNS_384)], dtype=object)
+
+# 96-well plate stamped into quadrant 1 of a 384-well plate (A1 = A1)
+STAMP_96_TO_384 = MappingProxyType(dict(zip(WELLS_96, QUADRANT_WELLS_384[1])))
+
+STAMP_384_TO_96 = MappingProxyType(dict(zip(QUADRANT_WELLS_384[1], WELLS_96)))
+
+_STAMP_INDEX_384 = pd.Index(QUADRANT_WELLS_384[1])
+
+_WELLS_96_ARRAY = _readonly(WELLS_96, dtype=object)
+
+
+# ---------------------------------------------------------------------------
+# Conversions
+# ---------------------------------------------------------------------------
+
+def _take(wells, index, table):
+    """Look wells up in index and take the matching table values.
+
+    Wells not found in index are returned unchanged, like Series.replace
+    with a dict.
+    """
+    wells = wells if isinstance(wells, pd.Series) else pd.Series(wells, dtype=object)
+    positions = index.get_indexer(wells)
+    found = positions >= 0
+
+    result = wells.astype(object)
+    result[found] = table.take(positions[found])
+
+    return result
+
+
+def stamp_96_to_384(wells):
+    """Convert 96-well positions to 384-well positions (quadrant 1).
+
+    Args:
+        wells: Series or list of 96-well positions, e.g. 'B1'.
+
+    Returns:
+        pd.Series: 384-well positions, e.g. 'C1'.  Values that are not
+            96-well positions are returned unchanged.
+    """
+    return _take(wells, WELL_INDEX_96, QUADRANT_WELLS_384[1])
+
+
+def stamp_384_to_96(wells):
+    """Convert quadrant-1 384-well positions to 96-well positions.
+
+    Args:
+        wells: Series or list of 384-well positions, e.g. 'C1'.
+
+    Returns:
+        pd.Series: 96-well positions, e.g. 'B1'.  Values that are not
+            quadrant-1 positions are returned unchanged.
+    """
+    return _take(wells, _STAMP_INDEX_384, _WELLS_96_ARRAY)
+
+
+def row_letters_to_numbers(row_letters):
+    """Convert row letters to 1-based row numbers (A=1, ..., P=16).
+
+    Args:
+        row_letters: Series or list of row letters.
+
+    Returns:
+        pd.Series: Integer row numbers.
+
+    Raises:
+        ValueError: If a value is not a row letter A-P.
+    """
+    row_letters = pd.Series(row_letters)
+    numbers = row_letters.map(ROW_NUMBERS)
+
+    invalid = numbers.isna()
+    if invalid.any():
+        raise ValueError(f"Invalid row letter: {row_letters[invalid].iloc[0]}")
+
+    return numbers.astype(int)
+
+
+def well_to_row_col(wells):
+    """Convert well positions to numeric rows and columns (384-well range).
+
+    Positions are upper-cased and stripped and may use zero-padded columns
+    ('c02' is C2).
+
+    Args:
+        wells: Series or list of well positions, e.g. 'C2'.
+
+    Returns:
+        tuple: (rows, columns) as integer Series with the index of wells.
+
+    Raises:
+        ValueError: If a value is not a well of a 384-well plate (A-P, 1-24).
+    """
+    wells = wells if isinstance(wells, pd.Series) else pd.Series(wells, dtype=object)
+
+    # non-string values become NaN here and are rejected below
+    try:
+        normalized = (wells.str.strip().str.upper()
+                      .str.replace(r'^([A-Z])0*(\d+)$', r'\1\2', regex=True))
+    except AttributeError:
+        # no string values at all
+        normalized = pd.Series(np.nan, index=wells.index)
+    positions = WELL_INDEX_384.get_indexer(normalized)
+
+    invalid = positions < 0
+    if invalid.any():
+        raise ValueError(f"Invalid well position format: {wells[invalid].iloc[0]}")
+
+    rows = pd.Series(ROWS_384.take(positions), index=wells.index)
+    columns = pd.Series(COLUMNS_384.take(positions), index=wells.index)
+
+    return rows, columns
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Optional Parquet snapshot of the project_summary table.
+
+Next to project_summary.db and project_summary.csv each stage that writes the
+database can also write project_summary.parquet, a columnar copy of the
+table as stored in the database.  Downstream stages load the snapshot
+instead of querying SQLite when it is newer than the database.  Archived
+copies of project_summary.csv are stored as zstd-compressed Parquet files.
+
+pyarrow is optional.  Without it no snapshot is written, every load reads the
+database and archives stay plain CSV files, exactly as before.
+"""
+
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from sps_archive import archive_files, archive_run_name
+from sps_database import read_project_summary
+
+try:
+    import pyarrow  # noqa: F401  (only needed by pandas' parquet engine)
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+SNAPSHOT_NAME = 'project_summary.parquet'
+
+SNAPSHOT_COMPRESSION = 'zstd'
+
+# Parquet key-value metadata listing columns that could not be stored exactly
+# (object columns mixing strings and numbers).  Such snapshots are not used
+# for loading.
+LOSSY_COLUMNS_KEY = 'sps_lossy_columns'
+
+
+# ---------------------------------------------------------------------------
+# Snapshot write / load
+# ---------------------------------------------------------------------------
+
+def snapshot_path(db_path):
+    """Return the snapshot path that belongs to a project database."""
+    return Path(db_path).with_name(SNAPSHOT_NAME)
+
+
+def refresh_project_summary_snapshot(db_path):
+    """Write project_summary.parquet from the current project_summary table.
+
+    The snapshot is written to a temporary file and moved into place, so a
+    reader never sees a partial file.
+
+    Args:
+        db_path: Path to project_summary.db.
+
+    Returns:
+        Path of the snapshot, or None when pyarrow is not installed.
+    """
+    if not HAVE_PYARROW:
+        return None
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = read_project_summary(db_path)
+
+    lossy_columns = [col for col in df.columns
+                     if df[col].dtype == object
+                     and pd.api.types.infer_dtype(df[col], skipna=True) not in ('string', 'empty')]
+
+    stored_df = df.copy()
+    for col in lossy_columns:
+        stored_df[col] = stored_df[col].map(lambda v: None if v is None else str(v))
+
+    table = pa.Table.from_pandas(stored_df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        LOSSY_COLUMNS_KEY.encode(): ','.join(lossy_columns).encode(),
+    })
+
+    path = snapshot_path(db_path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    pq.write_table(table, tmp_path, compression=SNAPSHOT_COMPRESSION)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def snapshot_is_current(db_path):
+    """True if a usable snapshot exists and is newer than the database.
+
+    The database counts as modified when either project_summary.db or its
+    WAL file changed after the snapshot was written.
+    """
+    path = snapshot_path(db_path)
+    db_path = Path(db_path)
+
+    if not (HAVE_PYARROW and path.exists() and db_path.exists()):
+        return False
+
+    db_mtime = db_path.stat().st_mtime_ns
+    wal_path = db_path.with_name(db_path.name + '-wal')
+    if wal_path.exists():
+        db_mtime = max(db_mtime, wal_path.stat().st_mtime_ns)
+
+    if path.stat().st_mtime_ns < db_mtime:
+        return False
+
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    return not metadata.get(LOSSY_COLUMNS_KEY.encode(), b'')
+
+
+def load_project_summary(db_path):
+    """Load the project_summary table, from the snapshot when it is current.
+
+    Args:
+        db_path: Path to project_summary.db.
+
+    Returns:
+        pandas.DataFrame identical to SELECT * FROM project_summary.
+    """
+    if snapshot_is_current(db_path):
+        return pd.read_parquet(snapshot_path(db_path))
+
+    return read_project_summary(db_path)
+
+
+# ---------------------------------------------------------------------------
+# Archives
+# ---------------------------------------------------------------------------
+
+def archive_project_summary_csv(csv_path, archive_dir, date, run=None):
+    """Archive project_summary.csv as archive_project_summary_{date}.
+
+    With pyarrow the CSV is stored as a zstd-compressed Parquet file in
+    which every column keeps its exact CSV text; otherwise the CSV file is
+    archived as is.  The file goes through the archive store (see
+    sps_archive.py) and the original CSV is removed in both cases.
+
+    Args:
+        csv_path: Path to the current project_summary.csv.
+        archive_dir: Archive directory (archived_files).
+        date: Timestamp string used in the archive name.
+        run: Archive run (manifest) name, default '<date>_project_summary'.
+
+    Returns:
+        Path of the archived file.
+    """
+    csv_path = Path(csv_path)
+    archive_stem = f"archive_project_summary_{date}"
+
+    if run is None:
+        run = archive_run_name('project_summary', date)
+
+    if not HAVE_PYARROW:
+        return archive_files(archive_dir, [(csv_path, f"{archive_stem}.csv")], run, move=True)[0]
+
+    csv_df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+
+    tmp_path = Path(archive_dir) / f".{archive_stem}.parquet.tmp"
+    csv_df.to_parquet(tmp_path, index=False, compression=SNAPSHOT_COMPRESSION)
+    archive_path = archive_files(archive_dir, [(tmp_path, f"{archive_stem}.parquet")], run, move=True)[0]
+    csv_path.unlink()
+
+    return archive_path
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FA pass/fail thresholds for the FA analysis scripts.
+
+A library passes when its FA molarity (nmol/L) and average fragment size
+are both above the thresholds of its plate.  A plate is reworked as a whole
+when at least min_failed_libs of its libraries failed.
+
+passed_libraries() and whole_plate_reworks() are the single-setting tests
+used by findPassFailLibs().  sweep_thresholds() evaluates a whole grid of
+(DNA conc threshold, size threshold, min_failed_libs) settings at once:
+the concentration and size tests are broadcast over all settings and
+libraries in one NumPy pass, failures are summed per plate with
+np.add.reduceat, and the result has one row per setting with the pass
+counts and the whole-plate rework set.  Running the FA analysis with
+--sweep-conc / --sweep-size / --sweep-min-failed writes this report to
+threshold_sweep.txt, so a marginal plate's thresholds can be chosen from
+one run.
+"""
+
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+CONC_THRESHOLD_COLUMN = 'DNA_conc_threshold_(nmol/L)'
+
+SIZE_THRESHOLD_COLUMN = 'Size_theshold_(bp)'
+
+MIN_FAILED_LIBS_COLUMN = 'min_failed_libs'
+
+# whole plate rework trigger when none is configured
+DEFAULT_MIN_FAILED_LIBS = 20
+
+SWEEP_FILE_NAME = 'threshold_sweep.txt'
+
+SWEEP_COLUMNS = [
+    CONC_THRESHOLD_COLUMN,
+    SIZE_THRESHOLD_COLUMN,
+    MIN_FAILED_LIBS_COLUMN,
+    'Passed_libraries',
+    'Failed_libraries',
+    'Rework_plate_count',
+    'Rework_plates',
+]
+
+
+# ---------------------------------------------------------------------------
+# Single setting
+# ---------------------------------------------------------------------------
+
+def passed_libraries(conc, size, conc_threshold, size_threshold):
+    """Return which libraries pass the molarity and size thresholds.
+
+    Missing values fail.  Thresholds may be scalars or per-library arrays.
+
+    Args:
+        conc: FA molarity (nmol/L) per library.
+        size: FA average size (bp) per library.
+        conc_threshold: DNA conc threshold(s) (nmol/L).
+        size_threshold: Size threshold(s) (bp).
+
+    Returns:
+        np.ndarray: Boolean pass flag per library.
+    """
+    return ((_as_float(conc) > _as_float(conc_threshold))
+            & (_as_float(size) > _as_float(size_threshold)))
+
+
+def whole_plate_reworks(plates, passed, min_failed_libs):
+    """Return the plates with at least min_failed_libs failed libraries.
+
+    Libraries without a plate are ignored.
+
+    Args:
+        plates: Plate barcode per library.
+        passed: Boolean pass flag per library.
+        min_failed_libs: Number of failed libraries that triggers a whole
+            plate rework.
+
+    Returns:
+        list: Sorted plate barcodes (only plates with failed libraries).
+    """
+    codes, plate_names = pd.factorize(pd.Series(plates, dtype=object))
+    failed = ~np.asarray(passed, dtype=bool) & (codes >= 0)
+    fail_counts = np.bincount(codes[failed], minlength=len(plate_names))
+
+    return sorted(plate_names[(fail_counts > 0) & (fail_counts >= min_failed_libs)])
+
+
+# ---------------------------------------------------------------------------
+# Sweeps
+# ---------------------------------------------------------------------------
+
+def sweep_thresholds(plates, conc, size, conc_thresholds, size_thresholds, min_failed_libs):
+    """Evaluate every combination of threshold settings in one pass.
+
+    Each setting applies to all plates.  Libraries without a plate are
+    ignored.
+
+    Args:
+        plates: Plate barcode per library.
+        conc: FA molarity (nmol/L) per library, before dilution correction.
+        size: FA average size (bp) per library.
+        conc_thresholds: DNA conc thresholds to try.
+        size_thresholds: Size thresholds to try.
+        min_failed_libs: Whole plate rework triggers to try.
+
+    Returns:
+        pd.DataFrame: SWEEP_COLUMNS, one row per (conc, size,
+            min_failed_libs) setting in the given order.  Rework_plates
+            lists the reworked plates comma separated.
+    """
+    conc_thresholds = _as_float(conc_thresholds).ravel()
+    size_thresholds = _as_float(size_thresholds).ravel()
+    min_failed_libs = _as_float(min_failed_libs).ravel()
+
+    codes, plate_names = pd.factorize(pd.Series(plates, dtype=object), sort=True)
+    has_plate = codes >= 0
+
+    # libraries grouped by plate, so per-plate sums are contiguous slices
+    order = np.argsort(codes[has_plate], kind='stable')
+    codes = codes[has_plate][order]
+    conc = _as_float(conc)[has_plate][order]
+    size = _as_float(size)[has_plate][order]
+
+    # (conc setting, size setting, library)
+    passed = (conc > conc_thresholds[:, None])[:, None, :] & (size > size_thresholds[:, None])[None, :, :]
+    n_passed = passed.sum(axis=2)
+
+    # (conc setting, size setting, plate)
+    if len(codes):
+        plate_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        fail_counts = np.add.reduceat(~passed, plate_starts, axis=2, dtype=np.int64)
+    else:
+        fail_counts = np.zeros(passed.shape[:2] + (0,), dtype=np.int64)
+
+    # (conc setting, size setting, min_failed_libs setting, plate)
+    reworked = ((fail_counts[:, :, None, :] >= min_failed_libs[None, None, :, None])
+                & (fail_counts[:, :, None, :] > 0))
+
+    plate_names = np.asarray(plate_names, dtype=object)
+    rows = []
+    for (i, conc_threshold), (j, size_threshold), (k, min_failed) in itertools.product(
+            enumerate(conc_thresholds), enumerate(size_thresholds), enumerate(min_failed_libs)):
+        rework_plates = plate_names[reworked[i, j, k]]
+        rows.append((conc_threshold, size_threshold, min_failed, n_passed[i, j], len(codes) - n_passed[i, j],
+                     len(rework_plates), ','.join(rework_plates)))
+
+    return pd.DataFrame(rows, columns=SWEEP_COLUMNS)
+
+
+def parse_threshold_list(value):
+    """Parse a comma separated list of threshold values (argparse type)."""
+    try:
+        values = [float(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma separated numbers, got '{value}'")
+
+    if not values:
+        raise argparse.ArgumentTypeError("expected at least one value")
+
+    return values
+
+
+def add_sweep_arguments(parser):
+    """Add the --sweep-conc, --sweep-size and --sweep-min-failed options."""
+    parser.add_argument('--sweep-conc', type=parse_threshold_list, metavar='NMOL,...',
+                        help='DNA conc thresholds (nmol/L) to compare in threshold_sweep.txt')
+    parser.add_argument('--sweep-size', type=parse_threshold_list, metavar='BP,...',
+                        help='size thresholds (bp) to compare in threshold_sweep.txt')
+    parser.add_argument('--sweep-min-failed', type=parse_threshold_list, metavar='N,...',
+                        help='failed libraries per plate that trigger a whole plate rework, '
+                             'to compare in threshold_sweep.txt')
+
+
+def sweep_requested(args):
+    """True if any sweep option was given."""
+    return any(getattr(args, name, None) for name in ('sweep_conc', 'sweep_size', 'sweep_min_failed'))
+
+
+def write_sweep_report(sweep_df, path):
+    """Write a sweep report as a tab separated file and print a summary.
+
+    Args:
+        sweep_df: Result of sweep_thresholds().
+        path: Output file (threshold_sweep.txt).
+
+    Returns:
+        Path: The written file.
+    """
+    sweep_df.to_csv(path, sep='\t', index=False)
+
+    print(f"\nThreshold sweep ({len(sweep_df)} settings, written to {path}):\n")
+    print(sweep_df.drop(columns=['Rework_plates']).to_string(index=False))
+    print()
+
+    return path
+
+
+def _as_float(values):
+    """Values as a float array (pandas Series, lists or scalars)."""
+    return np.asarray(pd.to_numeric(pd.Series(np.ravel(values)), errors='coerce'),
+                      dtype=float).reshape(np.shape(values))
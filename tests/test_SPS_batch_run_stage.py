@@ -0,0 +1,165 @@
+"""
+Tests for SPS_batch_run_stage.py
+
+Covers:
+  - read_batch_config
+  - build_environment
+  - run_batch
+  - write_label_batch
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import SPS_batch_run_stage
+from SPS_batch_run_stage import build_environment, read_batch_config, run_batch, write_label_batch
+from sps_bartender import BARTENDER_HEADER, write_label_file
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+# Stand-in stage: reads one parameter, fails for "fail", otherwise writes its
+# success marker like the real stage scripts.
+FAKE_STAGE = '''
+import os
+import sys
+from pathlib import Path
+
+assert os.environ["SPS_NON_INTERACTIVE"] == "1"
+answer = os.environ.get("SPS_THRESHOLD", "20")
+Path("answer.txt").write_text(answer)
+if answer == "fail":
+    print("FATAL ERROR: bad threshold")
+    sys.exit()
+Path(".workflow_status").mkdir(exist_ok=True)
+Path(".workflow_status/fake_stage.success").write_text("SUCCESS")
+'''
+
+
+@pytest.fixture
+def fake_stage(tmp_path, monkeypatch):
+    script_dir = tmp_path / "scripts"
+    script_dir.mkdir()
+    (script_dir / "fake_stage.py").write_text(FAKE_STAGE)
+    monkeypatch.setitem(SPS_batch_run_stage.STAGES, "fake", "fake_stage.py")
+    return script_dir
+
+
+def _project(tmp_path, name):
+    project_dir = tmp_path / name
+    project_dir.mkdir()
+    return project_dir
+
+
+# ===========================================================================
+# read_batch_config / build_environment
+# ===========================================================================
+
+class TestReadBatchConfig:
+    def test_relative_projects_resolve_against_config_folder(self, tmp_path):
+        config_path = tmp_path / "batch.json"
+        config_path.write_text(json.dumps({
+            "defaults": {"min_failed_libs": 20},
+            "projects": {"BP1": {"min_failed_libs": 5}},
+        }))
+
+        defaults, projects = read_batch_config(config_path)
+
+        assert defaults == {"min_failed_libs": 20}
+        assert projects == {(tmp_path / "BP1").resolve(): {"min_failed_libs": 5}}
+
+    def test_invalid_json_raises(self, tmp_path):
+        config_path = tmp_path / "batch.json"
+        config_path.write_text("{not json")
+
+        with pytest.raises(ValueError):
+            read_batch_config(config_path)
+
+
+class TestBuildEnvironment:
+    def test_parameters_become_sps_variables_and_prompts_are_off(self):
+        env = build_environment({"min_failed_libs": 12, "dilution_factor": 5.0})
+
+        assert env["SPS_MIN_FAILED_LIBS"] == "12"
+        assert env["SPS_DILUTION_FACTOR"] == "5.0"
+        assert env["SPS_NON_INTERACTIVE"] == "1"
+
+
+# ===========================================================================
+# run_batch
+# ===========================================================================
+
+class TestRunBatch:
+    def test_each_project_gets_its_own_answers(self, tmp_path, fake_stage):
+        project_a = _project(tmp_path, "A")
+        project_b = _project(tmp_path, "B")
+
+        report_df = run_batch("fake", {project_a: {}, project_b: {"threshold": 7}},
+                              {}, workers=2, script_dir=fake_stage)
+
+        assert report_df["status"].tolist() == ["success", "success"]
+        assert (project_a / "answer.txt").read_text() == "20"
+        assert (project_b / "answer.txt").read_text() == "7"
+
+    def test_stage_error_without_exit_code_is_reported_as_failure(self, tmp_path, fake_stage):
+        project_dir = _project(tmp_path, "A")
+
+        report_df = run_batch("fake", {project_dir: {"threshold": "fail"}}, {},
+                              script_dir=fake_stage)
+
+        row = report_df.iloc[0]
+        assert row["status"] == "failed"
+        assert row["message"] == "FATAL ERROR: bad threshold"
+        assert "FATAL ERROR" in Path(row["log_file"]).read_text()
+
+    def test_stale_success_marker_is_not_success(self, tmp_path, fake_stage):
+        project_dir = _project(tmp_path, "A")
+        (project_dir / ".workflow_status").mkdir()
+        (project_dir / ".workflow_status" / "fake_stage.success").write_text("old")
+
+        report_df = run_batch("fake", {project_dir: {"threshold": "fail"}}, {},
+                              script_dir=fake_stage)
+
+        assert report_df.iloc[0]["status"] == "failed"
+
+    def test_missing_project_folder_is_reported(self, tmp_path, fake_stage):
+        report_df = run_batch("fake", {tmp_path / "missing": {}}, {}, script_dir=fake_stage)
+
+        assert report_df.iloc[0]["message"] == "Project folder not found"
+
+
+# ===========================================================================
+# write_label_batch
+# ===========================================================================
+
+class TestWriteLabelBatch:
+    def test_label_files_of_successful_projects_are_combined(self, tmp_path, monkeypatch):
+        monkeypatch.setitem(SPS_batch_run_stage.STAGE_LABEL_FILES, "fake", "labels/BARTENDER_*.txt")
+        projects = []
+        for name in ["A", "B", "C"]:
+            project_dir = _project(tmp_path, name)
+            (project_dir / "labels").mkdir()
+            write_label_file(project_dir / "labels" / "BARTENDER_1.txt", [[f'{name}-1,"{name}-1"\r\n']])
+            projects.append(str(project_dir))
+        # only the newest label file of a project is used
+        newest = write_label_file(tmp_path / "A" / "labels" / "BARTENDER_0.txt", [['A-2,"A-2"\r\n']])
+        os.utime(newest, ns=(newest.stat().st_atime_ns, newest.stat().st_mtime_ns + 10**9))
+        report_df = pd.DataFrame({"project": projects, "status": ["success", "failed", "success"]})
+
+        label_files = write_label_batch("fake", report_df, tmp_path / "batch.txt")
+
+        assert label_files == [newest,
+                               tmp_path / "C" / "labels" / "BARTENDER_1.txt"]
+        assert (tmp_path / "batch.txt").read_bytes().decode() == (
+            BARTENDER_HEADER + 'A-2,"A-2"\r\n' + ',\r\n' + 'C-1,"C-1"\r\n' + '\r\n')
@@ -0,0 +1,142 @@
+"""
+Tests for SPS_conclude_FA_analysis_generate_ESP_smear_file.py
+
+Covers:
+  - findPoolingAttempt
+  - selectPlateForPooling (equivalence with the two-attempt nested np.where
+    selection, first-attempt-only data, more than two attempts)
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from SPS_conclude_FA_analysis_generate_ESP_smear_file import (
+    POOL_FIELDS,
+    POOL_PASSED_ONLY_FIELDS,
+    findPoolingAttempt,
+    selectPlateForPooling,
+)
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _make_attempts(attempt_prefixes, passed, seed=0):
+    """project_summary-like frame with one set of library columns per attempt."""
+    rng = np.random.default_rng(seed)
+    n = len(passed)
+    lib_df = pd.DataFrame({'sample_id': [f'S{i}' for i in range(n)]})
+
+    for a, prefix in enumerate(attempt_prefixes):
+        lib_df[f'{prefix}Passed_library'] = [row[a] for row in passed]
+        lib_df[f'{prefix}Destination_Plate_Barcode'] = [f'27-81000{a}'] * n
+        lib_df[f'{prefix}Destination_Well'] = [f'A{i + 1}' for i in range(n)]
+        lib_df[f'{prefix}Illumina_index_set'] = f'set{a}'
+        lib_df[f'{prefix}Illumina_index'] = [f'idx{a}_{i}' for i in range(n)]
+        lib_df[f'{prefix}dilution_factor'] = float(a + 1)
+        lib_df[f'{prefix}ng/uL'] = rng.uniform(1, 20, n)
+        lib_df[f'{prefix}nmole/L'] = rng.uniform(1, 20, n)
+        lib_df[f'{prefix}Avg. Size'] = rng.uniform(300, 900, n)
+
+    lib_df['Total_passed_attempts'] = np.sum(passed, axis=1)
+
+    return lib_df
+
+
+def _legacy_pool_columns(lib_df):
+    """Two-attempt nested np.where selection used by selectPlateForPooling before."""
+    pooled = {}
+    for pool_column, field in POOL_FIELDS.items():
+        values = np.where(
+            lib_df['Total_passed_attempts'] == 2,
+            lib_df[f'Redo_{field}'],
+            (np.where(lib_df['Redo_Passed_library'] == 1,
+                      lib_df[f'Redo_{field}'],
+                      lib_df[field])))
+        if pool_column in POOL_PASSED_ONLY_FIELDS:
+            values = np.where(lib_df['Total_passed_attempts'] >= 1, values, 0)
+        pooled[pool_column] = values
+    return pooled
+
+
+# ===========================================================================
+# findPoolingAttempt
+# ===========================================================================
+
+class TestFindPoolingAttempt:
+    def test_latest_passed_attempt_wins(self):
+        lib_df = _make_attempts(['', 'Redo_', 'Redo2_'],
+                                [[1, 1, 0], [0, 0, 1], [1, 0, 0], [0, 0, 0], [1, 1, 1], [0, 1, 0]])
+
+        attempt = findPoolingAttempt(lib_df, ['', 'Redo_', 'Redo2_'])
+
+        assert attempt.tolist() == [1, 2, 0, 0, 2, 1]
+
+    def test_missing_pass_results_count_as_failed(self):
+        lib_df = _make_attempts(['', 'Redo_'], [[1, 0], [0, 0]])
+        lib_df['Redo_Passed_library'] = [np.nan, np.nan]
+
+        assert findPoolingAttempt(lib_df, ['', 'Redo_']).tolist() == [0, 0]
+
+
+# ===========================================================================
+# selectPlateForPooling
+# ===========================================================================
+
+class TestSelectPlateForPooling:
+    def test_matches_legacy_two_attempt_selection(self):
+        lib_df = _make_attempts(['', 'Redo_'], [[1, 0], [0, 1], [1, 1], [0, 0]] * 5)
+
+        final_df = selectPlateForPooling(lib_df)
+
+        for pool_column, expected in _legacy_pool_columns(lib_df).items():
+            assert final_df[pool_column].dtype == expected.dtype
+            np.testing.assert_array_equal(final_df[pool_column].to_numpy(), expected)
+
+    def test_first_attempt_only_placeholders(self):
+        # handleFirstAttemptOnly() fills the Redo_ columns with ""
+        lib_df = _make_attempts(['', 'Redo_'], [[1, 0], [0, 0], [1, 0]])
+        for field in POOL_FIELDS.values():
+            lib_df[f'Redo_{field}'] = ""
+
+        final_df = selectPlateForPooling(lib_df)
+
+        for pool_column, expected in _legacy_pool_columns(lib_df).items():
+            assert final_df[pool_column].dtype == expected.dtype
+            assert final_df[pool_column].tolist() == expected.tolist()
+        assert final_df['Pool_nmole/L'].tolist()[1] == 0
+
+    def test_three_attempts(self):
+        prefixes = ['', 'Redo_', 'Redo2_']
+        lib_df = _make_attempts(prefixes, [[0, 0, 1], [1, 0, 0], [0, 0, 0]])
+
+        final_df = selectPlateForPooling(lib_df, prefixes)
+
+        assert final_df['Pool_source_plate'].tolist() == ['27-810002', '27-810000', '27-810000']
+        assert final_df['Pool_dilution_factor'].tolist() == [3.0, 1.0, 1.0]
+        assert final_df['Pool_Avg. Size'].tolist()[:2] == [lib_df.loc[0, 'Redo2_Avg. Size'],
+                                                          lib_df.loc[1, 'Avg. Size']]
+        assert final_df['Pool_Avg. Size'].tolist()[2] == 0
+
+    def test_input_is_not_modified(self):
+        lib_df = _make_attempts(['', 'Redo_'], [[1, 0]])
+        columns = list(lib_df.columns)
+
+        selectPlateForPooling(lib_df)
+
+        assert list(lib_df.columns) == columns
+
+    def test_missing_attempt_column_raises(self):
+        lib_df = _make_attempts(['', 'Redo_'], [[1, 0]]).drop(columns=['Redo_Illumina_index'])
+
+        with pytest.raises(KeyError):
+            selectPlateForPooling(lib_df)
@@ -0,0 +1,143 @@
+"""
+Tests for SPS_initiate_project_folder_and_make_sort_plate_labels.py
+
+Covers:
+  - generate_simple_barcodes
+  - validate_barcode_uniqueness
+  - load_plate_layout_template / render_plate_layout
+  - generate_plate_layout_files
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from SPS_initiate_project_folder_and_make_sort_plate_labels import (
+    EXPERIMENT_TYPE_SPS_CE,
+    SPS_LAYOUT_TEMPLATE,
+    generate_plate_layout_files,
+    generate_simple_barcodes,
+    load_plate_layout_template,
+    render_plate_layout,
+    validate_barcode_uniqueness,
+)
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _plates(names, samples=None, custom=None):
+    return pd.DataFrame({
+        'plate_name': names,
+        'sample': samples if samples is not None else ['S1'] * len(names),
+        'is_custom': custom if custom is not None else [False] * len(names),
+    })
+
+
+def _round_trip_layout(template_path, plate_name, sample):
+    """Per-plate DataFrame round trip the layout files were written with before."""
+    plate_df = pd.read_csv(template_path, encoding='utf-8-sig')
+    plate_df['Plate_ID'] = plate_name
+    plate_df['Sample'] = plate_df['Sample'].astype(object)
+    plate_df.loc[plate_df['Type'] != 'unused', 'Sample'] = sample
+    return plate_df.to_csv(index=False)
+
+
+# ===========================================================================
+# generate_simple_barcodes / validate_barcode_uniqueness
+# ===========================================================================
+
+class TestGenerateSimpleBarcodes:
+    def test_numbering_continues_after_existing_plates(self, tmp_path):
+        existing = pd.DataFrame({'barcode': ['ABC12-1', 'ABC12-7', 'ABC12-3']})
+        plates = _plates(['P-8', 'P-9'])
+
+        result = generate_simple_barcodes(plates, existing, db_path=tmp_path / 'project_summary.db')
+
+        assert result['barcode'].tolist() == ['ABC12-8', 'ABC12-9']
+        assert result['created_timestamp'].nunique() == 1
+
+    def test_numbers_reserved_by_another_run_are_skipped(self, tmp_path):
+        db_path = tmp_path / 'project_summary.db'
+        existing = pd.DataFrame({'barcode': ['ABC12-1']})
+
+        first = generate_simple_barcodes(_plates(['P-2']), existing, db_path=db_path)
+        second = generate_simple_barcodes(_plates(['Q-2', 'Q-3']), existing, db_path=db_path)
+
+        assert first['barcode'].tolist() == ['ABC12-2']
+        assert second['barcode'].tolist() == ['ABC12-3', 'ABC12-4']
+
+    def test_custom_base_barcode_for_new_project(self, tmp_path):
+        result = generate_simple_barcodes(_plates(['P-1', 'P-2']), None, 'REX12', db_path=tmp_path / 'project_summary.db')
+
+        assert result['barcode'].tolist() == ['REX12-1', 'REX12-2']
+
+
+class TestValidateBarcodeUniqueness:
+    def test_unique(self):
+        assert validate_barcode_uniqueness(pd.DataFrame({'barcode': ['A-1', 'A-2']}))
+
+    def test_duplicates_are_reported(self, capsys):
+        assert not validate_barcode_uniqueness(pd.DataFrame({'barcode': ['A-1', 'A-2', 'A-1', 'A-2', 'A-3']}))
+
+        assert "Duplicate barcodes found: ['A-1', 'A-2']" in capsys.readouterr().out
+
+
+# ===========================================================================
+# load_plate_layout_template / render_plate_layout
+# ===========================================================================
+
+class TestRenderPlateLayout:
+    @pytest.mark.parametrize("plate_name, sample", [
+        ('ABC12-1', 'SoilA'),
+        ('weird,plate', 'say "hi"'),
+        ('{brace}', float('nan')),
+    ])
+    def test_matches_dataframe_round_trip(self, plate_name, sample):
+        layout = render_plate_layout(load_plate_layout_template(SPS_LAYOUT_TEMPLATE), plate_name, sample)
+
+        assert layout == _round_trip_layout(SPS_LAYOUT_TEMPLATE, plate_name, sample)
+
+    def test_template_without_type_column_raises(self, tmp_path):
+        template = tmp_path / 'layout.csv'
+        template.write_text('Plate_ID,Well,Sample\n,A1,\n')
+
+        with pytest.raises(ValueError, match="Type"):
+            load_plate_layout_template(template)
+
+
+# ===========================================================================
+# generate_plate_layout_files
+# ===========================================================================
+
+class TestGeneratePlateLayoutFiles:
+    def test_one_file_per_standard_plate(self, tmp_path):
+        generate_plate_layout_files(_plates(['P-1', 'P-2', 'C-1'], custom=[False, False, True]),
+                                    EXPERIMENT_TYPE_SPS_CE, {'sort_plate_layouts': tmp_path})
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['P-1_plate_layout.csv', 'P-2_plate_layout.csv']
+
+    def test_existing_file_is_not_overwritten(self, tmp_path):
+        (tmp_path / 'P-2_plate_layout.csv').write_text('keep')
+
+        with pytest.raises(SystemExit):
+            generate_plate_layout_files(_plates(['P-1', 'P-2']), EXPERIMENT_TYPE_SPS_CE,
+                                        {'sort_plate_layouts': tmp_path})
+
+        # checked before anything is written
+        assert [p.name for p in tmp_path.iterdir()] == ['P-2_plate_layout.csv']
+        assert (tmp_path / 'P-2_plate_layout.csv').read_text() == 'keep'
+
+    def test_duplicate_plate_name_is_refused(self, tmp_path):
+        with pytest.raises(SystemExit):
+            generate_plate_layout_files(_plates(['P-1', 'P-1']), EXPERIMENT_TYPE_SPS_CE,
+                                        {'sort_plate_layouts': tmp_path})
+
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,187 @@
+"""
+Tests for the grid table validation in SPS_make_illumina_index_and_FA_files_NEW.py
+
+Covers:
+  - find_all_grid_tables
+  - combine_grid_tables
+  - detect_duplicate_samples
+  - identify_missing_samples
+  - make_plate_files
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from SPS_make_illumina_index_and_FA_files_NEW import (
+    GRID_FILE_COLUMN,
+    GRID_ROW_COLUMN,
+    combine_grid_tables,
+    detect_duplicate_samples,
+    find_all_grid_tables,
+    identify_missing_samples,
+    make_plate_files,
+)
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _grid(wells, plate='27-810155', barcode='XYZA1', ids=None):
+    return pd.DataFrame({
+        'Well': wells,
+        'Library Plate Label': plate,
+        'Illumina Library': 'lib',
+        'Library Plate Container Barcode': barcode,
+        'Nucleic Acid ID': ids if ids is not None else [f'{plate}_{w}' for w in wells],
+    })
+
+
+def _db(wells, plate='27-810155'):
+    return pd.DataFrame({
+        'Destination_Well': wells,
+        'Destination_plate_name': plate,
+        'internal_name': [f'int_{w}' for w in wells],
+        'plate_id': 'Prtist.13',
+        'source_well': 'B2',
+    })
+
+
+# ===========================================================================
+# find_all_grid_tables
+# ===========================================================================
+
+class TestFindAllGridTables:
+    def test_grid_tables_found_by_header(self, tmp_path):
+        _grid(['A1']).to_csv(tmp_path / 'grid_1.csv', index=False, encoding='utf-8-sig')
+        _grid(['B1']).to_csv(tmp_path / 'grid_2.csv', index=False)
+        _db(['A1']).to_csv(tmp_path / 'project_summary.csv', index=False)
+
+        found = find_all_grid_tables(tmp_path)
+
+        assert sorted(Path(f).name for f in found) == ['grid_1.csv', 'grid_2.csv']
+
+    def test_no_grid_table_exits(self, tmp_path, capsys):
+        _db(['A1']).to_csv(tmp_path / 'project_summary.csv', index=False)
+
+        with pytest.raises(SystemExit):
+            find_all_grid_tables(tmp_path)
+
+        assert "- project_summary.csv: Missing columns: ['Well'," in capsys.readouterr().out
+
+
+# ===========================================================================
+# combine_grid_tables
+# ===========================================================================
+
+class TestCombineGridTables:
+    def test_source_file_and_csv_row_are_recorded(self):
+        combined = combine_grid_tables([('g1.csv', _grid(['A1', 'B1'])), ('g2.csv', _grid(['C1'], plate='P2'))])
+
+        assert combined[GRID_FILE_COLUMN].tolist() == ['g1.csv', 'g1.csv', 'g2.csv']
+        assert combined[GRID_ROW_COLUMN].tolist() == [2, 3, 2]
+
+
+# ===========================================================================
+# detect_duplicate_samples
+# ===========================================================================
+
+class TestDetectDuplicateSamples:
+    def test_unique_samples_pass(self):
+        combined = combine_grid_tables([('g1.csv', _grid(['A1', 'B1'])), ('g2.csv', _grid(['A1'], plate='P2', barcode='B2'))])
+
+        assert detect_duplicate_samples(combined) == {}
+
+    def test_duplicates_are_reported_against_first_occurrence(self):
+        combined = combine_grid_tables([
+            ('g1.csv', _grid(['A1', 'B1'], ids=['S1', 'S2'])),
+            ('g2.csv', _grid(['C1'], plate='P2', barcode='B2', ids=['S1'])),
+            ('g3.csv', _grid(['A1'], ids=['S3'])),
+        ])
+
+        with pytest.raises(ValueError) as excinfo:
+            detect_duplicate_samples(combined)
+
+        message = str(excinfo.value)
+        assert "- Well A1 on plate '27-810155' found in both:\n  * g1.csv\n  * g3.csv\n" in message
+        assert "- Sample ID 'S1' found in both:\n  * g1.csv (well A1)\n  * g2.csv (well C1)\n" in message
+        assert "- Container 'XYZA1' well A1 found in both:\n  * g1.csv\n  * g3.csv\n" in message
+
+    @pytest.mark.parametrize("empty_id", [np.nan, '  '])
+    def test_empty_nucleic_acid_id_reports_file_and_row(self, empty_id):
+        combined = combine_grid_tables([('g1.csv', _grid(['A1', 'B1'], ids=['S1', empty_id]))])
+
+        with pytest.raises(ValueError, match="File: g1.csv\nRow: 3\nWell: B1"):
+            detect_duplicate_samples(combined)
+
+
+# ===========================================================================
+# identify_missing_samples
+# ===========================================================================
+
+class TestIdentifyMissingSamples:
+    def test_all_found(self):
+        result = identify_missing_samples(_db(['A1', 'B1']), _grid(['B1', 'A1', 'C1']))
+
+        assert result.empty
+
+    def test_missing_samples_are_listed_in_database_order(self):
+        with pytest.raises(ValueError) as excinfo:
+            identify_missing_samples(_db(['D1', 'A1', 'C1']), _grid(['A1']))
+
+        lines = str(excinfo.value).splitlines()
+        assert lines[0] == "FATAL ERROR: 2 samples from database not found in grid tables!"
+        assert [line.split('|')[0].strip() for line in lines[5:7]] == ['D1', 'C1']
+        assert 'int_D1' in lines[5]
+
+
+# ===========================================================================
+# make_plate_files
+# ===========================================================================
+
+class TestMakePlateFiles:
+    def _frames(self):
+        echo_df = pd.DataFrame({
+            'Source Plate Barcode': ['Prtist.13', 'Prtist.2', 'Prtist.13'],
+            'Destination Plate Barcode': ['XUPVQ-1', 'XUPVQ-1', 'XUPVQ-2'],
+            'Destination Row': [3, 1, 1],
+            'Destination Column': [1, 1, 1],
+        })
+        illum_df = pd.DataFrame({'Lib_plate_ID': ['XUPVQ-1', 'XUPVQ-1', 'XUPVQ-2'], 'Lib_plate_well': ['C1', 'A1', 'A1']})
+        fa_df = pd.DataFrame({
+            'Destination_Plate_Barcode': ['XUPVQ-1', 'XUPVQ-1', 'XUPVQ-2'],
+            'Destination_Well_96': ['B1', 'A1', 'A1'],
+            'name': ['XUPVQ-1_1_B1', 'XUPVQ-1_2_A1', 'XUPVQ-2_3_A1'],
+        })
+        dilution_df = pd.DataFrame({'Library_Plate_Barcode': ['XUPVQ-1', 'XUPVQ-1', 'XUPVQ-2'], 'FA_Well': ['B1', 'A1', 'A1']})
+        return echo_df, illum_df, fa_df, dilution_df
+
+    def test_files_of_every_plate(self, tmp_path):
+        dirs = {name: tmp_path / name for name in ('echo', 'fa', 'index', 'ftran')}
+        for d in dirs.values():
+            d.mkdir()
+        directories = (tmp_path, tmp_path, tmp_path, dirs['echo'], dirs['fa'], dirs['index'], tmp_path, dirs['ftran'], tmp_path)
+
+        make_plate_files(*self._frames(), directories)
+
+        assert sorted(p.name for p in dirs['echo'].iterdir()) == ['XUPVQ-1_Prtist.2_Prtist.13.csv', 'XUPVQ-2_Prtist.13.csv']
+        echo = pd.read_csv(dirs['echo'] / 'XUPVQ-1_Prtist.2_Prtist.13.csv')
+        assert echo['Destination Row'].tolist() == [1, 3]
+
+        illum = pd.read_csv(dirs['index'] / 'Illumina_index_transfer_XUPVQ-1.csv')
+        assert illum['Lib_plate_ID'].tolist() == ['hXUPVQ-1', 'hXUPVQ-1']
+
+        fa_lines = (dirs['fa'] / 'FA_upload_XUPVQ-1.csv').read_text().splitlines()
+        assert fa_lines[:3] == ['1,A1,XUPVQ-1_2_A1', '2,B1,XUPVQ-1_1_B1', '3,C1,empty_well']
+        assert fa_lines[-1] == '96,H12,ladder_1'
+
+        dilution = pd.read_csv(dirs['ftran'] / 'FA_plate_transfer_XUPVQ-2.csv')
+        assert dilution['Library_Plate_Barcode'].tolist() == ['hXUPVQ-2']
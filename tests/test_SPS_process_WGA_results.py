@@ -6,6 +6,8 @@ Covers:
   - scan_kinetics_files
   - validate_layout_files
   - read_kinetics_file
+  - process_kinetics_file / threaded load_and_process_plates (equivalence
+    with the one-file-at-a-time, all-columns reference)
 """
 
 import sqlite3
@@ -31,6 +33,7 @@ from SPS_process_WGA_results import (
     filter_wells,
     sort_by_crossing_point,
     load_and_process_plates,
+    process_kinetics_file,
     rename_columns,
     remap_type_values,
     assign_dest_plate,
@@ -555,6 +558,133 @@ class TestLoadAndProcessPlates:
         assert result.iloc[1]["Plate_ID"] == plate_high
 
 
+# ===========================================================================
+# Tests: threaded kinetics ingestion
+# ===========================================================================
+
+# Header as written by the WGA instrument export (13 columns, see README)
+KINETICS_EXPORT_COLUMNS = [
+    "Plate_ID", "Well_Row", "Well_Col", "Well", "Sample", "Type",
+    "number_of_cells/capsules", "Group_1", "Group_2", "Group_3",
+    "Delta_Fluorescence", "Crossing_Point", "Pass_Fail",
+]
+
+
+def _make_export_kinetics_csv(path, plate_name, n_wells, seed, bom=False):
+    """Write a realistic kinetics export with mixed Pass/Fail and NaN CPs."""
+    rows = []
+    for i in range(n_wells):
+        row_letter = "ABCDEFGH"[i % 8]
+        col = i // 8 + 1
+        rows.append({
+            "Plate_ID": plate_name,
+            "Well_Row": row_letter,
+            "Well_Col": col,
+            "Well": f"{row_letter}{col}",
+            "Sample": "WCBP1PR" if i % 11 else "001",
+            "Type": "neg_cntrl" if i % 12 == 0 else "sample",
+            "number_of_cells/capsules": 1 + (i + seed) % 3,
+            "Group_1": "Rep1" if i % 2 else "Sheath_fluid",
+            "Group_2": "BONCAT+",
+            "Group_3": "",
+            "Delta_Fluorescence": round(((i * 37 + seed) % 1000) / 7.0, 3),
+            "Crossing_Point": None if (i + seed) % 13 == 0 else round(((i * 53 + seed) % 400) / 17.0, 2),
+            "Pass_Fail": "Fail" if (i + seed) % 5 == 0 else "Pass",
+        })
+    df = pd.DataFrame(rows, columns=KINETICS_EXPORT_COLUMNS)
+    df.to_csv(path, index=False, encoding="utf-8-sig" if bom else "utf-8")
+
+
+def _reference_load(kinetics_files, plates_df):
+    """Original ingestion: all columns, one file at a time, in barcode order."""
+    barcode_lookup = dict(zip(plates_df["plate_name"], plates_df["barcode"]))
+    files = sorted(
+        kinetics_files,
+        key=lambda p: int(barcode_lookup[p.name.replace(KINETICS_SUFFIX, "")].rsplit("-", 1)[-1]),
+    )
+    dfs = [sort_by_crossing_point(filter_wells(read_kinetics_file(p))) for p in files]
+    return pd.concat(dfs, ignore_index=True)
+
+
+def _summary_csv(df):
+    """Run the Phase 3 transforms and render summary_MDA_results.csv as text."""
+    df = select_and_reorder_columns(assign_dest_plate(remap_type_values(rename_columns(df))))
+    return df.to_csv(index=False)
+
+
+class TestThreadedKineticsIngestion:
+    def _make_project(self, tmp_path, n_plates=6):
+        wga_dir = tmp_path / "B_WGA_results"
+        wga_dir.mkdir()
+        plate_rows = []
+        paths = []
+        for i in range(n_plates):
+            plate_name = f"509735_WCBP1PR.{i + 1}"
+            # barcodes deliberately out of plate order, with a two-digit suffix
+            barcode_number = [7, 1, 10, 3, 2, 12][i % 6] + 20 * (i // 6)
+            plate_rows.append({
+                "plate_name": plate_name, "project": "509735", "sample": "WCBP1PR",
+                "plate_number": i + 1, "is_custom": 0, "barcode": f"MKD50-{barcode_number}",
+                "created_timestamp": "2026-01-01",
+            })
+            path = wga_dir / f"{plate_name}{KINETICS_SUFFIX}"
+            _make_export_kinetics_csv(path, plate_name, n_wells=40 + 9 * i, seed=i, bom=i % 2 == 0)
+            paths.append(path)
+        return paths, _make_plates_df(plate_rows)
+
+    def test_summary_matches_reference_ingestion(self, tmp_path):
+        """Threaded, column-pruned ingestion writes the same summary CSV."""
+        paths, plates_df = self._make_project(tmp_path)
+
+        expected = _summary_csv(_reference_load(paths, plates_df))
+        result = _summary_csv(load_and_process_plates(paths, plates_df, workers=4))
+
+        assert result == expected
+
+    def test_serial_and_threaded_results_are_identical(self, tmp_path):
+        """workers=1 and workers>1 return equal DataFrames in barcode order."""
+        paths, plates_df = self._make_project(tmp_path)
+
+        serial = load_and_process_plates(paths, plates_df, workers=1)
+        threaded = load_and_process_plates(list(reversed(paths)), plates_df, workers=8)
+
+        pd.testing.assert_frame_equal(serial, threaded)
+        plate_order = threaded["Plate_ID"].drop_duplicates().tolist()
+        assert plate_order == ["509735_WCBP1PR.2", "509735_WCBP1PR.5", "509735_WCBP1PR.4",
+                               "509735_WCBP1PR.1", "509735_WCBP1PR.3", "509735_WCBP1PR.6"]
+
+    def test_only_output_columns_are_read(self, tmp_path):
+        """Columns not used by the summary are not loaded; labels stay text."""
+        plate_name = "509735_WCBP1PR.1"
+        path = tmp_path / f"{plate_name}{KINETICS_SUFFIX}"
+        _make_full_kinetics_csv(path, plate_name, [
+            {"Type": "sample", "Pass_Fail": "Pass", "Crossing_Point": 20.0, "Sample": "007"},
+        ])
+
+        df = process_kinetics_file(path)
+
+        assert "Notes" not in df.columns
+        assert "Instrument" not in df.columns
+        assert df["Sample"].iloc[0] == "007"
+
+    def test_plate_id_mismatch_in_worker_calls_sys_exit(self, tmp_path):
+        """A Plate_ID mismatch in any file stops the whole run."""
+        paths, plates_df = self._make_project(tmp_path, n_plates=4)
+        _make_export_kinetics_csv(paths[2], "509735_WCBP1PR.99", n_wells=10, seed=0)
+
+        with pytest.raises(SystemExit):
+            load_and_process_plates(paths, plates_df, workers=4)
+
+    def test_header_only_file_is_a_plate_id_mismatch(self, tmp_path):
+        """A kinetics file without rows has no matching Plate_ID, as before."""
+        plate_name = "509735_WCBP1PR.1"
+        path = tmp_path / f"{plate_name}{KINETICS_SUFFIX}"
+        path.write_text(",".join(KINETICS_EXPORT_COLUMNS) + "\n")
+
+        with pytest.raises(SystemExit):
+            process_kinetics_file(path)
+
+
 # ===========================================================================
 # Tests: rename_columns
 # ===========================================================================
@@ -0,0 +1,120 @@
+"""
+Tests for SPS_process_WGA_results_and_make_SPITS.py
+
+Covers:
+  - assignPlatePositions
+  - makeIndexWellTable
+  - assignIlluminaIndex
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from SPS_process_WGA_results_and_make_SPITS import (
+    PE17_EXCLUDE,
+    PE18_EXCLUDE,
+    assignIlluminaIndex,
+    assignPlatePositions,
+    makeIlluminaIndexSetToUse,
+    makeIndexWellTable,
+)
+from sps_plate_geometry import STAMP_96_TO_384, WELLS_96
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _make_libraries(plate_sizes):
+    """Frame shaped like importSCdata + assignLibPlateID output."""
+    dest_plate = [f'K7ZQ2M.{plate}' for plate, size in enumerate(plate_sizes, start=1) for _ in range(size)]
+    n = len(dest_plate)
+    return pd.DataFrame({
+        'Plate_id': 'P1',
+        'Well': [WELLS_96[i % 96] for i in range(n)],
+        'Type': 'sample',
+        'Dest_plate': dest_plate,
+        'Row': 'A',
+        'Col': 1,
+        'Pool': 1,
+    })
+
+
+# ===========================================================================
+# assignPlatePositions
+# ===========================================================================
+
+class TestAssignPlatePositions:
+    def test_positions_restart_at_one_per_plate(self):
+        df = assignPlatePositions(_make_libraries([3, 2, 4]))
+
+        assert df['Plate_position_number'].tolist() == [1, 2, 3, 1, 2, 1, 2, 3, 4]
+        assert df['Plate_position_number'].dtype == np.int64
+        assert 'Row' not in df.columns and 'Col' not in df.columns
+
+    def test_more_than_83_libraries_calls_sys_exit(self):
+        with pytest.raises(SystemExit):
+            assignPlatePositions(_make_libraries([84]))
+
+
+# ===========================================================================
+# makeIndexWellTable
+# ===========================================================================
+
+class TestMakeIndexWellTable:
+    def test_rows_follow_the_index_set_well_lists(self):
+        ill_set_list, illum_dict = makeIlluminaIndexSetToUse(list(WELLS_96))
+
+        table = makeIndexWellTable(ill_set_list, illum_dict)
+
+        pe17 = [w for w in WELLS_96 if w not in PE17_EXCLUDE]
+        pe18 = [w for w in WELLS_96 if w not in PE18_EXCLUDE]
+        assert table.shape == (4, 90)
+        assert [WELLS_96[i] for i in table[0]] == pe17
+        assert [WELLS_96[i] for i in table[1, :len(pe18)]] == pe18
+        assert (table[1, len(pe18):] == -1).all()
+
+
+# ===========================================================================
+# assignIlluminaIndex
+# ===========================================================================
+
+class TestAssignIlluminaIndex:
+    def _assign(self, plate_sizes, seed=3):
+        ill_set_list, illum_dict = makeIlluminaIndexSetToUse(list(WELLS_96))
+        df = assignPlatePositions(_make_libraries(plate_sizes))
+        random.seed(seed)
+        return assignIlluminaIndex(df, ill_set_list, illum_dict), illum_dict
+
+    def test_wells_match_the_illum_dict(self):
+        df, illum_dict = self._assign([83, 83, 40, 83, 83, 10])
+
+        assert df['Dest_well_96'].tolist() == [illum_dict[key] for key in df['Illumina_set']]
+        assert df['Dest_well_384'].tolist() == [STAMP_96_TO_384[well] for well in df['Dest_well_96']]
+
+    def test_index_sets_rotate_over_sorted_plates(self):
+        random.seed(3)
+        start = random.randint(0, 3)
+        df, _ = self._assign([2] * 6, seed=3)
+
+        sets = df.drop_duplicates('Dest_plate')['Illumina_set'].str.split('_').str[0].tolist()
+        expected = ['PE17', 'PE18', 'PE19', 'PE20']
+        assert sets == [expected[(i + start) % 4] for i in range(6)]
+        assert df['Illumina_set'].iloc[1].endswith('_2')
+
+    def test_position_missing_from_index_set_calls_sys_exit(self):
+        ill_set_list, illum_dict = makeIlluminaIndexSetToUse(list(WELLS_96))
+        illum_dict = {key: well for key, well in illum_dict.items() if not key.endswith('_2')}
+        df = assignPlatePositions(_make_libraries([3]))
+
+        with pytest.raises(SystemExit):
+            assignIlluminaIndex(df, ill_set_list, illum_dict)
@@ -0,0 +1,191 @@
+"""
+Tests for SPS_run_workflow.py
+
+Covers:
+  - parse_stages
+  - run_workflow (with fake stages, and the real stages on synthetic
+    projects with and without rework)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'benchmarks'))
+
+import SPS_run_workflow
+from SPS_run_workflow import FA_SUMMARY_FILES, parse_stages, run_workflow
+from sps_parameters import NON_INTERACTIVE_ENV
+from synthetic_project import POOLING_DIRS, SECOND_FA_DIR, fill_redo_thresholds, make_project
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+@pytest.fixture
+def fake_stages(request, tmp_path, monkeypatch):
+    """Replace the stage modules; records stage calls and decisions.
+
+    The first FA analysis flags plate P1 for rework unless the fixture is
+    parametrized with False.
+    """
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    redo = getattr(request, 'param', True)
+
+    def fake_run_stage(stage, project_df, workers=1):
+        calls.append((stage, len(project_df)))
+        fa_summary_df = None
+        if stage in FA_SUMMARY_FILES:
+            fa_summary_df = pd.DataFrame({'Destination_Plate_Barcode': ['P1'],
+                                          'Redo_whole_plate': [True if redo else '']})
+            reduced_file = FA_SUMMARY_FILES[stage][0]
+            reduced_file.parent.mkdir(parents=True, exist_ok=True)
+            fa_summary_df.to_csv(reduced_file, sep='\t', index=False)
+        if stage == 'rework':
+            # rework returns the persisted project_summary data
+            return pd.concat([project_df, project_df], ignore_index=True), None
+        return project_df, fa_summary_df
+
+    monkeypatch.setattr(SPS_run_workflow, "load_project_summary",
+                        lambda db_path: pd.DataFrame({'Library_Plate_Barcode': ['P1']}))
+    monkeypatch.setattr(SPS_run_workflow, "run_stage", fake_run_stage)
+    monkeypatch.setattr(SPS_run_workflow, "record_rework_decision",
+                        lambda rework: calls.append(('decision', rework)))
+
+    return calls
+
+
+# prompt answers of the FA analysis stages
+STAGE_PARAMETERS = {
+    NON_INTERACTIVE_ENV: '1',
+    'SPS_MIN_FAILED_LIBS': '20',
+    'SPS_CONFIRM_DILUTION_FACTOR': 'Y',
+}
+
+
+def _run_workflow(project_dir, *args):
+    """Run SPS_run_workflow.py on a project, accepting the FA results; returns its stdout."""
+    result = subprocess.run([sys.executable, str(Path(__file__).parent.parent / 'SPS_run_workflow.py'),
+                             '--accept-fa-results', *args],
+                            cwd=project_dir, env={**os.environ, **STAGE_PARAMETERS},
+                            capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def _smear_files(project_dir):
+    return sorted(path.name for path in (project_dir / POOLING_DIRS[0]).glob('*.csv'))
+
+
+# ===========================================================================
+# parse_stages
+# ===========================================================================
+
+class TestParseStages:
+    def test_stages_in_workflow_order(self):
+        assert parse_stages("first_fa, rework") == ['first_fa', 'rework']
+
+    def test_unknown_stage_is_rejected(self):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_stages("first_fa,pooling")
+
+    def test_out_of_order_stages_are_rejected(self):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_stages("rework,first_fa")
+
+    def test_conclude_after_rework_needs_second_fa(self):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_stages("rework,conclude")
+
+
+# ===========================================================================
+# run_workflow
+# ===========================================================================
+
+class TestRunWorkflow:
+    def test_data_is_handed_on_in_memory(self, fake_stages):
+        completed = run_workflow(['first_fa', 'rework', 'second_fa', 'conclude'],
+                                 accept_results=True)
+
+        assert completed == ['first_fa', 'rework', 'second_fa', 'conclude']
+        assert fake_stages == [('first_fa', 1), ('decision', True), ('rework', 1),
+                               ('second_fa', 2), ('conclude', 2)]
+
+    def test_accepted_fa_results_become_reviewed_file(self, fake_stages):
+        run_workflow(['first_fa', 'rework'], accept_results=True)
+
+        assert (FA_SUMMARY_FILES['first_fa'][1].read_text()
+                == FA_SUMMARY_FILES['first_fa'][0].read_text())
+
+    def test_stops_for_review_without_accept(self, fake_stages):
+        completed = run_workflow(['first_fa', 'rework'])
+
+        assert completed == ['first_fa']
+        assert not FA_SUMMARY_FILES['first_fa'][1].exists()
+        # the decision waits for the reviewed results
+        assert ('decision', True) not in fake_stages
+
+    @pytest.mark.parametrize('fake_stages', [False], indirect=True)
+    def test_no_plate_to_rework_skips_to_conclude(self, fake_stages):
+        completed = run_workflow(['first_fa', 'rework', 'second_fa', 'conclude'],
+                                 accept_results=True)
+
+        assert completed == ['first_fa', 'conclude']
+        assert fake_stages == [('first_fa', 1), ('decision', False), ('conclude', 1)]
+
+    def test_plates_to_rework_stop_before_conclude(self, fake_stages):
+        completed = run_workflow(['first_fa', 'conclude'], accept_results=True)
+
+        assert completed == ['first_fa']
+        assert fake_stages == [('first_fa', 1), ('decision', True)]
+
+    @pytest.mark.parametrize('fake_stages', [False], indirect=True)
+    def test_resumed_run_decides_on_reviewed_results(self, fake_stages):
+        run_workflow(['first_fa'])
+        FA_SUMMARY_FILES['first_fa'][0].rename(FA_SUMMARY_FILES['first_fa'][1])
+
+        completed = run_workflow(['rework', 'second_fa', 'conclude'])
+
+        assert completed == ['conclude']
+        assert fake_stages[1:] == [('decision', False), ('conclude', 1)]
+
+
+class TestRunWorkflowStages:
+    def test_project_without_rework_goes_to_conclude(self, tmp_path):
+        paths = make_project(tmp_path / 'project', plates=5, wells=24, attempts=1)
+
+        stdout = _run_workflow(paths['root'])
+
+        assert 'Completed stages: first_fa, conclude' in stdout
+        assert json.loads((paths['root'] / 'workflow_state.json').read_text()) == {
+            'rework_first_attempt': 'skipped',
+            'second_fa_analysis': 'skipped',
+            'conclude_fa_analysis': 'pending',
+        }
+        assert not (paths['root'] / SECOND_FA_DIR).exists()
+        assert len(_smear_files(paths['root'])) == 5
+
+    def test_project_with_rework_runs_every_stage(self, tmp_path):
+        paths = make_project(tmp_path / 'project', plates=5, wells=24, attempts=2)
+
+        stdout = _run_workflow(paths['root'], '--stages', 'first_fa,rework')
+        fill_redo_thresholds(paths['root'])
+        stdout += _run_workflow(paths['root'], '--stages', 'second_fa,conclude')
+
+        assert 'Completed stages: first_fa, rework' in stdout
+        assert 'Completed stages: second_fa, conclude' in stdout
+        state = json.loads((paths['root'] / 'workflow_state.json').read_text())
+        assert state['rework_first_attempt'] == 'pending'
+        redo_plates = pd.read_csv(paths['root'] / 'project_summary.csv')['Redo_Destination_Plate_Barcode']
+        assert sorted(redo_plates.dropna().unique()) == [f'{barcode}.2' for barcode in paths['rework_barcodes']]
+        assert len(_smear_files(paths['root'])) == 5
@@ -0,0 +1,206 @@
+"""
+Tests for sps_archive.py
+
+Covers:
+  - archive_files
+  - archive_tree
+  - restore_run / list_runs
+"""
+
+import json
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import sps_archive
+from sps_archive import (
+    archive_files,
+    archive_tree,
+    list_runs,
+    object_path,
+    read_manifest,
+    restore_run,
+    store_dir,
+)
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def _objects(archive_dir):
+    return [p for p in (store_dir(archive_dir) / "objects").rglob("*") if p.is_file()]
+
+
+def _make_fa_result(root):
+    _write(root / "run1" / "PLATE1F 10-01" / "2024 Smear Analysis Result.csv", "Well,Sample ID\nA1,x\n")
+    _write(root / "run1" / "PLATE1F 10-01" / "raw.txt", "raw data")
+    return root
+
+
+# ===========================================================================
+# archive_files
+# ===========================================================================
+
+class TestArchiveFiles:
+    def test_copy_keeps_source_and_links_archive_name(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "project_summary.db", "db v1")
+
+        archived = archive_files(archive_dir, [(source, "archive_project_summary_d1.db")], "d1_test")
+
+        assert source.read_text() == "db v1"
+        assert archived[0].read_text() == "db v1"
+        assert archived[0].samefile(object_path(archive_dir, sps_archive.file_digest(source)))
+
+    def test_identical_content_is_stored_once(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "project_summary.db", "same")
+
+        archive_files(archive_dir, [(source, "a_d1.db")], "d1_test")
+        archive_files(archive_dir, [(source, "a_d2.db")], "d2_test")
+
+        assert len(_objects(archive_dir)) == 1
+        assert (archive_dir / "a_d1.db").samefile(archive_dir / "a_d2.db")
+
+    def test_source_updated_in_place_does_not_change_archive(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "project_summary.db", "db v1")
+
+        archived = archive_files(archive_dir, [(source, "a_d1.db")], "d1_test")
+        with open(source, "a") as fh:
+            fh.write(" changed")
+
+        assert archived[0].read_text() == "db v1"
+
+    def test_move_removes_source(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "project_summary.csv", "a,b\n1,2\n")
+
+        archived = archive_files(archive_dir, [(source, "archive_d1.csv")], "d1_test", move=True)
+
+        assert not source.exists()
+        assert archived[0].read_text() == "a,b\n1,2\n"
+
+    def test_calls_with_same_run_share_a_manifest(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        db = _write(tmp_path / "project_summary.db", "db")
+        csv = _write(tmp_path / "project_summary.csv", "csv")
+
+        archive_files(archive_dir, [(db, "a_d1.db")], "d1_test")
+        archive_files(archive_dir, [(csv, "a_d1.csv")], "d1_test", move=True)
+
+        assert set(read_manifest(archive_dir, "d1_test")["files"]) == {"a_d1.db", "a_d1.csv"}
+
+    def test_unchanged_source_is_not_rehashed(self, tmp_path, monkeypatch):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "big.csv", "data")
+        archive_files(archive_dir, [(source, "a_d1.csv")], "d1_test")
+
+        def fail(path):
+            raise AssertionError("file was hashed again")
+
+        monkeypatch.setattr(sps_archive, "file_digest", fail)
+        archive_files(archive_dir, [(source, "a_d2.csv")], "d2_test")
+
+        assert (archive_dir / "a_d2.csv").read_text() == "data"
+
+
+# ===========================================================================
+# archive_tree
+# ===========================================================================
+
+class TestArchiveTree:
+    def test_tree_is_mirrored_and_stale_files_removed(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source_dir = _make_fa_result(tmp_path / "B_first_attempt_fa_result")
+        _write(archive_dir / "first" / "B_first_attempt_fa_result" / "old.txt", "stale")
+
+        dest = archive_tree(archive_dir, source_dir, Path("first") / source_dir.name, "d1_test")
+
+        archived = sorted(p.relative_to(dest).as_posix() for p in dest.rglob("*") if p.is_file())
+        assert archived == ["run1/PLATE1F 10-01/2024 Smear Analysis Result.csv",
+                            "run1/PLATE1F 10-01/raw.txt"]
+        assert (source_dir / "run1" / "PLATE1F 10-01" / "raw.txt").exists()
+
+    def test_rearchiving_unchanged_tree_adds_no_objects(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source_dir = _make_fa_result(tmp_path / "fa")
+
+        archive_tree(archive_dir, source_dir, "first/fa", "d1_test")
+        n_objects = len(_objects(archive_dir))
+        archive_tree(archive_dir, source_dir, "first/fa", "d2_test")
+
+        assert len(_objects(archive_dir)) == n_objects
+
+
+# ===========================================================================
+# restore_run / list_runs
+# ===========================================================================
+
+class TestRestoreRun:
+    def test_restore_rebuilds_past_run(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "project_summary.db", "db v1")
+        archive_files(archive_dir, [(source, "a_d1.db")], "d1_test")
+        source.write_text("db v2")
+        archive_files(archive_dir, [(source, "a_d2.db")], "d2_test")
+
+        restored = restore_run(archive_dir, "d1_test", tmp_path / "restored")
+
+        assert list_runs(archive_dir) == ["d1_test", "d2_test"]
+        assert [p.read_text() for p in restored] == ["db v1"]
+
+    def test_archived_files_are_read_only_and_restored_copies_writable(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "project_summary.db", "db v1")
+        archived = archive_files(archive_dir, [(source, "a_d1.db")], "d1_test")
+
+        restored = restore_run(archive_dir, "d1_test", tmp_path / "restored")
+
+        assert stat.S_IMODE(archived[0].stat().st_mode) == 0o444
+        assert restored[0].stat().st_mode & stat.S_IWUSR
+
+    def test_changed_file_is_stored_in_full(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "project_summary.db", "db v1 " * 100)
+        archive_files(archive_dir, [(source, "a_d1.db")], "d1_test")
+        with open(source, "a") as fh:
+            fh.write("+")
+
+        archive_files(archive_dir, [(source, "a_d2.db")], "d2_test")
+
+        assert sorted(obj.stat().st_size for obj in _objects(archive_dir)) == [600, 601]
+
+    def test_corrupt_object_is_reported(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "project_summary.db", "db v1")
+        archive_files(archive_dir, [(source, "a_d1.db")], "d1_test")
+        manifest = read_manifest(archive_dir, "d1_test")
+        obj = object_path(archive_dir, manifest["files"]["a_d1.db"]["sha256"])
+        obj.chmod(0o644)
+        obj.write_text("tampered")
+
+        with pytest.raises(ValueError):
+            restore_run(archive_dir, "d1_test", tmp_path / "restored")
+
+    def test_manifest_is_json(self, tmp_path):
+        archive_dir = tmp_path / "archived_files"
+        source = _write(tmp_path / "x.csv", "x")
+        archive_files(archive_dir, [(source, "x_d1.csv")], "d1_test")
+
+        manifest = json.loads((store_dir(archive_dir) / "manifests" / "d1_test.json").read_text())
+
+        assert manifest["files"]["x_d1.csv"]["size"] == 1
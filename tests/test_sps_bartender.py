@@ -0,0 +1,101 @@
+"""
+Tests for sps_bartender.py
+
+Covers:
+  - label_lines
+  - interleave_labels
+  - write_label_file
+  - read_label_lines
+  - write_print_batch
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_bartender import (
+    BARTENDER_HEADER,
+    SECTION_SEPARATOR,
+    interleave_labels,
+    label_lines,
+    read_label_lines,
+    write_label_file,
+    write_print_batch,
+)
+
+
+# ===========================================================================
+# label_lines / interleave_labels
+# ===========================================================================
+
+class TestLabelLines:
+    def test_lines_are_rendered_in_order(self):
+        plates = pd.Series(['27-1', '27-2'], index=[5, 3])
+
+        assert label_lines(plates + 'F', 'FA.run ' + plates + 'F') == [
+            '27-1F,"FA.run 27-1F"\r\n', '27-2F,"FA.run 27-2F"\r\n']
+
+    def test_non_string_values_are_converted(self):
+        assert label_lines([7], [7]) == ['7,"7"\r\n']
+
+    def test_empty(self):
+        assert label_lines([], []) == []
+
+
+class TestInterleaveLabels:
+    def test_one_group_per_position(self):
+        assert interleave_labels(['a1', 'a2'], ['b1', 'b2'], [',', ',']) == ['a1', 'b1', ',', 'a2', 'b2', ',']
+
+    def test_empty(self):
+        assert interleave_labels([], []) == []
+        assert interleave_labels() == []
+
+
+# ===========================================================================
+# write_label_file / read_label_lines
+# ===========================================================================
+
+class TestWriteLabelFile:
+    def test_sections_are_separated_and_crlf_is_kept(self, tmp_path):
+        path = write_label_file(tmp_path / 'labels.txt', [['a,"a"\r\n'], ['b,"b"\r\n', 'c,"c"\r\n']],
+                                trailer='\r\n')
+
+        assert path.read_bytes() == (BARTENDER_HEADER + 'a,"a"\r\n' + SECTION_SEPARATOR
+                                     + 'b,"b"\r\n' + 'c,"c"\r\n' + '\r\n').encode()
+
+    def test_read_label_lines_drops_header_and_trailing_blanks(self, tmp_path):
+        path = write_label_file(tmp_path / 'labels.txt', [['a,"a"\r\n'], ['b,"b"\r\n', SECTION_SEPARATOR]],
+                                trailer='\r\n')
+
+        assert read_label_lines(path) == ['a,"a"\r\n', SECTION_SEPARATOR, 'b,"b"\r\n']
+
+    def test_read_label_lines_rejects_other_files(self, tmp_path):
+        path = tmp_path / 'other.txt'
+        path.write_text('a,"a"\r\n')
+
+        with pytest.raises(ValueError, match="Not a BarTender label file"):
+            read_label_lines(path)
+
+
+# ===========================================================================
+# write_print_batch
+# ===========================================================================
+
+class TestWritePrintBatch:
+    def test_projects_become_sections_of_one_file(self, tmp_path):
+        first = write_label_file(tmp_path / 'p1.txt', [['p1-2,"p1-2"\r\n', 'p1-1,"p1-1"\r\n']], trailer='\r\n')
+        second = write_label_file(tmp_path / 'p2.txt', [['p2F,"FA.run p2F"\r\n', SECTION_SEPARATOR]])
+        empty = write_label_file(tmp_path / 'p3.txt', [])
+
+        batch = write_print_batch(tmp_path / 'batch.txt', [first, empty, second])
+
+        text = batch.read_bytes().decode()
+        assert text.count('%BTW%') == 1
+        assert text == (BARTENDER_HEADER + 'p1-2,"p1-2"\r\n' + 'p1-1,"p1-1"\r\n' + SECTION_SEPARATOR
+                        + 'p2F,"FA.run p2F"\r\n' + '\r\n')
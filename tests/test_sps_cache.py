@@ -0,0 +1,234 @@
+"""
+Tests for sps_cache.py
+
+Covers:
+  - enable_cache / disable_cache
+  - cached_frame
+  - evict
+  - cached readers (FA smear files, kinetics files)
+"""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import sps_cache
+from sps_cache import CACHE_DIR_NAME, cached_frame, disable_cache, enable_cache, evict
+from sps_fa_smear import parse_smear_files
+from SPS_process_WGA_results import KINETICS_INPUT_COLUMNS, read_kinetics_file
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+@pytest.fixture
+def project(tmp_path):
+    """Project folder with the cache turned on for the duration of a test."""
+    enable_cache(tmp_path)
+    yield tmp_path
+    disable_cache()
+
+
+class CountingParser:
+    """read_csv that counts how often it really parses."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return pd.read_csv(path, dtype={'Sample': str})
+
+
+def _write_csv(path, rows=3):
+    pd.DataFrame({'Sample': [f'00{i}' for i in range(rows)],
+                  'Value': np.arange(rows) / 3}).to_csv(path, index=False)
+    return path
+
+
+# ===========================================================================
+# cached_frame
+# ===========================================================================
+
+class TestCachedFrame:
+    def test_cache_off_parses_every_time(self, tmp_path):
+        parse = CountingParser()
+        path = _write_csv(tmp_path / 'a.csv')
+
+        cached_frame(path, 'test', parse)
+        cached_frame(path, 'test', parse)
+
+        assert parse.calls == 2
+        assert not (tmp_path / CACHE_DIR_NAME).exists()
+
+    def test_rerun_uses_cached_frame(self, project):
+        parse = CountingParser()
+        path = _write_csv(project / 'a.csv')
+
+        first = cached_frame(path, 'test', parse)
+        second = cached_frame(path, 'test', parse)
+
+        assert parse.calls == 1
+        pd.testing.assert_frame_equal(first, second)
+        assert second['Sample'].tolist() == ['000', '001', '002']
+
+    def test_changed_content_is_parsed_again(self, project):
+        parse = CountingParser()
+        path = _write_csv(project / 'a.csv')
+        cached_frame(path, 'test', parse)
+
+        _write_csv(path, rows=5)
+        result = cached_frame(path, 'test', parse)
+
+        assert parse.calls == 2
+        assert len(result) == 5
+
+    def test_copy_with_same_content_is_a_hit(self, project):
+        parse = CountingParser()
+        path = _write_csv(project / 'a.csv')
+        cached_frame(path, 'test', parse)
+
+        copy = project / 'copy.csv'
+        shutil.copyfile(path, copy)
+        os.utime(copy, ns=(0, 10**18))
+        cached_frame(copy, 'test', parse)
+
+        assert parse.calls == 1
+
+    def test_kind_is_part_of_the_key(self, project):
+        parse = CountingParser()
+        path = _write_csv(project / 'a.csv')
+
+        cached_frame(path, 'test', parse)
+        cached_frame(path, 'other', parse)
+
+        assert parse.calls == 2
+
+    def test_parse_errors_are_raised_and_not_cached(self, project):
+        path = project / 'bad.csv'
+        path.write_text('x\n1\n')
+
+        def parse(p):
+            raise ValueError("bad file")
+
+        with pytest.raises(ValueError, match="bad file"):
+            cached_frame(path, 'test', parse)
+        assert list((project / CACHE_DIR_NAME).glob('*.pkl')) == []
+
+    def test_missing_file_is_reported_by_the_parser(self, project):
+        with pytest.raises(FileNotFoundError):
+            cached_frame(project / 'missing.csv', 'test', pd.read_csv)
+
+    def test_corrupt_entry_is_parsed_again(self, project):
+        parse = CountingParser()
+        path = _write_csv(project / 'a.csv')
+        cached_frame(path, 'test', parse)
+        for entry in (project / CACHE_DIR_NAME).glob('*.pkl'):
+            entry.write_bytes(b'not a pickle')
+
+        result = cached_frame(path, 'test', parse)
+
+        assert parse.calls == 2
+        assert len(result) == 3
+
+    def test_no_cache_env_keeps_cache_off(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('SPS_NO_CACHE', '1')
+
+        assert enable_cache(tmp_path) is None
+        parse = CountingParser()
+        path = _write_csv(tmp_path / 'a.csv')
+        cached_frame(path, 'test', parse)
+        cached_frame(path, 'test', parse)
+
+        assert parse.calls == 2
+
+
+# ===========================================================================
+# evict
+# ===========================================================================
+
+class TestEvict:
+    def test_least_recently_used_entries_go_first(self, tmp_path):
+        for i, name in enumerate(['old', 'mid', 'new']):
+            entry = tmp_path / f'{name}.pkl'
+            entry.write_bytes(b'x' * 100)
+            os.utime(entry, ns=(10**18 + i, 10**18 + i))
+        (tmp_path / 'other.txt').write_bytes(b'x' * 1000)
+
+        removed = evict(tmp_path, max_bytes=150)
+
+        assert removed == ['old.pkl', 'mid.pkl']
+        assert (tmp_path / 'new.pkl').exists()
+        assert (tmp_path / 'other.txt').exists()
+
+    def test_hit_refreshes_an_entry(self, project, monkeypatch):
+        parse = CountingParser()
+        a = _write_csv(project / 'a.csv', rows=3)
+        b = _write_csv(project / 'b.csv', rows=4)
+        cached_frame(a, 'test', parse)
+        cached_frame(b, 'test', parse)
+        entries = sorted((project / CACHE_DIR_NAME).glob('*.pkl'), key=lambda p: p.stat().st_mtime_ns)
+        for i, entry in enumerate(entries):
+            os.utime(entry, ns=(10**9 * (i + 1), 10**9 * (i + 1)))
+
+        # a's entry was written first; reading it again makes b the oldest
+        cached_frame(a, 'test', parse)
+        entry_size = max(entry.stat().st_size for entry in entries)
+        monkeypatch.setattr(sps_cache, '_max_bytes', int(2.5 * entry_size))
+        cached_frame(_write_csv(project / 'c.csv', rows=5), 'test', parse)
+        calls = parse.calls
+        cached_frame(a, 'test', parse)
+
+        assert parse.calls == calls
+        assert len(list((project / CACHE_DIR_NAME).glob('*.pkl'))) == 2
+
+
+# ===========================================================================
+# Cached readers
+# ===========================================================================
+
+class TestCachedReaders:
+    def test_fa_smear_parse_is_identical_from_cache(self, project):
+        path = project / 'XUPVQ-1F.csv'
+        pd.DataFrame({
+            'Well': ['A:1', 'B:1', 'H:12'],
+            'Sample ID': ['XUPVQ-1_0001_A1', 'XUPVQ-1_0002_B1', 'ladder_1'],
+            'ng/uL': [1.5, np.nan, 0.1],
+            'nmole/L': [10.0, 2.0, 0.0],
+            'Avg. Size': [500.0, 450.0, 0.0],
+        }).to_csv(path, index=False)
+
+        fresh = parse_smear_files([path])
+        cached = parse_smear_files([path])
+
+        pd.testing.assert_frame_equal(fresh[0], cached[0])
+        assert fresh[1] == cached[1]
+        assert len(list((project / CACHE_DIR_NAME).glob('*.pkl'))) == 1
+
+    def test_kinetics_plate_id_is_checked_on_cached_frames(self, project):
+        path = project / '509735_WCBP1PR.1_amplification_kinetics_summary.csv'
+        pd.DataFrame({'Plate_ID': ['509735_WCBP1PR.1'] * 2, 'Well': ['A1', 'B1'],
+                      'Pass_Fail': ['Pass', 'Fail'], 'Notes': ['x', 'y']}).to_csv(path, index=False)
+
+        fresh = read_kinetics_file(path, columns=KINETICS_INPUT_COLUMNS)
+        cached = read_kinetics_file(path, columns=KINETICS_INPUT_COLUMNS)
+        all_columns = read_kinetics_file(path)
+
+        pd.testing.assert_frame_equal(fresh, cached)
+        assert 'Notes' in all_columns.columns and 'Notes' not in cached.columns
+
+        # same content under another plate's name: cache hit, still a mismatch
+        copy = project / '509735_WCBP1PR.2_amplification_kinetics_summary.csv'
+        shutil.copyfile(path, copy)
+        with pytest.raises(SystemExit):
+            read_kinetics_file(copy, columns=KINETICS_INPUT_COLUMNS)
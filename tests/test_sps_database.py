@@ -0,0 +1,442 @@
+"""
+Tests for sps_database.py
+
+Covers:
+  - write_project_summary
+  - upsert_project_summary
+  - reserve_barcode_block
+  - record_library_attempts / library_attempts_wide view (also after a
+    rework round run by the stages)
+  - bootstrap_database
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'benchmarks'))
+
+from sps_database import (
+    bootstrap_database,
+    column_type,
+    read_library_attempts,
+    read_library_attempts_wide,
+    read_project_summary,
+    record_library_attempts,
+    reserve_barcode_block,
+    upsert_project_summary,
+    write_project_summary,
+)
+from sps_parameters import NON_INTERACTIVE_ENV
+from synthetic_project import fill_redo_thresholds, make_project
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _make_project_df(n=4):
+    return pd.DataFrame({
+        "sample_id": [1001 + i for i in range(n)],
+        "Destination_Plate_Barcode": ["XUPVQ-1"] * n,
+        "Destination_Well": [f"A{2 * i + 1}" for i in range(n)],
+        "dilution_factor": [5] * n,
+    })
+
+
+def _table_sql(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'project_summary'").fetchone()[0]
+
+
+def _table_layout(db_path):
+    """(column, declared type) pairs and the storage classes of every cell."""
+    with sqlite3.connect(db_path) as conn:
+        layout = [(row[1], row[2]) for row in conn.execute("PRAGMA table_info(project_summary)")]
+        cells = conn.execute(
+            "SELECT " + ", ".join(f'typeof("{col}")' for col, _ in layout)
+            + " FROM project_summary ORDER BY CAST(sample_id AS TEXT)").fetchall()
+    return layout, cells
+
+
+# prompt answers of the FA analysis stages
+STAGE_PARAMETERS = {
+    NON_INTERACTIVE_ENV: "1",
+    "SPS_MIN_FAILED_LIBS": "20",
+    "SPS_CONFIRM_DILUTION_FACTOR": "Y",
+}
+
+
+def _run_workflow(project_dir, stages):
+    """Run SPS_run_workflow.py on a project, accepting the FA results."""
+    subprocess.run([sys.executable, str(Path(__file__).parent.parent / "SPS_run_workflow.py"),
+                    "--stages", stages, "--accept-fa-results"],
+                   cwd=project_dir, env={**os.environ, **STAGE_PARAMETERS}, capture_output=True, check=True)
+
+
+def _reworked_project_df():
+    """project_summary as the rework stage writes it (Redo_whole_plate is 1 or '')."""
+    df = _make_project_df()
+    df["nmole/L"] = [0.5, 9.0, 0.1, np.nan]
+    df["Redo_whole_plate"] = pd.Series([1, "", 1, ""], dtype=object)
+    df["Redo_FA_Well"] = ["A1", np.nan, "A5", np.nan]
+    return df
+
+
+# ===========================================================================
+# write_project_summary
+# ===========================================================================
+
+class TestWriteProjectSummary:
+    def test_table_has_declared_types_and_primary_key(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+
+        write_project_summary(_make_project_df(), db_path)
+
+        sql = _table_sql(db_path)
+        assert '"Destination_Well" TEXT' in sql
+        assert 'PRIMARY KEY ("sample_id")' in sql
+
+    def test_round_trip_keeps_values_and_types(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        df = _make_project_df()
+
+        write_project_summary(df, db_path)
+
+        pd.testing.assert_frame_equal(read_project_summary(db_path), df)
+
+    def test_table_without_sample_id_has_no_primary_key(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+
+        write_project_summary(_make_project_df().drop(columns=["sample_id"]), db_path)
+
+        assert "PRIMARY KEY" not in _table_sql(db_path)
+
+
+# ===========================================================================
+# upsert_project_summary
+# ===========================================================================
+
+class TestUpsertProjectSummary:
+    def test_only_changed_cells_updated(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        df = _make_project_df()
+        write_project_summary(df, db_path)
+
+        df.loc[1, "Destination_Well"] = "B1"
+        summary = upsert_project_summary(df, db_path)
+
+        assert summary == {"inserted_rows": 0, "deleted_rows": 0, "added_columns": 0, "dropped_columns": 0,
+                           "updated_cells": 1, "rebuilt": False}
+        assert read_project_summary(db_path)["Destination_Well"].tolist() == ["A1", "B1", "A5", "A7"]
+
+    def test_new_columns_added_and_untouched_columns_kept(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        write_project_summary(_make_project_df(), db_path)
+
+        fa_df = _make_project_df()[["sample_id"]].assign(**{"nmole/L": [1.5, 2.5, 0.0, 9.0]})
+        summary = upsert_project_summary(fa_df, db_path)
+
+        stored = read_project_summary(db_path)
+        assert summary["added_columns"] == 1
+        assert stored["nmole/L"].tolist() == [1.5, 2.5, 0.0, 9.0]
+        assert stored["dilution_factor"].tolist() == [5, 5, 5, 5]
+
+    def test_new_rows_inserted_with_string_keys_matching_integer_keys(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        write_project_summary(_make_project_df(2), db_path)
+
+        df = _make_project_df(3)
+        df["sample_id"] = df["sample_id"].astype(str)
+        summary = upsert_project_summary(df, db_path)
+
+        assert summary["inserted_rows"] == 1
+        assert len(read_project_summary(db_path)) == 3
+
+    def test_duplicate_keys_raise_value_error(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        df = pd.concat([_make_project_df(2), _make_project_df(1)], ignore_index=True)
+
+        with pytest.raises(ValueError, match="duplicate sample_id"):
+            upsert_project_summary(df, db_path)
+
+    def test_complete_frame_drops_removed_columns_and_rows(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        write_project_summary(_reworked_project_df(), db_path)
+
+        # conclude drops Redo_FA_Well before writing project_summary.csv
+        df = _reworked_project_df().drop(columns=["Redo_FA_Well"]).iloc[:3]
+        summary = upsert_project_summary(df, db_path, complete=True)
+
+        stored = read_project_summary(db_path)
+        assert summary["dropped_columns"] == 1
+        assert summary["deleted_rows"] == 1
+        assert summary["rebuilt"]
+        assert list(stored.columns) == list(df.columns)
+        assert stored["sample_id"].tolist() == [1001, 1002, 1003]
+
+    def test_complete_frame_with_added_columns_alters_the_table(self, tmp_path):
+        """Rework appends Redo_* columns: they are added in place, not by a rebuild."""
+        db_path = tmp_path / "project_summary.db"
+        baseline_path = tmp_path / "baseline.db"
+        write_project_summary(_make_project_df(), db_path)
+
+        df = _reworked_project_df()
+        df.loc[0, "Destination_Well"] = "H12"
+        summary = upsert_project_summary(df, db_path, complete=True)
+
+        assert summary == {"inserted_rows": 0, "deleted_rows": 0, "added_columns": 3, "dropped_columns": 0,
+                           "updated_cells": 10, "rebuilt": False}
+
+        engine = create_engine(f"sqlite:///{baseline_path}")
+        df.to_sql("project_summary", engine, if_exists="replace", index=False)
+        engine.dispose()
+
+        assert _table_layout(db_path) == _table_layout(baseline_path)
+        assert "PRIMARY KEY" in _table_sql(db_path)
+
+    def test_complete_frame_with_same_layout_updates_only_changed_cells(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        write_project_summary(_make_project_df(), db_path)
+
+        df = _make_project_df().iloc[1:].copy()
+        df.loc[2, "Destination_Well"] = "H12"
+        summary = upsert_project_summary(df, db_path, complete=True)
+
+        assert summary == {"inserted_rows": 0, "deleted_rows": 1, "added_columns": 0, "dropped_columns": 0,
+                           "updated_cells": 1, "rebuilt": False}
+        assert read_project_summary(db_path)["Destination_Well"].tolist() == ["A3", "H12", "A7"]
+
+    def test_complete_frame_gives_the_table_to_sql_writes(self, tmp_path):
+        """Columns, types and storage classes match the baseline to_sql(if_exists='replace')."""
+        db_path = tmp_path / "project_summary.db"
+        baseline_path = tmp_path / "baseline.db"
+        write_project_summary(_make_project_df(), db_path)
+
+        df = _reworked_project_df()
+        upsert_project_summary(df, db_path, complete=True)
+
+        engine = create_engine(f"sqlite:///{baseline_path}")
+        df.to_sql("project_summary", engine, if_exists="replace", index=False)
+        engine.dispose()
+
+        assert _table_layout(db_path) == _table_layout(baseline_path)
+        assert read_project_summary(db_path)["Redo_whole_plate"].tolist() == ["1", "", "1", ""]
+
+    def test_db_csv_db_round_trip(self, tmp_path):
+        """DB -> CSV -> DB: project_summary.db exports to project_summary.csv, also after a reload."""
+        db_path = tmp_path / "project_summary.db"
+        csv_path = tmp_path / "project_summary.csv"
+        write_project_summary(_reworked_project_df(), db_path)
+
+        # a stage writes the DB and the CSV from the same frame
+        df = _reworked_project_df().drop(columns=["Redo_FA_Well"])
+        upsert_project_summary(df, db_path, complete=True)
+        df.to_csv(csv_path, index=False)
+
+        assert read_project_summary(db_path).to_csv(index=False) == csv_path.read_text()
+
+        # the next stage reads the DB and writes it back: nothing changes
+        layout = _table_layout(db_path)
+        summary = upsert_project_summary(read_project_summary(db_path), db_path, complete=True)
+
+        assert not summary["rebuilt"]
+        assert summary["updated_cells"] == 0
+        assert _table_layout(db_path) == layout
+        assert read_project_summary(db_path).to_csv(index=False) == csv_path.read_text()
+
+
+# ===========================================================================
+# column_type
+# ===========================================================================
+
+class TestColumnType:
+    def test_types_match_to_sql(self):
+        df = pd.DataFrame({
+            "int": [1, 2],
+            "int32": np.array([1, 2], dtype="int32"),
+            "int16": np.array([1, 2], dtype="int16"),
+            "float": [1.5, np.nan],
+            "object_int": pd.Series([1, np.nan], dtype=object),
+            "object_mixed": pd.Series([1, ""], dtype=object),
+            "bool": [True, False],
+            "text": ["a", None],
+            "empty": pd.Series([None, None], dtype=object),
+            "datetime": pd.to_datetime(["2026-01-01", None]),
+            "datetime_tz": pd.to_datetime(["2026-01-01", None]).tz_localize("UTC"),
+            "nullable_int": pd.array([1, None], dtype="Int64"),
+        })
+        schema = pd.io.sql.get_schema(df, "t", con=create_engine("sqlite://"))
+        to_sql_types = dict(line.strip().rstrip(",").replace('"', "").rsplit(" ", 1)
+                            for line in schema.splitlines() if line.startswith("\t"))
+
+        assert {col: column_type(df[col]) for col in df.columns} == to_sql_types
+
+
+# ===========================================================================
+# reserve_barcode_block
+# ===========================================================================
+
+class TestReserveBarcodeBlock:
+    def test_blocks_are_consecutive(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+
+        assert reserve_barcode_block(db_path, "ABC12", 3) == 1
+        assert reserve_barcode_block(db_path, "ABC12", 2) == 4
+        assert reserve_barcode_block(db_path, "XYZ99", 1) == 1
+
+    def test_first_free_moves_counter_forward_only(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+
+        assert reserve_barcode_block(db_path, "ABC12", 2, first_free=10) == 10
+        assert reserve_barcode_block(db_path, "ABC12", 2, first_free=5) == 12
+
+    def test_concurrent_reservations_do_not_overlap(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            starts = list(executor.map(reserve_barcode_block, [db_path] * 20, ["ABC12"] * 20, [5] * 20))
+
+        assert sorted(starts) == list(range(1, 100, 5))
+
+    def test_empty_block_raises(self, tmp_path):
+        with pytest.raises(ValueError):
+            reserve_barcode_block(tmp_path / "project_summary.db", "ABC12", 0)
+
+
+# ===========================================================================
+# record_library_attempts
+# ===========================================================================
+
+class TestRecordLibraryAttempts:
+    def _reworked_df(self):
+        df = _make_project_df()
+        df["Illumina_index"] = ["i1", "i2", "i3", "i4"]
+        df["nmole/L"] = [12.0, 1.5, 2.5, 9.0]
+        df["Passed_library"] = [1, 0, 0, 1]
+        df["Redo_Destination_Plate_Barcode"] = [None, "XUPVQ-1.1", "XUPVQ-1.1", None]
+        df["Redo_Destination_Well"] = [None, "A3", "A5", None]
+        df["Redo_dilution_factor"] = [None, 5, 5, None]
+        return df
+
+    def test_library_creation_records_first_attempts(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+
+        summary = record_library_attempts(_make_project_df(), db_path, replace=True)
+
+        attempts = read_library_attempts(db_path)
+        assert summary == {"inserted_rows": 4, "updated_rows": 0}
+        assert attempts["sample_id"].tolist() == ["1001", "1002", "1003", "1004"]
+        assert attempts["attempt_no"].tolist() == [1] * 4
+        assert attempts["plate"].tolist() == ["XUPVQ-1"] * 4
+
+    def test_rework_adds_rows_and_updates_only_changed_attempts(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        record_library_attempts(_make_project_df(), db_path, replace=True)
+
+        summary = record_library_attempts(self._reworked_df(), db_path)
+        again = record_library_attempts(self._reworked_df(), db_path)
+
+        attempts = read_library_attempts(db_path)
+        assert summary == {"inserted_rows": 2, "updated_rows": 4}
+        assert again == {"inserted_rows": 0, "updated_rows": 0}
+        assert attempts[["sample_id", "attempt_no"]].values.tolist() == [
+            ["1001", 1], ["1002", 1], ["1002", 2], ["1003", 1], ["1003", 2], ["1004", 1]]
+        # fields missing from the DataFrame are not overwritten
+        assert attempts["well"].tolist() == ["A1", "A3", "A3", "A5", "A5", "A7"]
+
+    def test_wide_view_matches_legacy_columns(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        df = self._reworked_df()
+        df["Redo_Passed_library"] = [None, 1, 0, None]
+        record_library_attempts(df, db_path)
+
+        wide = read_library_attempts_wide(db_path)
+
+        assert wide["sample_id"].tolist() == ["1001", "1002", "1003", "1004"]
+        assert wide["Destination_Well"].tolist() == df["Destination_Well"].tolist()
+        assert wide["nmole/L"].tolist() == df["nmole/L"].tolist()
+        assert wide["Redo_Destination_Plate_Barcode"].tolist() == df["Redo_Destination_Plate_Barcode"].tolist()
+        assert wide["Redo_dilution_factor"].tolist()[1:3] == [5, 5]
+        assert wide["Total_passed_attempts"].tolist() == [1, 1, 0, 1]
+        # no second attempt is a failed one, as project_summary fills it
+        assert wide["Redo_Passed_library"].tolist() == [0, 1, 0, 0]
+
+    def test_replace_starts_over(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        record_library_attempts(self._reworked_df(), db_path)
+
+        record_library_attempts(_make_project_df(2), db_path, replace=True)
+
+        assert read_library_attempts(db_path)["sample_id"].tolist() == ["1001", "1002"]
+
+    def test_duplicate_keys_raise_value_error(self, tmp_path):
+        df = _make_project_df()
+        df.loc[1, "sample_id"] = 1001
+
+        with pytest.raises(ValueError, match="duplicate"):
+            record_library_attempts(df, tmp_path / "project_summary.db")
+
+    def test_wide_view_matches_project_summary_after_rework(self, tmp_path):
+        paths = make_project(tmp_path / "project", plates=5, wells=24, attempts=2)
+
+        _run_workflow(paths["root"], "first_fa,rework")
+        fill_redo_thresholds(paths["root"])
+        _run_workflow(paths["root"], "second_fa,conclude")
+
+        summary = read_project_summary(paths["db"])
+        summary["sample_id"] = summary["sample_id"].astype(str)
+        wide = read_library_attempts_wide(paths["db"])
+        # conclude drops Redo_FA_Well from project_summary
+        assert [col for col in wide.columns if col not in summary.columns] == ["Redo_FA_Well"]
+        assert summary["Redo_Destination_Plate_Barcode"].notna().sum() == 48
+
+        wide = wide.drop(columns=["Redo_FA_Well"]).sort_values("sample_id", ignore_index=True)
+        summary = summary[wide.columns].sort_values("sample_id", ignore_index=True)
+        pd.testing.assert_frame_equal(wide, summary, check_dtype=False)
+
+
+# ===========================================================================
+# bootstrap_database
+# ===========================================================================
+
+class TestBootstrapDatabase:
+    def _index_names(self, db_path):
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+        return {row[0] for row in rows}
+
+    def test_indexes_created_only_for_existing_tables(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE individual_plates (plate_name TEXT, barcode TEXT)")
+
+        created = bootstrap_database(db_path)
+
+        assert created == ["idx_individual_plates_plate_name", "idx_individual_plates_barcode"]
+        assert set(created) <= self._index_names(db_path)
+
+    def test_rerun_is_idempotent_and_enables_wal(self, tmp_path):
+        db_path = tmp_path / "project_summary.db"
+        pd.DataFrame({"sample_id": [1], "Destination_Plate_Barcode": ["XUPVQ-1"]}).to_sql(
+            "project_summary", sqlite3.connect(db_path), index=False)
+
+        first = bootstrap_database(db_path)
+        second = bootstrap_database(db_path)
+
+        assert first == second == [
+            "idx_project_summary_sample_id", "idx_project_summary_destination_plate_barcode"]
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
@@ -0,0 +1,141 @@
+"""
+Tests for sps_esp_export.py
+
+Covers:
+  - smear_table (equivalence with the row-wise apply version)
+  - write_smear_files (equivalence with per-plate boolean filtering)
+  - write_smear_bundles
+"""
+
+import sys
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_esp_export import (
+    SMEAR_FILE_COLUMNS,
+    smear_file_name,
+    smear_table,
+    write_smear_bundles,
+    write_smear_files,
+)
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _make_final_df(num_plates=3, wells=6, seed=0):
+    """Concluded project_summary frame with Pool_* columns, plates interleaved."""
+    rng = np.random.default_rng(seed)
+    n = num_plates * wells
+    plates = [f'XUPVQ-{i % num_plates + 1}' for i in range(n)]
+    total_passed = rng.integers(0, 3, n).astype(float)
+    total_passed[1] = np.nan
+    return pd.DataFrame({
+        'sample_id': range(1001, 1001 + n),
+        'Destination_Plate_Barcode': plates,
+        'Destination_Well': [f'A{i + 1}' for i in range(n)],
+        'Illumina Library': [f'LIB{i:03d}' for i in range(n)],
+        'Pool_DNA_conc_ng/uL': np.where(total_passed >= 1, rng.uniform(1, 20, n).round(3), 0),
+        'Pool_nmole/L': np.where(total_passed >= 1, rng.uniform(1, 20, n).round(3), 0),
+        'Pool_Avg. Size': np.where(total_passed >= 1, rng.uniform(300, 900, n).round(1), 0),
+        'Pool_Illumina_index': [f'IDX{i}' for i in range(n)],
+        'Total_passed_attempts': total_passed,
+    })
+
+
+def _legacy_smear_files(final_df, out_dir):
+    """generateSmearFile before the export engine: apply + one filter per plate."""
+    smear_df = final_df[['Destination_Well', 'Illumina Library', 'Pool_DNA_conc_ng/uL', 'Pool_nmole/L',
+                         'Pool_Avg. Size', 'Pool_Illumina_index', 'Total_passed_attempts',
+                         'Destination_Plate_Barcode']].copy()
+    smear_df.rename(columns={
+        'Destination_Well': 'Well', 'Illumina Library': 'Sample ID', 'Pool_DNA_conc_ng/uL': 'ng/uL',
+        'Pool_nmole/L': 'nmole/L', 'Pool_Avg. Size': 'Avg. Size', 'Pool_Illumina_index': 'Index Name',
+        'Total_passed_attempts': 'QC Result'}, inplace=True)
+    smear_df['Range'] = '400 bp to 800 bp'
+    smear_df['%Total'] = 15
+    smear_df['%CV'] = 20
+    smear_df['Volume uL'] = 20
+    smear_df['PCR Cycles'] = 12
+    smear_df['QC Result'] = smear_df['QC Result'].apply(lambda x: 'Pass' if x >= 1 else 'Fail')
+    smear_df['Failure Mode'] = smear_df['QC Result'].apply(lambda x: 'Sample Problem' if x == 'Fail' else '')
+
+    paths = []
+    for plate_barcode in smear_df['Destination_Plate_Barcode'].unique():
+        plate_df = smear_df[smear_df['Destination_Plate_Barcode'] == plate_barcode].copy()
+        plate_df = plate_df.drop('Destination_Plate_Barcode', axis=1)[SMEAR_FILE_COLUMNS]
+        path = out_dir / f'ESP_smear_file_for_upload_{plate_barcode}.csv'
+        plate_df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+# ===========================================================================
+# smear_table / write_smear_files
+# ===========================================================================
+
+class TestSmearFiles:
+    def test_qc_result_and_failure_mode(self):
+        smear_df = smear_table(_make_final_df())
+
+        passed = _make_final_df()['Total_passed_attempts'] >= 1
+        assert (smear_df['QC Result'] == np.where(passed, 'Pass', 'Fail')).all()
+        assert (smear_df['Failure Mode'] == np.where(passed, '', 'Sample Problem')).all()
+        assert smear_df.loc[1, 'QC Result'] == 'Fail'
+
+    def test_files_match_legacy_export(self, tmp_path):
+        final_df = _make_final_df()
+        (tmp_path / 'legacy').mkdir()
+        (tmp_path / 'new').mkdir()
+
+        legacy = _legacy_smear_files(final_df, tmp_path / 'legacy')
+        new = write_smear_files(smear_table(final_df), tmp_path / 'new', workers=4)
+
+        assert [p.name for p in new] == [p.name for p in legacy]
+        for new_path, legacy_path in zip(new, legacy):
+            assert new_path.read_bytes() == legacy_path.read_bytes()
+
+    def test_file_name(self):
+        assert smear_file_name('XUPVQ-1') == 'ESP_smear_file_for_upload_XUPVQ-1.csv'
+
+
+# ===========================================================================
+# write_smear_bundles
+# ===========================================================================
+
+class TestWriteSmearBundles:
+    def test_one_bundle_per_pooling_batch(self, tmp_path):
+        smear_files = write_smear_files(smear_table(_make_final_df(num_plates=5)), tmp_path)
+
+        bundles = write_smear_bundles(smear_files, tmp_path, 2)
+
+        assert [b.name for b in bundles] == [
+            'ESP_smear_upload_batch_01.zip', 'ESP_smear_upload_batch_02.zip', 'ESP_smear_upload_batch_03.zip']
+        with zipfile.ZipFile(bundles[0]) as zf:
+            assert zf.namelist() == [p.name for p in smear_files[:2]]
+            assert zf.read(smear_files[0].name) == smear_files[0].read_bytes()
+        with zipfile.ZipFile(bundles[2]) as zf:
+            assert zf.namelist() == [smear_files[4].name]
+
+    def test_old_bundles_are_replaced(self, tmp_path):
+        smear_files = write_smear_files(smear_table(_make_final_df(num_plates=4)), tmp_path)
+        write_smear_bundles(smear_files, tmp_path, 1)
+        (tmp_path / 'ESP_smear_upload_batch_notes.zip').write_text('keep')
+
+        write_smear_bundles(smear_files, tmp_path, 4)
+
+        assert sorted(p.name for p in tmp_path.glob('*.zip')) == [
+            'ESP_smear_upload_batch_01.zip', 'ESP_smear_upload_batch_notes.zip']
+
+    def test_invalid_batch_size_raises(self, tmp_path):
+        with pytest.raises(ValueError):
+            write_smear_bundles([], tmp_path, 0)
@@ -0,0 +1,145 @@
+"""
+Tests for sps_fa_smear.py
+
+Covers:
+  - parse_smear_files
+  - find_smear_files
+  - copy_smear_files
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_fa_smear import copy_smear_files, find_smear_files, parse_smear_files
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _make_smear_csv(path, rows):
+    """Write a minimal FA smear analysis CSV with the given rows."""
+    columns = ["Well", "Sample ID", "Range", "ng/uL", "%Total", "nmole/L", "Avg. Size"]
+    pd.DataFrame(rows, columns=columns).to_csv(path, index=False)
+    return path
+
+
+def _library_row(well, sample_id, conc=1.5, nmol=4.2, size=550.0):
+    return [well, sample_id, "400 bp to 800 bp", conc, 15, nmol, size]
+
+
+# ===========================================================================
+# parse_smear_files
+# ===========================================================================
+
+class TestParseSmearFiles:
+    def test_control_rows_removed_case_insensitive(self, tmp_path):
+        path = _make_smear_csv(tmp_path / "XUPVQ-1F.csv", [
+            _library_row("A:1", "XUPVQ-1_1001_A1"),
+            _library_row("B:1", "EMPTY"),
+            _library_row("C:1", "Ladder"),
+            _library_row("D:1", "libstd_1"),
+            _library_row("E:1", "XUPVQ-1_1002_E1"),
+        ])
+
+        fa_df, plates = parse_smear_files([path])
+
+        assert fa_df["FA_Sample"].tolist() == ["1001", "1002"]
+        assert fa_df["FA_Well"].tolist() == ["A1", "E1"]
+        assert plates == ["XUPVQ-1"]
+
+    def test_missing_values_filled_with_zero(self, tmp_path):
+        path = _make_smear_csv(tmp_path / "XUPVQ-1F.csv", [
+            _library_row("A:1", "XUPVQ-1_1001_A1", conc=None, nmol=None, size=None),
+        ])
+
+        fa_df, _ = parse_smear_files([path])
+
+        assert fa_df.loc[0, ["ng/uL", "nmole/L", "Avg. Size"]].tolist() == [0.0, 0.0, 0.0]
+        assert fa_df["ng/uL"].dtype == float
+
+    def test_prefix_applied_to_all_columns(self, tmp_path):
+        path = _make_smear_csv(tmp_path / "XUPVQ-1.2F.csv", [
+            _library_row("A:1", "XUPVQ-1.2_1001_A1"),
+        ])
+
+        fa_df, plates = parse_smear_files([path], prefix="Redo_")
+
+        assert list(fa_df.columns) == [
+            "Redo_FA_Well", "Redo_ng/uL", "Redo_nmole/L", "Redo_Avg. Size", "Redo_FA_Sample"]
+        assert plates == ["XUPVQ-1.2"]
+
+    def test_files_concatenated_in_order_with_one_plate_per_file(self, tmp_path):
+        first = _make_smear_csv(tmp_path / "XUPVQ-2F.csv", [
+            _library_row("A:1", "XUPVQ-2_2001_A1"),
+            _library_row("B:1", "XUPVQ-2_2002_B1"),
+        ])
+        second = _make_smear_csv(tmp_path / "XUPVQ-1F.csv", [
+            _library_row("A:1", "XUPVQ-1_1001_A1"),
+        ])
+
+        fa_df, plates = parse_smear_files([first, second])
+
+        assert fa_df["FA_Sample"].tolist() == ["2001", "2002", "1001"]
+        assert plates == ["XUPVQ-2", "XUPVQ-1"]
+
+    def test_malformed_sample_id_raises_value_error(self, tmp_path):
+        path = _make_smear_csv(tmp_path / "XUPVQ-1F.csv", [
+            _library_row("A:1", "XUPVQ-1_1001_A1"),
+            _library_row("B:1", "XUPVQ-1_1002_B1_extra"),
+        ])
+
+        with pytest.raises(ValueError, match="XUPVQ-1_1002_B1_extra"):
+            parse_smear_files([path])
+
+
+# ===========================================================================
+# find_smear_files / copy_smear_files
+# ===========================================================================
+
+def _make_fa_result_tree(result_dir, plates):
+    """Create <result_dir>/<run>/<plate>F <date>/<...> Smear Analysis Result.csv files."""
+    for run, plate in plates:
+        plate_dir = result_dir / run / f"{plate}F 2026-01-01"
+        plate_dir.mkdir(parents=True)
+        _make_smear_csv(plate_dir / f"2026 {plate}F Smear Analysis Result.csv", [
+            _library_row("A:1", f"{plate}_1001_A1"),
+            _library_row("H:12", "ladder_1"),
+        ])
+        (plate_dir / "other_output.csv").write_text("x\n")
+
+
+class TestFindAndCopySmearFiles:
+    def test_folders_found_in_name_order(self, tmp_path):
+        _make_fa_result_tree(tmp_path, [("run_b", "XUPVQ-3"), ("run_a", "XUPVQ-2"), ("run_a", "XUPVQ-1")])
+
+        found = find_smear_files(tmp_path)
+
+        assert [plate_dir.name.split(" ")[0] for plate_dir, _ in found] == [
+            "XUPVQ-1F", "XUPVQ-2F", "XUPVQ-3F"]
+        assert all(len(paths) == 1 for _, paths in found)
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_files_copied_and_renamed_in_job_order(self, tmp_path, workers):
+        _make_fa_result_tree(tmp_path, [("run_a", f"XUPVQ-{i}") for i in range(1, 6)])
+        jobs = [(plate_dir, paths[0]) for plate_dir, paths in find_smear_files(tmp_path)]
+
+        fa_files = copy_smear_files(jobs, tmp_path, workers=workers)
+
+        assert fa_files == [f"XUPVQ-{i}F.csv" for i in range(1, 6)]
+        assert (tmp_path / "XUPVQ-3F.csv").read_bytes() == jobs[2][1].read_bytes()
+
+    def test_folder_sample_mismatch_raises_value_error(self, tmp_path):
+        _make_fa_result_tree(tmp_path, [("run_a", "XUPVQ-1")])
+        plate_dir, paths = find_smear_files(tmp_path)[0]
+        wrong_dir = plate_dir.rename(plate_dir.parent / "XUPVQ-9F 2026-01-01")
+
+        with pytest.raises(ValueError, match="XUPVQ-9F"):
+            copy_smear_files([(wrong_dir, wrong_dir / paths[0].name)], tmp_path, workers=2)
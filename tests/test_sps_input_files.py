@@ -0,0 +1,180 @@
+"""
+Tests for sps_input_files.py
+
+Covers:
+  - read_header
+  - read_csv_headers (header index in .sps_cache)
+  - file_role / classify_csv_files
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_cache import disable_cache, enable_cache
+from sps_input_files import (
+    INDEX_FILE_NAME,
+    ROLE_FA_SMEAR,
+    ROLE_GRID_TABLE,
+    ROLE_KINETICS_SUMMARY,
+    ROLE_SAMPLE_METADATA,
+    classify_csv_files,
+    file_role,
+    read_csv_headers,
+    read_header,
+)
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+GRID_HEADER = 'Well,Library Plate Label,Illumina Library,Library Plate Container Barcode,Nucleic Acid ID'
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Scanned folder with the cache on; returns (folder, index path)."""
+    monkeypatch.delenv('SPS_NO_CACHE', raising=False)
+    folder = tmp_path / 'project'
+    folder.mkdir()
+    cache_dir = enable_cache(folder)
+    yield folder, cache_dir / INDEX_FILE_NAME
+    disable_cache()
+
+
+def _folder_index(index_path, folder):
+    return json.loads(index_path.read_text())['folders'][str(folder.resolve())]
+
+
+def _write(path, text, bom=False):
+    path.write_bytes((b'\xef\xbb\xbf' if bom else b'') + text.encode('utf-8'))
+    return path
+
+
+# ===========================================================================
+# read_header
+# ===========================================================================
+
+class TestReadHeader:
+    def test_bom_and_quoted_names(self, tmp_path):
+        path = _write(tmp_path / 'a.csv', '"Well","Sample, ID",ng/uL\nA1,x,1\n', bom=True)
+
+        assert read_header(path) == ['Well', 'Sample, ID', 'ng/uL']
+
+    def test_leading_blank_lines_are_skipped(self, tmp_path):
+        assert read_header(_write(tmp_path / 'a.csv', '\n\nA,B\n1,2\n')) == ['A', 'B']
+
+    def test_only_first_record_is_read(self, tmp_path):
+        # the body is not valid UTF-8; only the header line is decoded
+        path = tmp_path / 'a.csv'
+        path.write_bytes(b'A,B\n' + b'\xff\xfe,1\n' * 10000)
+
+        assert read_header(path) == ['A', 'B']
+
+    def test_empty_file_raises(self, tmp_path):
+        with pytest.raises(ValueError, match="No columns"):
+            read_header(_write(tmp_path / 'a.csv', ''))
+
+
+# ===========================================================================
+# read_csv_headers
+# ===========================================================================
+
+class TestReadCsvHeaders:
+    def test_headers_are_cached_until_the_file_changes(self, project):
+        folder, index_path = project
+        path = _write(folder / 'a.csv', 'A,B\n')
+        read_csv_headers([path])
+
+        index = json.loads(index_path.read_text())
+        entry = index['folders'][str(folder.resolve())]['a.csv']
+        assert entry['header'] == ['A', 'B']
+
+        # a cached entry is used while mtime and size match
+        entry['header'] = ['cached']
+        index_path.write_text(json.dumps(index))
+        assert read_csv_headers([path])[path] == ['cached']
+
+        _write(path, 'A,B,C\n')
+        os.utime(path, ns=(1, 1))
+        assert read_csv_headers([path])[path] == ['A', 'B', 'C']
+
+    def test_nothing_is_written_into_the_scanned_folder(self, project):
+        folder, index_path = project
+        sub = folder / 'grids'
+        sub.mkdir()
+        path = _write(sub / 'a.csv', 'A\n')
+
+        read_csv_headers([path])
+
+        assert [p.name for p in sub.iterdir()] == ['a.csv']
+        assert sorted(p.name for p in index_path.parent.iterdir()) == [INDEX_FILE_NAME]
+        assert list(_folder_index(index_path, sub)) == ['a.csv']
+
+    def test_no_index_while_the_cache_is_off(self, tmp_path):
+        disable_cache()
+        path = _write(tmp_path / 'a.csv', 'A\n')
+
+        assert read_csv_headers([path])[path] == ['A']
+        assert [p.name for p in tmp_path.iterdir()] == ['a.csv']
+
+    def test_unreadable_files_are_returned_as_errors(self, project):
+        folder, _ = project
+        good = _write(folder / 'good.csv', 'A\n')
+        empty = _write(folder / 'empty.csv', '')
+
+        headers = read_csv_headers([good, empty])
+
+        assert headers[good] == ['A']
+        assert isinstance(headers[empty], ValueError)
+
+    def test_corrupt_index_is_rebuilt(self, project):
+        folder, index_path = project
+        index_path.parent.mkdir()
+        index_path.write_text('{not json')
+        path = _write(folder / 'a.csv', 'A\n')
+
+        assert read_csv_headers([path])[path] == ['A']
+        assert 'a.csv' in _folder_index(index_path, folder)
+
+    def test_entries_of_deleted_files_are_dropped(self, project):
+        folder, index_path = project
+        first = _write(folder / 'a.csv', 'A\n')
+        second = _write(folder / 'b.csv', 'B\n')
+        read_csv_headers([first, second])
+
+        second.unlink()
+        read_csv_headers([first])
+
+        assert list(_folder_index(index_path, folder)) == ['a.csv']
+
+
+# ===========================================================================
+# file_role / classify_csv_files
+# ===========================================================================
+
+class TestFileRole:
+    @pytest.mark.parametrize("header, role", [
+        (['Proposal', 'Group_or_abrvSample', 'Sample_full', 'Number_of_sorted_plates', 'Country'], ROLE_SAMPLE_METADATA),
+        (GRID_HEADER.split(','), ROLE_GRID_TABLE),
+        (['Plate_ID', 'Well', 'Row', 'Pass_Fail', 'Crossing_Point'], ROLE_KINETICS_SUMMARY),
+        (['Well', 'Sample ID', 'Range', 'ng/uL', '%Total', 'nmole/L', 'Avg. Size'], ROLE_FA_SMEAR),
+        (['Well', 'Sample ID'], None),
+    ])
+    def test_roles(self, header, role):
+        assert file_role(header) == role
+
+    def test_classify_csv_files(self, tmp_path):
+        grid = _write(tmp_path / 'grid.csv', GRID_HEADER + '\n', bom=True)
+        other = _write(tmp_path / 'other.csv', 'x,y\n')
+        empty = _write(tmp_path / 'empty.csv', '')
+
+        assert classify_csv_files([grid, other, empty]) == {grid: ROLE_GRID_TABLE, other: None, empty: None}
@@ -0,0 +1,273 @@
+"""
+Tests for sps_instrumentation.py
+
+Covers:
+  - instrument_stage (profile JSON, exit status, cProfile dump)
+  - profile_step (decorator, context manager, nesting, pass-through)
+  - detail (SPS_QUIET), also in the FA analysis stage scripts
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'benchmarks'))
+
+import sps_instrumentation
+from sps_instrumentation import (
+    CPROFILE_SUFFIX,
+    MEMORY_MAX_RSS,
+    MEMORY_TRACEMALLOC,
+    PROFILE_ENV,
+    PROFILE_SUFFIX,
+    QUIET_ENV,
+    STATUS_DIR,
+    TRACE_MEMORY_ENV,
+    detail,
+    instrument_stage,
+    profile_step,
+)
+from sps_parameters import NON_INTERACTIVE_ENV
+from synthetic_project import fill_redo_thresholds, make_project
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+STAGE = Path(__file__).stem
+
+
+@profile_step()
+def _read_input():
+    return pd.read_csv('input.csv')
+
+
+@profile_step()
+def _write_output(df):
+    df.to_csv('output.csv', index=False)
+
+
+@instrument_stage
+def _stage_main():
+    df = _read_input()
+    with profile_step('transform') as step:
+        df['b'] = df['a'] * 2
+        step.rows = len(df)
+    _write_output(df)
+    return df
+
+
+def _profiles(project_dir):
+    return sorted((project_dir / STATUS_DIR).glob(f'*{PROFILE_SUFFIX}'))
+
+
+def _load_profile(project_dir):
+    paths = _profiles(project_dir)
+    assert len(paths) == 1
+    return json.loads(paths[0].read_text())
+
+
+REPO_DIR = Path(__file__).parent.parent
+
+# prompt answers of the FA analysis stages
+STAGE_PARAMETERS = {
+    NON_INTERACTIVE_ENV: '1',
+    'SPS_MIN_FAILED_LIBS': '20',
+    'SPS_CONFIRM_DILUTION_FACTOR': 'Y',
+}
+
+
+def _run_workflow(project_dir, stages, quiet):
+    """Run SPS_run_workflow.py on a project; returns its stdout."""
+    env = {**os.environ, **STAGE_PARAMETERS, QUIET_ENV: '1' if quiet else '0'}
+    result = subprocess.run([sys.executable, str(REPO_DIR / 'SPS_run_workflow.py'), '--stages', stages,
+                             '--accept-fa-results'],
+                            cwd=project_dir, env=env, capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for env in (PROFILE_ENV, QUIET_ENV, TRACE_MEMORY_ENV):
+        monkeypatch.delenv(env, raising=False)
+    pd.DataFrame({'a': range(5)}).to_csv('input.csv', index=False)
+    return tmp_path
+
+
+# ===========================================================================
+# instrument_stage
+# ===========================================================================
+
+class TestInstrumentStage:
+    def test_profile_is_written_with_steps(self, project):
+        _stage_main()
+
+        profile = _load_profile(project)
+        assert profile['stage'] == STAGE
+        assert profile['status'] == 'completed'
+        assert profile['exit_code'] is None
+        assert profile['wall_s'] >= 0
+        assert profile['peak_memory_mb'] > 0
+        assert profile['cprofile'] is None
+        assert profile['files_read'] == 1
+        assert profile['files_written'] == 1
+
+        steps = {step['name']: step for step in profile['steps']}
+        assert [step['name'] for step in profile['steps']] == ['_read_input', 'transform', '_write_output']
+        assert steps['_read_input']['rows'] == 5
+        assert steps['_read_input']['files_read'] == 1
+        assert steps['_read_input']['files_written'] == 0
+        assert steps['transform']['rows'] == 5
+        assert steps['_write_output']['rows'] is None
+        assert steps['_write_output']['files_written'] == 1
+
+    def test_sys_exit_is_recorded(self, project):
+        @instrument_stage
+        def main():
+            print("FATAL ERROR")
+            sys.exit(2)
+
+        with pytest.raises(SystemExit):
+            main()
+
+        profile = _load_profile(project)
+        assert profile['status'] == 'exited'
+        assert profile['exit_code'] == 2
+
+    def test_exception_is_recorded(self, project):
+        @instrument_stage
+        def main():
+            with profile_step('broken'):
+                raise KeyError('Plate')
+
+        with pytest.raises(KeyError):
+            main()
+
+        profile = _load_profile(project)
+        assert profile['status'] == 'failed'
+        assert 'KeyError' in profile['error']
+        assert profile['steps'][0]['wall_s'] is not None
+
+    def test_nested_stage_is_a_step(self, project):
+        @instrument_stage
+        def main():
+            return _stage_main()
+
+        main()
+
+        profile = _load_profile(project)
+        assert profile['steps'][0]['name'] == STAGE
+        assert profile['steps'][0]['depth'] == 0
+        assert profile['steps'][1]['name'] == '_read_input'
+        assert profile['steps'][1]['depth'] == 1
+
+    def test_cprofile_dump(self, project, monkeypatch):
+        monkeypatch.setenv(PROFILE_ENV, '1')
+
+        _stage_main()
+
+        profile = _load_profile(project)
+        assert profile['cprofile'].endswith(CPROFILE_SUFFIX)
+        assert (project / STATUS_DIR / profile['cprofile']).exists()
+
+    def test_memory_peak_is_max_rss_by_default(self, project):
+        _stage_main()
+
+        profile = _load_profile(project)
+        assert profile['memory'] == MEMORY_MAX_RSS
+        assert not tracemalloc.is_tracing()
+        # the process high-water mark never goes down
+        peaks = [profile['steps'][0]['peak_memory_mb'], profile['steps'][2]['peak_memory_mb'],
+                 profile['peak_memory_mb']]
+        assert 0 < peaks[0] <= peaks[1] <= peaks[2]
+
+    def test_memory_tracing_on_request(self, project, monkeypatch):
+        monkeypatch.setenv(TRACE_MEMORY_ENV, '1')
+
+        _stage_main()
+
+        profile = _load_profile(project)
+        assert profile['memory'] == MEMORY_TRACEMALLOC
+        assert profile['peak_memory_mb'] > 0
+        assert not tracemalloc.is_tracing()
+
+
+# ===========================================================================
+# profile_step
+# ===========================================================================
+
+class TestProfileStep:
+    def test_pass_through_without_stage(self, project):
+        df = _read_input()
+
+        assert len(df) == 5
+        assert sps_instrumentation._run is None
+        assert not (project / STATUS_DIR).exists()
+
+    def test_nested_steps_record_depth(self, project):
+        @instrument_stage
+        def main():
+            with profile_step('outer'):
+                with profile_step('inner'):
+                    _read_input()
+
+        main()
+
+        steps = [(step['name'], step['depth']) for step in _load_profile(project)['steps']]
+        assert steps == [('outer', 0), ('inner', 1), ('_read_input', 2)]
+
+    def test_files_outside_project_are_ignored(self, project, tmp_path_factory):
+        outside = tmp_path_factory.mktemp('outside') / 'other.csv'
+        outside.write_text('a\n1\n')
+
+        @instrument_stage
+        def main():
+            pd.read_csv(outside)
+
+        main()
+
+        assert _load_profile(project)['files_read'] == 0
+
+
+# ===========================================================================
+# detail
+# ===========================================================================
+
+class TestDetail:
+    def test_printed_by_default(self, monkeypatch, capsys):
+        monkeypatch.delenv(QUIET_ENV, raising=False)
+        detail('Archived (copied): plate1')
+        assert 'plate1' in capsys.readouterr().out
+
+    def test_quiet(self, monkeypatch, capsys):
+        monkeypatch.setenv(QUIET_ENV, 'yes')
+        detail('Archived (copied): plate1')
+        assert capsys.readouterr().out == ''
+
+
+class TestQuietStages:
+    @pytest.mark.parametrize('quiet', [False, True])
+    def test_fa_analyses_list_fa_files_only_when_not_quiet(self, tmp_path, quiet):
+        paths = make_project(tmp_path / 'project', plates=5, wells=24, attempts=2)
+
+        stdout = _run_workflow(paths['root'], 'first_fa,rework', quiet)
+        fill_redo_thresholds(paths['root'])
+        stdout += _run_workflow(paths['root'], 'second_fa', quiet)
+
+        assert 'Stage: second_fa' in stdout
+        assert 'Applying quality thresholds' in stdout
+        per_file_lines = ['List of processed FA output files', '27-810002F.csv',
+                          'Successfully processed 2 FA files', '27-810005.2F.csv']
+        for line in per_file_lines:
+            assert (line in stdout) != quiet, line
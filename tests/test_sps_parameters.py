@@ -0,0 +1,132 @@
+"""
+Tests for sps_parameters.py
+
+Covers:
+  - get_parameter source precedence
+  - non-interactive mode
+  - configure_parameters
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_parameters import (
+    add_parameter_arguments,
+    configure_parameters,
+    get_parameter,
+    set_parameters,
+)
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+@pytest.fixture(autouse=True)
+def clean_parameters(tmp_path, monkeypatch):
+    """Run every test in an empty project folder with no SPS_ variables."""
+    monkeypatch.chdir(tmp_path)
+    for name in ("SPS_MIN_FAILED_LIBS", "SPS_NON_INTERACTIVE", "SPS_PARAMS_FILE"):
+        monkeypatch.delenv(name, raising=False)
+    set_parameters()
+    yield
+    set_parameters()
+
+
+def _no_prompt(monkeypatch):
+    def fail(prompt):
+        raise AssertionError("unexpected prompt")
+    monkeypatch.setattr("builtins.input", fail)
+
+
+def _parse(argv):
+    parser = argparse.ArgumentParser()
+    add_parameter_arguments(parser)
+    return parser.parse_args(argv)
+
+
+# ===========================================================================
+# get_parameter
+# ===========================================================================
+
+class TestGetParameter:
+    def test_command_line_beats_environment_and_file(self, tmp_path, monkeypatch):
+        _no_prompt(monkeypatch)
+        (tmp_path / "sps_parameters.json").write_text(json.dumps({"min_failed_libs": 5}))
+        monkeypatch.setenv("SPS_MIN_FAILED_LIBS", "7")
+        configure_parameters(_parse(["--param", "min_failed_libs=9"]))
+
+        assert get_parameter("min_failed_libs", "? ", default=20, convert=float) == 9.0
+
+    def test_environment_beats_file(self, tmp_path, monkeypatch):
+        _no_prompt(monkeypatch)
+        (tmp_path / "sps_parameters.json").write_text(json.dumps({"min_failed_libs": 5}))
+        monkeypatch.setenv("SPS_MIN_FAILED_LIBS", "7")
+
+        assert get_parameter("min_failed_libs", "? ", default=20, convert=float) == 7.0
+
+    def test_project_parameters_file_is_used(self, tmp_path, monkeypatch):
+        _no_prompt(monkeypatch)
+        (tmp_path / "sps_parameters.json").write_text(json.dumps({"MIN_FAILED_LIBS": 5}))
+
+        assert get_parameter("min_failed_libs", "? ", default=20, convert=float) == 5.0
+
+    def test_prompt_is_the_fallback_and_empty_answer_uses_default(self, monkeypatch):
+        monkeypatch.setattr("builtins.input", lambda prompt: "")
+
+        assert get_parameter("min_failed_libs", "? ", default=20, convert=float) == 20.0
+
+    def test_invalid_value_names_its_source(self, monkeypatch):
+        monkeypatch.setenv("SPS_MIN_FAILED_LIBS", "many")
+
+        with pytest.raises(ValueError, match="SPS_MIN_FAILED_LIBS"):
+            get_parameter("min_failed_libs", "? ", default=20, convert=float)
+
+    def test_value_outside_choices_raises(self):
+        set_parameters({"second_attempt": "maybe"})
+
+        with pytest.raises(ValueError, match="Expected one of"):
+            get_parameter("second_attempt", "? ", choices=["YES", "NO"])
+
+
+# ===========================================================================
+# Non-interactive mode
+# ===========================================================================
+
+class TestNonInteractive:
+    def test_default_is_used_without_prompting(self, monkeypatch):
+        _no_prompt(monkeypatch)
+        monkeypatch.setenv("SPS_NON_INTERACTIVE", "1")
+
+        assert get_parameter("dilution_factor", "? ", default=5, convert=float) == 5.0
+
+    def test_missing_required_parameter_raises(self, monkeypatch):
+        _no_prompt(monkeypatch)
+        configure_parameters(_parse(["--non-interactive"]))
+
+        with pytest.raises(ValueError, match="--param second_attempt=VALUE"):
+            get_parameter("second_attempt", "? ")
+
+
+# ===========================================================================
+# configure_parameters
+# ===========================================================================
+
+class TestConfigureParameters:
+    def test_malformed_param_raises(self):
+        with pytest.raises(ValueError):
+            configure_parameters(_parse(["--param", "min_failed_libs"]))
+
+    def test_explicit_params_file_must_exist(self, tmp_path):
+        configure_parameters(_parse(["--params-file", str(tmp_path / "missing.json")]))
+
+        with pytest.raises(ValueError, match="not found"):
+            get_parameter("min_failed_libs", "? ", default=20)
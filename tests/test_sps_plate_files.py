@@ -0,0 +1,135 @@
+"""
+Tests for sps_plate_files.py
+
+Covers:
+  - split_rows_by_plate
+  - fa_upload_table
+  - write_plate_files
+  - write_text_files
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_plate_files import fa_upload_table, split_rows_by_plate, write_plate_files, write_text_files
+from sps_plate_geometry import WELLS_96
+
+
+# ===========================================================================
+# split_rows_by_plate
+# ===========================================================================
+
+class TestSplitRowsByPlate:
+    def test_plates_in_order_of_first_appearance(self):
+        groups = split_rows_by_plate(pd.Series(['P2', 'P1', 'P2', 'P3', 'P1']))
+
+        assert list(groups) == ['P2', 'P1', 'P3']
+        assert [rows.tolist() for rows in groups.values()] == [[0, 2], [1, 4], [3]]
+
+    def test_rows_without_plate_are_left_out(self):
+        groups = split_rows_by_plate(['P1', None, np.nan, 'P1'])
+
+        assert list(groups) == ['P1']
+        assert groups['P1'].tolist() == [0, 3]
+
+    def test_empty(self):
+        assert split_rows_by_plate(pd.Series([], dtype=object)) == {}
+
+
+# ===========================================================================
+# fa_upload_table
+# ===========================================================================
+
+class TestFaUploadTable:
+    def test_template_is_filled_column_major(self):
+        table = fa_upload_table(['B1', 'A2', 'A1'], ['s_B1', 's_A2', None])
+
+        assert table['Well'].tolist() == list(WELLS_96)
+        assert table.index.tolist() == list(range(1, 97))
+        assert table['name'].tolist()[:10] == ['empty_well', 's_B1'] + ['empty_well'] * 6 + ['s_A2', 'empty_well']
+        assert table.loc[96, 'name'] == 'ladder_1'
+
+    def test_sorted_wells_keep_the_redo_file_order(self):
+        wells = ['B1', 'A2', 'A10']
+        table = fa_upload_table(wells, ['s_B1', 's_A2', 's_A10'], sort_wells=True)
+
+        # order of the outer merge on the 96-well list the redo files were written with
+        legacy = pd.DataFrame({'Well': list(WELLS_96)}).merge(
+            pd.DataFrame({'FA_Well': wells, 'name': ['s_B1', 's_A2', 's_A10']}),
+            how='outer', left_on='Well', right_on='FA_Well')
+        legacy['name'] = legacy['name'].fillna('empty_well')
+        legacy.loc[legacy['Well'] == 'H12', 'name'] = 'ladder_1'
+
+        assert table['Well'].tolist()[:6] == ['A1', 'A10', 'A11', 'A12', 'A2', 'A3']
+        assert table.index.tolist() == list(range(1, 97))
+        assert table['Well'].tolist() == legacy['Well'].tolist()
+        assert table['name'].tolist() == legacy['name'].tolist()
+
+    def test_ladder_replaces_sample_in_h12(self):
+        table = fa_upload_table(['H12'], ['s_H12'])
+
+        assert table['name'].tolist() == ['empty_well'] * 95 + ['ladder_1']
+
+    def test_invalid_well_raises(self):
+        with pytest.raises(ValueError, match="Invalid FA well position: P24"):
+            fa_upload_table(['A1', 'P24'], ['a', 'b'])
+
+    def test_duplicate_well_raises(self):
+        with pytest.raises(ValueError, match="used twice on one plate: C3"):
+            fa_upload_table(['C3', 'A1', 'C3'], ['a', 'b', 'c'])
+
+
+# ===========================================================================
+# write_plate_files
+# ===========================================================================
+
+class TestWritePlateFiles:
+    def test_one_file_per_plate_and_family(self, tmp_path):
+        df = pd.DataFrame({'plate': ['P1', 'P2', 'P1'], 'value': [1, 2, 3]})
+        (tmp_path / 'a').mkdir()
+        (tmp_path / 'b').mkdir()
+
+        def build_a(plate, plate_df):
+            return plate_df, f'a_{plate}.csv', {'index': False}
+
+        def build_b(plate, plate_df):
+            return plate_df[['value']], f'b_{plate}.csv', {'index': False, 'header': False}
+
+        paths = write_plate_files([(df, 'plate', tmp_path / 'a', build_a),
+                                   (df, 'plate', tmp_path / 'b', build_b)], workers=2)
+
+        assert paths == [tmp_path / 'a' / 'a_P1.csv', tmp_path / 'a' / 'a_P2.csv',
+                         tmp_path / 'b' / 'b_P1.csv', tmp_path / 'b' / 'b_P2.csv']
+        assert pd.read_csv(paths[0])['value'].tolist() == [1, 3]
+        assert (tmp_path / 'b' / 'b_P2.csv').read_text() == '2\n'
+
+    def test_build_errors_are_raised(self, tmp_path):
+        df = pd.DataFrame({'plate': ['P1'], 'well': ['Z9'], 'name': ['s']})
+
+        def build(plate, plate_df):
+            return fa_upload_table(plate_df['well'], plate_df['name']), f'{plate}.csv', {}
+
+        with pytest.raises(ValueError, match="Z9"):
+            write_plate_files([(df, 'plate', tmp_path, build)])
+
+
+# ===========================================================================
+# write_text_files
+# ===========================================================================
+
+class TestWriteTextFiles:
+    def test_text_is_written_unchanged(self, tmp_path):
+        files = [(tmp_path / f'{i}.csv', f'a,b\r\n{i},é\r\n') for i in range(5)]
+
+        paths = write_text_files(files, workers=3)
+
+        assert paths == [path for path, _ in files]
+        assert (tmp_path / '3.csv').read_bytes() == 'a,b\r\n3,é\r\n'.encode('utf-8')
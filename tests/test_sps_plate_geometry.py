@@ -0,0 +1,115 @@
+"""
+Tests for sps_plate_geometry.py
+
+Covers:
+  - lookup tables
+  - stamp_96_to_384 / stamp_384_to_96
+  - row_letters_to_numbers
+  - well_to_row_col
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_plate_geometry import (
+    COLUMNS_384,
+    QUADRANT_WELLS_384,
+    QUADRANTS_384,
+    ROWS_384,
+    STAMP_96_TO_384,
+    WELL_INDEX_384,
+    WELLS_96,
+    WELLS_96_OF_384,
+    row_letters_to_numbers,
+    stamp_384_to_96,
+    stamp_96_to_384,
+    well_to_row_col,
+)
+
+
+# ===========================================================================
+# Lookup tables
+# ===========================================================================
+
+class TestTables:
+    def test_wells_are_column_major(self):
+        assert WELLS_96[:9] == ('A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'G1', 'H1', 'A2')
+        assert WELLS_96[-1] == 'H12'
+
+    def test_quadrants_cover_384_plate_once(self):
+        stamped = [well for quadrant in (1, 2, 3, 4) for well in QUADRANT_WELLS_384[quadrant]]
+
+        assert sorted(stamped) == sorted(WELL_INDEX_384)
+
+    def test_quadrant_tables_agree(self):
+        for quadrant in (1, 2, 3, 4):
+            positions = WELL_INDEX_384.get_indexer(QUADRANT_WELLS_384[quadrant])
+            assert set(QUADRANTS_384[positions]) == {quadrant}
+            assert tuple(WELLS_96_OF_384[positions]) == WELLS_96
+
+    def test_tables_are_read_only(self):
+        with pytest.raises(ValueError):
+            ROWS_384[0] = 5
+        with pytest.raises(TypeError):
+            STAMP_96_TO_384['A1'] = 'B2'
+
+    def test_row_and_column_arrays_align_with_wells(self):
+        position = WELL_INDEX_384.get_loc('C2')
+
+        assert (ROWS_384[position], COLUMNS_384[position]) == (3, 2)
+
+
+# ===========================================================================
+# stamp_96_to_384 / stamp_384_to_96
+# ===========================================================================
+
+class TestStamp:
+    def test_96_to_384_uses_upper_left_quadrant(self):
+        assert stamp_96_to_384(['A1', 'B1', 'A2', 'H12']).tolist() == ['A1', 'C1', 'A3', 'O23']
+
+    def test_round_trip(self):
+        wells = pd.Series(WELLS_96)
+
+        assert stamp_384_to_96(stamp_96_to_384(wells)).tolist() == list(WELLS_96)
+
+    def test_unmapped_values_are_unchanged(self):
+        wells = pd.Series(['C1', 'B2', 'PE17_1', None], index=[10, 11, 12, 13])
+
+        result = stamp_384_to_96(wells)
+
+        assert result.tolist() == ['B1', 'B2', 'PE17_1', None]
+        assert result.index.tolist() == [10, 11, 12, 13]
+
+
+# ===========================================================================
+# row_letters_to_numbers / well_to_row_col
+# ===========================================================================
+
+class TestRowLettersToNumbers:
+    def test_letters(self):
+        assert row_letters_to_numbers(['A', 'H', 'P']).tolist() == [1, 8, 16]
+
+    def test_invalid_letter_raises(self):
+        with pytest.raises(ValueError, match="Q"):
+            row_letters_to_numbers(['A', 'Q'])
+
+
+class TestWellToRowCol:
+    def test_rows_and_columns(self):
+        rows, columns = well_to_row_col(pd.Series(['C2', ' p24', 'b05'], index=[4, 5, 6]))
+
+        assert rows.tolist() == [3, 16, 2]
+        assert columns.tolist() == [2, 24, 5]
+        assert rows.index.tolist() == [4, 5, 6]
+
+    @pytest.mark.parametrize("well", ['Q1', 'A25', 'A0', 'A', '1A', None, 7])
+    def test_invalid_well_raises(self, well):
+        with pytest.raises(ValueError, match="Invalid well position"):
+            well_to_row_col(['A1', well])
@@ -0,0 +1,142 @@
+"""
+Tests for sps_snapshot.py
+
+Covers:
+  - refresh_project_summary_snapshot / load_project_summary
+  - archive_project_summary_csv
+"""
+
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import sps_snapshot
+from sps_database import read_project_summary, write_project_summary
+from sps_snapshot import (
+    archive_project_summary_csv,
+    load_project_summary,
+    refresh_project_summary_snapshot,
+    snapshot_is_current,
+    snapshot_path,
+)
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _make_project_df(n=4):
+    return pd.DataFrame({
+        "sample_id": [1001 + i for i in range(n)],
+        "Destination_Plate_Barcode": ["XUPVQ-1"] * n,
+        "Destination_Well": [f"A{2 * i + 1}" for i in range(n)],
+        "ng/uL": [1.5 * i for i in range(n)],
+        "Passed_library": [1, 0, 1, None][:n],
+    })
+
+
+def _write_db(tmp_path, df=None):
+    db_path = tmp_path / "project_summary.db"
+    write_project_summary(_make_project_df() if df is None else df, db_path)
+    return db_path
+
+
+def _age(path, seconds):
+    """Move the modification time of path into the past."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - int(seconds * 1e9)))
+
+
+# ===========================================================================
+# Snapshot write / load
+# ===========================================================================
+
+class TestProjectSummarySnapshot:
+    def test_snapshot_round_trips_the_table(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        db_path = _write_db(tmp_path)
+
+        refresh_project_summary_snapshot(db_path)
+
+        assert snapshot_is_current(db_path)
+        pd.testing.assert_frame_equal(load_project_summary(db_path),
+                                      read_project_summary(db_path))
+
+    def test_stale_snapshot_is_ignored(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        db_path = _write_db(tmp_path)
+        refresh_project_summary_snapshot(db_path)
+        _age(snapshot_path(db_path), 10)
+
+        assert not snapshot_is_current(db_path)
+
+    def test_database_change_after_snapshot_is_read_from_database(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        db_path = _write_db(tmp_path)
+        refresh_project_summary_snapshot(db_path)
+        _age(snapshot_path(db_path), 10)
+
+        write_project_summary(_make_project_df(2), db_path)
+
+        assert len(load_project_summary(db_path)) == 2
+
+    def test_mixed_type_column_is_not_loaded_from_snapshot(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        db_path = _write_db(tmp_path)
+        # untyped column, as in databases written before the to_sql column types
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('ALTER TABLE project_summary ADD COLUMN "Redo_Passed_library"')
+            conn.executemany('UPDATE project_summary SET "Redo_Passed_library" = ? WHERE sample_id = ?',
+                             [(1, 1001), ("0", 1002), (1, 1003)])
+
+        refresh_project_summary_snapshot(db_path)
+
+        assert snapshot_path(db_path).exists()
+        assert not snapshot_is_current(db_path)
+        assert load_project_summary(db_path)["Redo_Passed_library"].tolist() == [1, "0", 1, None]
+
+    def test_without_pyarrow_database_is_read(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sps_snapshot, "HAVE_PYARROW", False)
+        db_path = _write_db(tmp_path)
+
+        assert refresh_project_summary_snapshot(db_path) is None
+        assert not snapshot_path(db_path).exists()
+        pd.testing.assert_frame_equal(load_project_summary(db_path),
+                                      read_project_summary(db_path))
+
+
+# ===========================================================================
+# archive_project_summary_csv
+# ===========================================================================
+
+class TestArchiveProjectSummaryCsv:
+    def test_archive_keeps_csv_text(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        csv_path = tmp_path / "project_summary.csv"
+        csv_path.write_text("sample_id,Destination_Well,ng/uL\n1001,A01,5.0\n1002,,NA\n")
+
+        archive_path = archive_project_summary_csv(csv_path, tmp_path, "2024_01_01-Time00-00-00")
+
+        assert archive_path.name == "archive_project_summary_2024_01_01-Time00-00-00.parquet"
+        assert not csv_path.exists()
+        archived = pd.read_parquet(archive_path)
+        assert archived.values.tolist() == [["1001", "A01", "5.0"], ["1002", "", "NA"]]
+
+    def test_without_pyarrow_csv_is_moved(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sps_snapshot, "HAVE_PYARROW", False)
+        csv_path = tmp_path / "project_summary.csv"
+        csv_path.write_text("sample_id\n1001\n")
+
+        archive_path = archive_project_summary_csv(csv_path, tmp_path, "2024_01_01-Time00-00-00")
+
+        assert archive_path.name == "archive_project_summary_2024_01_01-Time00-00-00.csv"
+        assert archive_path.read_text() == "sample_id\n1001\n"
+        assert not csv_path.exists()
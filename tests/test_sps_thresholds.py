@@ -0,0 +1,140 @@
+"""
+Tests for sps_thresholds.py
+
+Covers:
+  - passed_libraries
+  - whole_plate_reworks
+  - sweep_thresholds
+  - parse_threshold_list
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure the workspace root is on the path so the import works regardless of
+# where pytest is invoked from.
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sps_thresholds import (
+    SWEEP_COLUMNS,
+    parse_threshold_list,
+    passed_libraries,
+    sweep_thresholds,
+    whole_plate_reworks,
+)
+
+
+# ===========================================================================
+# Helpers
+# ===========================================================================
+
+def _make_libraries(num_plates=6, wells=40, seed=0):
+    """Merged library/FA frame with some plates failing badly."""
+    rng = np.random.default_rng(seed)
+    n = num_plates * wells
+    plates = np.repeat([f'27-81000{p}' for p in range(num_plates)], wells)
+    conc = rng.uniform(0, 12, n)
+    conc[plates == '27-810002'] *= 0.3
+    size = rng.uniform(300, 900, n)
+    conc[::17] = np.nan
+    return pd.DataFrame({'Destination_Plate_Barcode': plates, 'nmole/L': conc, 'Avg. Size': size})
+
+
+def _legacy_reworks(lib_df, min_failed_libs):
+    """value_counts loop used by findPassFailLibs before."""
+    whole_plate_redo = []
+    for val, cnt in lib_df[(lib_df['Passed_library'] == 0)]['Destination_Plate_Barcode'].value_counts().items():
+        if cnt >= min_failed_libs:
+            whole_plate_redo.append(val)
+    return sorted(whole_plate_redo)
+
+
+# ===========================================================================
+# passed_libraries / whole_plate_reworks
+# ===========================================================================
+
+class TestSingleSetting:
+    def test_matches_legacy_pass_and_rework_logic(self):
+        lib_df = _make_libraries()
+        lib_df['DNA_conc_threshold_(nmol/L)'] = 5
+        lib_df['Size_theshold_(bp)'] = np.where(lib_df['Destination_Plate_Barcode'] == '27-810004', 600, 530)
+
+        legacy = np.where(((lib_df['nmole/L'] > lib_df['DNA_conc_threshold_(nmol/L)']) & (
+            lib_df['Avg. Size'] > lib_df['Size_theshold_(bp)'])), 1, 0)
+        passed = passed_libraries(lib_df['nmole/L'], lib_df['Avg. Size'],
+                                  lib_df['DNA_conc_threshold_(nmol/L)'], lib_df['Size_theshold_(bp)'])
+
+        np.testing.assert_array_equal(np.where(passed, 1, 0), legacy)
+        lib_df['Passed_library'] = legacy
+        for min_failed in [0, 1, 15, 20.0, 25, 1000]:
+            assert whole_plate_reworks(lib_df['Destination_Plate_Barcode'], passed, min_failed) == \
+                _legacy_reworks(lib_df, min_failed)
+
+    def test_missing_values_fail(self):
+        assert passed_libraries([np.nan, 6, 6], [600, np.nan, 600], 5, 530).tolist() == [False, False, True]
+
+    def test_libraries_without_plate_are_ignored(self):
+        assert whole_plate_reworks(['A', None, np.nan], [False, False, False], 1) == ['A']
+
+
+# ===========================================================================
+# sweep_thresholds
+# ===========================================================================
+
+class TestSweepThresholds:
+    def test_every_setting_matches_a_single_evaluation(self):
+        lib_df = _make_libraries()
+        conc_thresholds, size_thresholds, min_failed = [2, 5, 8], [450, 530], [10, 20]
+
+        sweep_df = sweep_thresholds(lib_df['Destination_Plate_Barcode'], lib_df['nmole/L'], lib_df['Avg. Size'],
+                                    conc_thresholds, size_thresholds, min_failed)
+
+        assert list(sweep_df.columns) == SWEEP_COLUMNS
+        assert len(sweep_df) == 12
+        for row in sweep_df.itertuples(index=False):
+            passed = passed_libraries(lib_df['nmole/L'], lib_df['Avg. Size'], row[0], row[1])
+            reworks = whole_plate_reworks(lib_df['Destination_Plate_Barcode'], passed, row[2])
+            assert row.Passed_libraries == passed.sum()
+            assert row.Failed_libraries == len(lib_df) - passed.sum()
+            assert row.Rework_plate_count == len(reworks)
+            assert row.Rework_plates == ','.join(reworks)
+
+    def test_settings_are_listed_in_the_given_order(self):
+        lib_df = _make_libraries(num_plates=2, wells=5)
+
+        sweep_df = sweep_thresholds(lib_df['Destination_Plate_Barcode'], lib_df['nmole/L'], lib_df['Avg. Size'],
+                                    [8, 2], [530], [3, 1])
+
+        assert sweep_df[SWEEP_COLUMNS[:3]].values.tolist() == [[8, 530, 3], [8, 530, 1], [2, 530, 3], [2, 530, 1]]
+
+    def test_unordered_plates(self):
+        sweep_df = sweep_thresholds(['b', 'a', 'b', None, 'a'], [1, 1, 9, 1, 1], [600] * 5, [5], [530], [2])
+
+        assert sweep_df.loc[0, 'Passed_libraries'] == 1
+        assert sweep_df.loc[0, 'Failed_libraries'] == 3
+        assert sweep_df.loc[0, 'Rework_plates'] == 'a'
+
+    def test_no_libraries(self):
+        sweep_df = sweep_thresholds([], [], [], [5], [530], [20])
+
+        assert sweep_df.loc[0, 'Passed_libraries'] == 0
+        assert sweep_df.loc[0, 'Rework_plates'] == ''
+
+
+# ===========================================================================
+# parse_threshold_list
+# ===========================================================================
+
+class TestParseThresholdList:
+    def test_comma_separated_numbers(self):
+        assert parse_threshold_list('5, 7.5,') == [5.0, 7.5]
+
+    @pytest.mark.parametrize('value', ['5,x', ',', ''])
+    def test_invalid_lists_are_rejected(self, value):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_threshold_list(value)